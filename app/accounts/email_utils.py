@@ -1,6 +1,6 @@
 import boto3
 from django.conf import settings
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 from datetime import datetime
 
 
@@ -14,7 +14,7 @@ def get_ses_client():
 
 
 def send_register_email(to_email, user_name=None):
-    config = Configuration.objects.first()
+    config = get_configuration()
     email_body = config.email_register_subject if config and config.email_register_subject else "Bem-vindo(a)!"
     if user_name:
         email_body = email_body.replace("{{user_name}}", user_name)
@@ -34,7 +34,7 @@ def send_register_email(to_email, user_name=None):
 
 def send_password_reset_email(to_email, user_name, recovery_code, reset_link, expiration_hours):
 
-    config = Configuration.objects.first()
+    config = get_configuration()
     email_body = config.email_recovery
     email_body = email_body.replace("{{user_name}}", user_name)
     email_body = email_body.replace("{{recovery_code}}", recovery_code)
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from campaigns.finance_months import get_compacted_months, split_date_range, whole_months_in_range
+from campaigns.models import Campaign, FinanceLogsMonthly, UserDailyFinance
+
+logger = logging.getLogger('django')
+
+# Quantidade de usuários mantidos no ranking (top-K)
+LEADERBOARD_SIZE = 10
+
+
+class Leaderboard:
+    """
+    Ranking por processo dos usuários com maior profit (de todo o período).
+
+    A carga lê os K primeiros pelo índice de `users.profit` (uma consulta de
+    K linhas). As variações de profit gravadas pelo processo (ver
+    `campaigns.finance_log_utils.apply_user_profit_delta`) atualizam o
+    ranking na hora, sem consultas; um usuário do ranking que cai abaixo do
+    K-ésimo descarta o ranking, pois o próximo colocado não está no processo.
+    As variações dos demais processos aparecem na recarga, feita a cada
+    `LEADERBOARD_REFRESH_SECONDS`.
+    """
+
+    def __init__(self, size=LEADERBOARD_SIZE, refresh_interval=None):
+        self.size = size
+        self.refresh_interval = (
+            settings.LEADERBOARD_REFRESH_SECONDS if refresh_interval is None else refresh_interval)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.loaded = False
+        self.generation = 0
+        self.loaded_at = 0.0
+
+    def load(self):
+        """
+        Carrega os K usuários com maior profit.
+        """
+        generation = self.generation
+        entries = dict(get_user_model().objects.order_by('-profit').values_list('pk', 'profit')[:self.size])
+        with self.lock:
+            self.entries = entries
+            # Uma variação que descartou o ranking durante a carga mantém o ranking sujo
+            self.loaded = generation == self.generation
+            self.loaded_at = time.monotonic()
+        return len(entries)
+
+    def invalidate(self):
+        """
+        Descarta o ranking do processo; a próxima leitura recarrega do banco.
+        """
+        with self.lock:
+            self.generation += 1
+            self.loaded = False
+
+    def record(self, user_id, profit):
+        """
+        Atualiza o ranking com o novo profit do usuário.
+        """
+        with self.lock:
+            if not self.loaded:
+                return
+            # Com menos de K usuários no ranking, todos os usuários estão nele
+            full = len(self.entries) >= self.size
+            floor = min(self.entries.values()) if full else None
+            if user_id in self.entries:
+                if full and profit < floor:
+                    self.generation += 1
+                    self.loaded = False
+                else:
+                    self.entries[user_id] = profit
+            elif not full:
+                self.entries[user_id] = profit
+            elif profit > floor:
+                self.entries[user_id] = profit
+                del self.entries[min(self.entries, key=self.entries.get)]
+
+    def discard(self, user_id):
+        """
+        Remove um usuário excluído; o ranking é recarregado para repor a posição.
+        """
+        with self.lock:
+            if user_id in self.entries:
+                self.generation += 1
+                self.loaded = False
+
+    def top(self, limit=None):
+        """
+        Retorna [(user_id, profit)] dos `limit` (até K) primeiros colocados.
+        """
+        if not self.loaded or time.monotonic() - self.loaded_at >= self.refresh_interval:
+            self.load()
+        with self.lock:
+            ranking = sorted(self.entries.items(), key=lambda entry: entry[1], reverse=True)
+        return ranking[:limit or self.size]
+
+
+def get_top_users(limit=LEADERBOARD_SIZE):
+    """
+    Retorna os usuários com maior profit de todo o período, em ordem (uma
+    consulta pela chave primária, além da recarga eventual do ranking).
+    """
+    ranking = leaderboard.top(limit)
+    users = get_user_model().objects.in_bulk([user_id for user_id, _ in ranking])
+    return [users[user_id] for user_id, _ in ranking if user_id in users]
+
+
+def period_ranking(start_date, end_date, limit=LEADERBOARD_SIZE):
+    """
+    Calcula os `limit` usuários com maior lucro (aprovado - anúncios) no
+    intervalo, em uma única consulta: os meses inteiros compactados pelo
+    FinanceLogsMonthly e os demais dias pelos rollups diários dos usuários.
+
+    Returns:
+        list: [(user_id, profit)] em ordem decrescente de lucro.
+    """
+    if not whole_months_in_range(start_date, end_date):
+        day_ranges, months = [(start_date, end_date)], []
+    else:
+        day_ranges, months = split_date_range(start_date, end_date, get_compacted_months())
+
+    qn = connection.ops.quote_name
+    parts, params = [], []
+    if day_ranges:
+        days = Q()
+        for first, last in day_ranges:
+            days |= Q(date__gte=first, date__lte=last)
+        daily_sql, daily_params = UserDailyFinance.objects.filter(days).values(
+            'user_id', 'amount_approved', 'total_ads').query.sql_with_params()
+        parts.append(f"SELECT * FROM ({daily_sql}) AS days")
+        params.extend(daily_params)
+    if months:
+        parts.append(
+            f"SELECT c.user_id, m.amount_approved, m.total_ads "
+            f"FROM {qn(FinanceLogsMonthly._meta.db_table)} AS m "
+            f"JOIN {qn(Campaign._meta.db_table)} AS c ON c.id = m.campaign_id WHERE m.month = ANY(%s)")
+        params.append(months)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT user_id, SUM(amount_approved) - SUM(total_ads) AS profit "
+            f"FROM ({' UNION ALL '.join(parts)}) AS tiers GROUP BY user_id ORDER BY profit DESC LIMIT %s",
+            params + [limit])
+        return cursor.fetchall()
+
+
+def get_top_users_by_period(start_date, end_date, limit=LEADERBOARD_SIZE):
+    """
+    Retorna os usuários com maior lucro no intervalo, em ordem, com `profit`
+    igual ao lucro do intervalo.
+
+    O ranking de cada intervalo fica no cache compartilhado por
+    `LEADERBOARD_CACHE_SECONDS`: as leituras seguintes leem apenas os K
+    usuários pela chave primária.
+    """
+    key = f"leaderboard:{start_date}:{end_date}:{limit}"
+    ranking = cache.get(key)
+    if ranking is None:
+        ranking = period_ranking(start_date, end_date, limit)
+        cache.set(key, ranking, settings.LEADERBOARD_CACHE_SECONDS)
+
+    users = get_user_model().objects.in_bulk([user_id for user_id, _ in ranking])
+    top_users = []
+    for user_id, profit in ranking:
+        if user_id in users:
+            users[user_id].profit = profit
+            top_users.append(users[user_id])
+    return top_users
+
+
+# Instância usada pelo dashboard admin e pelas escritas de profit
+leaderboard = Leaderboard()
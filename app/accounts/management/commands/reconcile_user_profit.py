@@ -0,0 +1,42 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from accounts.models import Usuario
+from campaigns.models import CampaignCounters
+import logging
+logger = logging.getLogger('django')
+
+
+def campaigns_profit():
+    """
+    Subquery com a soma do profit de todas as campanhas do usuário (0 se não houver).
+    """
+    total = CampaignCounters.objects.filter(campaign__user=OuterRef('pk')).order_by().values(
+        'campaign__user').annotate(total=Sum('profit')).values('total')
+    output_field = DecimalField(max_digits=10, decimal_places=2)
+    return Coalesce(Subquery(total, output_field=output_field), Value(Decimal('0')), output_field=output_field)
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o profit dos usuários a partir dos contadores das campanhas e corrige divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas informa os usuários com profit divergente.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Arredonda como a coluna `profit` do usuário (2 casas)
+            divergent = Usuario.objects.annotate(expected=campaigns_profit()).exclude(
+                profit=Round('expected', 2))
+            divergent_ids = list(divergent.values_list('pk', flat=True))
+
+            if divergent_ids and not options['dry_run']:
+                Usuario.objects.filter(pk__in=divergent_ids).update(profit=campaigns_profit())
+
+        logger.info(f"Reconciliação de profit: {len(divergent_ids)} usuários divergentes.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(divergent_ids)} usuários com profit divergente"
+            f"{' (nada alterado)' if options['dry_run'] else ' corrigidos'}."))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_usuario_password_reset_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['profit'], name='users_profit_idx'),
+        ),
+    ]
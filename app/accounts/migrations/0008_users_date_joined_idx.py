@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_users_profit_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['date_joined', 'uid'], name='users_date_joined_idx'),
+        ),
+    ]
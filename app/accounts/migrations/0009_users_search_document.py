@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+from campaigns.search import search_document_operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_users_date_joined_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='search_document',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='users_search_idx'),
+        ),
+        *search_document_operations(
+            'users', ['name', 'email']),
+    ]
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
@@ -45,11 +47,16 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     def recalculate_profit(self):
         """
         Recalcula o valor total de profit com base nas campanhas associadas.
+
+        A linha do usuário fica travada entre a soma e a gravação: uma venda
+        concorrente (`apply_user_profit_delta`) soma o seu delta depois.
         """
-        total_profit = self.campaigns.aggregate(
-            Sum('profit'))['profit__sum'] or 0
-        self.profit = total_profit
-        self.save()
+        with transaction.atomic():
+            Usuario.objects.select_for_update().filter(pk=self.pk).exists()
+            total_profit = self.campaigns.aggregate(
+                total=Sum('counters__profit'))['total'] or 0
+            self.profit = total_profit
+            self.save(update_fields=['profit'])
 
     # Controle de tentativas de login
     login_attempts = models.PositiveIntegerField(
@@ -60,6 +67,11 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     # Garantir que o usuário possa ser desativado
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)  # Necessário para admin
+    # Documento da busca das listagens, mantido por trigger (ver `campaigns.search`)
+    search_document = models.TextField(null=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    SEARCH_DOCUMENT_FIELDS = ('name', 'email')
 
     objects = UsuarioManager()
 
@@ -68,10 +80,30 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         db_table = 'users'
+        indexes = [
+            # Ranking dos usuários por profit (ver `accounts.leaderboard`)
+            models.Index(fields=['profit'], name='users_profit_idx'),
+            # Listagem por cursor (date_joined, uid) do admin
+            models.Index(fields=['date_joined', 'uid'], name='users_date_joined_idx'),
+            GinIndex(fields=['search_vector'], name='users_search_idx'),
+        ]
 
     def __str__(self):
         return self.email or self.cpf
 
+    def save(self, *args, **kwargs):
+        """
+        O save completo de um usuário existente não grava o profit, mantido por
+        UPDATEs incrementais (ver `campaigns.finance_log_utils.apply_user_profit_delta`):
+        o valor carregado na instância pode estar desatualizado. Para gravá-lo,
+        use `update_fields=['profit']` (ex.: `recalculate_profit`).
+        """
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'profit']
+        super().save(*args, **kwargs)
+
     def is_locked(self):
         """Verifica se o usuário está temporariamente bloqueado"""
         if self.locked_until and self.locked_until > timezone.now():
@@ -83,13 +115,13 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
         self.login_attempts += 1
         if self.login_attempts >= 5 and self.locked_until is None:  # Bloqueia após 5 tentativas erradas
             self.locked_until = timezone.now() + timedelta(minutes=5)  # Bloqueio de 5 min
-        self.save()
+        self.save(update_fields=['login_attempts', 'locked_until'])
 
     def reset_login_attempts(self):
         """Reseta as tentativas após um login bem-sucedido"""
         self.login_attempts = 0
         self.locked_until = None
-        self.save()
+        self.save(update_fields=['login_attempts', 'locked_until'])
 
 
 User = get_user_model()
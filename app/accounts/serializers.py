@@ -1,6 +1,6 @@
 import socket
 import re
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
@@ -36,7 +36,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"cpf": "CPF inválido."})
 
         # Valida o captcha se necessário
-        config = Configuration.objects.first()
+        config = get_configuration()
         if config and config.recaptchar_enable and not data.get('captcha'):
             raise serializers.ValidationError(
                 {'captcha': 'Este campo é obrigatório.'})
@@ -50,16 +50,16 @@ class RegisterSerializer(serializers.ModelSerializer):
         avatar = validated_data.pop('avatar', None)
         if avatar:
             user.avatar = avatar
-            user.save()
+            user.save(update_fields=['avatar'])
 
-        config = Configuration.objects.first()
+        config = get_configuration()
         if config and config.require_email_confirmation:
             user.is_active = True
-            user.save()
+            user.save(update_fields=['is_active'])
 
         else:
             user.is_active = True
-            user.save()
+            user.save(update_fields=['is_active'])
 
         return user
 
@@ -269,6 +269,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = Usuario
         fields = ['uid', 'name', 'email', 'cpf',
                   'avatar', 'date_joined', 'profit']
+        # Mantido pelas vendas das campanhas (ver `Usuario.save`)
+        read_only_fields = ['profit']
 
     def validate_name(self, value):
 
@@ -383,19 +385,27 @@ class AdminUserUpdateSerializer(serializers.ModelSerializer):
         """
         Atualiza os dados do usuário.
         """
+        # Apenas os campos alterados: o profit é mantido por UPDATEs incrementais
+        model_fields = {field.name for field in Usuario._meta.concrete_fields}
+        update_fields = []
+
         admin_flag = validated_data.pop('admin', None)
         if admin_flag is not None:
             instance.is_superuser = admin_flag
+            update_fields.append('is_superuser')
 
         if validated_data.pop('change_password', False):
             password = validated_data.pop('password', None)
             if password:
                 instance.set_password(password)
+                update_fields.append('password')
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+            if attr in model_fields:
+                update_fields.append(attr)
 
-        instance.save()
+        instance.save(update_fields=update_fields)
         return instance
 
 
@@ -412,7 +422,7 @@ class PasswordResetRequestSerializer(serializers.Serializer):
         required=False, allow_blank=True)
 
     def validate(self, data):
-        config = Configuration.objects.first()
+        config = get_configuration()
         if config and config.recaptchar_enable and not data.get('captcha'):
             raise serializers.ValidationError(
                 {'captcha': 'Este campo é obrigatório.'}
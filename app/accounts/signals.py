@@ -1,12 +1,38 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from campaigns.models import Campaign  # Importar o modelo Campaign corretamente
+from campaigns.models import CampaignCounters
+from campaigns.finance_log_utils import apply_user_profit_delta
+from .leaderboard import leaderboard
+from .models import Usuario
 
 
-@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=CampaignCounters)
 def update_user_profit(sender, instance, **kwargs):
     """
-    Atualiza o profit do usuário sempre que uma campanha for salva.
+    Remove do profit do usuário o lucro de uma campanha excluída.
+
+    As variações de lucro das vendas são somadas no usuário junto com os
+    contadores da campanha (ver `campaigns.finance_log_utils.apply_campaign_deltas`).
+    """
+    apply_user_profit_delta(instance.campaign_id, -instance.profit)
+
+
+@receiver(post_save, sender=Usuario)
+def user_profit_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Usuários salvos com o profit (`update_fields`, ex.: `recalculate_profit`)
+    atualizam o ranking por profit após o commit; os demais saves não gravam
+    o profit (ver `Usuario.save`).
+    """
+    if update_fields and 'profit' in update_fields:
+        profit = instance.profit
+        transaction.on_commit(lambda: leaderboard.record(instance.pk, profit))
+
+
+@receiver(post_delete, sender=Usuario)
+def user_removed_from_leaderboard(sender, instance, **kwargs):
+    """
+    Usuários excluídos saem do ranking por profit.
     """
-    if instance.user:  # Certifique-se de que a campanha está associada a um usuário
-        instance.user.recalculate_profit()
+    transaction.on_commit(lambda: leaderboard.discard(instance.pk))
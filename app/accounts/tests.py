@@ -1,8 +1,20 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse, NoReverseMatch
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from custom_admin.models import Configuration
+from accounts.leaderboard import LEADERBOARD_SIZE, get_top_users, get_top_users_by_period, leaderboard
+from campaigns.models import Campaign, UserDailyFinance
+from campaigns.finance_log_utils import apply_finance_deltas, apply_user_profit_delta
+from campaigns.finance_months import compact_finance_month, invalidate_compacted_months, month_start
 from uuid import UUID
 import os
 
@@ -284,3 +296,111 @@ class TestProfileUpdate(APITestCase):
         except Exception as e:
             self.fail(f"Erro inesperado: {str(e)}")
             print(f"Erro inesperado: {str(e)}")
+
+
+class TestLeaderboard(APITestCase):
+    """Testes do ranking de usuários por profit (accounts.leaderboard)."""
+
+    def setUp(self):
+        self.users = []
+        self.campaigns = []
+        for index in range(15):
+            user = User.objects.create_user(
+                cpf=f"{index + 1:011d}", email=f"user{index}@gmail.com", name=f"Usuário {index}", password=password)
+            self.users.append(user)
+            self.campaigns.append(Campaign.objects.create(user=user, title=f"Campanha {index}", method="CPC"))
+        self.rng = random.Random(20241001)
+        leaderboard.invalidate()
+        cache.clear()
+
+    def tearDown(self):
+        leaderboard.invalidate()
+        cache.clear()
+
+    def expected_top(self, limit=LEADERBOARD_SIZE):
+        return list(User.objects.order_by('-profit').values_list('pk', 'profit')[:limit])
+
+    def test_incremental_updates_match_database(self):
+        """
+        Testa se o ranking atualizado pelas variações de profit é igual ao do
+        banco, recarregando apenas quando um usuário do ranking cai abaixo do K-ésimo.
+        """
+        leaderboard.top()
+        reloads = 0
+        for _ in range(200):
+            campaign = self.rng.choice(self.campaigns)
+            delta = Decimal(self.rng.randint(-4000, 9000)) / 100
+            with self.captureOnCommitCallbacks(execute=True):
+                apply_user_profit_delta(campaign.pk, delta)
+            if not leaderboard.loaded:
+                reloads += 1
+                leaderboard.top()
+            with self.assertNumQueries(0):
+                ranking = leaderboard.top()
+            self.assertEqual([profit for _, profit in ranking], [profit for _, profit in self.expected_top()])
+            # Empates no K-ésimo podem trocar o usuário, mas não o profit
+            profits = dict(User.objects.filter(pk__in=[user_id for user_id, _ in ranking]).values_list('pk', 'profit'))
+            self.assertEqual(dict(ranking), profits)
+        self.assertLess(reloads, 100)
+
+    def test_top_users_query_uses_profit_index(self):
+        """
+        Testa se a recarga do ranking lê apenas os K primeiros (LIMIT) pela coluna indexada.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            top_users = get_top_users()
+        self.assertEqual(len(captured.captured_queries), 2)
+        self.assertIn('ORDER BY "users"."profit" DESC', captured.captured_queries[0]['sql'])
+        self.assertIn(f'LIMIT {LEADERBOARD_SIZE}', captured.captured_queries[0]['sql'])
+        self.assertEqual(len(top_users), LEADERBOARD_SIZE)
+
+        # Usuário excluído sai do ranking
+        with self.captureOnCommitCallbacks(execute=True):
+            top_users[0].delete()
+        self.assertNotIn(top_users[0].pk, [user.pk for user in get_top_users()])
+
+    def test_period_ranking_from_rollups(self):
+        """
+        Testa o ranking por período pelos rollups diários e meses compactados,
+        e se o ranking do intervalo é reaproveitado pelo cache.
+        """
+        today = timezone.localdate()
+        for _ in range(300):
+            campaign = self.rng.choice(self.campaigns)
+            day = today - timedelta(days=self.rng.randint(0, 120))
+            apply_finance_deltas(campaign.pk, day, {
+                'total_approved': 1, 'amount_approved': Decimal(self.rng.randint(100, 9000)) / 100,
+                'total_ads': Decimal(self.rng.randint(0, 3000)) / 100})
+        compact_finance_month(month_start(today - timedelta(days=60)))
+        invalidate_compacted_months()
+
+        start, end = today - timedelta(days=100), today - timedelta(days=5)
+        expected = UserDailyFinance.objects.filter(date__gte=start, date__lte=end).values('user_id').annotate(
+            profit=Sum('amount_approved') - Sum('total_ads')).order_by('-profit').values_list('user_id', 'profit')
+
+        top_users = get_top_users_by_period(start, end, limit=5)
+        self.assertEqual([(user.pk, user.profit) for user in top_users], list(expected[:5]))
+
+        with self.assertNumQueries(1):
+            cached = get_top_users_by_period(start, end, limit=5)
+        self.assertEqual([user.pk for user in cached], [user.pk for user in top_users])
+
+    def test_admin_dashboard_ranking(self):
+        """
+        Testa o ranking do dashboard admin de todo o período e do intervalo (?ranking=period).
+        """
+        today = timezone.localdate()
+        apply_finance_deltas(self.campaigns[0].pk, today - timedelta(days=40), {
+            'total_approved': 1, 'amount_approved': Decimal('500.00')})
+        apply_finance_deltas(self.campaigns[1].pk, today, {'total_approved': 1, 'amount_approved': Decimal('80.00')})
+        admin = User.objects.create_superuser(cpf="63861694921", email=email, name=name, password=password)
+        self.client.force_authenticate(user=admin)
+
+        url = reverse('admin-dashboard-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['top_users'][0]['uid'], str(self.users[0].pk))
+
+        response = self.client.get(url, {'ranking': 'period'})
+        self.assertEqual(response.data['top_users'][0]['uid'], str(self.users[1].pk))
+        self.assertEqual(response.data['top_users'][0]['profit'], '80.00')
@@ -22,4 +22,4 @@ def sync_user_subscription(user):
         user.subscription_active = False
         user.subscription_expiration = None
 
-    user.save()
+    user.save(update_fields=['subscription_active', 'subscription_expiration'])
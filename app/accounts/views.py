@@ -10,10 +10,11 @@ from rest_framework.decorators import action
 from django.utils.crypto import get_random_string
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 import logging
 from django.urls import reverse
 from .models import Usuario, LoginLog
+from campaigns.search import DocumentSearchFilter
 from .email_utils import send_register_email, send_password_reset_email
 from rest_framework_simplejwt.tokens import RefreshToken
 import user_agents
@@ -47,7 +48,7 @@ class RegisterView(APIView):
             user = serializer.save()
 
             # configuração de confirmação de e-mail
-            config = Configuration.objects.first()
+            config = get_configuration()
             require_email_confirmation = config.require_email_confirmation if config else False
 
             # Dispara e-mail
@@ -117,7 +118,7 @@ class ChangePasswordView(APIView):
             data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         request.user.set_password(serializer.validated_data['new_password'])
-        request.user.save()
+        request.user.save(update_fields=['password'])
         return Response({"message": "Senha alterada com sucesso."}, status=status.HTTP_200_OK)
 
 
@@ -126,12 +127,14 @@ class UserViewSet(viewsets.ModelViewSet):
     ViewSet para gerenciar usuários.
     """
     queryset = Usuario.objects.all().order_by("uid")
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, DocumentSearchFilter]
     ordering_fields = ['date_joined']
     ordering = ['-date_joined']
     search_fields = ['name', 'email']
     lookup_field = 'uid'
     permission_classes = [IsAdminUserForList]
+    # Campo da paginação por cursor (`?cursor=`)
+    cursor_field = 'date_joined'
 
     def get_serializer_class(self):
         """
@@ -178,7 +181,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
         if admin_flag:
             user.is_superuser = True
-            user.save()
+            user.save(update_fields=['is_superuser'])
 
         return Response(
             {
@@ -199,13 +202,14 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         queryset = self.filter_queryset(self.get_queryset())
 
-        if not queryset.exists():
+        # A página é buscada primeiro: uma página vazia indica que não há usuários
+        page = self.paginate_queryset(queryset)
+        if page is not None and not page:
             return Response(
                 {"count": 0, "detail": "Nenhum usuário encontrado.", "results": []},
                 status=status.HTTP_200_OK
             )
 
-        page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
@@ -437,7 +441,7 @@ class UploadAvatarView(APIView):
 
             # Atualiza o campo avatar do usuário
             request.user.avatar = avatar_url
-            request.user.save()
+            request.user.save(update_fields=['avatar'])
 
             return Response(
                 {"message": "Avatar enviado com sucesso.", "avatar_url": avatar_url},
@@ -470,7 +474,7 @@ class PasswordResetRequestView(APIView):
         recovery_code = get_random_string(length=6, allowed_chars="0123456789")
         user.password_reset_code = recovery_code
         user.password_reset_expires = timezone.now() + timedelta(minutes=10)
-        user.save()
+        user.save(update_fields=['password_reset_code', 'password_reset_expires'])
 
         reset_path = reverse('password-reset-confirm', args=[recovery_code])
         if bool(int(os.getenv('DEBUG', 0))):
@@ -521,6 +525,6 @@ class PasswordResetConfirmView(APIView):
         user.set_password(new_password)
         user.password_reset_code = None
         user.password_reset_expires = None
-        user.save()
+        user.save(update_fields=['password', 'password_reset_code', 'password_reset_expires'])
 
         return Response({"message": "Senha redefinida com sucesso."}, status=status.HTTP_200_OK)
@@ -5,7 +5,7 @@ from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth import get_user_model
 from .schema import custom_token_verify_schema
-from goals.models import Goal
+from custom_admin.reference_data import get_goal_for_profit
 
 
 User = get_user_model()
@@ -26,10 +26,7 @@ class CustomTokenVerifyView(TokenVerifyView):
             user_profit = user.profit if user.profit is not None else 0
 
             # Determinar a regra da meta com base no range de faturamento
-            if user.profit <= 0:
-                goal_rule = Goal.objects.order_by('min').first()
-            else:
-                goal_rule = Goal.objects.filter(min__lte=user_profit, max__gte=user_profit).first()
+            goal_rule = get_goal_for_profit(user_profit)
 
             # Construir o objeto goals com min e max
             goals_data = {
@@ -0,0 +1,441 @@
+from datetime import datetime, timedelta
+from django.db import connection
+from django.db.models import DateField, Sum, Min, Max
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .models import Campaign, FinanceLogs, FinanceLogShard
+
+# Contadores (inteiros) somados a partir do FinanceLogs
+FINANCE_COUNTER_FIELDS = [
+    'total_views',
+    'total_clicks',
+    'total_approved',
+    'total_pending',
+    'total_refunded',
+    'total_abandoned',
+    'total_chargeback',
+    'total_rejected',
+    'credit_card_total',
+    'pix_total',
+    'debit_card_total',
+    'boleto_total',
+]
+
+# Valores monetários somados a partir do FinanceLogs
+FINANCE_AMOUNT_FIELDS = [
+    'total_ads',
+    'amount_approved',
+    'amount_pending',
+    'amount_refunded',
+    'amount_rejected',
+    'amount_chargeback',
+    'amount_abandoned',
+    'credit_card_amount',
+    'pix_amount',
+    'debit_card_amount',
+    'boleto_amount',
+]
+
+FINANCE_SUM_FIELDS = FINANCE_COUNTER_FIELDS + FINANCE_AMOUNT_FIELDS
+
+# Divisão por forma de pagamento (chave da resposta -> coluna do FinanceLogs)
+PAYMENT_METHOD_AMOUNT_FIELDS = {
+    'CREDIT_CARD': 'credit_card_amount',
+    'DEBIT_CARD': 'debit_card_amount',
+    'PIX': 'pix_amount',
+    'BOLETO': 'boleto_amount',
+}
+
+
+def finance_sum_annotations():
+    """
+    Retorna as expressões `Sum` de todos os campos somáveis do FinanceLogs,
+    prontas para uso em `aggregate()` ou `annotate()`.
+    """
+    return {field: Sum(field) for field in FINANCE_SUM_FIELDS}
+
+
+def build_finance_totals(row):
+    """
+    Normaliza o resultado de uma agregação do FinanceLogs.
+
+    Campos sem registros (None) passam a valer 0 e são calculados o lucro
+    (profit), o ROI e a divisão por forma de pagamento (stats).
+
+    Args:
+        row (dict): Resultado de `aggregate()`/`values().annotate()` com os campos de FINANCE_SUM_FIELDS.
+
+    Returns:
+        dict: Totais agregados, incluindo `profit`, `ROI` e `stats`.
+    """
+    totals = {field: row.get(field) or 0 for field in FINANCE_SUM_FIELDS}
+
+    total_ads = totals['total_ads']
+    profit = totals['amount_approved'] - total_ads
+    totals['profit'] = profit
+    totals['ROI'] = (profit / total_ads) * 100 if total_ads > 0 else 0
+
+    totals['stats'] = {
+        method: totals[field] for method, field in PAYMENT_METHOD_AMOUNT_FIELDS.items()
+    }
+    totals['first_date'] = row.get('first_date')
+    totals['last_date'] = row.get('last_date')
+    return totals
+
+
+def merge_finance_rows(row, other):
+    """
+    Soma duas linhas agregadas (ex.: FinanceLogs e shards ainda não
+    consolidados), mantendo o menor `first_date` e o maior `last_date`.
+    """
+    merged = {field: (row.get(field) or 0) + (other.get(field) or 0) for field in FINANCE_SUM_FIELDS}
+    for key, pick in (('first_date', min), ('last_date', max)):
+        dates = [value for value in (row.get(key), other.get(key)) if value is not None]
+        merged[key] = pick(dates) if dates else None
+    return merged
+
+
+def aggregate_finance_logs(finance_logs, shards=None):
+    """
+    Calcula todos os contadores, valores, divisão por forma de pagamento,
+    lucro e ROI de um queryset de FinanceLogs em uma única consulta SQL.
+
+    Args:
+        finance_logs (QuerySet): Queryset de FinanceLogs (ou dos rollups
+            diários UserDailyFinance/KwaiDailyFinance) já filtrado.
+        shards (QuerySet): Queryset de FinanceLogShard com os mesmos filtros,
+            somado aos totais (uma consulta a mais). Opcional.
+
+    Returns:
+        dict: Totais agregados (ver `build_finance_totals`), incluindo
+        `first_date` e `last_date` do intervalo encontrado.
+    """
+    annotations = dict(finance_sum_annotations(), first_date=Min('date'), last_date=Max('date'))
+    row = finance_logs.aggregate(**annotations)
+    if shards is not None:
+        row = merge_finance_rows(row, shards.aggregate(**annotations))
+    return build_finance_totals(row)
+
+
+def finance_range_sql(campaigns, start_date=None, end_date=None):
+    """
+    Monta a consulta dos totais de cada campanha no intervalo [start_date, end_date]
+    pelos totais acumulados do FinanceLogs: `cum[fim] - cum[início - 1]`.
+
+    Para cada campanha são feitas três buscas pelo índice (campanha, data) —
+    o último dia até o fim, o último dia antes do início e o primeiro dia do
+    intervalo —, independentemente do tamanho do intervalo. Campanhas sem
+    registros no intervalo não são retornadas.
+
+    Args:
+        campaigns (QuerySet): Queryset de Campaign.
+        start_date (date): Início do intervalo. Padrão: desde o primeiro dia.
+        end_date (date): Fim do intervalo. Padrão: até o último dia.
+
+    Returns:
+        tuple: (sql, params) com as colunas `campaign_id`, FINANCE_SUM_FIELDS,
+        `first_date` e `last_date`.
+    """
+    table = connection.ops.quote_name(FinanceLogs._meta.db_table)
+    qn = connection.ops.quote_name
+    campaigns_sql, campaigns_params = campaigns.order_by().values('pk').query.sql_with_params()
+
+    end_filter = " AND date <= %s" if end_date else ""
+    end_params = [end_date] if end_date else []
+    start_filter = " AND date >= %s" if start_date else ""
+    start_params = [start_date] if start_date else []
+
+    cum_columns = ', '.join(qn(f'cum_{field}') for field in FINANCE_SUM_FIELDS)
+    if start_date:
+        totals = ', '.join(
+            f"last_day.{qn(f'cum_{field}')} - COALESCE(before_start.{qn(f'cum_{field}')}, 0) AS {qn(field)}"
+            for field in FINANCE_SUM_FIELDS)
+        before_start = (
+            f"LEFT JOIN LATERAL (SELECT {cum_columns} FROM {table} "
+            f"WHERE campaign_id = campaign.id AND date < %s ORDER BY date DESC LIMIT 1) AS before_start ON TRUE "
+        )
+        before_params = [start_date]
+    else:
+        totals = ', '.join(f"last_day.{qn(f'cum_{field}')} AS {qn(field)}" for field in FINANCE_SUM_FIELDS)
+        before_start, before_params = "", []
+
+    sql = (
+        f"SELECT campaign.id AS campaign_id, {totals}, "
+        f"first_day.date AS first_date, last_day.date AS last_date "
+        f"FROM ({campaigns_sql}) AS campaign "
+        f"JOIN LATERAL (SELECT date, {cum_columns} FROM {table} "
+        f"WHERE campaign_id = campaign.id{end_filter} ORDER BY date DESC LIMIT 1) AS last_day ON TRUE "
+        f"JOIN LATERAL (SELECT date FROM {table} "
+        f"WHERE campaign_id = campaign.id{start_filter}{end_filter} ORDER BY date LIMIT 1) AS first_day ON TRUE "
+        f"{before_start}"
+    )
+    params = list(campaigns_params) + end_params + start_params + end_params + before_params
+    return sql, params
+
+
+def fetch_dicts(sql, params):
+    """
+    Executa uma consulta SQL e retorna as linhas como dicionários.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def aggregate_finance_range(campaigns, start_date=None, end_date=None, shards=None):
+    """
+    Calcula os totais (ver `build_finance_totals`) das campanhas no intervalo
+    em uma única consulta, pelos totais acumulados (ver `finance_range_sql`):
+    o custo não depende da quantidade de dias do intervalo.
+
+    Args:
+        campaigns (QuerySet): Queryset de Campaign.
+        start_date (date): Início do intervalo (opcional).
+        end_date (date): Fim do intervalo (opcional).
+        shards (QuerySet): Queryset de FinanceLogShard com os mesmos filtros,
+            somado aos totais (uma consulta a mais). Opcional.
+    """
+    range_sql, params = finance_range_sql(campaigns, start_date, end_date)
+    qn = connection.ops.quote_name
+    sums = ', '.join(f"SUM({qn(field)}) AS {qn(field)}" for field in FINANCE_SUM_FIELDS)
+    row = fetch_dicts(
+        f"SELECT {sums}, MIN(first_date) AS first_date, MAX(last_date) AS last_date FROM ({range_sql}) AS ranges",
+        params,
+    )[0]
+    if shards is not None:
+        annotations = dict(finance_sum_annotations(), first_date=Min('date'), last_date=Max('date'))
+        row = merge_finance_rows(row, shards.aggregate(**annotations))
+    return build_finance_totals(row)
+
+
+def aggregate_finance_range_by_campaign(campaign_ids, start_date=None, end_date=None, shards=None):
+    """
+    Calcula os totais de várias campanhas no intervalo em uma única consulta
+    pelos totais acumulados (mais uma para os `shards`, se informados).
+
+    Returns:
+        dict: {campaign_id: totais}. Campanhas sem registros recebem totais zerados.
+    """
+    range_sql, params = finance_range_sql(
+        Campaign.objects.filter(pk__in=campaign_ids), start_date, end_date)
+    rows = {row['campaign_id']: row for row in fetch_dicts(range_sql, params)}
+    if shards is not None:
+        grouped = shards.filter(campaign_id__in=campaign_ids).values('campaign_id').annotate(
+            **finance_sum_annotations(),
+            first_date=Min('date'),
+            last_date=Max('date'),
+        ).order_by()
+        for row in grouped:
+            rows[row['campaign_id']] = merge_finance_rows(rows.get(row['campaign_id'], {}), row)
+
+    totals = {campaign_id: build_finance_totals({}) for campaign_id in campaign_ids}
+    for campaign_id, row in rows.items():
+        totals[campaign_id] = build_finance_totals(row)
+    return totals
+
+
+def get_date_range(start_date=None, end_date=None):
+    """
+    Resolve o intervalo de datas usado nos filtros `?start=YYYY-MM-DD&end=YYYY-MM-DD`.
+
+    Sem datas, retorna os últimos 30 dias. Apenas com `start`, retorna o dia
+    informado e o dia seguinte.
+
+    Raises:
+        ValueError: Se as datas não estiverem no formato YYYY-MM-DD.
+    """
+    if not start_date and not end_date:
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=30)
+    elif start_date and not end_date:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = start_date + timedelta(days=1)
+    elif start_date and end_date:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return start_date, end_date
+
+
+# Agrupamentos aceitos nos overviews (?granularity=day|week|month)
+OVERVIEW_GRANULARITIES = ('day', 'week', 'month')
+
+
+def get_granularity(value=None):
+    """
+    Resolve o agrupamento dos overviews informado via `?granularity=`; sem
+    valor, os overviews são diários.
+
+    Raises:
+        ValueError: Se o agrupamento não for `day`, `week` ou `month`.
+    """
+    granularity = value or 'day'
+    if granularity not in OVERVIEW_GRANULARITIES:
+        raise ValueError(f"Agrupamento inválido: {granularity}.")
+    return granularity
+
+
+def bucket_start(date, granularity):
+    """
+    Retorna o início do período da data: o próprio dia, a segunda-feira da
+    semana ou o primeiro dia do mês (como o `date_trunc` do PostgreSQL).
+    """
+    if granularity == 'week':
+        return date - timedelta(days=date.weekday())
+    if granularity == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def next_bucket(date, granularity):
+    """
+    Retorna o início do período seguinte ao período iniciado em `date`.
+    """
+    if granularity == 'week':
+        return date + timedelta(days=7)
+    if granularity == 'month':
+        return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return date + timedelta(days=1)
+
+
+def bucket_rows(queryset, granularity, keys=()):
+    """
+    Agrupa as despesas e receitas do queryset por período (`date` passa a ser
+    o início do período), com as chaves extras informadas.
+    """
+    if granularity == 'day':
+        rows = queryset.values(*keys, 'date')
+    else:
+        rows = queryset.annotate(
+            period=Trunc('date', granularity, output_field=DateField())).values(*keys, 'period')
+    rows = rows.annotate(
+        total_expense=Sum('total_ads'),
+        total_revenue=Sum('amount_approved'),
+    ).order_by(*keys, 'date' if granularity == 'day' else 'period')
+    if granularity == 'day':
+        return rows
+    return [dict(row, date=row.pop('period')) for row in rows]
+
+
+def overview_rows(finance_logs, start_date, end_date, granularity='day', shards=None):
+    """
+    Retorna as linhas de overview (`date`, `total_expense`, `total_revenue`)
+    do intervalo, uma por período (dia, semana ou mês), em ordem e com 0 nos
+    períodos sem registros, somando os shards informados.
+
+    As duas séries vêm de uma única consulta agrupada pelo `date_trunc` do
+    período (ver `campaigns.finance_months.overview_tiers` para o nível mensal).
+
+    Args:
+        finance_logs (QuerySet): Linhas diárias sem filtro de datas (FinanceLogs ou rollups).
+        shards (QuerySet): FinanceLogShard já filtrado pelo intervalo (opcional).
+    """
+    rows = bucket_rows(finance_logs.filter(date__gte=start_date, date__lte=end_date), granularity)
+    if shards is not None:
+        rows = merge_overview_rows(rows, bucket_rows(shards, granularity), keys=('date',))
+    return fill_overview_rows(rows, start_date, end_date, granularity)
+
+
+def fill_overview_rows(rows, start_date, end_date, granularity='day'):
+    """
+    Completa as linhas de overview com 0 em todos os períodos do intervalo sem registros.
+    """
+    by_date = {row['date']: row for row in rows}
+    filled = []
+    period = bucket_start(start_date, granularity)
+    while period <= end_date:
+        row = by_date.get(period)
+        filled.append({
+            'date': period,
+            'total_expense': (row['total_expense'] or 0) if row else 0,
+            'total_revenue': (row['total_revenue'] or 0) if row else 0,
+        })
+        period = next_bucket(period, granularity)
+    return filled
+
+
+def merge_overview_rows(rows, shard_rows, keys):
+    """
+    Soma as linhas de overview dos shards nas linhas do FinanceLogs com as
+    mesmas chaves (`keys`), retornando-as ordenadas pelas chaves.
+    """
+    merged = {}
+    for row in list(rows) + list(shard_rows):
+        key = tuple(row[k] for k in keys)
+        if key in merged:
+            merged[key]['total_expense'] += row['total_expense'] or 0
+            merged[key]['total_revenue'] += row['total_revenue'] or 0
+        else:
+            merged[key] = dict(row)
+            merged[key]['total_expense'] = row['total_expense'] or 0
+            merged[key]['total_revenue'] = row['total_revenue'] or 0
+    return [merged[key] for key in sorted(merged)]
+
+
+def build_overviews(rows):
+    """
+    Monta a lista de overviews (EXPENSE e REVENUE por data) a partir de linhas
+    com `date`, `total_expense` e `total_revenue`, ordenadas por data.
+    """
+    overviews = []
+    for row in rows:
+        overviews.append({
+            "type": "EXPENSE",
+            "value": row['total_expense'],
+            "date": row['date']
+        })
+        overviews.append({
+            "type": "REVENUE",
+            "value": row['total_revenue'],
+            "date": row['date']
+        })
+    return overviews
+
+
+def overviews_by_campaign(finance_logs, campaign_ids, start_date, end_date, granularity='day', shards=None):
+    """
+    Calcula os overviews por período de várias campanhas em uma única
+    consulta agrupada por (campanha, período) (mais uma para os `shards`, se
+    informados), com 0 nos períodos sem registros.
+
+    Returns:
+        dict: {campaign_id: overviews}.
+    """
+    def grouped_rows(queryset):
+        return bucket_rows(queryset.filter(campaign_id__in=campaign_ids), granularity, keys=('campaign_id',))
+
+    rows = grouped_rows(finance_logs)
+    if shards is not None:
+        rows = merge_overview_rows(rows, grouped_rows(shards), keys=('campaign_id', 'date'))
+
+    grouped = {campaign_id: [] for campaign_id in campaign_ids}
+    for row in rows:
+        grouped[row['campaign_id']].append(row)
+    return {
+        campaign_id: build_overviews(fill_overview_rows(campaign_rows, start_date, end_date, granularity))
+        for campaign_id, campaign_rows in grouped.items()
+    }
+
+
+def get_campaigns_finance_context(campaign_ids, start_date, end_date, sharded_ids=(), granularity='day'):
+    """
+    Pré-calcula os totais e overviews de uma página de campanhas no intervalo
+    informado, para ser repassado ao CampaignSerializer via contexto.
+
+    Os shards de contadores ainda não consolidados são somados apenas para as
+    campanhas em `sharded_ids` (com `counter_shards` > 1).
+
+    Returns:
+        dict: `finance_totals` e `finance_overviews`, ambos indexados por campaign_id.
+    """
+    finance_logs = FinanceLogs.objects.filter(
+        date__gte=start_date, date__lte=end_date)
+    shards = None
+    if sharded_ids:
+        shards = FinanceLogShard.objects.filter(
+            campaign_id__in=sharded_ids, date__gte=start_date, date__lte=end_date)
+    return {
+        'finance_totals': aggregate_finance_range_by_campaign(campaign_ids, start_date, end_date, shards),
+        'finance_overviews': overviews_by_campaign(
+            finance_logs, campaign_ids, start_date, end_date, granularity, shards),
+    }
@@ -0,0 +1,512 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Tamanhos padrão dos slots de cada classe do slab (bytes, incluindo o cabeçalho e a chave)
+DEFAULT_SLAB_SIZES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Versão do formato do segmento: mude ao alterar as structs abaixo (o arquivo é reformatado)
+MAGIC = b'PXSHMC01'
+# Cabeçalho: magic, layout, seqlock, quantidade de classes, de buckets e de lápides
+HEADER = struct.Struct('<8sQQIII')
+# Classe do slab: tamanho do slot, quantidade de slots, offset, ponteiro do CLOCK e topo da lista de livres
+SLAB = struct.Struct('<IIQII')
+SLABS_OFFSET = 40
+MAX_SLABS = 16
+HEADER_SIZE = 512
+SEQ_OFFSET = 16
+TOMBSTONES_OFFSET = 32
+# Bucket do índice: hash da chave, classe + 1 (0 = vazio) e slot
+BUCKET = struct.Struct('<QII')
+EMPTY = 0
+TOMBSTONE = 0xFFFFFFFF
+# Slot: hash da chave, expiração (0 = nunca), tamanho da chave e do valor, em uso e bit de referência
+SLOT = struct.Struct('<QdIIBB6x')
+USED_OFFSET = 24
+REF_OFFSET = 25
+
+# Tentativas de leitura sem trava antes de ler com a trava dos escritores
+READ_RETRIES = 8
+
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+class SharedMemorySegment:
+    """
+    Segmento de memória mapeado (mmap de um arquivo) compartilhado por todos
+    os processos que abrem o mesmo arquivo.
+
+    O segmento é dividido em classes de slots de tamanho fixo (slab): cada
+    item ocupa um slot da menor classe em que cabe, tirado da lista de slots
+    livres da classe; com a classe cheia, o ponteiro do CLOCK da classe
+    escolhe o slot despejado (itens lidos desde a última volta ganham mais
+    uma volta). Um índice de hash com sondagem linear aponta cada chave para
+    o seu slot.
+
+    As escritas são serializadas pela trava do arquivo (`flock`) e dentro do
+    processo por uma trava de thread. As leituras não travam: um seqlock no
+    cabeçalho (ímpar durante uma escrita) faz a leitura ser repetida se uma
+    escrita aconteceu no meio dela.
+    """
+
+    def __init__(self, path, size, slab_sizes=DEFAULT_SLAB_SIZES):
+        slab_sizes = sorted(set(slab_sizes))
+        if not slab_sizes or len(slab_sizes) > MAX_SLABS or slab_sizes[0] <= SLOT.size:
+            raise ValueError(f"Classes de slab inválidas: {slab_sizes}.")
+        self.path = path
+        self.lock = threading.Lock()
+
+        # Cada classe recebe a mesma fatia de memória; o índice tem 2 buckets por slot
+        share = size // len(slab_sizes)
+        counts = [max(share // slot_size, 1) for slot_size in slab_sizes]
+        buckets = 1
+        while buckets < 2 * sum(counts):
+            buckets *= 2
+        self.buckets = buckets
+        self.mask = buckets - 1
+        self.index_offset = HEADER_SIZE
+        self.free_offsets = []
+        offset = self.index_offset + buckets * BUCKET.size
+        for count in counts:
+            self.free_offsets.append(offset)
+            offset += 4 * count
+        self.slabs = []
+        for slot_size, count in zip(slab_sizes, counts):
+            self.slabs.append((slot_size, count, offset))
+            offset += slot_size * count
+        self.size = offset
+        self.layout = key_hash(repr((self.size, buckets, self.slabs)).encode())
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o660)
+        with self.write_lock(initializing=True):
+            # O arquivo nunca diminui: processos antigos podem ter um mapeamento maior
+            if os.fstat(self.fd).st_size < self.size:
+                os.ftruncate(self.fd, self.size)
+            self.mm = mmap.mmap(self.fd, self.size)
+            magic, layout = HEADER.unpack_from(self.mm, 0)[:2]
+            if magic != MAGIC or layout != self.layout:
+                self.format()
+
+    def format(self):
+        """
+        Inicializa o cabeçalho e esvazia o índice e os slots (com a trava).
+        """
+        self.mm[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        HEADER.pack_into(self.mm, 0, MAGIC, self.layout, 0, len(self.slabs), self.buckets, 0)
+        self.clear_index()
+        empty = bytes(SLOT.size)
+        for slot_size, count, offset in self.slabs:
+            for slot in range(count):
+                position = offset + slot * slot_size
+                self.mm[position:position + SLOT.size] = empty
+        self.reset_slabs()
+
+    def reset_slabs(self):
+        """
+        Devolve todos os slots às listas de livres (com os slots já vazios).
+        """
+        for klass, (slot_size, count, offset) in enumerate(self.slabs):
+            SLAB.pack_into(self.mm, SLABS_OFFSET + klass * SLAB.size, slot_size, count, offset, 0, count)
+            # O topo da lista é o fim do array: os primeiros slots saem primeiro
+            struct.pack_into(f'<{count}I', self.mm, self.free_offsets[klass], *range(count - 1, -1, -1))
+
+    def clear_index(self):
+        chunk = bytes(1 << 20)
+        end = self.index_offset + self.buckets * BUCKET.size
+        for position in range(self.index_offset, end, len(chunk)):
+            length = min(len(chunk), end - position)
+            self.mm[position:position + length] = chunk[:length]
+        struct.pack_into('<I', self.mm, TOMBSTONES_OFFSET, 0)
+
+    class _WriteLock:
+        def __init__(self, segment, initializing):
+            self.segment = segment
+            self.initializing = initializing
+
+        def __enter__(self):
+            self.segment.lock.acquire()
+            fcntl.flock(self.segment.fd, fcntl.LOCK_EX)
+            if not self.initializing:
+                # Ímpar durante a escrita (também se um escritor anterior morreu no meio)
+                seq = struct.unpack_from('<Q', self.segment.mm, SEQ_OFFSET)[0]
+                struct.pack_into('<Q', self.segment.mm, SEQ_OFFSET, (seq + 2) | 1)
+
+        def __exit__(self, *exc_info):
+            try:
+                if not self.initializing:
+                    seq = struct.unpack_from('<Q', self.segment.mm, SEQ_OFFSET)[0]
+                    struct.pack_into('<Q', self.segment.mm, SEQ_OFFSET, seq + 1)
+            finally:
+                fcntl.flock(self.segment.fd, fcntl.LOCK_UN)
+                self.segment.lock.release()
+
+    def write_lock(self, initializing=False):
+        """
+        Trava das escritas: serializa os processos e as threads e deixa o
+        seqlock ímpar enquanto o segmento é alterado.
+        """
+        return self._WriteLock(self, initializing)
+
+    def valid(self):
+        """
+        Indica se o segmento ainda tem o layout deste processo (outro deploy
+        com outra configuração pode ter reformatado o arquivo).
+        """
+        return struct.unpack_from('<Q', self.mm, 8)[0] == self.layout
+
+    def slot_offset(self, klass, slot):
+        slot_size, _, offset = self.slabs[klass]
+        return offset + slot * slot_size
+
+    def find(self, key, hashed):
+        """
+        Procura a chave no índice.
+
+        Returns:
+            tuple: (posição do bucket, classe, slot) ou None.
+        """
+        position = hashed & self.mask
+        for _ in range(self.buckets):
+            bucket_offset = self.index_offset + position * BUCKET.size
+            bucket_hash, klass, slot = BUCKET.unpack_from(self.mm, bucket_offset)
+            if klass == EMPTY:
+                return None
+            if klass != TOMBSTONE and bucket_hash == hashed:
+                offset = self.slot_offset(klass - 1, slot)
+                _, _, key_length, _, used, _ = SLOT.unpack_from(self.mm, offset)
+                start = offset + SLOT.size
+                if used and key_length == len(key) and self.mm[start:start + key_length] == key:
+                    return position, klass - 1, slot
+            position = (position + 1) & self.mask
+        return None
+
+    def read(self, key, now=None):
+        """
+        Lê o valor (bytes) da chave sem travar, ou None se não existir ou tiver expirado.
+        """
+        hashed = key_hash(key)
+        for _ in range(READ_RETRIES):
+            seq = struct.unpack_from('<Q', self.mm, SEQ_OFFSET)[0]
+            if seq % 2:
+                time.sleep(0)
+                continue
+            try:
+                value, offset = self._read(key, hashed, now)
+            except (struct.error, IndexError, ValueError):
+                # Leitura de um slot sendo reescrito
+                continue
+            if struct.unpack_from('<Q', self.mm, SEQ_OFFSET)[0] == seq:
+                if offset is not None:
+                    # Bit de referência do CLOCK (sem trava: uma corrida apenas dá uma volta a mais ao slot)
+                    self.mm[offset + REF_OFFSET] = 1
+                return value
+        with self.write_lock():
+            value, offset = self._read(key, hashed, now)
+            if offset is not None:
+                self.mm[offset + REF_OFFSET] = 1
+            return value
+
+    def _read(self, key, hashed, now=None):
+        """
+        Returns:
+            tuple: (valor ou None, posição do slot lido ou None).
+        """
+        if not self.valid():
+            return None, None
+        found = self.find(key, hashed)
+        if found is None:
+            return None, None
+        _, klass, slot = found
+        offset = self.slot_offset(klass, slot)
+        _, expires, key_length, value_length, _, _ = SLOT.unpack_from(self.mm, offset)
+        if expires and expires <= (now or time.time()):
+            return None, None
+        start = offset + SLOT.size + key_length
+        return self.mm[start:start + value_length], offset
+
+    def remove(self, position, klass, slot, release=True):
+        """
+        Remove o item do índice (lápide) e libera o slot (com a trava); com
+        `release`, o slot volta para a lista de livres da classe.
+        """
+        BUCKET.pack_into(self.mm, self.index_offset + position * BUCKET.size, 0, TOMBSTONE, 0)
+        self.mm[self.slot_offset(klass, slot) + USED_OFFSET] = 0
+        if release:
+            top_offset = SLABS_OFFSET + klass * SLAB.size + 20
+            top = struct.unpack_from('<I', self.mm, top_offset)[0]
+            struct.pack_into('<I', self.mm, self.free_offsets[klass] + 4 * top, slot)
+            struct.pack_into('<I', self.mm, top_offset, top + 1)
+        tombstones = struct.unpack_from('<I', self.mm, TOMBSTONES_OFFSET)[0] + 1
+        struct.pack_into('<I', self.mm, TOMBSTONES_OFFSET, tombstones)
+        if tombstones > self.buckets // 4:
+            self.rebuild_index()
+
+    def rebuild_index(self):
+        """
+        Recria o índice a partir dos slots em uso, descartando as lápides.
+        """
+        self.clear_index()
+        for klass, (slot_size, count, offset) in enumerate(self.slabs):
+            for slot in range(count):
+                hashed, _, _, _, used, _ = SLOT.unpack_from(self.mm, offset + slot * slot_size)
+                if used:
+                    self.insert_bucket(hashed, klass, slot)
+
+    def insert_bucket(self, hashed, klass, slot):
+        position = hashed & self.mask
+        while True:
+            bucket_offset = self.index_offset + position * BUCKET.size
+            bucket_class = struct.unpack_from('<I', self.mm, bucket_offset + 8)[0]
+            if bucket_class in (EMPTY, TOMBSTONE):
+                if bucket_class == TOMBSTONE:
+                    tombstones = struct.unpack_from('<I', self.mm, TOMBSTONES_OFFSET)[0]
+                    struct.pack_into('<I', self.mm, TOMBSTONES_OFFSET, tombstones - 1)
+                BUCKET.pack_into(self.mm, bucket_offset, hashed, klass + 1, slot)
+                return
+            position = (position + 1) & self.mask
+
+    def evict(self, klass, slot):
+        """
+        Remove o item do slot (se houver) para reutilizá-lo.
+        """
+        offset = self.slot_offset(klass, slot)
+        hashed, _, key_length, _, used, _ = SLOT.unpack_from(self.mm, offset)
+        if not used:
+            return
+        start = offset + SLOT.size
+        found = self.find(bytes(self.mm[start:start + key_length]), hashed)
+        if found is not None:
+            self.remove(*found, release=False)
+
+    def allocate(self, klass, now):
+        """
+        Retorna um slot da lista de livres da classe ou, com a classe cheia,
+        o escolhido pelo CLOCK: o primeiro slot expirado ou sem o bit de
+        referência (que é zerado nos slots percorridos).
+        """
+        slot_size, count, offset = self.slabs[klass]
+        top_offset = SLABS_OFFSET + klass * SLAB.size + 20
+        top = struct.unpack_from('<I', self.mm, top_offset)[0]
+        if top:
+            struct.pack_into('<I', self.mm, top_offset, top - 1)
+            return struct.unpack_from('<I', self.mm, self.free_offsets[klass] + 4 * (top - 1))[0]
+
+        hand_offset = SLABS_OFFSET + klass * SLAB.size + 16
+        hand = struct.unpack_from('<I', self.mm, hand_offset)[0] % count
+        for _ in range(2 * count + 1):
+            slot = hand
+            hand = (hand + 1) % count
+            position = offset + slot * slot_size
+            _, expires, _, _, used, ref = SLOT.unpack_from(self.mm, position)
+            if ref and not (expires and expires <= now):
+                self.mm[position + REF_OFFSET] = 0
+                continue
+            struct.pack_into('<I', self.mm, hand_offset, hand)
+            self.evict(klass, slot)
+            return slot
+        raise RuntimeError("CLOCK sem slot disponível.")
+
+    def slab_for(self, length):
+        for klass, (slot_size, _, _) in enumerate(self.slabs):
+            if length <= slot_size:
+                return klass
+        return None
+
+    def write(self, key, value, expires, only_if_missing=False):
+        """
+        Grava o valor (bytes) da chave, com expiração absoluta (0 = nunca).
+
+        Returns:
+            bool: False se `only_if_missing` e a chave existe, ou se o item
+            não cabe na maior classe do slab (a chave é removida).
+        """
+        hashed = key_hash(key)
+        now = time.time()
+        with self.write_lock():
+            if not self.valid():
+                return False
+            found = self.find(key, hashed)
+            if found is not None:
+                if only_if_missing and not self._expired(found, now):
+                    return False
+                self.remove(*found)
+            return self.place(key, hashed, value, expires, now)
+
+    def place(self, key, hashed, value, expires, now):
+        """
+        Grava o item em um slot da menor classe em que cabe (com a trava e
+        sem a chave no índice).
+        """
+        klass = self.slab_for(SLOT.size + len(key) + len(value))
+        if klass is None:
+            return False
+        slot = self.allocate(klass, now)
+        offset = self.slot_offset(klass, slot)
+        SLOT.pack_into(self.mm, offset, hashed, expires or 0, len(key), len(value), 1, 0)
+        start = offset + SLOT.size
+        self.mm[start:start + len(key)] = key
+        self.mm[start + len(key):start + len(key) + len(value)] = value
+        self.insert_bucket(hashed, klass, slot)
+        return True
+
+    def _expired(self, found, now):
+        expires = SLOT.unpack_from(self.mm, self.slot_offset(found[1], found[2]))[1]
+        return bool(expires) and expires <= now
+
+    def delete(self, key):
+        with self.write_lock():
+            if not self.valid():
+                return False
+            found = self.find(key, key_hash(key))
+            if found is None:
+                return False
+            self.remove(*found)
+            return True
+
+    def touch(self, key, expires):
+        with self.write_lock():
+            if not self.valid():
+                return False
+            found = self.find(key, key_hash(key))
+            if found is None or self._expired(found, time.time()):
+                return False
+            struct.pack_into('<d', self.mm, self.slot_offset(found[1], found[2]) + 8, expires or 0)
+            return True
+
+    def update(self, key, function):
+        """
+        Lê e regrava a chave atomicamente (com a trava): `function(bytes)`
+        retorna (novo valor em bytes, resultado). Chaves ausentes repassam None.
+        """
+        with self.write_lock():
+            if not self.valid():
+                return function(None)[1]
+            hashed = key_hash(key)
+            found = self.find(key, hashed)
+            if found is not None and self._expired(found, time.time()):
+                found = None
+            current, expires = None, 0
+            if found is not None:
+                current = self._read(key, hashed)[0]
+                expires = SLOT.unpack_from(self.mm, self.slot_offset(found[1], found[2]))[1]
+            value, result = function(current)
+            if found is not None:
+                self.remove(*found)
+            self.place(key, hashed, value, expires, time.time())
+            return result
+
+    def clear(self):
+        with self.write_lock():
+            self.clear_index()
+            for slot_size, count, offset in self.slabs:
+                for slot in range(count):
+                    self.mm[offset + slot * slot_size + USED_OFFSET] = 0
+            self.reset_slabs()
+
+    def stats(self):
+        """
+        Retorna {tamanho do slot: (slots em uso, total de slots)}.
+        """
+        stats = {}
+        for slot_size, count, offset in self.slabs:
+            used = sum(self.mm[offset + slot * slot_size + USED_OFFSET] for slot in range(count))
+            stats[slot_size] = (used, count)
+        return stats
+
+
+def get_segment(path, size, slab_sizes):
+    """
+    Retorna o segmento do arquivo, aberto uma vez por processo (um processo
+    criado por fork abre o seu, com a própria trava do arquivo).
+    """
+    key = (os.getpid(), path)
+    with _segments_lock:
+        segment = _segments.get(key)
+        if segment is None:
+            segment = _segments[key] = SharedMemorySegment(path, size, slab_sizes)
+        return segment
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    Backend de cache do Django em um segmento de memória compartilhada (ver
+    `SharedMemorySegment`), comum a todos os processos que usam o mesmo
+    arquivo em LOCATION (ex.: os workers do uwsgi e o worker da fila de
+    webhooks, pelo volume compartilhado).
+
+    OPTIONS:
+        SIZE_MB: Tamanho dos slots do segmento (padrão: 128).
+        SLAB_SIZES: Tamanhos dos slots de cada classe (ver `DEFAULT_SLAB_SIZES`).
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.segment = get_segment(
+            location, int(options.get('SIZE_MB', 128)) << 20, options.get('SLAB_SIZES', DEFAULT_SLAB_SIZES))
+
+    def encode_key(self, key, version):
+        return self.make_and_validate_key(key, version=version).encode()
+
+    def expires_at(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0 if expires is None else expires
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.expires_at(timeout)
+        if expires and expires <= time.time():
+            return False
+        return self.segment.write(
+            self.encode_key(key, version), pickle.dumps(value, self.pickle_protocol), expires,
+            only_if_missing=True)
+
+    def get(self, key, default=None, version=None):
+        value = self.segment.read(self.encode_key(key, version))
+        if value is None:
+            return default
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.encode_key(key, version)
+        expires = self.expires_at(timeout)
+        if expires and expires <= time.time():
+            self.segment.delete(key)
+            return
+        self.segment.write(key, pickle.dumps(value, self.pickle_protocol), expires)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.segment.touch(self.encode_key(key, version), self.expires_at(timeout))
+
+    def delete(self, key, version=None):
+        return self.segment.delete(self.encode_key(key, version))
+
+    def has_key(self, key, version=None):
+        return self.segment.read(self.encode_key(key, version)) is not None
+
+    def incr(self, key, delta=1, version=None):
+        def increment(current):
+            if current is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(current) + delta
+            return pickle.dumps(value, self.pickle_protocol), value
+
+        return self.segment.update(self.encode_key(key, version), increment)
+
+    def clear(self):
+        self.segment.clear()
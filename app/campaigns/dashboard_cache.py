@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.http import urlencode
+
+logger = logging.getLogger('django')
+
+# Chave da versão dos dados de cada usuário no cache compartilhado entre os processos
+DATA_VERSION_KEY = 'dashboard_data_version:{user_id}'
+
+
+def get_data_version(user_id):
+    """
+    Retorna a versão atual dos dados financeiros do usuário, criando-a se necessário.
+    """
+    key = DATA_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(user_id):
+    """
+    Grava uma nova versão dos dados do usuário: as respostas em cache dos
+    dashboards do usuário passam a ser recalculadas.
+    """
+    version = uuid.uuid4().hex
+    cache.set(DATA_VERSION_KEY.format(user_id=user_id), version, None)
+    return version
+
+
+def invalidate_dashboards(user_id):
+    """
+    Troca a versão dos dados do usuário após o commit, para que um recálculo
+    concorrente não grave os dados anteriores ao commit com a nova versão.
+    """
+    if user_id is not None:
+        transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+class DashboardCache:
+    """
+    Cache das respostas dos dashboards (Dashboard_campaigns,
+    KwaiViewSet.list/retrieve e CampaignViewSet.retrieve) no cache compartilhado.
+
+    Cada resposta é guardada por (usuário, endpoint, parâmetros da request e
+    dia atual) junto com a versão dos dados do usuário em que foi calculada
+    (ver `invalidate_dashboards`). Uma entrada de versão antiga é tratada como
+    ausente: a request após uma alteração já recebe os dados novos. Uma
+    entrada da versão atual com mais de `DASHBOARD_CACHE_SECONDS` ainda é
+    servida por até `DASHBOARD_CACHE_STALE_SECONDS` enquanto é recalculada em
+    segundo plano.
+
+    Apenas um recálculo por chave é feito por vez: as requests concorrentes do
+    processo aguardam o mesmo cálculo e as dos demais processos aguardam a
+    trava da chave no cache compartilhado (até `DASHBOARD_CACHE_LOCK_SECONDS`).
+    """
+
+    def __init__(self, timeout=None, stale_timeout=None, lock_timeout=None, background=True):
+        self.timeout = settings.DASHBOARD_CACHE_SECONDS if timeout is None else timeout
+        self.stale_timeout = (
+            settings.DASHBOARD_CACHE_STALE_SECONDS if stale_timeout is None else stale_timeout)
+        self.lock_timeout = settings.DASHBOARD_CACHE_LOCK_SECONDS if lock_timeout is None else lock_timeout
+        # Sem `background`, o recálculo das entradas antigas é feito na própria request
+        self.background = background
+        self.lock = threading.Lock()
+        self.inflight = {}
+
+    def make_key(self, user_id, endpoint, params=None):
+        """
+        Monta a chave da resposta; o dia atual faz parte da chave porque os
+        intervalos padrão (sem `start`/`end`) terminam hoje.
+        """
+        items = sorted((params or {}).items())
+        digest = hashlib.md5(urlencode(items, doseq=True).encode()).hexdigest()
+        return f"dashboard:{user_id}:{endpoint}:{timezone.localdate()}:{digest}"
+
+    def get_or_compute(self, user_id, endpoint, params, compute):
+        """
+        Retorna a resposta em cache ou calcula (`compute()`) e guarda.
+
+        Args:
+            user_id: Dono dos dados (versão usada na invalidação).
+            endpoint (str): Nome do endpoint (inclui o objeto, nos detalhes).
+            params (dict): Parâmetros da request ({nome: [valores]}).
+            compute (callable): Calcula os dados da resposta (devem ser serializáveis).
+        """
+        if self.timeout <= 0:
+            return compute()
+
+        key = self.make_key(user_id, endpoint, params)
+        version = get_data_version(user_id)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version:
+            if time.time() - entry['computed_at'] >= self.timeout:
+                # Entrada vencida da versão atual: servida enquanto outro cálculo a atualiza
+                self.revalidate(key, version, compute)
+            return entry['data']
+        # Ausente ou de uma versão anterior dos dados do usuário
+        return self.compute_once(key, version, compute)
+
+    def store(self, key, version, data):
+        cache.set(key, {'version': version, 'computed_at': time.time(), 'data': data},
+                  self.timeout + self.stale_timeout)
+
+    def acquire(self, key):
+        """
+        Registra o cálculo da chave no processo e tenta a trava dos demais
+        processos.
+
+        Returns:
+            tuple: (threading.Event do cálculo, líder do processo, trava obtida).
+        """
+        with self.lock:
+            event = self.inflight.get(key)
+            if event is not None:
+                return event, False, False
+            event = self.inflight[key] = threading.Event()
+        return event, True, cache.add(f"{key}:lock", 1, self.lock_timeout)
+
+    def release(self, key, event, locked):
+        if locked:
+            cache.delete(f"{key}:lock")
+        with self.lock:
+            self.inflight.pop(key, None)
+        event.set()
+
+    def wait_for(self, key, version, event=None):
+        """
+        Aguarda o cálculo de outra request e retorna os dados, ou None se a
+        espera passar de `DASHBOARD_CACHE_LOCK_SECONDS`.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        if event is not None:
+            event.wait(self.lock_timeout)
+        while True:
+            entry = cache.get(key)
+            if entry is not None and entry['version'] == version:
+                return entry['data']
+            if event is not None or time.monotonic() >= deadline or cache.get(f"{key}:lock") is None:
+                return None
+            time.sleep(0.05)
+
+    def compute_once(self, key, version, compute):
+        """
+        Calcula a resposta de uma chave ausente, uma vez por chave.
+        """
+        event, leader, locked = self.acquire(key)
+        if not leader:
+            data = self.wait_for(key, version, event)
+            return compute() if data is None else data
+        try:
+            if not locked:
+                data = self.wait_for(key, version)
+                if data is not None:
+                    return data
+            data = compute()
+            self.store(key, version, data)
+            return data
+        finally:
+            self.release(key, event, locked)
+
+    def revalidate(self, key, version, compute):
+        """
+        Recalcula a entrada antiga em segundo plano, se nenhum outro cálculo
+        da chave estiver em andamento.
+        """
+        event, leader, locked = self.acquire(key)
+        if not leader:
+            return
+        if not locked:
+            self.release(key, event, locked)
+            return
+
+        def refresh():
+            try:
+                self.store(key, version, compute())
+            except Exception:
+                logger.exception(f"Erro ao recalcular o cache do dashboard {key}.")
+            finally:
+                self.release(key, event, locked)
+                if self.background:
+                    connection.close()
+
+        if self.background:
+            threading.Thread(target=refresh, daemon=True).start()
+        else:
+            refresh()
+
+
+# Instância usada pelas views dos dashboards
+dashboard_cache = DashboardCache()
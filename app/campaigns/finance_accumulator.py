@@ -0,0 +1,114 @@
+import logging
+import time
+from django.db import transaction
+from .finance_log_utils import apply_finance_deltas, merge_deltas
+
+logger = logging.getLogger('django')
+
+
+class FlushMetrics:
+    """
+    Métricas dos flushes do acumulador: quantidade, tamanho (eventos e linhas
+    de campanha/dia) e latência.
+    """
+
+    def __init__(self):
+        self.flushes = 0
+        self.events = 0
+        self.rows = 0
+        self.last_size = 0
+        self.max_size = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.total_latency_ms = 0.0
+
+    def record(self, events, rows, latency_ms):
+        self.flushes += 1
+        self.events += events
+        self.rows += rows
+        self.last_size = events
+        self.max_size = max(self.max_size, events)
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.total_latency_ms += latency_ms
+
+    def as_dict(self):
+        return {
+            'flushes': self.flushes,
+            'events': self.events,
+            'rows': self.rows,
+            'last_size': self.last_size,
+            'max_size': self.max_size,
+            'avg_size': self.events / self.flushes if self.flushes else 0,
+            'last_latency_ms': round(self.last_latency_ms, 3),
+            'max_latency_ms': round(self.max_latency_ms, 3),
+            'avg_latency_ms': round(self.total_latency_ms / self.flushes, 3) if self.flushes else 0,
+        }
+
+
+class FinanceDeltaAccumulator:
+    """
+    Acumula os deltas de transições de vendas por (campanha, dia) e os aplica
+    de uma vez: um UPDATE na campanha e um upsert no FinanceLogs por chave,
+    independente de quantos eventos foram somados.
+
+    O flush é pedido (`should_flush`) ao atingir `max_events` eventos ou
+    `max_delay_ms` desde o primeiro evento pendente. O acumulador não é
+    persistente: quem o usa deve aplicar o flush na mesma transação que
+    confirma os eventos de origem (ver `integrations.webhook_queue`) ou
+    chamar `flush()` no encerramento.
+    """
+
+    def __init__(self, max_events=1000, max_delay_ms=200):
+        self.max_events = max_events
+        self.max_delay_ms = max_delay_ms
+        self.metrics = FlushMetrics()
+        self.reset()
+
+    def reset(self):
+        self.pending = {}
+        self.shards = {}
+        self.events = 0
+        self.started_at = None
+
+    def add(self, campaign_id, date, deltas, shards=0):
+        """
+        Soma os deltas de um evento na chave (campanha, dia). `shards` é o
+        `Campaign.counter_shards` da campanha.
+        """
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.events += 1
+        if deltas:
+            merge_deltas(self.pending.setdefault((campaign_id, date), {}), deltas)
+            self.shards[campaign_id] = shards
+
+    def should_flush(self):
+        if not self.events:
+            return False
+        elapsed_ms = (time.monotonic() - self.started_at) * 1000
+        return self.events >= self.max_events or elapsed_ms >= self.max_delay_ms
+
+    def flush(self):
+        """
+        Aplica os deltas acumulados em uma transação e limpa o acumulador.
+
+        Returns:
+            int: Quantidade de linhas (campanha, dia) atualizadas.
+        """
+        if not self.events:
+            return 0
+
+        started = time.perf_counter()
+        # Em ordem de (campanha, dia): todos os workers travam as linhas na mesma ordem (sem deadlock)
+        rows = [(key, deltas) for key, deltas in sorted(self.pending.items()) if deltas]
+        with transaction.atomic(savepoint=False):
+            for (campaign_id, date), deltas in rows:
+                apply_finance_deltas(campaign_id, date, deltas, self.shards.get(campaign_id, 0))
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        self.metrics.record(self.events, len(rows), latency_ms)
+        logger.debug(
+            f"Flush do acumulador: {self.events} eventos em {len(rows)} linhas, {latency_ms:.2f}ms")
+        self.reset()
+        return len(rows)
@@ -1,113 +1,408 @@
-from django.utils.timezone import now
+from django.contrib.auth import get_user_model
+from django.utils.timezone import localdate, now
+from django.db import connection, transaction
+from django.db.models import F, Case, When, Value, DecimalField, ExpressionWrapper
+from django.db.models.lookups import GreaterThan
 from decimal import Decimal
-from .models import FinanceLogs
+import random
+from accounts.leaderboard import leaderboard
+from .dashboard_cache import invalidate_dashboards
+from .models import Campaign, CampaignCounters, FinanceLogs, FinanceLogShard, FinanceRunningTotals
+from .finance_months import month_upsert_cte
+from .finance_rollups import rollup_upsert_ctes
 
+# Colunas de quantidade e valor atualizadas para cada status interno
+STATUS_FIELDS = {
+    'APPROVED': ('total_approved', 'amount_approved'),
+    'PENDING': ('total_pending', 'amount_pending'),
+    'REFUNDED': ('total_refunded', 'amount_refunded'),
+    'REJECTED': ('total_rejected', 'amount_rejected'),
+    'CHARGEBACK': ('total_chargeback', 'amount_chargeback'),
+    'ABANDONED': ('total_abandoned', 'amount_abandoned'),
+    'CANCELED': ('total_canceled', 'amount_canceled'),
+}
 
-def update_finance_logs(campaign, old_status=None, old_amount=Decimal('0.0'), status=None, amount=Decimal('0.0')):
+# Colunas de quantidade e valor de cada forma de pagamento (contabilizadas apenas para vendas aprovadas)
+PAYMENT_METHOD_FIELDS = {
+    'PIX': ('pix_total', 'pix_amount'),
+    'CREDIT_CARD': ('credit_card_total', 'credit_card_amount'),
+    'DEBIT_CARD': ('debit_card_total', 'debit_card_amount'),
+    'BOLETO': ('boleto_total', 'boleto_amount'),
+}
+
+# Colunas de totais acumulados do FinanceLogs -> coluna diária correspondente
+RUNNING_TOTAL_COLUMNS = {
+    field.column: field.column[len('cum_'):] for field in FinanceRunningTotals._meta.fields
+}
+
+# Colunas numéricas do FinanceLogs que recebem deltas no upsert diário
+FINANCE_LOG_DELTA_COLUMNS = [
+    field.column for field in FinanceLogs._meta.concrete_fields
+    if not field.primary_key and field.name not in ('campaign', 'date', 'ROI')
+    and field.column not in RUNNING_TOTAL_COLUMNS
+]
+
+# Colunas de contadores dos shards (FinanceLogShard)
+SHARD_DELTA_COLUMNS = [
+    field.column for field in FinanceLogShard._meta.concrete_fields
+    if not field.primary_key and field.name not in ('campaign', 'date', 'shard_no')
+]
+
+
+def _add_delta(deltas, field, value):
+    deltas[field] = deltas.get(field, 0) + value
+
+
+def merge_deltas(target, deltas):
+    """
+    Soma os deltas em `target` (in-place), descartando os campos que zeram.
+    """
+    for field, value in deltas.items():
+        _add_delta(target, field, value)
+        if not target[field]:
+            del target[field]
+    return target
+
+
+def get_transition_deltas(old_status=None, old_amount=Decimal('0.0'), status=None, amount=Decimal('0.0'), payment_method=None, old_payment_method=None):
     """
-    Atualiza ou cria um registro no FinanceLogs para o dia atual com base nos dados da Campaign.
+    Calcula os deltas dos contadores de uma transição de status de venda (old_status -> status).
 
     Args:
-        campaign (Campaign): Instância da campanha cujos dados serão usados para atualizar o FinanceLogs.
-        old_status (str): Status anterior da campanha (APPROVED, PENDING, etc.).
-        old_amount (Decimal): Valor anterior associado ao status antigo.
-        status (str): Novo status da campanha (APPROVED, PENDING, etc.).
-        amount (Decimal): Novo valor associado ao novo status.
+        old_status (str): Status anterior (APPROVED, PENDING, etc.) ou None para uma venda nova.
+        old_amount (Decimal): Valor associado ao status anterior.
+        status (str): Novo status.
+        amount (Decimal): Valor associado ao novo status.
+        payment_method (str): Forma de pagamento normalizada (PIX, CREDIT_CARD, DEBIT_CARD, BOLETO).
+        old_payment_method (str): Forma de pagamento anterior. Padrão: a mesma de `payment_method`.
 
     Returns:
-        FinanceLogs: O registro atualizado ou criado no FinanceLogs.
+        dict: {campo: delta}, sem os campos cujo delta é zero.
     """
-    today = now().date()
-    old_status = old_status if old_status else None
     old_amount = old_amount if old_amount else Decimal('0.0')
-    # Decrementar os campos da campanha com base no status antigo 
-
-    if old_status:
-        if old_status == 'APPROVED':
-            campaign.total_approved -= 1
-            campaign.amount_approved -= old_amount
-
-        if old_status == 'PENDING':
-            campaign.total_pending -= 1
-            campaign.amount_pending -= old_amount
-
-        if old_status == 'REFUNDED':
-            campaign.total_refunded -= 1
-            campaign.amount_refunded -= old_amount
-
-        if old_status == 'REJECTED':
-            campaign.total_rejected -= 1
-            campaign.amount_rejected -= old_amount
-
-        if old_status == 'CHARGEBACK':
-            campaign.total_chargeback -= 1
-            campaign.amount_chargeback -= old_amount
-
-        if old_status == 'ABANDONED':
-            campaign.total_abandoned -= 1
-            campaign.amount_abandoned -= old_amount
-
-    # Incrementar os campos da campanha com base no novo status
-    if status:
-        if status == 'APPROVED':
-            campaign.total_approved += 1
-            campaign.amount_approved += amount
-
-        if status == 'PENDING':
-            campaign.total_pending += 1
-            campaign.amount_pending += amount
-
-        if status == 'REFUNDED':
-            campaign.total_refunded += 1
-            campaign.amount_refunded += amount
-
-        if status == 'REJECTED':
-            campaign.total_rejected += 1
-            campaign.amount_rejected += amount
-
-        if status == 'CHARGEBACK':
-            campaign.total_chargeback += 1
-            campaign.amount_chargeback += amount
-
-        if status == 'ABANDONED':
-            campaign.total_abandoned += 1
-            campaign.amount_abandoned += amount
-
-        if status == 'CANCELED':
-            campaign.total_canceled += 1
-            campaign.amount_canceled += amount
-
-    # Salva as alterações na campanha
-    campaign.save()
-
-    # Calcula o profit e ROI
-    profit = campaign.amount_approved - campaign.total_ads
-    ROI = (profit / campaign.total_ads) * \
-        100 if campaign.total_ads > 0 else Decimal('0.0')
-
-    # Atualizar ou criar o registro no FinanceLogs
-    finance_log, created = FinanceLogs.objects.update_or_create(
-        campaign=campaign,
-        date=today,
-        defaults={
-            'profit': profit,
-            'ROI': ROI,
-            'total_views': campaign.total_views,
-            'total_clicks': campaign.total_clicks,
-            'total_ads': campaign.total_ads,
-            'total_approved': campaign.total_approved,
-            'total_pending': campaign.total_pending,
-            'total_refunded': campaign.total_refunded,
-            'total_abandoned': campaign.total_abandoned,
-            'total_chargeback': campaign.total_chargeback,
-            'total_rejected': campaign.total_rejected,
-            'amount_approved': campaign.amount_approved,
-            'amount_pending': campaign.amount_pending,
-            'amount_refunded': campaign.amount_refunded,
-            'amount_rejected': campaign.amount_rejected,
-            'amount_chargeback': campaign.amount_chargeback,
-            'amount_abandoned': campaign.amount_abandoned,
-        }
+    amount = amount if amount else Decimal('0.0')
+    old_payment_method = old_payment_method or payment_method
+    deltas = {}
+
+    # Decrementa os campos do status antigo
+    if old_status in STATUS_FIELDS:
+        total_field, amount_field = STATUS_FIELDS[old_status]
+        _add_delta(deltas, total_field, -1)
+        _add_delta(deltas, amount_field, -old_amount)
+        if old_status == 'APPROVED' and old_payment_method in PAYMENT_METHOD_FIELDS:
+            total_field, amount_field = PAYMENT_METHOD_FIELDS[old_payment_method]
+            _add_delta(deltas, total_field, -1)
+            _add_delta(deltas, amount_field, -old_amount)
+
+    # Incrementa os campos do novo status
+    if status in STATUS_FIELDS:
+        total_field, amount_field = STATUS_FIELDS[status]
+        _add_delta(deltas, total_field, 1)
+        _add_delta(deltas, amount_field, amount)
+        if status == 'APPROVED' and payment_method in PAYMENT_METHOD_FIELDS:
+            total_field, amount_field = PAYMENT_METHOD_FIELDS[payment_method]
+            _add_delta(deltas, total_field, 1)
+            _add_delta(deltas, amount_field, amount)
+
+    return {field: delta for field, delta in deltas.items() if delta}
+
+
+def apply_campaign_deltas(campaign_id, deltas):
+    """
+    Aplica os deltas nos contadores da campanha (CampaignCounters) com um único
+    UPDATE usando expressões F, recalculando profit e ROI no próprio banco.
+
+    Não chama `Campaign.save()`, evitando regravar as integrações e os sinais
+    de post_save. Se o lucro muda, o profit do usuário recebe o mesmo delta
+    (ver `apply_user_profit_delta`).
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    profit_delta = get_profit_delta(deltas)
+
+    if 'amount_approved' in deltas or 'total_ads' in deltas:
+        decimal_field = DecimalField(max_digits=15, decimal_places=5)
+        # No SET, as colunas ainda têm os valores anteriores ao UPDATE
+        total_ads = ExpressionWrapper(
+            F('total_ads') + Value(deltas.get('total_ads', 0)), output_field=decimal_field)
+        profit = ExpressionWrapper(
+            F('amount_approved') + Value(deltas.get('amount_approved', 0)) - total_ads,
+            output_field=decimal_field)
+        updates['profit'] = profit
+        updates['ROI'] = Case(
+            When(GreaterThan(total_ads, 0), then=ExpressionWrapper(
+                profit * Value(100) / total_ads, output_field=decimal_field)),
+            default=Value(Decimal('0')),
+            output_field=decimal_field,
+        )
+
+    updates['updated_at'] = now()
+    with transaction.atomic(savepoint=False):
+        updated = CampaignCounters.objects.filter(campaign_id=campaign_id).update(**updates)
+        if updated:
+            apply_user_profit_delta(campaign_id, profit_delta)
+    return updated
+
+
+def get_profit_delta(deltas):
+    """
+    Retorna a variação do lucro (amount_approved - total_ads) causada pelos deltas.
+    """
+    return deltas.get('amount_approved', 0) - deltas.get('total_ads', 0)
+
+
+def apply_user_profit_delta(campaign_id, delta):
+    """
+    Soma a variação de lucro de uma campanha no profit do usuário dono com um
+    único `UPDATE ... SET profit = profit + delta`, sem recalcular a soma de
+    todas as campanhas. Divergências de arredondamento são corrigidas pelo
+    `manage.py reconcile_user_profit`.
+
+    O novo profit (`RETURNING`) atualiza o ranking de usuários do processo
+    após o commit (ver `accounts.leaderboard`).
+    """
+    if not delta:
+        return 0
+    User = get_user_model()
+    qn = connection.ops.quote_name
+    pk_column = qn(User._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {qn(User._meta.db_table)} SET profit = profit + %s "
+            f"WHERE {pk_column} = (SELECT user_id FROM {qn(Campaign._meta.db_table)} WHERE id = %s) "
+            f"RETURNING {pk_column}, profit",
+            [delta, campaign_id])
+        rows = cursor.fetchall()
+    for user_id, profit in rows:
+        transaction.on_commit(lambda user_id=user_id, profit=profit: leaderboard.record(user_id, profit))
+    return len(rows)
+
+
+def upsert_finance_log_deltas(campaign_id, date, deltas):
+    """
+    Soma os deltas no registro diário do FinanceLogs e nos totais acumulados
+    com um único comando:
+
+    - os dias seguintes da campanha recebem o delta nos totais acumulados
+      (UPDATE em uma CTE; nenhuma linha quando o dia é o atual);
+    - o dia é gravado com `INSERT ... ON CONFLICT (campaign_id, date) DO UPDATE`;
+      um dia novo parte dos totais acumulados do dia anterior mais recente;
+    - o mesmo delta é somado no dia dos rollups do usuário e das contas Kwai
+      vinculadas (ver `campaigns.finance_rollups.rollup_upsert_ctes`) e, em
+      meses fechados, na linha mensal da campanha (ver
+      `campaigns.finance_months.month_upsert_cte`).
+
+    As escritas de uma campanha são serializadas pelo bloqueio da linha de
+    contadores (ver `apply_finance_deltas`), o que mantém os acumulados consistentes.
+    Campos que não existem no FinanceLogs (ex.: cancelados) são ignorados.
+
+    Returns:
+        Usuário dono da campanha (`RETURNING`), para invalidar os dashboards.
+    """
+    values = {column: deltas.get(column, 0) for column in FINANCE_LOG_DELTA_COLUMNS}
+    values['profit'] = values['amount_approved'] - values['total_ads']
+    roi = values['profit'] * 100 / values['total_ads'] if values['total_ads'] > 0 else 0
+
+    table = FinanceLogs._meta.db_table
+    qn = connection.ops.quote_name
+    columns = ['campaign_id', 'date', 'ROI'] + FINANCE_LOG_DELTA_COLUMNS + list(RUNNING_TOTAL_COLUMNS)
+    later = ', '.join(
+        f"{qn(cum_column)} = {qn(cum_column)} + %s" for cum_column in RUNNING_TOTAL_COLUMNS)
+    selected = ['%s'] * (3 + len(FINANCE_LOG_DELTA_COLUMNS)) + [
+        f"COALESCE(previous.{qn(cum_column)}, 0) + %s" for cum_column in RUNNING_TOTAL_COLUMNS]
+    assignments = [
+        f"{qn(column)} = {qn(table)}.{qn(column)} + EXCLUDED.{qn(column)}"
+        for column in FINANCE_LOG_DELTA_COLUMNS
+    ] + [
+        f"{qn(cum_column)} = {qn(table)}.{qn(cum_column)} + EXCLUDED.{qn(column)}"
+        for cum_column, column in RUNNING_TOTAL_COLUMNS.items()
+    ]
+    assignments.append(
+        f"{qn('ROI')} = CASE WHEN {qn(table)}.total_ads + EXCLUDED.total_ads > 0 "
+        f"THEN ({qn(table)}.profit + EXCLUDED.profit) * 100 / ({qn(table)}.total_ads + EXCLUDED.total_ads) "
+        f"ELSE 0 END"
+    )
+
+    rollups, rollup_params = rollup_upsert_ctes(campaign_id, date, values)
+    month_row = month_upsert_cte(campaign_id, date, values)
+    if month_row:
+        rollups, rollup_params = f"{rollups}, {month_row[0]}", rollup_params + month_row[1]
+    sql = (
+        f"WITH later AS (UPDATE {qn(table)} SET {later} "
+        f"WHERE campaign_id = %s AND date > %s RETURNING 1), {rollups} "
+        f"INSERT INTO {qn(table)} ({', '.join(qn(column) for column in columns)}) "
+        f"SELECT {', '.join(selected)} "
+        f"FROM (SELECT 1) AS day LEFT JOIN LATERAL ("
+        f"SELECT {', '.join(qn(cum_column) for cum_column in RUNNING_TOTAL_COLUMNS)} FROM {qn(table)} "
+        f"WHERE campaign_id = %s AND date < %s ORDER BY date DESC LIMIT 1) AS previous ON TRUE "
+        f"ON CONFLICT (campaign_id, date) DO UPDATE SET {', '.join(assignments)} "
+        f"RETURNING (SELECT user_id FROM {qn(Campaign._meta.db_table)} WHERE id = %s)"
+    )
+    running_deltas = [values[column] for column in RUNNING_TOTAL_COLUMNS.values()]
+    params = (
+        running_deltas + [campaign_id, date] + rollup_params
+        + [campaign_id, date, roi] + [values[column] for column in FINANCE_LOG_DELTA_COLUMNS]
+        + running_deltas + [campaign_id, date, campaign_id]
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+def refresh_finance_log_running_totals(campaign_id, since=None):
+    """
+    Recalcula os totais acumulados do FinanceLogs da campanha a partir dos
+    valores diários (soma com função de janela), a partir de `since` se informado.
+    """
+    table = FinanceLogs._meta.db_table
+    qn = connection.ops.quote_name
+    running = ', '.join(
+        f"SUM({qn(column)}) OVER (ORDER BY date) AS {qn(cum_column)}"
+        for cum_column, column in RUNNING_TOTAL_COLUMNS.items())
+    assignments = ', '.join(
+        f"{qn(cum_column)} = running.{qn(cum_column)}" for cum_column in RUNNING_TOTAL_COLUMNS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {qn(table)} SET {assignments} "
+            f"FROM (SELECT id, date, {running} FROM {qn(table)} WHERE campaign_id = %s) AS running "
+            f"WHERE {qn(table)}.id = running.id" + (" AND running.date >= %s" if since else ""),
+            [campaign_id] + ([since] if since else []),
+        )
+
+
+def upsert_shard_deltas(campaign_id, date, shard_no, deltas):
+    """
+    Soma os deltas em um shard de contadores com um único
+    `INSERT ... ON CONFLICT (campaign_id, date, shard_no) DO UPDATE`.
+
+    Returns:
+        Usuário dono da campanha (`RETURNING`), para invalidar os dashboards.
+    """
+    table = FinanceLogShard._meta.db_table
+    qn = connection.ops.quote_name
+    columns = ['campaign_id', 'date', 'shard_no'] + SHARD_DELTA_COLUMNS
+    assignments = [
+        f"{qn(column)} = {qn(table)}.{qn(column)} + EXCLUDED.{qn(column)}"
+        for column in SHARD_DELTA_COLUMNS
+    ]
+    sql = (
+        f"INSERT INTO {qn(table)} ({', '.join(qn(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT (campaign_id, date, shard_no) DO UPDATE SET {', '.join(assignments)} "
+        f"RETURNING (SELECT user_id FROM {qn(Campaign._meta.db_table)} WHERE id = %s)"
     )
+    params = [campaign_id, date, shard_no] + [deltas.get(column, 0) for column in SHARD_DELTA_COLUMNS]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [campaign_id])
+        return cursor.fetchone()[0]
+
+
+def apply_finance_deltas(campaign_id, date, deltas, shards=0):
+    """
+    Aplica os deltas na campanha (e no profit do usuário) e no FinanceLogs do
+    dia informado na mesma transação.
+
+    Com `shards` > 1 (ver `Campaign.counter_shards`), os deltas são somados em
+    um shard aleatório, sem bloquear a linha da campanha nem a do FinanceLogs;
+    os shards são consolidados pelo `compact_counter_shards`. Campos que não
+    existem nos shards (ex.: cancelados) são aplicados direto na campanha.
+
+    Após o commit, os dashboards em cache do dono da campanha são invalidados
+    (ver `campaigns.dashboard_cache`).
+    """
+    if not deltas:
+        return
+    if shards > 1:
+        unsharded = {field: delta for field, delta in deltas.items() if field not in SHARD_DELTA_COLUMNS}
+        with transaction.atomic(savepoint=False):
+            if len(unsharded) < len(deltas):
+                user_id = upsert_shard_deltas(campaign_id, date, random.randrange(shards), deltas)
+            else:
+                user_id = Campaign.objects.filter(pk=campaign_id).values_list('user_id', flat=True).first()
+            if unsharded:
+                apply_campaign_deltas(campaign_id, unsharded)
+            invalidate_dashboards(user_id)
+        return
+    with transaction.atomic(savepoint=False):
+        apply_campaign_deltas(campaign_id, deltas)
+        invalidate_dashboards(upsert_finance_log_deltas(campaign_id, date, deltas))
+
+
+def apply_status_transition(campaign_id, old_status=None, old_amount=Decimal('0.0'), status=None, amount=Decimal('0.0'), payment_method=None, old_payment_method=None, date=None, shards=0):
+    """
+    Aplica uma transição de status de venda na campanha e no FinanceLogs do dia.
+
+    São executados apenas um UPDATE com expressões F nos contadores da campanha
+    (mais um no profit do usuário, se o lucro muda) e um upsert no FinanceLogs,
+    na mesma transação, seguros para webhooks concorrentes
+    da mesma campanha. Com `shards` > 1, apenas um upsert em um shard aleatório.
+
+    Returns:
+        dict: Deltas aplicados (vazio se a transição não altera nenhum contador).
+    """
+    deltas = get_transition_deltas(
+        old_status, old_amount, status, amount, payment_method, old_payment_method)
+    apply_finance_deltas(campaign_id, date or localdate(), deltas, shards)
+    return deltas
+
+
+def compact_finance_log_shards(campaign_id=None):
+    """
+    Consolida os shards de contadores no FinanceLogs e na campanha.
+
+    Os shards são removidos com `DELETE ... RETURNING` e somados por
+    (campanha, dia) na mesma transação; escritas concorrentes em um shard
+    removido aguardam o commit e criam um novo shard, sem perder incrementos.
+
+    Returns:
+        int: Quantidade de linhas (campanha, dia) consolidadas.
+    """
+    table = FinanceLogShard._meta.db_table
+    qn = connection.ops.quote_name
+    where = "WHERE campaign_id = %s" if campaign_id else ""
+    params = [campaign_id] if campaign_id else []
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {qn(table)} {where} RETURNING campaign_id, date, "
+                f"{', '.join(qn(column) for column in SHARD_DELTA_COLUMNS)}",
+                params,
+            )
+            rows = cursor.fetchall()
+
+        grouped = {}
+        for campaign_id, date, *values in rows:
+            merge_deltas(grouped.setdefault((campaign_id, date), {}),
+                         dict(zip(SHARD_DELTA_COLUMNS, values)))
+
+        for (campaign_id, date), deltas in grouped.items():
+            apply_finance_deltas(campaign_id, date, deltas)
 
-    return finance_log
+    return len(grouped)
+
+
+def update_finance_logs(campaign, old_status=None, old_amount=Decimal('0.0'), status=None, amount=Decimal('0.0'), payment_method=None):
+    """
+    Atualiza os contadores da campanha e o registro do FinanceLogs do dia atual
+    para uma transição de status.
+
+    Os contadores são alterados atomicamente no banco (ver `apply_status_transition`);
+    a instância `campaign` recebida não é recarregada.
+
+    Args:
+        campaign (Campaign): Campanha da venda.
+        old_status (str): Status anterior da venda (APPROVED, PENDING, etc.).
+        old_amount (Decimal): Valor anterior associado ao status antigo.
+        status (str): Novo status da venda (APPROVED, PENDING, etc.).
+        amount (Decimal): Novo valor associado ao novo status.
+        payment_method (str): Forma de pagamento normalizada da venda.
+
+    Returns:
+        dict: Deltas aplicados.
+    """
+    return apply_status_transition(
+        campaign.pk, old_status, old_amount, status, amount, payment_method,
+        shards=campaign.counter_shards)
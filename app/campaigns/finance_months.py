@@ -0,0 +1,286 @@
+import time
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.utils.timezone import localdate
+from .aggregations import (
+    FINANCE_SUM_FIELDS, bucket_rows, build_finance_totals, fetch_dicts, fill_overview_rows, finance_sum_annotations,
+    merge_finance_rows, merge_overview_rows, overview_rows,
+)
+from .invalidation_bus import bus
+from .models import CampaignCounters, FinanceCompactedMonth, FinanceLogs, FinanceLogsMonthly
+
+# Campanhas compactadas por transação
+COMPACTION_BATCH_SIZE = 500
+
+# Segundos em que a lista de meses compactados é reaproveitada pelo processo.
+# Uma lista desatualizada só deixa de usar meses recém-compactados (que são somados dia a dia).
+COMPACTED_MONTHS_TTL = 300
+
+# Tag dos meses compactados no barramento de invalidação dos caches (ver `campaigns.signals`)
+COMPACTED_MONTHS_TAG = 'finance_compacted_months'
+
+_compacted_months = {'months': frozenset(), 'loaded_at': None}
+
+
+def month_start(date):
+    """
+    Retorna o primeiro dia do mês da data.
+    """
+    return date.replace(day=1)
+
+
+def next_month(date):
+    """
+    Retorna o primeiro dia do mês seguinte.
+    """
+    return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def get_compacted_months():
+    """
+    Retorna os meses já compactados (primeiro dia de cada mês), lidos do
+    banco no máximo a cada COMPACTED_MONTHS_TTL segundos (ou após a
+    compactação de um mês, em qualquer processo).
+    """
+    bus.ensure_started()
+    loaded_at = _compacted_months['loaded_at']
+    if loaded_at is None or time.monotonic() - loaded_at > COMPACTED_MONTHS_TTL:
+        _compacted_months['months'] = frozenset(
+            FinanceCompactedMonth.objects.values_list('month', flat=True))
+        _compacted_months['loaded_at'] = time.monotonic()
+    return _compacted_months['months']
+
+
+def invalidate_compacted_months():
+    """
+    Descarta a lista de meses compactados do processo.
+    """
+    _compacted_months['loaded_at'] = None
+
+
+bus.subscribe(COMPACTED_MONTHS_TAG, lambda key: invalidate_compacted_months())
+
+
+def split_date_range(start_date, end_date, compacted_months):
+    """
+    Divide o intervalo [start_date, end_date] entre o nível mensal e o diário.
+
+    Os meses inteiros dentro do intervalo e já compactados são lidos do
+    FinanceLogsMonthly; os demais dias (bordas do intervalo e meses ainda não
+    compactados, como o atual) são somados dia a dia.
+
+    Returns:
+        tuple: (day_ranges, months) — intervalos [(início, fim)] de dias
+        contíguos e a lista de meses (primeiro dia) lidos do nível mensal.
+    """
+    day_ranges, months = [], []
+    month = month_start(start_date)
+    while month <= end_date:
+        last_day = next_month(month) - timedelta(days=1)
+        if month >= start_date and last_day <= end_date and month in compacted_months:
+            months.append(month)
+        else:
+            first, last = max(month, start_date), min(last_day, end_date)
+            if day_ranges and day_ranges[-1][1] + timedelta(days=1) == first:
+                day_ranges[-1] = (day_ranges[-1][0], last)
+            else:
+                day_ranges.append((first, last))
+        month = next_month(month)
+    return day_ranges, months
+
+
+def whole_months_in_range(start_date, end_date):
+    """
+    Indica se o intervalo contém ao menos um mês inteiro.
+    """
+    first_whole_month = start_date if start_date.day == 1 else next_month(start_date)
+    return next_month(first_whole_month) - timedelta(days=1) <= end_date
+
+
+def aggregate_finance_tiers(daily, monthly, start_date, end_date, shards=None):
+    """
+    Calcula os totais (ver `build_finance_totals`) do intervalo combinando os
+    meses inteiros compactados (FinanceLogsMonthly) com os dias das bordas,
+    em uma única consulta (UNION ALL dos dois níveis).
+
+    Um intervalo de um ano lê ~12 linhas mensais por campanha e no máximo
+    ~60 linhas diárias, em vez de 365 linhas diárias.
+
+    Args:
+        daily (QuerySet): Linhas diárias sem filtro de datas (rollups ou FinanceLogs).
+        monthly (QuerySet): FinanceLogsMonthly das mesmas campanhas.
+        start_date (date): Início do intervalo.
+        end_date (date): Fim do intervalo.
+        shards (QuerySet): FinanceLogShard já filtrado pelo intervalo (opcional).
+    """
+    # Intervalos sem nenhum mês inteiro nem consultam a lista de meses compactados
+    if not whole_months_in_range(start_date, end_date):
+        day_ranges, months = [(start_date, end_date)], []
+    else:
+        day_ranges, months = split_date_range(start_date, end_date, get_compacted_months())
+
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(field) for field in FINANCE_SUM_FIELDS)
+    parts, params = [], []
+    if day_ranges:
+        days = Q()
+        for first, last in day_ranges:
+            days |= Q(date__gte=first, date__lte=last)
+        daily_sql, daily_params = daily.filter(days).values(*FINANCE_SUM_FIELDS, 'date').query.sql_with_params()
+        parts.append(f"SELECT {columns}, date AS first_date, date AS last_date FROM ({daily_sql}) AS days")
+        params.extend(daily_params)
+    if months:
+        monthly_sql, monthly_params = monthly.filter(month__in=months).values(
+            *FINANCE_SUM_FIELDS, 'first_date', 'last_date').query.sql_with_params()
+        parts.append(f"SELECT {columns}, first_date, last_date FROM ({monthly_sql}) AS months")
+        params.extend(monthly_params)
+
+    sums = ', '.join(f"SUM({qn(field)}) AS {qn(field)}" for field in FINANCE_SUM_FIELDS)
+    row = fetch_dicts(
+        f"SELECT {sums}, MIN(first_date) AS first_date, MAX(last_date) AS last_date "
+        f"FROM ({' UNION ALL '.join(parts)}) AS tiers",
+        params,
+    )[0]
+    if shards is not None:
+        annotations = dict(finance_sum_annotations(), first_date=Min('date'), last_date=Max('date'))
+        row = merge_finance_rows(row, shards.aggregate(**annotations))
+    return build_finance_totals(row)
+
+
+def overview_tiers(daily, monthly, start_date, end_date, granularity='day', shards=None):
+    """
+    Retorna as linhas de overview do intervalo (ver `overview_rows`). No
+    agrupamento mensal, os meses inteiros já compactados são lidos do
+    FinanceLogsMonthly e os demais dias das linhas diárias, na mesma consulta.
+
+    Args:
+        daily (QuerySet): Linhas diárias sem filtro de datas (rollups ou FinanceLogs).
+        monthly (QuerySet): FinanceLogsMonthly das mesmas campanhas.
+        shards (QuerySet): FinanceLogShard já filtrado pelo intervalo (opcional).
+    """
+    months = []
+    if granularity == 'month' and whole_months_in_range(start_date, end_date):
+        day_ranges, months = split_date_range(start_date, end_date, get_compacted_months())
+    if not months:
+        return overview_rows(daily, start_date, end_date, granularity, shards)
+
+    qn = connection.ops.quote_name
+    parts, params = [], []
+    if day_ranges:
+        days = Q()
+        for first, last in day_ranges:
+            days |= Q(date__gte=first, date__lte=last)
+        daily_sql, daily_params = daily.filter(days).values(
+            'date', 'total_ads', 'amount_approved').query.sql_with_params()
+        parts.append(
+            f"SELECT date_trunc('month', date)::date AS period, total_ads, amount_approved FROM ({daily_sql}) AS days")
+        params.extend(daily_params)
+    monthly_sql, monthly_params = monthly.filter(month__in=months).values(
+        'month', 'total_ads', 'amount_approved').query.sql_with_params()
+    parts.append(f"SELECT month AS period, total_ads, amount_approved FROM ({monthly_sql}) AS months")
+    params.extend(monthly_params)
+
+    rows = fetch_dicts(
+        f"SELECT period AS {qn('date')}, SUM(total_ads) AS total_expense, SUM(amount_approved) AS total_revenue "
+        f"FROM ({' UNION ALL '.join(parts)}) AS tiers GROUP BY period ORDER BY period",
+        params,
+    )
+    if shards is not None:
+        rows = merge_overview_rows(rows, bucket_rows(shards, granularity), keys=('date',))
+    return fill_overview_rows(rows, start_date, end_date, granularity)
+
+
+def month_upsert_cte(campaign_id, date, values):
+    """
+    Monta a CTE que soma os deltas de um dia de um mês fechado na linha
+    mensal da campanha, para ser executada no mesmo comando do upsert do
+    FinanceLogs (ver `upsert_finance_log_deltas`).
+
+    Toda escrita em um mês fechado (ex.: estornos e chargebacks atrasados)
+    atualiza o nível mensal, compactado ou não; escritas no mês atual não
+    têm linha mensal e retornam None.
+
+    Returns:
+        tuple: (sql, params) com a CTE `month_row`, sem o `WITH`, ou None.
+    """
+    month = month_start(date)
+    if month >= month_start(localdate()):
+        return None
+
+    qn = connection.ops.quote_name
+    table = qn(FinanceLogsMonthly._meta.db_table)
+    columns = ', '.join(qn(field) for field in FINANCE_SUM_FIELDS)
+    assignments = ', '.join(
+        f"{qn(field)} = {table}.{qn(field)} + EXCLUDED.{qn(field)}" for field in FINANCE_SUM_FIELDS)
+    sql = (
+        f"month_row AS (INSERT INTO {table} (campaign_id, month, {columns}, first_date, last_date) "
+        f"VALUES (%s, %s, {', '.join(['%s'] * len(FINANCE_SUM_FIELDS))}, %s, %s) "
+        f"ON CONFLICT (campaign_id, month) DO UPDATE SET {assignments}, "
+        f"first_date = LEAST({table}.first_date, EXCLUDED.first_date), "
+        f"last_date = GREATEST({table}.last_date, EXCLUDED.last_date) RETURNING 1)"
+    )
+    params = [campaign_id, month] + [values[field] for field in FINANCE_SUM_FIELDS] + [date, date]
+    return sql, params
+
+
+def _insert_months_sql(where):
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(field) for field in FINANCE_SUM_FIELDS)
+    sums = ', '.join(f"SUM({qn(field)})" for field in FINANCE_SUM_FIELDS)
+    assignments = ', '.join(
+        f"{qn(column)} = EXCLUDED.{qn(column)}" for column in FINANCE_SUM_FIELDS + ['first_date', 'last_date'])
+    return (
+        f"INSERT INTO {qn(FinanceLogsMonthly._meta.db_table)} "
+        f"(campaign_id, month, {columns}, first_date, last_date) "
+        f"SELECT campaign_id, date_trunc('month', date)::date, {sums}, MIN(date), MAX(date) "
+        f"FROM {qn(FinanceLogs._meta.db_table)} WHERE {where} GROUP BY 1, 2 "
+        f"ON CONFLICT (campaign_id, month) DO UPDATE SET {assignments}"
+    )
+
+
+def compact_finance_month(month, batch_size=COMPACTION_BATCH_SIZE):
+    """
+    Compacta um mês fechado: grava a soma mensal de cada campanha com
+    registros no mês e registra o mês como compactado.
+
+    Cada lote de campanhas é somado com os contadores das campanhas
+    bloqueados (como nas escritas do FinanceLogs); escritas concorrentes em
+    dias do mês aguardam e somam seus deltas na linha mensal depois. O mês
+    só é lido do nível mensal após todas as campanhas.
+
+    Returns:
+        int: Quantidade de campanhas compactadas.
+    """
+    last_day = next_month(month) - timedelta(days=1)
+    campaign_ids = list(FinanceLogs.objects.filter(date__gte=month, date__lte=last_day).order_by(
+        'campaign_id').values_list('campaign_id', flat=True).distinct())
+
+    for start in range(0, len(campaign_ids), batch_size):
+        batch = campaign_ids[start:start + batch_size]
+        with transaction.atomic(), connection.cursor() as cursor:
+            list(CampaignCounters.objects.select_for_update().filter(
+                campaign_id__in=batch).order_by('campaign_id').values_list('campaign_id', flat=True))
+            cursor.execute(
+                _insert_months_sql("campaign_id = ANY(%s) AND date >= %s AND date <= %s"),
+                [batch, month, last_day])
+
+    FinanceCompactedMonth.objects.update_or_create(month=month, defaults={'campaigns': len(campaign_ids)})
+    return len(campaign_ids)
+
+
+def refresh_finance_months(campaign_id, since=None):
+    """
+    Recalcula as linhas mensais dos meses fechados da campanha a partir do
+    FinanceLogs (a partir do mês de `since`, se informado), após os dias
+    serem reescritos (ver `write_daily_finance`).
+    """
+    qn = connection.ops.quote_name
+    current_month = month_start(localdate())
+    where = "campaign_id = %s AND month < %s" + (" AND month >= %s" if since else "")
+    logs_where = "campaign_id = %s AND date < %s" + (" AND date >= %s" if since else "")
+    params = [campaign_id, current_month] + ([month_start(since)] if since else [])
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {qn(FinanceLogsMonthly._meta.db_table)} WHERE {where}", params)
+        cursor.execute(_insert_months_sql(logs_where), params)
@@ -0,0 +1,254 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connection, transaction
+from django.utils import timezone
+from integrations.models import IntegrationRequest, SaleEventLedger
+from integrations.routing import get_integration_campaigns
+from .models import Campaign, CampaignCounters, FinanceLogs
+from .finance_log_utils import (
+    FINANCE_LOG_DELTA_COLUMNS, PAYMENT_METHOD_FIELDS, RUNNING_TOTAL_COLUMNS, STATUS_FIELDS,
+    apply_user_profit_delta, compact_finance_log_shards, get_transition_deltas, merge_deltas,
+    refresh_finance_log_running_totals,
+)
+from .finance_months import refresh_finance_months
+from .finance_rollups import shift_finance_rollups
+
+# Contadores derivados das vendas (os demais — anúncios, views e cliques — não são recalculados)
+SALE_COUNTER_FIELDS = [
+    field for fields in (*STATUS_FIELDS.values(), *PAYMENT_METHOD_FIELDS.values()) for field in fields
+]
+
+# Colunas do FinanceLogs derivadas das vendas (o FinanceLogs não tem os cancelados)
+FINANCE_LOG_SALE_COLUMNS = [column for column in FINANCE_LOG_DELTA_COLUMNS if column in SALE_COUNTER_FIELDS]
+
+# Linhas lidas por vez do cursor do servidor e linhas por INSERT no FinanceLogs
+FETCH_SIZE = 5000
+UPSERT_BATCH_SIZE = 1000
+
+
+def get_rebuild_plan(campaign_ids=None):
+    """
+    Agrupa as integrações por campanha, seguindo a mesma regra do roteamento
+    dos webhooks (cada integração pertence à campanha mais recente vinculada).
+
+    Args:
+        campaign_ids (list): Campanhas a reconstruir. Padrão: todas as não excluídas.
+
+    Returns:
+        dict: {campaign_id: [integration_id]}, incluindo campanhas sem integrações.
+    """
+    campaigns = Campaign.objects.filter(deleted=False)
+    if campaign_ids is not None:
+        campaigns = campaigns.filter(pk__in=campaign_ids)
+    plan = {campaign_id: [] for campaign_id in campaigns.order_by('pk').values_list('pk', flat=True)}
+
+    for integration_id, (campaign_id, _) in get_integration_campaigns().items():
+        if campaign_id in plan:
+            plan[campaign_id].append(integration_id)
+    return plan
+
+
+def get_sale_totals(integration_ids):
+    """
+    Soma as vendas das integrações pelo status atual e forma de pagamento
+    (um único GROUP BY no IntegrationRequest).
+
+    Returns:
+        dict: {campo: valor} com todos os contadores de vendas.
+    """
+    totals = dict.fromkeys(SALE_COUNTER_FIELDS, 0)
+    if not integration_ids:
+        return totals
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT status, payment_method, COUNT(*), COALESCE(SUM(amount), 0) "
+            f"FROM {IntegrationRequest._meta.db_table} "
+            f"WHERE integration_id = ANY(%s) GROUP BY status, payment_method",
+            [list(integration_ids)],
+        )
+        for status, payment_method, count, amount in cursor.fetchall():
+            if status not in STATUS_FIELDS:
+                continue
+            total_field, amount_field = STATUS_FIELDS[status]
+            totals[total_field] += count
+            totals[amount_field] += amount
+            if status == 'APPROVED' and payment_method in PAYMENT_METHOD_FIELDS:
+                total_field, amount_field = PAYMENT_METHOD_FIELDS[payment_method]
+                totals[total_field] += count
+                totals[amount_field] += amount
+    return totals
+
+
+def replay_sale(status, amount, payment_method, changed_at, history):
+    """
+    Reaplica as transições de uma venda a partir do zero.
+
+    As transições e seus horários vêm do ledger de deduplicação (ver
+    `integrations.webhooks.register_sale_event`); vendas sem histórico (ou
+    cujo último status registrado difere do atual) recebem a transição para o
+    status atual no horário da última alteração. Como os deltas se anulam em
+    sequência, a soma dos dias é sempre o status atual da venda.
+
+    Args:
+        status (str): Status atual da venda (IntegrationRequest).
+        amount (Decimal): Valor atual da venda.
+        payment_method (str): Forma de pagamento atual.
+        changed_at (datetime): Horário da última alteração da venda.
+        history (list): [(status, horário)] registrados no ledger, em ordem.
+
+    Returns:
+        list: [(dia, deltas)] de cada transição.
+    """
+    if not history or history[-1][0] != status:
+        history = history + [(status, changed_at)]
+
+    transitions = []
+    old_status = None
+    for new_status, at in history:
+        deltas = get_transition_deltas(
+            old_status, amount, new_status, amount, payment_method, payment_method)
+        if deltas:
+            transitions.append((timezone.localdate(at), deltas))
+        old_status = new_status
+    return transitions
+
+
+def replay_daily_finance(integration_ids, since=None):
+    """
+    Recalcula os contadores diários de vendas das integrações.
+
+    As vendas são lidas com um cursor do servidor, ordenadas por (integração,
+    criação), junto com as transições do ledger, e reaplicadas em memória.
+    Com `since`, apenas as vendas alteradas a partir desse dia são lidas e
+    apenas os dias a partir dele são retornados.
+
+    Returns:
+        dict: {dia: {coluna: valor}} com os dias que têm alguma venda.
+    """
+    days = defaultdict(dict)
+    if not integration_ids:
+        return days
+
+    requests = IntegrationRequest._meta.db_table
+    ledger = SaleEventLedger._meta.db_table
+    where = "r.integration_id = ANY(%s)"
+    params = [list(integration_ids)]
+    if since:
+        where += " AND COALESCE(r.updated_at, r.created_at) >= %s"
+        params.append(since)
+
+    sql = (
+        f"SELECT r.id, r.status, r.amount, r.payment_method, COALESCE(r.updated_at, r.created_at), "
+        f"l.status, l.created_at "
+        f"FROM {requests} AS r "
+        f"LEFT JOIN {ledger} AS l ON l.integration_id = r.integration_id AND l.payment_id = r.payment_id "
+        f"WHERE {where} "
+        f"ORDER BY r.integration_id, r.created_at, r.id, l.created_at, l.id"
+    )
+
+    def add_sale(sale, history):
+        for date, deltas in replay_sale(*sale, history):
+            if since is None or date >= since:
+                merge_deltas(days[date], deltas)
+
+    sale_id, sale, history = None, None, []
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for request_id, status, amount, payment_method, changed_at, event_status, event_at in rows:
+                if request_id != sale_id:
+                    if sale is not None:
+                        add_sale(sale, history)
+                    sale_id, sale, history = request_id, (status, amount, payment_method, changed_at), []
+                if event_status is not None:
+                    history.append((event_status, event_at))
+        if sale is not None:
+            add_sale(sale, history)
+
+    return days
+
+
+def write_daily_finance(campaign_id, days, since=None):
+    """
+    Grava os contadores diários de vendas recalculados no FinanceLogs.
+
+    Zera as colunas de vendas dos dias reconstruídos (a partir de `since`),
+    grava os dias com vendas com `INSERT ... ON CONFLICT DO UPDATE` em lotes
+    e recalcula profit, ROI e os totais acumulados; anúncios, views e
+    cliques são mantidos. Os dias reescritos são subtraídos dos rollups
+    antes e somados de novo ao final; os meses fechados são recalculados.
+    """
+    table = FinanceLogs._meta.db_table
+    qn = connection.ops.quote_name
+    where = "campaign_id = %s" + (" AND date >= %s" if since else "")
+    where_params = [campaign_id] + ([since] if since else [])
+
+    # Os totais acumulados são recalculados ao final (ver `refresh_finance_log_running_totals`)
+    columns = ['campaign_id', 'date', 'ROI'] + FINANCE_LOG_DELTA_COLUMNS + list(RUNNING_TOTAL_COLUMNS)
+    row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+    assignments = ', '.join(
+        f"{qn(column)} = EXCLUDED.{qn(column)}" for column in FINANCE_LOG_SALE_COLUMNS)
+    rows = [
+        [campaign_id, date, 0] + [values.get(column, 0) for column in FINANCE_LOG_DELTA_COLUMNS]
+        + [0] * len(RUNNING_TOTAL_COLUMNS)
+        for date, values in sorted(days.items())
+    ]
+
+    shift_finance_rollups([campaign_id], -1, since)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {qn(table)} SET {', '.join(f'{qn(column)} = 0' for column in FINANCE_LOG_SALE_COLUMNS)} "
+            f"WHERE {where}",
+            where_params,
+        )
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f"INSERT INTO {qn(table)} ({', '.join(qn(column) for column in columns)}) "
+                f"VALUES {', '.join([row_placeholder] * len(batch))} "
+                f"ON CONFLICT (campaign_id, date) DO UPDATE SET {assignments}",
+                [value for row in batch for value in row],
+            )
+        cursor.execute(
+            f"UPDATE {qn(table)} SET profit = amount_approved - total_ads, "
+            f"{qn('ROI')} = CASE WHEN total_ads > 0 "
+            f"THEN (amount_approved - total_ads) * 100 / total_ads ELSE 0 END "
+            f"WHERE {where}",
+            where_params,
+        )
+    refresh_finance_log_running_totals(campaign_id, since)
+    shift_finance_rollups([campaign_id], 1, since)
+    refresh_finance_months(campaign_id, since)
+
+
+def rebuild_campaign_finance(campaign_id, integration_ids, since=None):
+    """
+    Recalcula os contadores de vendas da campanha e o FinanceLogs a partir
+    das vendas (IntegrationRequest) das integrações informadas.
+
+    A linha de contadores da campanha fica bloqueada durante a reconstrução;
+    o worker de webhooks aguarda o commit e aplica suas transições por cima
+    dos valores recalculados. Os shards pendentes são consolidados antes.
+    Os totais da campanha são sempre recalculados por completo; `since`
+    limita apenas os dias do FinanceLogs reconstruídos.
+
+    Returns:
+        int: Quantidade de dias com vendas gravados no FinanceLogs.
+    """
+    with transaction.atomic():
+        counters = CampaignCounters.objects.select_for_update().get(campaign_id=campaign_id)
+        if compact_finance_log_shards(campaign_id):
+            counters.refresh_from_db()
+
+        totals = get_sale_totals(integration_ids)
+        days = replay_daily_finance(integration_ids, since)
+
+        profit = totals['amount_approved'] - counters.total_ads
+        roi = profit * 100 / counters.total_ads if counters.total_ads > 0 else Decimal('0')
+        CampaignCounters.objects.filter(campaign_id=campaign_id).update(
+            profit=profit, ROI=roi, **totals)
+        apply_user_profit_delta(campaign_id, profit - counters.profit)
+
+        write_daily_finance(campaign_id, days, since)
+    return len(days)
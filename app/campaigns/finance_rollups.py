@@ -0,0 +1,194 @@
+from django.db import connection, transaction
+from kwai.models import KwaiCampaign, KwaiDailyFinance
+from .aggregations import FINANCE_SUM_FIELDS
+from .models import Campaign, CampaignCounters, FinanceLogs, UserDailyFinance
+
+# Colunas dos rollups diários (as colunas somáveis do FinanceLogs)
+ROLLUP_COLUMNS = FINANCE_SUM_FIELDS
+
+
+def _rollup_assignments(table):
+    qn = connection.ops.quote_name
+    return ', '.join(
+        f"{qn(column)} = {qn(table)}.{qn(column)} + EXCLUDED.{qn(column)}" for column in ROLLUP_COLUMNS)
+
+
+def rollup_upsert_ctes(campaign_id, date, values):
+    """
+    Monta as CTEs que somam os deltas de um dia da campanha nos rollups do
+    usuário dono e das contas Kwai vinculadas, para serem executadas no
+    mesmo comando do upsert do FinanceLogs (ver `upsert_finance_log_deltas`).
+
+    Como o FinanceLogs, os rollups aceitam qualquer dia: estornos e
+    chargebacks atribuídos a dias anteriores ajustam o dia correspondente.
+
+    Args:
+        values (dict): {coluna: delta} com todas as colunas de ROLLUP_COLUMNS.
+
+    Returns:
+        tuple: (sql, params) com as CTEs `user_day` e `kwai_days`, sem o `WITH`.
+    """
+    qn = connection.ops.quote_name
+    user_table = UserDailyFinance._meta.db_table
+    kwai_table = KwaiDailyFinance._meta.db_table
+    columns = ', '.join(qn(column) for column in ROLLUP_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(ROLLUP_COLUMNS))
+    deltas = [values[column] for column in ROLLUP_COLUMNS]
+
+    sql = (
+        f"user_day AS (INSERT INTO {qn(user_table)} (user_id, date, {columns}) "
+        f"SELECT user_id, %s, {placeholders} FROM {qn(Campaign._meta.db_table)} WHERE id = %s "
+        f"ON CONFLICT (user_id, date) DO UPDATE SET {_rollup_assignments(user_table)} RETURNING 1), "
+        f"kwai_days AS (INSERT INTO {qn(kwai_table)} (kwai_id, date, {columns}) "
+        f"SELECT kwai_id, %s, {placeholders} FROM (SELECT DISTINCT kwai_id "
+        f"FROM {qn(KwaiCampaign._meta.db_table)} WHERE campaign_id = %s) AS linked "
+        f"ON CONFLICT (kwai_id, date) DO UPDATE SET {_rollup_assignments(kwai_table)} RETURNING 1)"
+    )
+    params = [date] + deltas + [campaign_id] + [date] + deltas + [campaign_id]
+    return sql, params
+
+
+def shift_finance_rollups(campaign_ids, sign, since=None, kwai_id=None):
+    """
+    Soma (`sign` = 1) ou subtrai (`sign` = -1) os dias do FinanceLogs das
+    campanhas nos rollups, com um `INSERT ... SELECT ... GROUP BY date` por tabela.
+
+    Sem `kwai_id`, ajusta o rollup dos usuários donos e das contas Kwai
+    vinculadas (ex.: antes e depois de reescrever os dias de uma campanha);
+    com `kwai_id`, apenas o rollup dessa conta (vínculo ou desvínculo). Na
+    subtração, os dias que ficam zerados são removidos.
+
+    Quem chama deve bloquear os contadores das campanhas (ver
+    `lock_campaign_counters`), para que nenhuma escrita concorrente no
+    FinanceLogs fique fora do ajuste.
+    """
+    if sign not in (1, -1):
+        raise ValueError("O sinal deve ser 1 ou -1.")
+    campaign_ids = list(campaign_ids)
+    if not campaign_ids:
+        return
+
+    qn = connection.ops.quote_name
+    finance_logs = qn(FinanceLogs._meta.db_table)
+    columns = ', '.join(qn(column) for column in ROLLUP_COLUMNS)
+    sums = ', '.join(f"{sign} * SUM(f.{qn(column)})" for column in ROLLUP_COLUMNS)
+    where = "f.campaign_id = ANY(%s)" + (" AND f.date >= %s" if since else "")
+    where_params = [campaign_ids] + ([since] if since else [])
+
+    statements = []
+    if kwai_id is None:
+        user_table = UserDailyFinance._meta.db_table
+        kwai_table = KwaiDailyFinance._meta.db_table
+        statements.append((
+            f"INSERT INTO {qn(user_table)} (user_id, date, {columns}) "
+            f"SELECT c.user_id, f.date, {sums} FROM {finance_logs} AS f "
+            f"JOIN {qn(Campaign._meta.db_table)} AS c ON c.id = f.campaign_id "
+            f"WHERE {where} GROUP BY c.user_id, f.date "
+            f"ON CONFLICT (user_id, date) DO UPDATE SET {_rollup_assignments(user_table)}",
+            where_params,
+        ))
+        statements.append((
+            f"INSERT INTO {qn(kwai_table)} (kwai_id, date, {columns}) "
+            f"SELECT linked.kwai_id, f.date, {sums} FROM {finance_logs} AS f "
+            f"JOIN (SELECT DISTINCT kwai_id, campaign_id FROM {qn(KwaiCampaign._meta.db_table)}) AS linked "
+            f"ON linked.campaign_id = f.campaign_id "
+            f"WHERE {where} GROUP BY linked.kwai_id, f.date "
+            f"ON CONFLICT (kwai_id, date) DO UPDATE SET {_rollup_assignments(kwai_table)}",
+            where_params,
+        ))
+    else:
+        kwai_table = KwaiDailyFinance._meta.db_table
+        statements.append((
+            f"INSERT INTO {qn(kwai_table)} (kwai_id, date, {columns}) "
+            f"SELECT %s, f.date, {sums} FROM {finance_logs} AS f "
+            f"WHERE {where} GROUP BY f.date "
+            f"ON CONFLICT (kwai_id, date) DO UPDATE SET {_rollup_assignments(kwai_table)}",
+            [kwai_id] + where_params,
+        ))
+
+    if sign < 0:
+        # Dias que zeraram (ex.: a única campanha do dia foi desvinculada) deixam de existir
+        zeros = ' AND '.join(f"{qn(column)} = 0" for column in ROLLUP_COLUMNS)
+        if kwai_id is None:
+            statements.append((
+                f"DELETE FROM {qn(UserDailyFinance._meta.db_table)} WHERE user_id IN "
+                f"(SELECT user_id FROM {qn(Campaign._meta.db_table)} WHERE id = ANY(%s)) AND {zeros}",
+                [campaign_ids],
+            ))
+            statements.append((
+                f"DELETE FROM {qn(KwaiDailyFinance._meta.db_table)} WHERE kwai_id IN "
+                f"(SELECT kwai_id FROM {qn(KwaiCampaign._meta.db_table)} WHERE campaign_id = ANY(%s)) AND {zeros}",
+                [campaign_ids],
+            ))
+        else:
+            statements.append((
+                f"DELETE FROM {qn(KwaiDailyFinance._meta.db_table)} WHERE kwai_id = %s AND {zeros}",
+                [kwai_id],
+            ))
+
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(sql, params)
+
+
+def lock_campaign_counters(campaign_ids):
+    """
+    Bloqueia as linhas de contadores das campanhas (em ordem de id) até o fim
+    da transação. As escritas no FinanceLogs bloqueiam a mesma linha antes de
+    gravar (ver `apply_finance_deltas`), então aguardam o ajuste dos rollups.
+    """
+    list(CampaignCounters.objects.select_for_update().filter(
+        campaign_id__in=list(campaign_ids)).order_by('campaign_id').values_list('campaign_id', flat=True))
+
+
+def rebuild_finance_rollups(user_ids=(), kwai_ids=(), since=None):
+    """
+    Recalcula os rollups dos usuários e das contas Kwai informados a partir
+    do FinanceLogs (a partir do dia `since`, se informado).
+
+    A tabela de rollups fica bloqueada para escrita (leituras continuam)
+    durante o recálculo: escritas em andamento no FinanceLogs aguardam e
+    somam seus deltas depois, sem serem contadas duas vezes nem perdidas.
+
+    Returns:
+        int: Quantidade de linhas diárias gravadas.
+    """
+    qn = connection.ops.quote_name
+    finance_logs = qn(FinanceLogs._meta.db_table)
+    columns = ', '.join(qn(column) for column in ROLLUP_COLUMNS)
+    sums = ', '.join(f"SUM(f.{qn(column)})" for column in ROLLUP_COLUMNS)
+    delete_filter = " AND date >= %s" if since else ""
+    logs_filter = " AND f.date >= %s" if since else ""
+    date_params = [since] if since else []
+
+    rows = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        if user_ids:
+            user_table = qn(UserDailyFinance._meta.db_table)
+            cursor.execute(f"LOCK TABLE {user_table} IN EXCLUSIVE MODE")
+            cursor.execute(
+                f"DELETE FROM {user_table} WHERE user_id = ANY(%s){delete_filter}",
+                [list(user_ids)] + date_params)
+            cursor.execute(
+                f"INSERT INTO {user_table} (user_id, date, {columns}) "
+                f"SELECT c.user_id, f.date, {sums} FROM {finance_logs} AS f "
+                f"JOIN {qn(Campaign._meta.db_table)} AS c ON c.id = f.campaign_id "
+                f"WHERE c.user_id = ANY(%s){logs_filter} "
+                f"GROUP BY c.user_id, f.date",
+                [list(user_ids)] + date_params)
+            rows += cursor.rowcount
+        if kwai_ids:
+            kwai_table = qn(KwaiDailyFinance._meta.db_table)
+            cursor.execute(f"LOCK TABLE {kwai_table} IN EXCLUSIVE MODE")
+            cursor.execute(
+                f"DELETE FROM {kwai_table} WHERE kwai_id = ANY(%s){delete_filter}",
+                [list(kwai_ids)] + date_params)
+            cursor.execute(
+                f"INSERT INTO {kwai_table} (kwai_id, date, {columns}) "
+                f"SELECT linked.kwai_id, f.date, {sums} FROM {finance_logs} AS f "
+                f"JOIN (SELECT DISTINCT kwai_id, campaign_id FROM {qn(KwaiCampaign._meta.db_table)} "
+                f"WHERE kwai_id = ANY(%s)) AS linked ON linked.campaign_id = f.campaign_id{logs_filter} "
+                f"GROUP BY linked.kwai_id, f.date",
+                [list(kwai_ids)] + date_params)
+            rows += cursor.rowcount
+    return rows
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import select
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger('django')
+
+# Chave do carimbo de versão de cada tag no cache compartilhado (modo poll)
+TAG_VERSION_KEY = 'cache_invalidation_version:{tag}'
+
+INVALIDATION_MODES = ('notify', 'poll')
+
+
+class InvalidationBus:
+    """
+    Barramento de invalidação dos caches por processo (rotas das integrações,
+    meses compactados, dados de referência...).
+
+    Cada cache registra, por tag, a função que descarta as suas entradas
+    (`subscribe`) e as alterações nos models marcados com a tag (`tag_models`)
+    ou as chamadas a `publish` descartam as entradas do próprio processo na
+    hora e avisam os demais processos:
+
+    - modo `notify`: um `pg_notify` no canal `CACHE_INVALIDATION_CHANNEL`,
+      dentro da transação da alteração (o Postgres só entrega após o commit
+      e descarta no rollback). Uma thread por processo escuta o canal
+      (LISTEN, em uma conexão própria) e descarta as entradas avisadas; a
+      cada (re)conexão tudo é descartado, pois os avisos enviados com a
+      conexão fechada se perdem.
+    - modo `poll`: após o commit, um novo carimbo de versão da tag no cache
+      compartilhado; a thread compara os carimbos a cada
+      `CACHE_INVALIDATION_POLL_SECONDS` e descarta as tags alteradas. Só
+      alcança os processos que usam o mesmo cache (os do mesmo nó, com o
+      cache em memória compartilhada).
+
+    A thread só é iniciada nos processos habilitados (`enable`, chamado no
+    wsgi e no worker de webhooks) e é recriada após o fork dos workers do
+    uwsgi na primeira leitura dos caches (`ensure_started`).
+    """
+
+    def __init__(self, mode=None, channel=None, poll_interval=None, using=DEFAULT_DB_ALIAS):
+        self.mode = settings.CACHE_INVALIDATION_MODE if mode is None else mode
+        if self.mode not in INVALIDATION_MODES:
+            raise ValueError(f"Modo de invalidação inválido: {self.mode}.")
+        self.channel = settings.CACHE_INVALIDATION_CHANNEL if channel is None else channel
+        self.poll_interval = (
+            settings.CACHE_INVALIDATION_POLL_SECONDS if poll_interval is None else poll_interval)
+        self.using = using
+        self.lock = threading.Lock()
+        self.handlers = {}
+        self.enabled = False
+        self.pid = None
+        self.origin = None
+        self.thread = None
+        self.stopping = threading.Event()
+        # Sinaliza que o processo está escutando o canal (ou com os carimbos lidos, no modo poll)
+        self.listening = threading.Event()
+        self.versions = {}
+
+    def subscribe(self, tag, handler):
+        """
+        Registra a função que descarta as entradas da tag no processo.
+
+        Args:
+            tag (str): Nome da tag.
+            handler (callable): Recebe a chave alterada (str) ou None para
+                descartar todas as entradas da tag.
+        """
+        with self.lock:
+            self.handlers.setdefault(tag, []).append(handler)
+
+    def tag_models(self, tag, *models, key=None):
+        """
+        Publica a tag quando instâncias dos models são salvas ou excluídas.
+
+        Args:
+            key (callable): Opcional; recebe a instância e retorna a chave alterada.
+        """
+        def changed(sender, instance, **kwargs):
+            self.publish(tag, key(instance) if key else None, using=kwargs.get('using') or self.using)
+
+        for model in models:
+            for signal in (post_save, post_delete):
+                signal.connect(changed, sender=model, weak=False,
+                               dispatch_uid=f"invalidation_bus:{tag}:{model._meta.label}:{id(self)}")
+
+    def publish(self, tag, key=None, using=None):
+        """
+        Descarta as entradas da tag no processo e avisa os demais processos
+        quando a transação atual fizer commit.
+
+        O processo descarta as entradas na hora e de novo após o commit: uma
+        recarga de outra thread entre os dois ainda lê os dados anteriores ao
+        commit (e o aviso do próprio processo no canal é ignorado).
+        """
+        using = using or self.using
+        self.dispatch(tag, key)
+        transaction.on_commit(lambda: self.dispatch(tag, key), using=using)
+        if self.mode == 'notify':
+            message = json.dumps({'origin': self.get_origin(), 'tag': tag, 'key': key})
+            with connections[using].cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, message])
+        else:
+            transaction.on_commit(lambda: self.bump_version(tag), using=using)
+
+    def bump_version(self, tag):
+        version = uuid.uuid4().hex
+        cache.set(TAG_VERSION_KEY.format(tag=tag), version, None)
+        return version
+
+    def dispatch(self, tag, key=None):
+        """
+        Chama as funções registradas da tag no processo.
+        """
+        for handler in list(self.handlers.get(tag, ())):
+            try:
+                handler(key)
+            except Exception:
+                logger.exception(f"Erro ao invalidar o cache da tag {tag}.")
+
+    def dispatch_all(self):
+        for tag in list(self.handlers):
+            self.dispatch(tag)
+
+    def receive(self, payload):
+        """
+        Trata um aviso recebido no canal; os avisos do próprio processo já
+        foram tratados em `publish`.
+        """
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Aviso de invalidação inválido: {payload!r}.")
+            return
+        if message.get('origin') != self.origin:
+            self.dispatch(message.get('tag'), message.get('key'))
+
+    def get_origin(self):
+        """
+        Identifica o processo nos avisos (os pids se repetem entre os containers).
+        """
+        if self.pid != os.getpid() or self.origin is None:
+            with self.lock:
+                if self.pid != os.getpid() or self.origin is None:
+                    self.pid = os.getpid()
+                    self.origin = uuid.uuid4().hex
+                    self.thread = None
+        return self.origin
+
+    def enable(self):
+        """
+        Habilita a escuta no processo e nos processos criados por fork a
+        partir dele; a thread é iniciada na primeira leitura dos caches.
+        """
+        self.enabled = True
+
+    def ensure_started(self):
+        """
+        Inicia a thread de escuta do processo, se habilitada e ainda não
+        iniciada (os processos filhos não herdam as threads do pai).
+        """
+        if not self.enabled or (self.thread is not None and self.pid == os.getpid()):
+            return
+        self.get_origin()
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stopping = threading.Event()
+            self.listening = threading.Event()
+            if self.mode == 'poll':
+                # Os carimbos atuais são a base: as alterações a partir daqui são detectadas
+                self.versions = self.read_versions()
+                self.listening.set()
+                target = self.poll
+            else:
+                target = self.listen
+            self.thread = threading.Thread(target=target, name='cache-invalidation-bus', daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Encerra a thread de escuta do processo.
+        """
+        self.enabled = False
+        thread = self.thread
+        self.stopping.set()
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.thread = None
+        self.listening.clear()
+
+    def listen(self):
+        """
+        Escuta o canal em uma conexão própria, reconectando após falhas.
+        """
+        stopping = self.stopping
+        while not stopping.is_set():
+            raw = None
+            try:
+                wrapper = connections[self.using]
+                raw = wrapper.get_new_connection(wrapper.get_connection_params())
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {wrapper.ops.quote_name(self.channel)}")
+                self.dispatch_all()
+                self.listening.set()
+                logger.debug(f"Escutando as invalidações de cache no canal {self.channel}.")
+                while not stopping.is_set():
+                    if select.select([raw], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self.receive(raw.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Erro na escuta das invalidações de cache; reconectando.")
+                self.listening.clear()
+                stopping.wait(self.poll_interval)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def read_versions(self):
+        tags = list(self.handlers)
+        versions = cache.get_many([TAG_VERSION_KEY.format(tag=tag) for tag in tags])
+        return {tag: versions.get(TAG_VERSION_KEY.format(tag=tag)) for tag in tags}
+
+    def poll(self):
+        """
+        Compara os carimbos de versão das tags a cada `poll_interval`.
+        """
+        stopping = self.stopping
+        while not stopping.wait(self.poll_interval):
+            try:
+                versions = self.read_versions()
+            except Exception:
+                logger.exception("Erro ao ler os carimbos de invalidação de cache.")
+                continue
+            for tag, version in versions.items():
+                if version != self.versions.get(tag, version):
+                    self.dispatch(tag)
+            self.versions = versions
+
+
+# Instância usada pelos caches por processo
+bus = InvalidationBus()
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from campaigns.finance_rollups import rebuild_finance_rollups
+from kwai.models import Kwai
+import logging
+logger = logging.getLogger('django')
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula os rollups diários por usuário (user_daily_finance) e por conta Kwai '
+        '(kwai_daily_finance) a partir do FinanceLogs, inclusive os dias anteriores que '
+        'receberam estornos e chargebacks depois.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, default=None,
+                            help='Recalcula apenas a partir deste dia (AAAA-MM-DD). Padrão: todos os dias.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Usuários (ou contas Kwai) recalculados por transação.')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Data inválida: {options['since']} (use AAAA-MM-DD).")
+        batch_size = max(options['batch_size'], 1)
+
+        # Lotes curtos: a tabela de rollups fica bloqueada para escrita durante cada lote
+        rows = 0
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(user_ids), batch_size):
+            rows += rebuild_finance_rollups(user_ids=user_ids[start:start + batch_size], since=since)
+        kwai_ids = list(Kwai.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(kwai_ids), batch_size):
+            rows += rebuild_finance_rollups(kwai_ids=kwai_ids[start:start + batch_size], since=since)
+
+        logger.info(
+            f"Rollups financeiros recalculados: {len(user_ids)} usuários, {len(kwai_ids)} contas Kwai, "
+            f"{rows} dias.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups recalculados: {len(user_ids)} usuários e {len(kwai_ids)} contas Kwai ({rows} dias)."))
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import uuid
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from campaigns.cache_backend import SharedMemoryCache
+import logging
+logger = logging.getLogger('django')
+
+
+def mixed_workload(backend, keys, ops, payload, seed, results):
+    """
+    Executa `ops` operações (90% leituras, 10% escritas) em chaves
+    compartilhadas e registra (segundos, acertos, leituras).
+    """
+    rng = random.Random(seed)
+    hits = reads = 0
+    started = time.perf_counter()
+    for _ in range(ops):
+        key = rng.choice(keys)
+        if rng.random() < 0.9:
+            reads += 1
+            hits += backend.get(key) is not None
+        else:
+            backend.set(key, payload, 300)
+    results.put((time.perf_counter() - started, hits, reads))
+
+
+class Command(BaseCommand):
+    help = 'Compara o cache em memória compartilhada com o FileBasedCache e o LocMemCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=20000,
+                            help='Quantidade de operações por medição.')
+        parser.add_argument('--payload', type=int, default=2048,
+                            help='Tamanho (bytes) dos valores gravados.')
+        parser.add_argument('--processes', type=int, default=4,
+                            help='Quantidade de processos na medição concorrente.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            backends = [
+                ('shared_memory', SharedMemoryCache(
+                    os.path.join(directory, 'shared_memory.cache'), {'OPTIONS': {'SIZE_MB': 64}})),
+                # Sem o corte padrão de 300 entradas, para que as leituras encontrem as chaves
+                ('file_based', FileBasedCache(
+                    os.path.join(directory, 'file_based'), {'OPTIONS': {'MAX_ENTRIES': 100000}})),
+                ('locmem', LocMemCache(f"benchmark-{uuid.uuid4().hex}", {'OPTIONS': {'MAX_ENTRIES': 100000}})),
+            ]
+            for name, backend in backends:
+                self.run(name, backend, options['ops'], options['payload'], options['processes'])
+        self.stdout.write("Os acertos do locmem são menores: cada processo vê apenas as próprias escritas.")
+
+    def run(self, name, backend, ops, payload_size, processes):
+        payload = os.urandom(payload_size)
+        keys = [f"benchmark:{index}" for index in range(min(ops, 5000))]
+
+        started = time.perf_counter()
+        for index in range(ops):
+            backend.set(keys[index % len(keys)], payload, 300)
+        set_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for index in range(ops):
+            backend.get(keys[index % len(keys)])
+        hit_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for index in range(ops):
+            backend.get(f"missing:{index}")
+        miss_elapsed = time.perf_counter() - started
+
+        # Processos concorrentes (como os workers do uwsgi) lendo e gravando as mesmas chaves
+        backend.clear()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=mixed_workload, args=(backend, keys, ops, payload, seed, results))
+            for seed in range(processes)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        measurements = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        hits = sum(measurement[1] for measurement in measurements)
+        reads = sum(measurement[2] for measurement in measurements)
+
+        self.stdout.write(
+            f"{name}: set {ops / set_elapsed:.0f}/s ({set_elapsed / ops * 1e6:.1f}µs), "
+            f"get {ops / hit_elapsed:.0f}/s ({hit_elapsed / ops * 1e6:.1f}µs), "
+            f"miss {ops / miss_elapsed:.0f}/s ({miss_elapsed / ops * 1e6:.1f}µs) | "
+            f"{processes} processos: {processes * ops / elapsed:.0f} ops/s, "
+            f"acertos {hits / max(reads, 1):.0%}"
+        )
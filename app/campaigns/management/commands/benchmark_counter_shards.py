@@ -0,0 +1,81 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from campaigns.models import Campaign, FinanceLogs
+from campaigns.finance_log_utils import apply_status_transition, compact_finance_log_shards
+import logging
+logger = logging.getLogger('django')
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão de transições concorrentes na mesma campanha com e sem shards de contadores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=2000,
+                            help='Quantidade de vendas aprovadas por rodada.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Quantidade de threads escrevendo em paralelo.')
+        parser.add_argument('--shards', type=int, default=16,
+                            help='Quantidade de shards da rodada com shards.')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:10]
+        user = User.objects.create_user(
+            cpf=str(uuid.uuid4().int)[:11], email=f"benchmark-{run_id}@example.com", name="Benchmark")
+
+        try:
+            for shards in (0, options['shards']):
+                campaign = Campaign.objects.create(
+                    user=user, title=f"Benchmark {run_id} ({shards} shards)", method='CPC',
+                    CPC=Decimal('1.00'), counter_shards=shards)
+                elapsed, errors = self.run(campaign, options['sales'], options['workers'])
+
+                compact_started = time.perf_counter()
+                compact_finance_log_shards(campaign.pk)
+                compact_elapsed = time.perf_counter() - compact_started
+
+                campaign.refresh_from_db()
+                finance_log = FinanceLogs.objects.get(campaign=campaign)
+                self.stdout.write(
+                    f"shards={shards}: {options['sales']} transições em {elapsed:.2f}s "
+                    f"({options['sales'] / elapsed:.0f}/s), {options['workers']} threads, {errors} erros, "
+                    f"compactação {compact_elapsed * 1000:.2f}ms | "
+                    f"campanha: total_approved={campaign.total_approved} | "
+                    f"FinanceLogs: total_approved={finance_log.total_approved}"
+                )
+        finally:
+            user.delete()
+
+    def run(self, campaign, sales, workers):
+        """
+        Aplica `sales` aprovações na campanha a partir de `workers` threads.
+
+        Returns:
+            tuple: (segundos decorridos, quantidade de erros)
+        """
+        errors = []
+
+        def worker(worker_no):
+            try:
+                for _ in range(worker_no, sales, workers):
+                    apply_status_transition(
+                        campaign.pk, status='APPROVED', amount=Decimal('10.00'),
+                        payment_method='PIX', shards=campaign.counter_shards)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(worker_no,)) for worker_no in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, len(errors)
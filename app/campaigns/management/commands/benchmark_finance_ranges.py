@@ -0,0 +1,94 @@
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from campaigns.models import Campaign, FinanceLogs
+from campaigns.aggregations import aggregate_finance_logs, aggregate_finance_range
+from campaigns.finance_log_utils import refresh_finance_log_running_totals
+import logging
+logger = logging.getLogger('django')
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compara o tempo dos totais por intervalo somando os dias e pelos totais acumulados do FinanceLogs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=20,
+                            help='Quantidade de campanhas do usuário de teste.')
+        parser.add_argument('--days', type=int, default=1095,
+                            help='Dias de FinanceLogs por campanha.')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Execuções de cada consulta (é informada a média).')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:10]
+        user = User.objects.create_user(
+            cpf=str(uuid.uuid4().int)[:11], email=f"benchmark-{run_id}@example.com", name="Benchmark")
+
+        try:
+            campaigns = [
+                Campaign.objects.create(
+                    user=user, title=f"Benchmark {run_id} #{index}", method='CPC', CPC=Decimal('1.00'))
+                for index in range(options['campaigns'])
+            ]
+            self.create_finance_logs(campaigns, options['days'])
+
+            today = timezone.localdate()
+            user_campaigns = Campaign.objects.filter(user=user)
+            for days in (30, 90, 365):
+                start = today - timedelta(days=days - 1)
+                daily = self.measure(options['repeat'], lambda: aggregate_finance_logs(FinanceLogs.objects.filter(
+                    campaign__user=user, date__gte=start, date__lte=today)))
+                running = self.measure(
+                    options['repeat'], lambda: aggregate_finance_range(user_campaigns, start, today))
+                self.stdout.write(
+                    f"{days:>3} dias ({options['campaigns']} campanhas): soma dos dias {daily:.2f}ms | "
+                    f"acumulados {running:.2f}ms"
+                )
+        finally:
+            user.delete()
+
+    def create_finance_logs(self, campaigns, days):
+        """
+        Cria `days` dias de FinanceLogs para cada campanha (um INSERT com
+        generate_series) e calcula os acumulados.
+        """
+        values = {
+            'total_views': 100, 'total_clicks': 10, 'total_ads': 5, 'total_approved': 2,
+            'amount_approved': 20, 'total_pending': 1, 'amount_pending': Decimal('7.5'),
+            'pix_total': 2, 'pix_amount': 20, 'profit': 15,
+        }
+        qn = connection.ops.quote_name
+        columns = [
+            field.column for field in FinanceLogs._meta.concrete_fields
+            if not field.primary_key and field.column not in ('campaign_id', 'date')
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(FinanceLogs._meta.db_table)} "
+                f"(campaign_id, date, {', '.join(qn(column) for column in columns)}) "
+                f"SELECT campaign_id, %s::date - day, {', '.join(['%s'] * len(columns))} "
+                f"FROM unnest(%s::int[]) AS campaign_id, generate_series(0, %s - 1) AS day",
+                [timezone.localdate()] + [values.get(column, 0) for column in columns]
+                + [[campaign.pk for campaign in campaigns], days],
+            )
+        for campaign in campaigns:
+            refresh_finance_log_running_totals(campaign.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {qn(FinanceLogs._meta.db_table)}")
+
+    def measure(self, repeat, query):
+        """
+        Retorna o tempo médio (ms) de `repeat` execuções da consulta.
+        """
+        query()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        return (time.perf_counter() - started) * 1000 / repeat
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from campaigns.models import Campaign
+from campaigns.finance_log_utils import compact_finance_log_shards
+import logging
+logger = logging.getLogger('django')
+
+
+class Command(BaseCommand):
+    help = 'Consolida os shards de contadores (finance_log_shards) no FinanceLogs e nas campanhas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=str, default=None,
+                            help='UID da campanha a consolidar (padrão: todas).')
+
+    def handle(self, *args, **options):
+        campaign_id = None
+        if options['campaign']:
+            try:
+                campaign_id = Campaign.objects.values_list('pk', flat=True).get(uid=options['campaign'])
+            except (Campaign.DoesNotExist, ValueError):
+                raise CommandError(f"Campanha {options['campaign']} não encontrada.")
+
+        try:
+            rows = compact_finance_log_shards(campaign_id)
+        except Exception as e:
+            logger.error(f"Erro ao consolidar os shards de contadores: {e}", exc_info=True)
+            raise
+
+        logger.info(f"Shards de contadores consolidados: {rows} linhas (campanha, dia).")
+        self.stdout.write(self.style.SUCCESS(f"{rows} linhas (campanha, dia) consolidadas."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from campaigns.models import FinanceCompactedMonth, FinanceLogs
+from campaigns.finance_months import compact_finance_month, month_start, next_month
+import logging
+logger = logging.getLogger('django')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacta os meses fechados do FinanceLogs no nível mensal (FinanceLogsMonthly), '
+        'usado pelas consultas de intervalos longos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=str, default=None,
+                            help='Recompacta apenas este mês fechado (AAAA-MM). '
+                                 'Padrão: todos os meses fechados ainda não compactados.')
+
+    def handle(self, *args, **options):
+        current_month = month_start(timezone.localdate())
+
+        if options['month']:
+            month = parse_date(f"{options['month']}-01")
+            if month is None or month >= current_month:
+                raise CommandError(f"Mês inválido ou ainda aberto: {options['month']} (use AAAA-MM).")
+            months = [month]
+        else:
+            compacted = set(FinanceCompactedMonth.objects.values_list('month', flat=True))
+            first_log = FinanceLogs.objects.order_by('date').values_list('date', flat=True).first()
+            months = []
+            month = month_start(first_log) if first_log else current_month
+            while month < current_month:
+                if month not in compacted:
+                    months.append(month)
+                month = next_month(month)
+
+        campaigns = 0
+        for month in months:
+            compacted_campaigns = compact_finance_month(month)
+            campaigns += compacted_campaigns
+            logger.info(f"Mês {month:%Y-%m} compactado: {compacted_campaigns} campanhas.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(months)} meses compactados ({campaigns} linhas mensais)."))
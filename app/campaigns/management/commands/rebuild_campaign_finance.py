@@ -0,0 +1,81 @@
+import multiprocessing
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_date
+from campaigns.models import Campaign
+from campaigns.finance_rebuild import get_rebuild_plan, rebuild_campaign_finance
+import logging
+logger = logging.getLogger('django')
+
+
+def rebuild_task(task):
+    """
+    Reconstrói uma campanha em um processo do pool.
+    """
+    campaign_id, integration_ids, since = task
+    return campaign_id, rebuild_campaign_finance(campaign_id, integration_ids, since)
+
+
+def close_connections():
+    """
+    Descarta as conexões herdadas do processo pai; cada processo abre a sua.
+    """
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula os contadores de vendas das campanhas e o FinanceLogs a partir do histórico '
+        'de vendas (IntegrationRequest e ledger de transições). As vendas de cada integração são '
+        'atribuídas à campanha vinculada atualmente, como no recebimento dos webhooks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=str, default=None,
+                            help='UID da campanha a reconstruir (padrão: todas).')
+        parser.add_argument('--since', type=str, default=None,
+                            help='Reconstrói o FinanceLogs apenas a partir deste dia (AAAA-MM-DD). '
+                                 'Os totais da campanha são sempre recalculados por completo.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Quantidade de processos; as campanhas são divididas entre eles.')
+
+    def handle(self, *args, **options):
+        campaign_ids = None
+        if options['campaign']:
+            try:
+                campaign_ids = [Campaign.objects.values_list('pk', flat=True).get(
+                    uid=options['campaign'], deleted=False)]
+            except (Campaign.DoesNotExist, ValueError):
+                raise CommandError(f"Campanha {options['campaign']} não encontrada.")
+
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Data inválida: {options['since']} (use AAAA-MM-DD).")
+
+        workers = max(options['workers'], 1)
+        plan = get_rebuild_plan(campaign_ids)
+        tasks = [(campaign_id, integration_ids, since) for campaign_id, integration_ids in plan.items()]
+
+        started = time.perf_counter()
+        try:
+            if workers == 1 or len(tasks) <= 1:
+                results = [rebuild_task(task) for task in tasks]
+            else:
+                # As conexões abertas não podem ser compartilhadas com os processos filhos
+                close_connections()
+                with multiprocessing.get_context('fork').Pool(workers, initializer=close_connections) as pool:
+                    results = list(pool.imap_unordered(rebuild_task, tasks))
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir as finanças das campanhas: {e}", exc_info=True)
+            raise
+
+        elapsed = time.perf_counter() - started
+        days = sum(rows for _, rows in results)
+        logger.info(
+            f"Finanças reconstruídas: {len(results)} campanhas, {days} dias, "
+            f"{workers} processos, {elapsed:.2f}s.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(results)} campanhas reconstruídas ({days} dias no FinanceLogs) em {elapsed:.2f}s."))
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0031_alter_campaign_options_campaign_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='counter_shards',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='FinanceLogShard',
+            fields=[
+                ('total_views', models.IntegerField(default=0)),
+                ('total_clicks', models.IntegerField(default=0)),
+                ('total_ads', models.DecimalField(decimal_places=8, default=0, max_digits=13)),
+                ('total_approved', models.IntegerField(default=0)),
+                ('total_pending', models.IntegerField(default=0)),
+                ('total_refunded', models.IntegerField(default=0)),
+                ('total_abandoned', models.IntegerField(default=0)),
+                ('total_chargeback', models.IntegerField(default=0)),
+                ('total_rejected', models.IntegerField(default=0)),
+                ('amount_approved', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_pending', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_refunded', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_rejected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_chargeback', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_abandoned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_total', models.IntegerField(default=0)),
+                ('pix_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('pix_total', models.IntegerField(default=0)),
+                ('debit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('debit_card_total', models.IntegerField(default=0)),
+                ('boleto_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('boleto_total', models.IntegerField(default=0)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('shard_no', models.PositiveSmallIntegerField()),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finance_log_shards', to='campaigns.campaign')),
+            ],
+            options={
+                'db_table': 'finance_log_shards',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='financelogshard',
+            constraint=models.UniqueConstraint(fields=('campaign', 'date', 'shard_no'), name='unique_finance_log_shard'),
+        ),
+    ]
@@ -0,0 +1,207 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Contadores movidos de `campaigns` para `campaign_counters`
+COUNTER_COLUMNS = [
+    'total_approved',
+    'total_pending',
+    'amount_approved',
+    'amount_pending',
+    'total_ads',
+    'profit',
+    'ROI',
+    'total_views',
+    'total_clicks',
+    'total_abandoned',
+    'amount_abandoned',
+    'total_canceled',
+    'amount_canceled',
+    'total_refunded',
+    'amount_refunded',
+    'total_rejected',
+    'amount_rejected',
+    'total_chargeback',
+    'amount_chargeback',
+    'credit_card_amount',
+    'credit_card_total',
+    'pix_amount',
+    'pix_total',
+    'debit_card_amount',
+    'debit_card_total',
+    'boleto_amount',
+    'boleto_total',
+]
+QUOTED_COLUMNS = ', '.join(f'"{column}"' for column in COUNTER_COLUMNS)
+
+COPY_COUNTERS = (
+    f'INSERT INTO campaign_counters (campaign_id, {QUOTED_COLUMNS}, updated_at) '
+    f'SELECT id, {QUOTED_COLUMNS}, updated_at FROM campaigns'
+)
+RESTORE_COUNTERS = (
+    'UPDATE campaigns SET '
+    + ', '.join(f'"{column}" = counters."{column}"' for column in COUNTER_COLUMNS)
+    + ' FROM campaign_counters counters WHERE counters.campaign_id = campaigns.id'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0032_financelogshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignCounters',
+            fields=[
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='campaigns.campaign')),
+                ('total_approved', models.IntegerField(default=0)),
+                ('total_pending', models.IntegerField(default=0)),
+                ('amount_approved', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('amount_pending', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_ads', models.DecimalField(decimal_places=8, default=0, max_digits=13)),
+                ('profit', models.DecimalField(decimal_places=5, default=0, max_digits=15)),
+                ('ROI', models.DecimalField(decimal_places=5, default=0, max_digits=15)),
+                ('total_views', models.IntegerField(default=0)),
+                ('total_clicks', models.IntegerField(default=0)),
+                ('total_abandoned', models.IntegerField(default=0)),
+                ('amount_abandoned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_canceled', models.IntegerField(default=0)),
+                ('amount_canceled', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_refunded', models.IntegerField(default=0)),
+                ('amount_refunded', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_rejected', models.IntegerField(default=0)),
+                ('amount_rejected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_chargeback', models.IntegerField(default=0)),
+                ('amount_chargeback', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_total', models.IntegerField(default=0)),
+                ('pix_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('pix_total', models.IntegerField(default=0)),
+                ('debit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('debit_card_total', models.IntegerField(default=0)),
+                ('boleto_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('boleto_total', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'campaign_counters',
+            },
+        ),
+        # Espaço livre nas páginas para atualizações HOT (sem reescrever índices)
+        migrations.RunSQL(
+            'ALTER TABLE campaign_counters SET (fillfactor = 70)',
+            'ALTER TABLE campaign_counters RESET (fillfactor)',
+        ),
+        migrations.RunSQL(COPY_COUNTERS, RESTORE_COUNTERS),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='ROI',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_abandoned',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_approved',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_canceled',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_chargeback',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_pending',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_refunded',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='amount_rejected',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='boleto_amount',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='boleto_total',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='credit_card_amount',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='credit_card_total',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='debit_card_amount',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='debit_card_total',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='pix_amount',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='pix_total',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='profit',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_abandoned',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_ads',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_approved',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_canceled',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_chargeback',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_clicks',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_pending',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_refunded',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_rejected',
+        ),
+        migrations.RemoveField(
+            model_name='campaign',
+            name='total_views',
+        ),
+    ]
@@ -0,0 +1,257 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:29
+
+import logging
+from decimal import Decimal
+from django.db import migrations, models
+
+logger = logging.getLogger('django')
+
+# Colunas que as versões antigas do `update_finance_logs` gravavam como
+# retrato dos contadores acumulados da campanha (e não como delta do dia)
+SNAPSHOT_COLUMNS = [
+    'total_views', 'total_clicks', 'total_ads',
+    'total_approved', 'total_pending', 'total_refunded',
+    'total_abandoned', 'total_chargeback', 'total_rejected',
+    'amount_approved', 'amount_pending', 'amount_refunded',
+    'amount_rejected', 'amount_chargeback', 'amount_abandoned',
+]
+# Colunas de vendas comparadas com os contadores da campanha para achar os retratos
+SALE_COLUMNS = SNAPSHOT_COLUMNS[3:]
+
+# Colunas diárias com total acumulado (cum_<coluna>)
+RUNNING_COLUMNS = [
+    'total_views', 'total_clicks', 'total_approved', 'total_pending',
+    'total_refunded', 'total_abandoned', 'total_chargeback', 'total_rejected',
+    'credit_card_total', 'pix_total', 'debit_card_total', 'boleto_total',
+    'total_ads', 'amount_approved', 'amount_pending', 'amount_refunded',
+    'amount_rejected', 'amount_chargeback', 'amount_abandoned',
+    'credit_card_amount', 'pix_amount', 'debit_card_amount', 'boleto_amount',
+]
+
+FILL_RUNNING_TOTALS = (
+    'UPDATE finances_logs SET '
+    + ', '.join(f'cum_{column} = running.cum_{column}' for column in RUNNING_COLUMNS)
+    + ' FROM (SELECT id, '
+    + ', '.join(
+        f'SUM({column}) OVER (PARTITION BY campaign_id ORDER BY date) AS cum_{column}'
+        for column in RUNNING_COLUMNS)
+    + ' FROM finances_logs) AS running WHERE finances_logs.id = running.id'
+)
+
+
+def find_snapshot_rows(rows, counters):
+    """
+    Retorna quantas linhas iniciais (em ordem de data) são retratos acumulados.
+
+    Se a soma das linhas já bate com os contadores da campanha, todas são deltas.
+    Senão, procura (do fim para o início) a última linha k em que
+    retrato[k] + soma das linhas seguintes (deltas) = contadores.
+
+    Returns:
+        int: Quantidade de retratos, ou None se nenhuma divisão bate com os
+        contadores (as linhas não são convertidas e a campanha é reportada).
+    """
+    def matches(values):
+        return all(values[column] == counters[column] for column in SALE_COLUMNS)
+
+    suffix = dict.fromkeys(SALE_COLUMNS, 0)
+    for row in rows:
+        for column in SALE_COLUMNS:
+            suffix[column] += row[column]
+    if matches(suffix):
+        return 0
+
+    suffix = dict.fromkeys(SALE_COLUMNS, 0)
+    for index in range(len(rows) - 1, -1, -1):
+        row = rows[index]
+        if matches({column: row[column] + suffix[column] for column in SALE_COLUMNS}):
+            return index + 1
+        for column in SALE_COLUMNS:
+            suffix[column] += row[column]
+    return None
+
+
+def convert_snapshots_to_deltas(apps, schema_editor):
+    """
+    Converte as linhas antigas do FinanceLogs (retratos acumulados) em deltas
+    diários: delta[dia] = retrato[dia] - retrato[dia anterior].
+
+    As campanhas cujas linhas não batem com os contadores (ou sem contadores)
+    ficam como estão e são listadas no log da migração, para serem
+    reconstruídas com `rebuild_campaign_finance --campaign <uid>`.
+    """
+    FinanceLogs = apps.get_model('campaigns', 'FinanceLogs')
+    CampaignCounters = apps.get_model('campaigns', 'CampaignCounters')
+    counters = {
+        row['campaign_id']: row
+        for row in CampaignCounters.objects.values('campaign_id', *SALE_COLUMNS)
+    }
+
+    unmatched = []
+
+    def convert(campaign_id, rows):
+        if not rows:
+            return []
+        snapshots = find_snapshot_rows(rows, counters[campaign_id]) if campaign_id in counters else None
+        if snapshots is None:
+            unmatched.append(campaign_id)
+            return []
+        changed = []
+        for index in range(snapshots - 1, 0, -1):
+            row, previous = rows[index], rows[index - 1]
+            log = FinanceLogs(id=row['id'])
+            for column in SNAPSHOT_COLUMNS:
+                setattr(log, column, row[column] - previous[column])
+            log.profit = log.amount_approved - log.total_ads
+            log.ROI = log.profit * 100 / log.total_ads if log.total_ads > 0 else Decimal('0')
+            changed.append(log)
+        return changed
+
+    changed = []
+    campaign_id, rows = None, []
+    logs = FinanceLogs.objects.order_by('campaign_id', 'date').values(
+        'id', 'campaign_id', *SNAPSHOT_COLUMNS).iterator(chunk_size=5000)
+    for row in logs:
+        if row['campaign_id'] != campaign_id:
+            changed.extend(convert(campaign_id, rows))
+            campaign_id, rows = row['campaign_id'], []
+        rows.append(row)
+    changed.extend(convert(campaign_id, rows))
+
+    FinanceLogs.objects.bulk_update(changed, SNAPSHOT_COLUMNS + ['profit', 'ROI'], batch_size=1000)
+
+    if unmatched:
+        Campaign = apps.get_model('campaigns', 'Campaign')
+        uids = [str(uid) for uid in Campaign.objects.filter(pk__in=unmatched).values_list('uid', flat=True)]
+        message = (
+            f"{len(uids)} campanha(s) com FinanceLogs que não batem com os contadores não foram "
+            f"convertidas; reconstrua com `rebuild_campaign_finance --campaign <uid>`: {', '.join(uids)}")
+        logger.warning(message)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0033_campaigncounters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_amount_abandoned',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_amount_approved',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_amount_chargeback',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_amount_pending',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_amount_refunded',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_amount_rejected',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_boleto_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_boleto_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_credit_card_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_credit_card_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_debit_card_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_debit_card_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_pix_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_pix_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_abandoned',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_ads',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_approved',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_chargeback',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_clicks',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_pending',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_refunded',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_rejected',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='financelogs',
+            name='cum_total_views',
+            field=models.BigIntegerField(default=0),
+        ),
+        # Linhas antigas (retratos) -> deltas; o inverso não é possível sem saber onde os retratos terminam
+        migrations.RunPython(convert_snapshots_to_deltas, migrations.RunPython.noop),
+        migrations.RunSQL(FILL_RUNNING_TOTALS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0035_userdailyfinance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceCompactedMonth',
+            fields=[
+                ('month', models.DateField(primary_key=True, serialize=False)),
+                ('campaigns', models.PositiveIntegerField(default=0)),
+                ('compacted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'finance_compacted_months',
+            },
+        ),
+        migrations.CreateModel(
+            name='FinanceLogsMonthly',
+            fields=[
+                ('total_views', models.IntegerField(default=0)),
+                ('total_clicks', models.IntegerField(default=0)),
+                ('total_approved', models.IntegerField(default=0)),
+                ('total_pending', models.IntegerField(default=0)),
+                ('total_refunded', models.IntegerField(default=0)),
+                ('total_abandoned', models.IntegerField(default=0)),
+                ('total_chargeback', models.IntegerField(default=0)),
+                ('total_rejected', models.IntegerField(default=0)),
+                ('amount_approved', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_pending', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_refunded', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_rejected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_chargeback', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_abandoned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_total', models.IntegerField(default=0)),
+                ('pix_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('pix_total', models.IntegerField(default=0)),
+                ('debit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('debit_card_total', models.IntegerField(default=0)),
+                ('boleto_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('boleto_total', models.IntegerField(default=0)),
+                ('total_ads', models.DecimalField(decimal_places=8, default=0, max_digits=17)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('campaign', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='finance_months', to='campaigns.campaign')),
+            ],
+            options={
+                'db_table': 'finance_logs_monthly',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='financelogsmonthly',
+            constraint=models.UniqueConstraint(fields=('campaign', 'month'), name='unique_finance_logs_month'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0036_finance_logs_monthly'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userdailyfinance',
+            index=models.Index(fields=['date'], name='user_daily_finance_date_idx'),
+        ),
+    ]
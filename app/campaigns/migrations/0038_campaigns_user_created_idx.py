@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0037_user_daily_finance_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='campaigns_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+from campaigns.search import search_document_operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0038_campaigns_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='search_document',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='campaigns_search_idx'),
+        ),
+        # A data de criação entra como texto (a busca por created_at do SearchFilter)
+        *search_document_operations(
+            'campaigns', ['title', 'description', 'method', 'created_at'],
+            ["NEW.title", "NEW.description", "NEW.method",
+             "to_char(NEW.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"]),
+    ]
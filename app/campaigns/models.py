@@ -1,9 +1,31 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from integrations.models import Integration, User
 import uuid
 from decimal import Decimal
 
 
+class CampaignCounter:
+    """
+    Expõe um contador do CampaignCounters como atributo somente leitura da
+    campanha (ex.: `campaign.total_approved`), mantendo o formato da API.
+    Use `select_related('counters')` para carregar os contadores no mesmo JOIN.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance.counters, self.name)
+        except ObjectDoesNotExist:
+            return CampaignCounters._meta.get_field(self.name).get_default()
+
+
 class Campaign(models.Model):
     id = models.AutoField(primary_key=True)
     uid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
@@ -34,6 +56,101 @@ class Campaign(models.Model):
     method = models.CharField(
         max_length=3, choices=METHOD_CHOICES, null=True, blank=True, default=None
     )
+    # Contadores (ver CampaignCounters)
+    total_approved = CampaignCounter()
+    total_pending = CampaignCounter()
+    amount_approved = CampaignCounter()
+    amount_pending = CampaignCounter()
+    total_ads = CampaignCounter()
+    profit = CampaignCounter()
+    ROI = CampaignCounter()
+    total_views = CampaignCounter()
+    total_clicks = CampaignCounter()
+    total_abandoned = CampaignCounter()
+    amount_abandoned = CampaignCounter()
+    total_canceled = CampaignCounter()
+    amount_canceled = CampaignCounter()
+    total_refunded = CampaignCounter()
+    amount_refunded = CampaignCounter()
+    total_rejected = CampaignCounter()
+    amount_rejected = CampaignCounter()
+    total_chargeback = CampaignCounter()
+    amount_chargeback = CampaignCounter()
+    credit_card_amount = CampaignCounter()
+    credit_card_total = CampaignCounter()
+    pix_amount = CampaignCounter()
+    pix_total = CampaignCounter()
+    debit_card_amount = CampaignCounter()
+    debit_card_total = CampaignCounter()
+    boleto_amount = CampaignCounter()
+    boleto_total = CampaignCounter()
+    # Quantidade de shards de contadores (0 ou 1 = sem shards, ver FinanceLogShard)
+    counter_shards = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Documento da busca das listagens, mantido por trigger (ver `campaigns.search`)
+    search_document = models.TextField(null=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    SEARCH_DOCUMENT_FIELDS = ('title', 'description', 'method', 'created_at')
+
+    class Meta:
+        db_table = 'campaigns'
+        ordering = ['-created_at']
+        indexes = [
+            # Listagem por cursor (created_at, id) das campanhas do usuário
+            models.Index(fields=['user', 'created_at', 'id'], name='campaigns_user_created_idx'),
+            GinIndex(fields=['search_vector'], name='campaigns_search_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def save(self, *args, **kwargs):
+        """
+        Atualiza o campo `in_use` das integrações associadas ao salvar a campanha.
+        """
+        if self.method == 'CPM':
+            self.CPC = None
+            self.CPV = None
+        elif self.method == 'CPC':
+            self.CPM = None
+            self.CPV = None
+        elif self.method == 'CPV':
+            self.CPM = None
+            self.CPC = None
+
+        adding = self._state.adding
+        super().save(*args, **kwargs)  # Salva a campanha primeiro
+        if adding:
+            CampaignCounters.objects.create(campaign=self)
+        # Atualiza o campo `in_use` para todas as integrações associadas
+        for integration in self.integrations.all():
+            integration.in_use = True
+            integration.save()
+
+    def delete(self, *args, **kwargs):
+        """
+        Atualiza o campo `in_use` das integrações associadas ao excluir a campanha.
+        """
+        # Atualiza o campo `in_use` para todas as integrações associadas antes de excluir
+        for integration in self.integrations.all():
+            integration.in_use = False
+            integration.save()
+        super().delete(*args, **kwargs)  # Exclui a campanha
+
+
+class CampaignCounters(models.Model):
+    """
+    Contadores acumulados da campanha, atualizados a cada venda.
+
+    Ficam fora da tabela `campaigns` (1:1) para que as atualizações frequentes
+    reescrevam apenas uma linha estreita: a tabela não tem índices além da
+    chave primária e usa fillfactor 70 (ver migração 0033), permitindo
+    atualizações HOT na mesma página.
+    """
+    campaign = models.OneToOneField(
+        Campaign, on_delete=models.CASCADE, primary_key=True, related_name='counters')
     total_approved = models.IntegerField(default=0)
     total_pending = models.IntegerField(default=0)
     amount_approved = models.DecimalField(
@@ -76,45 +193,13 @@ class Campaign(models.Model):
         max_digits=15, decimal_places=2, default=0
     )
     boleto_total = models.IntegerField(default=0)
-    created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'campaigns'
-        ordering = ['-created_at']
+        db_table = 'campaign_counters'
 
     def __str__(self):
-        return self.title
-
-    def save(self, *args, **kwargs):
-        """
-        Atualiza o campo `in_use` das integrações associadas ao salvar a campanha.
-        """
-        if self.method == 'CPM':
-            self.CPC = None
-            self.CPV = None
-        elif self.method == 'CPC':
-            self.CPM = None
-            self.CPV = None
-        elif self.method == 'CPV':
-            self.CPM = None
-            self.CPC = None
-
-        super().save(*args, **kwargs)  # Salva a campanha primeiro
-        # Atualiza o campo `in_use` para todas as integrações associadas
-        for integration in self.integrations.all():
-            integration.in_use = True
-            integration.save()
-
-    def delete(self, *args, **kwargs):
-        """
-        Atualiza o campo `in_use` das integrações associadas ao excluir a campanha.
-        """
-        # Atualiza o campo `in_use` para todas as integrações associadas antes de excluir
-        for integration in self.integrations.all():
-            integration.in_use = False
-            integration.save()
-        super().delete(*args, **kwargs)  # Exclui a campanha
+        return f"CampaignCounters for Campaign {self.campaign_id}"
 
 
 class CampaignView(models.Model):
@@ -133,13 +218,11 @@ class CampaignView(models.Model):
         return f"{self.campaign.title} - {self.action} - {self.created_at}"
 
 
-class FinanceLogs(models.Model):
-    id = models.AutoField(primary_key=True)
-    campaign = models.ForeignKey(
-        'Campaign', on_delete=models.CASCADE, related_name='finance_logs', default=0
-    )
-    profit = models.DecimalField(max_digits=15, decimal_places=5, default=0)
-    ROI = models.DecimalField(max_digits=15, decimal_places=5, default=0)
+class FinanceCounters(models.Model):
+    """
+    Contadores e valores financeiros diários, compartilhados pelo FinanceLogs
+    e pelos shards de contadores (FinanceLogShard).
+    """
     total_views = models.IntegerField(default=0)
     total_clicks = models.IntegerField(default=0)
     total_ads = models.DecimalField(max_digits=13, decimal_places=8, default=0)
@@ -173,6 +256,77 @@ class FinanceLogs(models.Model):
     boleto_amount = models.DecimalField(
         max_digits=15, decimal_places=2, default=0)
     boleto_total = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class FinanceRunningTotals(models.Model):
+    """
+    Totais acumulados (do primeiro dia até o dia da linha, inclusive) de cada
+    contador diário do FinanceLogs, mantidos a cada escrita (ver
+    `campaigns.finance_log_utils.upsert_finance_log_deltas`).
+
+    O total de um intervalo [início, fim] é `cum[fim] - cum[início - 1]`:
+    duas buscas pelo índice (campanha, data), independentemente do tamanho
+    do intervalo (ver `campaigns.aggregations.aggregate_finance_range`).
+    """
+    cum_total_views = models.BigIntegerField(default=0)
+    cum_total_clicks = models.BigIntegerField(default=0)
+    cum_total_approved = models.BigIntegerField(default=0)
+    cum_total_pending = models.BigIntegerField(default=0)
+    cum_total_refunded = models.BigIntegerField(default=0)
+    cum_total_abandoned = models.BigIntegerField(default=0)
+    cum_total_chargeback = models.BigIntegerField(default=0)
+    cum_total_rejected = models.BigIntegerField(default=0)
+    cum_credit_card_total = models.BigIntegerField(default=0)
+    cum_pix_total = models.BigIntegerField(default=0)
+    cum_debit_card_total = models.BigIntegerField(default=0)
+    cum_boleto_total = models.BigIntegerField(default=0)
+    cum_total_ads = models.DecimalField(max_digits=17, decimal_places=8, default=0)
+    cum_amount_approved = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_amount_pending = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_amount_refunded = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_amount_rejected = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_amount_chargeback = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_amount_abandoned = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_credit_card_amount = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_pix_amount = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_debit_card_amount = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+    cum_boleto_amount = models.DecimalField(
+        max_digits=17, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class FinanceRollupCounters(FinanceCounters):
+    """
+    Contadores diários somados de várias campanhas (rollups por usuário e por
+    conta Kwai). O custo de anúncios comporta a soma de várias campanhas.
+    """
+    total_ads = models.DecimalField(max_digits=17, decimal_places=8, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class FinanceLogs(FinanceCounters, FinanceRunningTotals):
+    id = models.AutoField(primary_key=True)
+    campaign = models.ForeignKey(
+        'Campaign', on_delete=models.CASCADE, related_name='finance_logs', default=0
+    )
+    profit = models.DecimalField(max_digits=15, decimal_places=5, default=0)
+    ROI = models.DecimalField(max_digits=15, decimal_places=5, default=0)
     date = models.DateField(auto_now_add=True)
 
     class Meta:
@@ -186,3 +340,98 @@ class FinanceLogs(models.Model):
 
     def __str__(self):
         return f"FinanceLogs for Campaign {self.campaign.id} on {self.date}"
+
+
+class FinanceLogShard(FinanceCounters):
+    """
+    Shard dos contadores diários de uma campanha com alto volume de vendas.
+
+    Campanhas com `counter_shards` > 1 somam cada transição em um shard
+    aleatório (sem disputar a linha da campanha); o `manage.py
+    compact_counter_shards` consolida os shards no FinanceLogs e na campanha.
+    """
+    id = models.BigAutoField(primary_key=True)
+    campaign = models.ForeignKey(
+        'Campaign', on_delete=models.CASCADE, related_name='finance_log_shards')
+    date = models.DateField()
+    shard_no = models.PositiveSmallIntegerField()
+
+    class Meta:
+        db_table = 'finance_log_shards'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campaign', 'date', 'shard_no'], name='unique_finance_log_shard'),
+        ]
+
+    def __str__(self):
+        return f"FinanceLogShard {self.shard_no} for Campaign {self.campaign_id} on {self.date}"
+
+
+class UserDailyFinance(FinanceRollupCounters):
+    """
+    Soma diária do FinanceLogs de todas as campanhas do usuário, mantida na
+    mesma transação das escritas no FinanceLogs (ver `campaigns.finance_rollups`).
+    O dashboard lê no máximo uma linha por dia, independentemente da
+    quantidade de campanhas.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='daily_finance', db_index=False)
+    date = models.DateField()
+
+    class Meta:
+        db_table = 'user_daily_finance'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_user_daily_finance'),
+        ]
+        indexes = [
+            # Soma de todos os usuários por dia (indicadores da plataforma)
+            models.Index(fields=['date'], name='user_daily_finance_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"UserDailyFinance for User {self.user_id} on {self.date}"
+
+
+class FinanceLogsMonthly(FinanceRollupCounters):
+    """
+    Soma mensal do FinanceLogs de uma campanha, gravada pela compactação dos
+    meses fechados (`manage.py compact_finance_months`) e mantida pelas
+    escritas posteriores em dias desses meses (ex.: estornos atrasados).
+
+    Consultas de intervalos longos somam os meses inteiros compactados e
+    apenas os dias das bordas (ver `campaigns.finance_months`).
+    """
+    id = models.BigAutoField(primary_key=True)
+    campaign = models.ForeignKey(
+        'Campaign', on_delete=models.CASCADE, related_name='finance_months', db_index=False)
+    # Primeiro dia do mês
+    month = models.DateField()
+    # Primeiro e último dia do mês com registro no FinanceLogs
+    first_date = models.DateField()
+    last_date = models.DateField()
+
+    class Meta:
+        db_table = 'finance_logs_monthly'
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'month'], name='unique_finance_logs_month'),
+        ]
+
+    def __str__(self):
+        return f"FinanceLogsMonthly for Campaign {self.campaign_id} on {self.month:%Y-%m}"
+
+
+class FinanceCompactedMonth(models.Model):
+    """
+    Meses fechados já compactados no FinanceLogsMonthly. Só os meses
+    registrados aqui são lidos do nível mensal; os demais são somados dia a dia.
+    """
+    month = models.DateField(primary_key=True)
+    campaigns = models.PositiveIntegerField(default=0)
+    compacted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'finance_compacted_months'
+
+    def __str__(self):
+        return f"FinanceCompactedMonth {self.month:%Y-%m}"
@@ -23,6 +23,16 @@ schemas = {
                     type=OpenApiTypes.INT,
                     location=OpenApiParameter.QUERY,
                 ),
+                OpenApiParameter(
+                    name="cursor",
+                    description=(
+                        "Paginação por cursor (created_at, id), sem `count`: envie `?cursor=` na primeira "
+                        "página e siga os links `next`/`previous`."
+                    ),
+                    required=False,
+                    type=OpenApiTypes.STR,
+                    location=OpenApiParameter.QUERY,
+                ),
                 OpenApiParameter(
                     name="ordering",
                     description=(
@@ -61,6 +71,13 @@ schemas = {
                     required=False,
                     type=OpenApiTypes.DATE,
                 ),
+                OpenApiParameter(
+                    name="granularity",
+                    description="Agrupamento dos overviews: `day` (padrão), `week` ou `month`. Períodos sem registros vêm com 0.",
+                    required=False,
+                    type=OpenApiTypes.STR,
+                    enum=["day", "week", "month"],
+                ),
             ],
             responses={
                 200: {
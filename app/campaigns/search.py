@@ -0,0 +1,186 @@
+import operator
+import re
+import threading
+from functools import reduce
+from django.contrib.postgres.search import SearchQuery
+from django.db import connections, migrations
+from django.db.models import Q
+from rest_framework import filters
+
+# Configuração de busca textual do Postgres (radicais em português); a
+# configuração `simple` complementa com as palavras inteiras e as stopwords
+SEARCH_CONFIG = 'portuguese'
+
+# Acentos removidos do documento e dos termos (a extensão unaccent não é
+# exigida: a função `search_unaccent` substitui cada letra acentuada)
+ACCENTS = {
+    'a': 'áàâãäåÁÀÂÃÄÅ',
+    'e': 'éèêëÉÈÊË',
+    'i': 'íìîïÍÌÎÏ',
+    'o': 'óòôõöÓÒÔÕÖ',
+    'u': 'úùûüÚÙÛÜ',
+    'c': 'çÇ',
+    'n': 'ñÑ',
+    'y': 'ýÿÝ',
+}
+UNACCENT_TABLE = str.maketrans({char: letter for letter, chars in ACCENTS.items() for char in chars})
+
+# As palavras do tsvector e das consultas são os trechos de letras e números
+# sem acentos: e-mails, URLs e datas viram palavras soltas nos dois lados
+SEPARATOR_SQL = '[^0-9A-Za-z]+'
+SEPARATOR_RE = re.compile(SEPARATOR_SQL)
+
+
+def unaccent_sql(expression):
+    """
+    Expressão SQL que remove os acentos (por alternância, e não por
+    `translate`, para valer também em bancos SQL_ASCII).
+    """
+    for letter, chars in ACCENTS.items():
+        expression = f"regexp_replace({expression}, '{'|'.join(chars)}', '{letter}', 'g')"
+    return f"lower({expression})"
+
+
+UNACCENT_FUNCTION_SQL = f"""
+    CREATE OR REPLACE FUNCTION search_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT {unaccent_sql('$1')} $$
+"""
+
+
+def unaccent(text):
+    """
+    Equivalente em Python da função `search_unaccent` do banco.
+    """
+    return text.translate(UNACCENT_TABLE).lower()
+
+
+def search_document_operations(table, columns, expressions=None):
+    """
+    Operações de migração que mantêm o documento de busca de uma tabela.
+
+    Um trigger grava em `search_document` o texto das colunas sem acentos e
+    em `search_vector` o tsvector das palavras dele (GIN, indexado pelo
+    model) a cada INSERT e a cada UPDATE das colunas; as linhas existentes
+    são preenchidas na migração. Com a extensão pg_trgm disponível, o documento também ganha
+    um índice de trigramas (`<tabela>_search_trgm_idx`) para as buscas por
+    trechos de palavras.
+
+    Args:
+        table (str): Nome da tabela.
+        columns (list): Colunas de texto do documento (disparam o trigger).
+        expressions (list): Opcional; expressões SQL sobre `NEW` no lugar das
+            colunas (ex.: datas formatadas).
+    """
+    expressions = expressions or [f"NEW.{column}" for column in columns]
+    document = f"search_unaccent(concat_ws(' ', {', '.join(expressions)}))"
+    trigger_sql = f"""
+        CREATE OR REPLACE FUNCTION {table}_search_document() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            words text;
+        BEGIN
+            NEW.search_document := {document};
+            words := regexp_replace(NEW.search_document, '{SEPARATOR_SQL}', ' ', 'g');
+            NEW.search_vector := to_tsvector('{SEARCH_CONFIG}', words) || to_tsvector('simple', words);
+            RETURN NEW;
+        END
+        $$;
+        CREATE TRIGGER {table}_search_document
+            BEFORE INSERT OR UPDATE OF {', '.join(columns)}, search_document ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_document();
+        UPDATE {table} SET search_document = NULL;
+    """
+    trigram_sql = f"""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                EXECUTE 'CREATE INDEX IF NOT EXISTS {table}_search_trgm_idx '
+                    'ON {table} USING gin (search_document gin_trgm_ops)';
+            END IF;
+        EXCEPTION WHEN insufficient_privilege THEN
+            RAISE NOTICE 'pg_trgm indisponível: busca de {table} sem trigramas.';
+        END
+        $$;
+    """
+    return [
+        migrations.RunSQL(UNACCENT_FUNCTION_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(
+            trigger_sql,
+            reverse_sql=f"""
+                DROP TRIGGER IF EXISTS {table}_search_document ON {table};
+                DROP FUNCTION IF EXISTS {table}_search_document();
+            """,
+        ),
+        migrations.RunSQL(trigram_sql, reverse_sql=f"DROP INDEX IF EXISTS {table}_search_trgm_idx"),
+    ]
+
+
+_trigram_lock = threading.Lock()
+_trigram_enabled = {}
+
+
+def trigram_enabled(using):
+    """
+    Indica se a extensão pg_trgm está instalada no banco (consultado uma vez
+    por processo).
+    """
+    if using not in _trigram_enabled:
+        with _trigram_lock, connections[using].cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram_enabled[using] = cursor.fetchone()[0]
+    return _trigram_enabled[using]
+
+
+def search_words(term):
+    """
+    Retorna as palavras do termo, separadas por espaço ('' se não houver).
+    """
+    return SEPARATOR_RE.sub(' ', unaccent(term)).strip()
+
+
+def search_query(term):
+    """
+    Retorna a consulta (tsquery) de um termo: as palavras em sequência, a
+    última como prefixo, com e sem os radicais em português.
+    """
+    value = f"'{search_words(term)}':*"
+    return (SearchQuery(value, config=SEARCH_CONFIG, search_type='raw')
+            | SearchQuery(value, config='simple', search_type='raw'))
+
+
+class DocumentSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter que busca no documento indexado do model (`search_vector`,
+    ver `search_document_operations`) em vez de um ILIKE por campo.
+
+    Usado quando todos os `search_fields` da view estão no documento do model
+    (`SEARCH_DOCUMENT_FIELDS`) e o banco é Postgres; nos demais casos (ou com
+    termos sem letras e números) a busca padrão do DRF é mantida. Cada termo
+    precisa aparecer no documento, como no SearchFilter: como prefixo de uma
+    palavra (sem acentos e com os radicais em português) ou, com a extensão
+    pg_trgm, como trecho do texto.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+        if not self.uses_document(queryset, search_fields) or not all(map(search_words, search_terms)):
+            return super().filter_queryset(request, queryset, view)
+
+        trigram = trigram_enabled(queryset.db)
+        conditions = []
+        for term in search_terms:
+            condition = Q(search_vector=search_query(term))
+            if trigram:
+                condition |= Q(search_document__contains=unaccent(term))
+            conditions.append(condition)
+        return queryset.filter(reduce(operator.and_, conditions))
+
+    def uses_document(self, queryset, search_fields):
+        document_fields = getattr(queryset.model, 'SEARCH_DOCUMENT_FIELDS', ())
+        return (connections[queryset.db].vendor == 'postgresql'
+                and all(field in document_fields for field in search_fields))
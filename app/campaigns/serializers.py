@@ -1,10 +1,9 @@
 from rest_framework import serializers
 from .models import Campaign, CampaignView, Integration
+from .aggregations import aggregate_finance_range, build_overviews, get_date_range, get_granularity
+from .finance_months import overview_tiers
 from payments.models import UserSubscription
 import logging
-from django.db.models import Sum
-from datetime import datetime, timedelta
-from django.utils import timezone
 from django.utils.html import strip_tags
 import html
 
@@ -27,6 +26,9 @@ class CampaignSerializer(serializers.ModelSerializer):
         required=True,
         error_messages={'required': 'Este campo é obrigatório.'}
     )
+    # Contadores do CampaignCounters não recalculados por período (ver to_representation)
+    total_canceled = serializers.IntegerField(read_only=True)
+    amount_canceled = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
     # Campo personalizado para estatísticas
     stats = serializers.SerializerMethodField()
     overviews = serializers.SerializerMethodField()
@@ -113,27 +115,27 @@ class CampaignSerializer(serializers.ModelSerializer):
         return value
 
     def get_stats(self, obj):
+        return self.get_finance_totals(obj)['stats']
 
-        stats = obj.finance_logs.aggregate(
-            credit_card_amount=Sum('credit_card_amount'),
-            debit_card_amount=Sum('debit_card_amount'),
-            pix_amount=Sum('pix_amount'),
-            boleto_amount=Sum('boleto_amount')
-        )
-
-        return {
-            "CREDIT_CARD": stats.get('credit_card_amount', 0) or 0,
-            "DEBIT_CARD": stats.get('debit_card_amount', 0) or 0,
-            "PIX": stats.get('pix_amount', 0) or 0,
-            "BOLETO": stats.get('boleto_amount', 0) or 0,
-        }
-
-    def get_filtered_finance_logs(self, obj):
+    def get_finance_totals(self, obj):
+        """
+        Retorna os totais do FinanceLogs da campanha no intervalo da request.
+        A agregação é feita uma única vez por campanha e reaproveitada
+        por `get_stats` e `to_representation`; na listagem, os totais da
+        página inteira já chegam pré-calculados no contexto.
+        """
+        finance_totals = self.context.setdefault('finance_totals', {})
+        if obj.pk not in finance_totals:
+            start_date, end_date = self.get_date_range()
+            finance_totals[obj.pk] = aggregate_finance_range(
+                Campaign.objects.filter(pk=obj.pk), start_date, end_date, self.get_filtered_shards(obj))
+        return finance_totals[obj.pk]
+
+    def get_date_range(self):
         """
-        Retorna os FinanceLogs filtrados pelo intervalo de datas da request.
+        Retorna o intervalo de datas informado via query params (?start=YYYY-MM-DD&end=YYYY-MM-DD).
         """
         request = self.context.get('request')
-        today = timezone.now().date()
         start_date = None
         end_date = None
 
@@ -142,139 +144,80 @@ class CampaignSerializer(serializers.ModelSerializer):
             end_date = request.query_params.get('end', None)
 
         try:
-            if not start_date and not end_date:
-                end_date = today
-                start_date = end_date - timedelta(days=30)
-            elif start_date and not end_date:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = start_date + timedelta(days=1)
-            elif start_date and end_date:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            return get_date_range(start_date, end_date)
         except ValueError:
             raise serializers.ValidationError(
                 {"detail": "Os parâmetros de data devem estar no formato YYYY-MM-DD."})
 
-        return obj.finance_logs.filter(date__gte=start_date, date__lte=end_date)
+    def get_granularity(self):
+        """
+        Retorna o agrupamento dos overviews informado via query params (?granularity=day|week|month).
+        """
+        request = self.context.get('request')
+        try:
+            return get_granularity(request.query_params.get('granularity') if request else None)
+        except ValueError:
+            raise serializers.ValidationError(
+                {"detail": "O parâmetro granularity deve ser day, week ou month."})
+
+    def get_filtered_shards(self, obj):
+        """
+        Retorna os shards de contadores ainda não consolidados no intervalo de
+        datas da request, ou None se a campanha não usa shards.
+        """
+        if obj.counter_shards <= 1:
+            return None
+        start_date, end_date = self.get_date_range()
+        return obj.finance_log_shards.filter(date__gte=start_date, date__lte=end_date)
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        finance_logs = self.get_filtered_finance_logs(instance)
+        totals = self.get_finance_totals(instance)
 
         # Agregações filtradas
-        data['total_approved'] = finance_logs.aggregate(
-            total=Sum('total_approved'))['total'] or 0
-        data['total_pending'] = finance_logs.aggregate(
-            total=Sum('total_pending'))['total'] or 0
-        data['amount_approved'] = str(finance_logs.aggregate(
-            total=Sum('amount_approved'))['total'] or 0)
-        data['amount_pending'] = str(finance_logs.aggregate(
-            total=Sum('amount_pending'))['total'] or 0)
-        data['total_abandoned'] = finance_logs.aggregate(
-            total=Sum('total_abandoned'))['total'] or 0
-        data['amount_abandoned'] = str(finance_logs.aggregate(
-            total=Sum('amount_abandoned'))['total'] or 0)
-        # data['total_canceled'] = finance_logs.aggregate(total=Sum('total_canceled'))['total'] or 0
-        # data['amount_canceled'] = str(finance_logs.aggregate(total=Sum('amount_canceled'))['total'] or 0)
-        data['total_refunded'] = finance_logs.aggregate(
-            total=Sum('total_refunded'))['total'] or 0
-        data['amount_refunded'] = str(finance_logs.aggregate(
-            total=Sum('amount_refunded'))['total'] or 0)
-        data['total_rejected'] = finance_logs.aggregate(
-            total=Sum('total_rejected'))['total'] or 0
-        data['amount_rejected'] = str(finance_logs.aggregate(
-            total=Sum('amount_rejected'))['total'] or 0)
-        data['total_chargeback'] = finance_logs.aggregate(
-            total=Sum('total_chargeback'))['total'] or 0
-        data['amount_chargeback'] = str(finance_logs.aggregate(
-            total=Sum('amount_chargeback'))['total'] or 0)
-        data['total_ads'] = str(finance_logs.aggregate(
-            total=Sum('total_ads'))['total'] or 0)
-        data['total_views'] = finance_logs.aggregate(
-            total=Sum('total_views'))['total'] or 0
-        data['total_clicks'] = finance_logs.aggregate(
-            total=Sum('total_clicks'))['total'] or 0
-
-        # Calcula profit e ROI filtrados
-        amount_approved = finance_logs.aggregate(
-            total=Sum('amount_approved'))['total'] or 0
-        total_ads = finance_logs.aggregate(
-            total=Sum('total_ads'))['total'] or 0
-        profit = float(amount_approved) - float(total_ads)
-        data['profit'] = f"{profit:.5f}"
-        data['ROI'] = f"{(profit / float(total_ads) * 100) if total_ads else 0:.5f}"
+        data['total_approved'] = totals['total_approved']
+        data['total_pending'] = totals['total_pending']
+        data['amount_approved'] = str(totals['amount_approved'])
+        data['amount_pending'] = str(totals['amount_pending'])
+        data['total_abandoned'] = totals['total_abandoned']
+        data['amount_abandoned'] = str(totals['amount_abandoned'])
+        data['total_refunded'] = totals['total_refunded']
+        data['amount_refunded'] = str(totals['amount_refunded'])
+        data['total_rejected'] = totals['total_rejected']
+        data['amount_rejected'] = str(totals['amount_rejected'])
+        data['total_chargeback'] = totals['total_chargeback']
+        data['amount_chargeback'] = str(totals['amount_chargeback'])
+        data['total_ads'] = str(totals['total_ads'])
+        data['total_views'] = totals['total_views']
+        data['total_clicks'] = totals['total_clicks']
+
+        # Profit e ROI filtrados
+        data['profit'] = f"{totals['profit']:.5f}"
+        data['ROI'] = f"{totals['ROI']:.5f}"
 
         # Stats filtrados
-        data['stats'] = {
-            "CREDIT_CARD": finance_logs.aggregate(total=Sum('credit_card_amount'))['total'] or 0,
-            "DEBIT_CARD": finance_logs.aggregate(total=Sum('debit_card_amount'))['total'] or 0,
-            "PIX": finance_logs.aggregate(total=Sum('pix_amount'))['total'] or 0,
-            "BOLETO": finance_logs.aggregate(total=Sum('boleto_amount'))['total'] or 0,
-        }
+        data['stats'] = totals['stats']
 
         return data
 
     def get_overviews(self, obj):
         """
         Obtém os dados de despesas (EXPENSE) e receitas (REVENUE) diretamente da tabela FinanceLogs,
-        filtrando pelo intervalo de datas informado via query params (?start=YYYY-MM-DD&end=YYYY-MM-DD).
-        """
-        request = self.context.get('request')
-        today = timezone.now().date()
-        start_date = None
-        end_date = None
+        filtrando pelo intervalo de datas informado via query params (?start=YYYY-MM-DD&end=YYYY-MM-DD)
+        e agrupando por dia, semana ou mês (?granularity=day|week|month).
 
-        if request:
-            start_date = request.query_params.get('start', None)
-            end_date = request.query_params.get('end', None)
+        Na listagem, os overviews da página inteira já chegam pré-calculados no contexto.
+        """
+        finance_overviews = self.context.get('finance_overviews')
+        if finance_overviews is not None and obj.pk in finance_overviews:
+            return finance_overviews[obj.pk]
 
-        try:
-            if not start_date and not end_date:
-                end_date = today
-                start_date = end_date - timedelta(days=30)
-            elif start_date and not end_date:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = start_date + timedelta(days=1)
-            elif start_date and end_date:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            raise serializers.ValidationError(
-                {"detail": "Os parâmetros de data devem estar no formato YYYY-MM-DD."})
+        start_date, end_date = self.get_date_range()
+        rows = overview_tiers(
+            obj.finance_logs.all(), obj.finance_months.all(), start_date, end_date,
+            self.get_granularity(), self.get_filtered_shards(obj))
 
-        # Obtém os registros de FinanceLogs associados à campanha no intervalo filtrado
-        finance_logs = obj.finance_logs.filter(
-            date__gte=start_date, date__lte=end_date)
-
-        # Inicializa a lista de overviews
-        overviews = []
-
-        # Adiciona as despesas (EXPENSE) ao overview
-        expenses = finance_logs.values('date').annotate(
-            total_expense=Sum('total_ads'))
-        for expense in expenses:
-            if 'total_expense' in expense and 'date' in expense:
-                overviews.append({
-                    "type": "EXPENSE",
-                    "value": expense['total_expense'],
-                    "date": expense['date']
-                })
-
-        # Adiciona as receitas (REVENUE) ao overview
-        revenues = finance_logs.values('date').annotate(
-            total_revenue=Sum('amount_approved'))
-        for revenue in revenues:
-            if 'total_revenue' in revenue and 'date' in revenue:
-                overviews.append({
-                    "type": "REVENUE",
-                    "value": revenue['total_revenue'],
-                    "date": revenue['date']
-                })
-
-        # Ordena os resultados por data
-        overviews.sort(key=lambda x: x['date'])
-
-        return overviews
+        return build_overviews(rows)
 
     def validate_title(self, value):
         try:
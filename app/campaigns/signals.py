@@ -0,0 +1,41 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from integrations.models import Integration
+from .models import Campaign, FinanceCompactedMonth
+from .dashboard_cache import invalidate_dashboards
+from .finance_months import COMPACTED_MONTHS_TAG
+from .finance_rollups import lock_campaign_counters, shift_finance_rollups
+from .invalidation_bus import bus
+
+# Meses compactados (manage.py compact_finance_months) passam a ser lidos do nível mensal
+bus.tag_models(COMPACTED_MONTHS_TAG, FinanceCompactedMonth)
+
+
+@receiver(pre_delete, sender=Campaign)
+def campaign_finance_removed(sender, instance, **kwargs):
+    """
+    Campanhas excluídas do banco (o FinanceLogs é excluído em cascata) saem
+    dos rollups diários do usuário e das contas Kwai vinculadas.
+    """
+    lock_campaign_counters([instance.pk])
+    shift_finance_rollups([instance.pk], -1)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+@receiver(post_save, sender=Integration)
+@receiver(post_delete, sender=Integration)
+def campaign_dashboards_changed(sender, instance, **kwargs):
+    """
+    Campanhas e integrações alteradas mudam os dashboards em cache do dono.
+    """
+    invalidate_dashboards(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Campaign.integrations.through)
+def campaign_integrations_dashboards_changed(sender, instance, action, **kwargs):
+    """
+    Vínculos entre campanhas e integrações alterados mudam o detalhe da campanha em cache.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_dashboards(instance.user_id)
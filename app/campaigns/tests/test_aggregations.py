@@ -0,0 +1,198 @@
+from decimal import Decimal
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign, FinanceLogs
+from campaigns.aggregations import aggregate_finance_logs, get_date_range
+from campaigns.finance_log_utils import refresh_finance_log_running_totals
+from campaigns.finance_rollups import rebuild_finance_rollups
+from campaigns.serializers import CampaignSerializer
+from custom_admin.platform_kpis import refresh_platform_kpis
+from custom_admin.views import AdminDashboardViewSet
+from integrations.models import Integration
+from kwai.services import get_financial_data
+
+User = get_user_model()
+
+
+def finance_log_queries(captured):
+    """Retorna apenas as consultas executadas na tabela finances_logs."""
+    return [q['sql'] for q in captured.captured_queries if 'finances_logs' in q['sql']]
+
+
+class TestFinanceLogsAggregation(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+
+        today = timezone.localdate()
+        # Cria 10 dias de registros para a campanha
+        for days_ago in range(9, -1, -1):
+            log = FinanceLogs.objects.create(
+                campaign=self.campaign,
+                total_views=10,
+                total_clicks=2,
+                total_ads=Decimal('5.00000000'),
+                total_approved=1,
+                amount_approved=Decimal('20.00'),
+                total_pending=1,
+                amount_pending=Decimal('7.50'),
+                pix_total=1,
+                pix_amount=Decimal('20.00'),
+            )
+            FinanceLogs.objects.filter(pk=log.pk).update(
+                date=today - timedelta(days=days_ago))
+        # Os registros criados direto no banco não passam pelo upsert que mantém os acumulados e rollups
+        refresh_finance_log_running_totals(self.campaign.pk)
+        rebuild_finance_rollups(user_ids=[self.user.pk])
+
+    def test_aggregate_single_query(self):
+        """
+        Testa se todos os totais são calculados em uma única consulta.
+        """
+        with self.assertNumQueries(1):
+            totals = aggregate_finance_logs(self.campaign.finance_logs.all())
+
+        self.assertEqual(totals['total_views'], 100)
+        self.assertEqual(totals['total_clicks'], 20)
+        self.assertEqual(totals['total_approved'], 10)
+        self.assertEqual(totals['amount_approved'], Decimal('200.00'))
+        self.assertEqual(totals['amount_pending'], Decimal('75.00'))
+        self.assertEqual(totals['total_ads'], Decimal('50'))
+        self.assertEqual(totals['profit'], Decimal('150'))
+        self.assertEqual(totals['ROI'], Decimal('300'))
+        self.assertEqual(totals['stats']['PIX'], Decimal('200.00'))
+        self.assertEqual(totals['stats']['BOLETO'], 0)
+        self.assertEqual(totals['first_date'],
+                         timezone.localdate() - timedelta(days=9))
+        self.assertEqual(totals['last_date'], timezone.localdate())
+
+    def test_aggregate_empty_queryset(self):
+        """
+        Testa a agregação de um queryset vazio (valores zerados, sem ROI).
+        """
+        totals = aggregate_finance_logs(FinanceLogs.objects.none())
+        self.assertEqual(totals['total_approved'], 0)
+        self.assertEqual(totals['profit'], 0)
+        self.assertEqual(totals['ROI'], 0)
+        self.assertIsNone(totals['first_date'])
+
+    def test_campaign_serializer_single_aggregate(self):
+        """
+        Testa se o serializer de campanha faz uma única agregação de totais por campanha.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            data = CampaignSerializer(self.campaign).data
+
+        aggregates = [sql for sql in finance_log_queries(captured)
+                      if 'GROUP BY' not in sql]
+        self.assertEqual(len(aggregates), 1)
+        self.assertEqual(data['total_approved'], 10)
+        self.assertEqual(data['amount_approved'], '200.00')
+        self.assertEqual(data['profit'], '150.00000')
+        self.assertEqual(data['ROI'], '300.00000')
+        self.assertEqual(data['stats']['PIX'], Decimal('200.00'))
+
+    def test_kwai_financial_data_query_count(self):
+        """
+        Testa a quantidade de consultas do get_financial_data (agregação e overviews,
+        dos rollups diários e dos shards).
+        """
+        with self.assertNumQueries(4):
+            data = get_financial_data(user=self.user)
+
+        self.assertEqual(data['total_approved'], 10)
+        self.assertEqual(data['profit'], Decimal('150'))
+        self.assertEqual(data['stats']['PIX'], Decimal('200.00'))
+        self.assertEqual(data['updated_at'], timezone.localdate())
+
+    def test_admin_finance_stats_single_query(self):
+        """
+        Testa se as estatísticas financeiras do dashboard admin usam uma única consulta.
+        """
+        today = timezone.localdate()
+        refresh_platform_kpis(today - timedelta(days=9), today)
+        with self.assertNumQueries(1):
+            stats = AdminDashboardViewSet().get_finance_stats(today - timedelta(days=9), today)
+
+        self.assertEqual(stats['total_pending'], 10)
+        self.assertEqual(stats['amount_approved'], Decimal('200.00'))
+        self.assertEqual(stats['profit'], Decimal('150'))
+        self.assertEqual(stats['stats']['PIX'], Decimal('200.00'))
+
+
+class TestCampaignListBatchedRollup(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse("campaign-list")
+
+    def create_campaigns(self, quantity):
+        """Cria campanhas com uma integração e dois dias de FinanceLogs cada."""
+        today = timezone.localdate()
+        for index in range(quantity):
+            integration = Integration.objects.create(
+                user=self.user, name=f"Integração {index}", gateway="zeroone")
+            campaign = Campaign.objects.create(
+                user=self.user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            campaign.integrations.set([integration])
+            for days_ago in (1, 0):
+                log = FinanceLogs.objects.create(
+                    campaign=campaign,
+                    total_ads=Decimal('2.00000000'),
+                    total_approved=1,
+                    amount_approved=Decimal('10.00'),
+                )
+                FinanceLogs.objects.filter(pk=log.pk).update(
+                    date=today - timedelta(days=days_ago))
+            refresh_finance_log_running_totals(campaign.pk)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.list_url, {"page_size": 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(captured.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        """
+        Testa se a listagem de campanhas executa um número constante de consultas,
+        independente da quantidade de campanhas na página.
+        """
+        self.create_campaigns(2)
+        _, small_page_queries = self.count_list_queries()
+
+        self.create_campaigns(6)
+        response, large_page_queries = self.count_list_queries()
+
+        self.assertEqual(response.data["count"], 8)
+        self.assertEqual(small_page_queries, large_page_queries)
+
+    def test_list_uses_precomputed_totals(self):
+        """
+        Testa se os totais e overviews pré-calculados da página estão corretos.
+        """
+        self.create_campaigns(3)
+        response, _ = self.count_list_queries()
+        start, end = get_date_range()
+
+        for result in response.data["results"]:
+            self.assertEqual(result["total_approved"], 2)
+            self.assertEqual(result["amount_approved"], "20.00")
+            self.assertEqual(result["profit"], "16.00000")
+            # Um par (EXPENSE, REVENUE) por dia do intervalo padrão, com 0 nos dias sem registros
+            self.assertEqual(len(result["overviews"]), 2 * ((end - start).days + 1))
+            self.assertEqual(result["overviews"][0]["type"], "EXPENSE")
+            self.assertEqual(result["overviews"][0]["value"], 0)
+            self.assertEqual(result["overviews"][-1]["type"], "REVENUE")
+            self.assertEqual(result["overviews"][-1]["value"], Decimal('10.00'))
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from django.test import SimpleTestCase
+from campaigns.cache_backend import SharedMemoryCache
+
+
+def increment_counter(location, times):
+    cache = SharedMemoryCache(location, {'OPTIONS': {'SIZE_MB': 1}})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+def write_keys(location, prefix, count):
+    cache = SharedMemoryCache(location, {'OPTIONS': {'SIZE_MB': 1}})
+    for index in range(count):
+        cache.set(f"{prefix}:{index}", {'index': index, 'pid': os.getpid()}, None)
+
+
+class TestSharedMemoryCache(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.bin')
+        self.cache = SharedMemoryCache(self.location, {'OPTIONS': {'SIZE_MB': 1}})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_api(self):
+        """
+        Testa as operações do backend (get, set, add, incr, touch, delete, expiração).
+        """
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.assertEqual(self.cache.get_many(['key', 'other', 'missing']), {'key': {'value': 1}, 'other': 2})
+
+        self.assertEqual(self.cache.incr('other', 5), 7)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+        self.cache.set('short', 1, 0.2)
+        self.assertTrue(self.cache.touch('key', None))
+        time.sleep(0.3)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 2))
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+
+        self.cache.set('zero', 1, 0)
+        self.assertFalse(self.cache.has_key('zero'))
+        self.assertTrue(self.cache.delete('key'))
+        self.assertFalse(self.cache.delete('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+        # Itens maiores que a maior classe do slab não são guardados
+        self.cache.set('other', 'x' * (2 << 20))
+        self.assertIsNone(self.cache.get('other'))
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('short'))
+
+    def test_clock_keeps_recently_read_items(self):
+        """
+        Testa se, com a classe cheia, o CLOCK despeja os itens não lidos e
+        mantém os lidos entre as escritas.
+        """
+        cache = SharedMemoryCache(
+            os.path.join(self.directory.name, 'small.bin'), {'OPTIONS': {'SIZE_MB': 1, 'SLAB_SIZES': [4096]}})
+        slots = cache.segment.stats()[4096][1]
+
+        for index in range(slots):
+            cache.set(f"key:{index}", index)
+        for index in range(2 * slots):
+            for hot in range(10):
+                self.assertEqual(cache.get(f"key:{hot}"), hot)
+            cache.set(f"new:{index}", index)
+
+        self.assertEqual(cache.segment.stats()[4096], (slots, slots))
+        self.assertEqual([cache.get(f"key:{hot}") for hot in range(10)], list(range(10)))
+        self.assertIsNone(cache.get(f"key:{slots - 1}"))
+        self.assertEqual(cache.get(f"new:{2 * slots - 1}"), 2 * slots - 1)
+
+    def test_index_survives_churn(self):
+        """
+        Testa se muitas inclusões e exclusões (lápides no índice) mantêm as buscas corretas.
+        """
+        # Apenas 10 chaves por rodada continuam no cache: os slots liberados são reutilizados
+        for round_no in range(25):
+            for index in range(300):
+                self.cache.set(f"churn:{round_no}:{index}", index)
+            for index in range(10, 300):
+                self.cache.delete(f"churn:{round_no}:{index}")
+        self.assertIsNone(self.cache.get('churn:24:10'))
+        for round_no in range(25):
+            self.assertEqual([self.cache.get(f"churn:{round_no}:{index}") for index in range(10)], list(range(10)))
+
+    def test_reads_without_lock_are_consistent(self):
+        """
+        Testa se as leituras sem trava nunca veem um item escrito pela metade
+        enquanto outra thread reescreve a chave.
+        """
+        self.cache.set('pair', (0, '0' * 2000))
+        done = threading.Event()
+        torn = []
+
+        def writer():
+            for index in range(3000):
+                self.cache.set('pair', (index, str(index % 10) * (2000 + index % 500)))
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        while not done.is_set():
+            index, text = self.cache.get('pair')
+            if text != str(index % 10) * (2000 + index % 500):
+                torn.append(index)
+        thread.join()
+        self.assertEqual(torn, [])
+
+    def test_processes_share_the_segment(self):
+        """
+        Testa se dois processos enxergam as escritas um do outro e se o incr
+        é atômico entre processos.
+        """
+        self.cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment_counter, args=(self.location, 300)),
+            context.Process(target=increment_counter, args=(self.location, 300)),
+            context.Process(target=write_keys, args=(self.location, 'child', 50)),
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(self.cache.get('counter'), 600)
+        self.assertEqual(self.cache.get('child:49')['index'], 49)
+        self.assertNotEqual(self.cache.get('child:49')['pid'], os.getpid())
@@ -0,0 +1,95 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign, CampaignCounters
+from campaigns.finance_log_utils import update_finance_logs
+
+User = get_user_model()
+
+
+class TestCampaignCounters(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+
+    def test_counters_created_with_campaign(self):
+        """
+        Testa se a linha de contadores é criada junto com a campanha.
+        """
+        counters = CampaignCounters.objects.get(campaign=self.campaign)
+        self.assertEqual(counters.total_approved, 0)
+        self.assertEqual(self.campaign.total_approved, 0)
+        self.assertEqual(self.campaign.profit, 0)
+
+    def test_sale_updates_only_counters_table(self):
+        """
+        Testa se a venda atualiza apenas a tabela estreita de contadores, sem tocar em `campaigns`.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            update_finance_logs(self.campaign, status='APPROVED', amount=Decimal('25.00'), payment_method='PIX')
+
+        statements = [q['sql'] for q in captured.captured_queries]
+        self.assertFalse([sql for sql in statements if sql.startswith('UPDATE "campaigns"')])
+        self.assertEqual(len([sql for sql in statements if sql.startswith('UPDATE "campaign_counters"')]), 1)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.amount_approved, Decimal('25.00'))
+        self.assertEqual(self.campaign.pix_amount, Decimal('25.00'))
+
+    def test_campaign_save_keeps_counters(self):
+        """
+        Testa se salvar a configuração da campanha não reescreve os contadores.
+        """
+        update_finance_logs(self.campaign, status='APPROVED', amount=Decimal('25.00'))
+        campaign = Campaign.objects.get(pk=self.campaign.pk)
+        campaign.title = "Novo título"
+        campaign.save()
+
+        counters = CampaignCounters.objects.get(campaign=self.campaign)
+        self.assertEqual(counters.total_approved, 1)
+
+    def test_counters_table_fillfactor(self):
+        """
+        Testa se a tabela de contadores tem fillfactor reduzido e apenas o índice da chave primária.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reloptions FROM pg_class WHERE relname = 'campaign_counters'")
+            self.assertIn('fillfactor=70', cursor.fetchone()[0])
+            cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename = 'campaign_counters'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class TestCampaignCountersApi(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+
+    def test_detail_loads_counters_with_join(self):
+        """
+        Testa se o detalhe da campanha carrega os contadores no mesmo SELECT da campanha (JOIN).
+        """
+        update_finance_logs(self.campaign, status='CANCELED', amount=Decimal('12.00'))
+        url = reverse("campaign-detail", kwargs={"uid": self.campaign.uid})
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_canceled"], 1)
+        self.assertEqual(response.data["amount_canceled"], "12.00")
+        counters_queries = [q['sql'] for q in captured.captured_queries if 'campaign_counters' in q['sql']]
+        self.assertEqual(len(counters_queries), 1)
+        self.assertIn('JOIN "campaign_counters"', counters_queries[0])
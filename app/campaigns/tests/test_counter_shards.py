@@ -0,0 +1,210 @@
+import threading
+from io import StringIO
+from decimal import Decimal
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign, FinanceLogs, FinanceLogShard
+from campaigns.finance_log_utils import (
+    apply_status_transition, compact_finance_log_shards, refresh_finance_log_running_totals, update_finance_logs,
+)
+from campaigns.finance_rollups import rebuild_finance_rollups
+from campaigns.serializers import CampaignSerializer
+from kwai.services import get_financial_data
+
+User = get_user_model()
+
+
+class TestCounterShards(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'),
+            counter_shards=4)
+
+    def approve_sales(self, quantity, amount=Decimal('10.00')):
+        for _ in range(quantity):
+            update_finance_logs(self.campaign, status='APPROVED', amount=amount, payment_method='PIX')
+
+    def test_sharded_transition_single_statement(self):
+        """
+        Testa se a transição de uma campanha com shards grava apenas no shard,
+        sem alterar a campanha nem o FinanceLogs.
+        """
+        with self.assertNumQueries(1):
+            apply_status_transition(
+                self.campaign.pk, status='APPROVED', amount=Decimal('10.00'), shards=4)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 0)
+        self.assertFalse(FinanceLogs.objects.filter(campaign=self.campaign).exists())
+
+        shard = FinanceLogShard.objects.get(campaign=self.campaign)
+        self.assertLess(shard.shard_no, 4)
+        self.assertEqual(shard.date, timezone.localdate())
+        self.assertEqual(shard.total_approved, 1)
+        self.assertEqual(shard.amount_approved, Decimal('10.00'))
+
+    def test_unsharded_fields_go_to_campaign(self):
+        """
+        Testa se os campos que não existem nos shards (cancelados) são aplicados na campanha.
+        """
+        update_finance_logs(self.campaign, status='CANCELED', amount=Decimal('5.00'))
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_canceled, 1)
+        self.assertFalse(FinanceLogShard.objects.filter(campaign=self.campaign).exists())
+
+    def test_readers_sum_shards(self):
+        """
+        Testa se o serializer da campanha e os dashboards somam os shards ainda não consolidados.
+        """
+        FinanceLogs.objects.create(
+            campaign=self.campaign, total_approved=2, amount_approved=Decimal('20.00'),
+            total_ads=Decimal('5.00000000'))
+        refresh_finance_log_running_totals(self.campaign.pk)
+        rebuild_finance_rollups(user_ids=[self.user.pk])
+        self.approve_sales(3)
+
+        data = CampaignSerializer(self.campaign).data
+        self.assertEqual(data['total_approved'], 5)
+        self.assertEqual(data['amount_approved'], '50.00')
+        self.assertEqual(data['profit'], '45.00000')
+        self.assertEqual(data['stats']['PIX'], Decimal('30.00'))
+        self.assertEqual(data['overviews'][-1], {
+            "type": "REVENUE", "value": Decimal('50.00'), "date": timezone.localdate()})
+
+        financial_data = get_financial_data(user=self.user)
+        self.assertEqual(financial_data['total_approved'], 5)
+        self.assertEqual(financial_data['amount_approved'], Decimal('50.00'))
+
+    def test_compaction_folds_shards(self):
+        """
+        Testa se a compactação soma os shards no FinanceLogs e na campanha e os remove.
+        """
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.approve_sales(6)
+        apply_status_transition(
+            self.campaign.pk, status='APPROVED', amount=Decimal('7.00'), date=yesterday, shards=4)
+
+        rows = compact_finance_log_shards()
+
+        self.assertEqual(rows, 2)
+        self.assertFalse(FinanceLogShard.objects.exists())
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 7)
+        self.assertEqual(self.campaign.amount_approved, Decimal('67.00'))
+        self.assertEqual(self.campaign.profit, Decimal('67.00'))
+
+        today_log = FinanceLogs.objects.get(campaign=self.campaign, date=timezone.localdate())
+        self.assertEqual(today_log.total_approved, 6)
+        self.assertEqual(today_log.pix_amount, Decimal('60.00'))
+        self.assertEqual(today_log.profit, Decimal('60.00'))
+        self.assertEqual(
+            FinanceLogs.objects.get(campaign=self.campaign, date=yesterday).amount_approved, Decimal('7.00'))
+
+        # Os totais lidos não mudam com a compactação
+        self.assertEqual(CampaignSerializer(self.campaign).data['total_approved'], 7)
+
+    def test_compaction_command_by_campaign(self):
+        """
+        Testa se o comando compact_counter_shards consolida apenas a campanha informada.
+        """
+        other = Campaign.objects.create(
+            user=self.user, title="Outra campanha", method="CPC", CPC=Decimal('1.00'), counter_shards=2)
+        self.approve_sales(2)
+        update_finance_logs(other, status='APPROVED', amount=Decimal('10.00'))
+
+        call_command('compact_counter_shards', campaign=str(self.campaign.uid), stdout=StringIO())
+
+        self.assertFalse(FinanceLogShard.objects.filter(campaign=self.campaign).exists())
+        self.assertTrue(FinanceLogShard.objects.filter(campaign=other).exists())
+
+
+class TestCampaignListWithShards(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_sums_shards_of_sharded_campaigns(self):
+        """
+        Testa se a listagem de campanhas soma os shards apenas das campanhas com shards.
+        """
+        sharded = Campaign.objects.create(
+            user=self.user, title="Campanha com shards", method="CPC", CPC=Decimal('1.00'), counter_shards=8)
+        plain = Campaign.objects.create(
+            user=self.user, title="Campanha sem shards", method="CPC", CPC=Decimal('1.00'))
+        for campaign in (sharded, plain):
+            for _ in range(3):
+                update_finance_logs(campaign, status='APPROVED', amount=Decimal('10.00'))
+
+        response = self.client.get(reverse("campaign-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for result in response.data["results"]:
+            self.assertEqual(result["total_approved"], 3)
+            self.assertEqual(result["amount_approved"], "30.00")
+            self.assertEqual(result["overviews"][-1]["value"], Decimal('30.00'))
+
+
+class TestConcurrentShardedTransitions(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'),
+            counter_shards=4)
+
+    def test_parallel_writes_and_compaction_do_not_lose_updates(self):
+        """
+        Testa se escritas concorrentes nos shards, intercaladas com compactações,
+        não perdem incrementos.
+        """
+        threads_count = 6
+        events_per_thread = 10
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(events_per_thread):
+                    apply_status_transition(
+                        self.campaign.pk, status='APPROVED', amount=Decimal('10.00'), shards=4)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        def compactor():
+            try:
+                for _ in range(5):
+                    compact_finance_log_shards(self.campaign.pk)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        threads.append(threading.Thread(target=compactor))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        compact_finance_log_shards()
+
+        self.assertEqual(errors, [])
+        expected = threads_count * events_per_thread
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, expected)
+        self.assertEqual(self.campaign.amount_approved, Decimal('10.00') * expected)
+        self.assertEqual(FinanceLogs.objects.get(campaign=self.campaign).total_approved, expected)
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from campaigns.models import Campaign
+from integrations.models import Integration, IntegrationRequest
+from integrations.views import IntegrationRequestListView
+
+User = get_user_model()
+
+
+class TestCursorPagination(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        now = timezone.now()
+        self.campaigns = []
+        for index in range(25):
+            campaign = Campaign.objects.create(
+                user=self.user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            # Campanhas em grupos de três com o mesmo created_at: o id desempata
+            Campaign.objects.filter(pk=campaign.pk).update(created_at=now - timedelta(minutes=index // 3))
+            self.campaigns.append(campaign)
+
+    def walk(self, url, params):
+        """
+        Percorre as páginas pelos links `next` e retorna (uids, respostas).
+        """
+        responses = [self.client.get(url, params)]
+        while responses[-1].data['next']:
+            responses.append(self.client.get(responses[-1].data['next']))
+        uids = [item['uid'] for response in responses for item in response.data['results']]
+        return uids, responses
+
+    def expected_uids(self, descending=True):
+        campaigns = Campaign.objects.filter(user=self.user).order_by(
+            *(['-created_at', '-id'] if descending else ['created_at', 'id']))
+        return [str(campaign.uid) for campaign in campaigns]
+
+    def test_walks_pages_in_order(self):
+        """
+        Testa se as páginas por cursor percorrem todas as campanhas na ordem
+        (created_at, id), sem repetir nem pular campanhas com o mesmo created_at.
+        """
+        url = reverse('campaign-list')
+        uids, responses = self.walk(url, {'cursor': '', 'page_size': 10})
+
+        self.assertEqual(uids, self.expected_uids())
+        self.assertEqual([len(response.data['results']) for response in responses], [10, 10, 5])
+        self.assertNotIn('count', responses[0].data)
+        self.assertIsNone(responses[0].data['previous'])
+
+        ascending, _ = self.walk(url, {'cursor': '', 'page_size': 7, 'ordering': 'created_at'})
+        self.assertEqual(ascending, self.expected_uids(descending=False))
+
+    def test_previous_links(self):
+        """
+        Testa se o link `previous` volta para a página anterior.
+        """
+        url = reverse('campaign-list')
+        first = self.client.get(url, {'cursor': '', 'page_size': 10})
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+
+        back = self.client.get(third.data['previous'])
+        self.assertEqual(back.data['results'], second.data['results'])
+        back = self.client.get(back.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+        self.assertEqual(self.client.get(back.data['next']).data['results'], second.data['results'])
+
+    def test_page_number_mode_is_kept(self):
+        """
+        Testa se sem `cursor` a paginação por número de página continua igual.
+        """
+        response = self.client.get(reverse('campaign-list'), {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_invalid_cursor(self):
+        """
+        Testa se um cursor inválido retorna 404.
+        """
+        response = self.client.get(reverse('campaign-list'), {'cursor': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_integration_requests_with_null_dates(self):
+        """
+        Testa a listagem das vendas por cursor, com as vendas sem data no fim.
+        """
+        integration = Integration.objects.create(user=self.user, name="Conta ZeroOne", gateway="zeroone")
+        requests = [
+            IntegrationRequest.objects.create(
+                integration=integration, status="APPROVED", payment_id=f"pay-{index}", payment_method="PIX",
+                amount=Decimal('10.00'), response={},
+                created_at=None if index % 4 == 0 else timezone.now() - timedelta(hours=index))
+            for index in range(12)
+        ]
+        # A view não tem rota: as requests são montadas pela factory
+        factory = APIRequestFactory()
+
+        def get(url, params=None):
+            request = factory.get(url, params)
+            force_authenticate(request, user=self.user)
+            return IntegrationRequestListView.as_view()(request)
+
+        self.assertEqual(len(get('/integration-requests/').data), 12)
+
+        responses = [get('/integration-requests/', {'cursor': '', 'page_size': 5})]
+        while responses[-1].data['next']:
+            responses.append(get(responses[-1].data['next']))
+        uids = [item['uid'] for response in responses for item in response.data['results']]
+
+        dated = sorted((request for request in requests if request.created_at),
+                       key=lambda request: request.created_at, reverse=True)
+        undated = sorted((request for request in requests if not request.created_at),
+                         key=lambda request: request.pk, reverse=True)
+        self.assertEqual(uids, [str(request.uid) for request in dated + undated])
+
+        back = get(responses[-1].data['previous'])
+        self.assertEqual(back.data['results'], responses[-2].data['results'])
+
+    def test_users_by_date_joined(self):
+        """
+        Testa a listagem de usuários do admin por cursor (date_joined, uid).
+        """
+        admin = User.objects.create_superuser(
+            cpf="52998224725", email="admin@gmail.com", name="Admin", password="7lonAzJxss@")
+        for index in range(6):
+            User.objects.create_user(
+                cpf=f"{index:011d}", email=f"user{index}@gmail.com", name=f"Usuário {index}", password="7lonAzJxss@")
+        self.client.force_authenticate(user=admin)
+
+        responses = [self.client.get(reverse('user-list'), {'cursor': '', 'page_size': 3})]
+        while responses[-1].data['next']:
+            responses.append(self.client.get(responses[-1].data['next']))
+        uids = [item['uid'] for response in responses for item in response.data['results']]
+
+        expected = User.objects.order_by('-date_joined', '-uid').values_list('uid', flat=True)
+        self.assertEqual(uids, [str(uid) for uid in expected])
@@ -0,0 +1,178 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign
+from campaigns.dashboard_cache import DashboardCache, dashboard_cache, get_data_version
+from campaigns.finance_log_utils import apply_status_transition
+from kwai.models import Kwai
+from kwai.services import set_kwai_campaigns
+
+User = get_user_model()
+
+
+class TestDashboardCache(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha", method="CPC", CPC=Decimal('1.00'))
+        self.kwai = Kwai.objects.create(user=self.user, name="Conta da Sarah - Kwai")
+        set_kwai_campaigns(self.kwai, [self.campaign])
+        # O recálculo das respostas antigas é feito na própria request (o TestCase não faz commit)
+        dashboard_cache.background = False
+
+    def tearDown(self):
+        dashboard_cache.background = True
+
+    def approve_sale(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_status_transition(self.campaign.pk, status='APPROVED', amount=amount, payment_method='PIX')
+
+    def test_repeated_requests_hit_cache(self):
+        """
+        Testa se as requests repetidas dos dashboards não consultam o banco
+        (os detalhes apenas buscam a conta Kwai ou a campanha com as integrações).
+        """
+        urls = [
+            (reverse('dashboard-campaign-list'), 0),
+            (reverse('kwai-list'), 0),
+            (reverse('kwai-detail', kwargs={'uid': self.kwai.uid}), 1),
+            (reverse('campaign-detail', kwargs={'uid': self.campaign.uid}), 2),
+        ]
+        for url, queries in urls:
+            first = self.client.get(url, {'granularity': 'week'})
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            with self.assertNumQueries(queries):
+                second = self.client.get(url, {'granularity': 'week'})
+            self.assertEqual(second.data, first.data)
+
+        # Outros parâmetros são outra entrada
+        weekly = self.client.get(reverse('dashboard-campaign-list'), {'granularity': 'week'})
+        daily = self.client.get(reverse('dashboard-campaign-list'))
+        self.assertEqual(len(daily.data['overviews']), 2 * 31)
+        self.assertLess(len(weekly.data['overviews']), len(daily.data['overviews']))
+
+    def test_writes_invalidate(self):
+        """
+        Testa se uma venda troca a versão dos dados do usuário: a primeira
+        request após a venda já recebe os dados novos.
+        """
+        urls = [
+            reverse('dashboard-campaign-list'),
+            reverse('kwai-detail', kwargs={'uid': self.kwai.uid}),
+            reverse('campaign-detail', kwargs={'uid': self.campaign.uid}),
+        ]
+        for url in urls:
+            self.assertEqual(Decimal(self.client.get(url).data['amount_approved']), 0)
+
+        self.approve_sale(Decimal('10.00'))
+
+        for url in urls:
+            self.assertEqual(Decimal(self.client.get(url).data['amount_approved']), Decimal('10.00'))
+
+    def test_campaign_changes_invalidate(self):
+        """
+        Testa se a alteração de uma campanha invalida o detalhe em cache.
+        """
+        url = reverse('campaign-detail', kwargs={'uid': self.campaign.uid})
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campaign.title = "Campanha renomeada"
+            self.campaign.save()
+
+        self.assertEqual(self.client.get(url).data['title'], "Campanha renomeada")
+
+    def test_users_do_not_share_entries(self):
+        """
+        Testa se a mesma request de outro usuário não recebe a resposta em cache.
+        """
+        self.approve_sale(Decimal('10.00'))
+        url = reverse('dashboard-campaign-list')
+        self.assertEqual(self.client.get(url).data['amount_approved'], Decimal('10.00'))
+
+        other = User.objects.create_user(
+            cpf="52998224725", email="other@gmail.com", name="Outro Usuário", password="7lonAzJxss@")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url).data['amount_approved'], 0)
+
+
+class TestDashboardCacheSingleFlight(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = DashboardCache(timeout=60, stale_timeout=60, lock_timeout=5, background=False)
+        self.user_id = uuid.uuid4()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def compute(self):
+        with self.calls_lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return {'value': 42}
+
+    def test_concurrent_misses_compute_once(self):
+        """
+        Testa se requests concorrentes de uma chave ausente aguardam um único cálculo.
+        """
+        results = []
+
+        def request():
+            results.append(self.cache.get_or_compute(self.user_id, 'test', {'start': '2024-01-01'}, self.compute))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'value': 42}] * 8)
+
+    def test_waits_for_other_process(self):
+        """
+        Testa se, com a trava da chave ocupada por outro processo, a request
+        aguarda o cálculo do outro processo em vez de calcular.
+        """
+        key = self.cache.make_key(self.user_id, 'test', {})
+        version = get_data_version(self.user_id)
+        cache.add(f"{key}:lock", 1, 5)
+
+        def other_process():
+            time.sleep(0.2)
+            self.cache.store(key, version, {'value': 7})
+            cache.delete(f"{key}:lock")
+
+        thread = threading.Thread(target=other_process)
+        thread.start()
+        data = self.cache.get_or_compute(self.user_id, 'test', {}, self.compute)
+        thread.join()
+
+        self.assertEqual(data, {'value': 7})
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_entry_is_served_while_revalidating(self):
+        """
+        Testa se uma entrada vencida da versão atual é servida enquanto é
+        recalculada, e se uma entrada de versão anterior é recalculada antes.
+        """
+        key = self.cache.make_key(self.user_id, 'test', {})
+        version = get_data_version(self.user_id)
+        cache.set(key, {'version': version, 'computed_at': time.time() - 120, 'data': {'value': 1}}, 60)
+
+        self.assertEqual(self.cache.get_or_compute(self.user_id, 'test', {}, self.compute), {'value': 1})
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.get_or_compute(self.user_id, 'test', {}, self.compute), {'value': 42})
+
+        cache.set(key, {'version': 'anterior', 'computed_at': time.time(), 'data': {'value': 1}}, 60)
+        self.assertEqual(self.cache.get_or_compute(self.user_id, 'test', {}, self.compute), {'value': 42})
+        self.assertEqual(self.calls, 2)
@@ -0,0 +1,116 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from campaigns import finance_accumulator
+from campaigns.finance_accumulator import FinanceDeltaAccumulator
+from campaigns.finance_log_utils import get_transition_deltas
+from campaigns.models import Campaign, FinanceLogs, FinanceLogShard
+
+User = get_user_model()
+
+
+class TestFinanceDeltaAccumulator(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.today = timezone.localdate()
+
+    def test_burst_is_coalesced_in_one_flush(self):
+        """
+        Testa se centenas de transições da mesma campanha viram um único UPDATE
+        (mais o do profit do usuário) e um único upsert.
+        """
+        accumulator = FinanceDeltaAccumulator(max_events=1000, max_delay_ms=float('inf'))
+        for _ in range(300):
+            accumulator.add(self.campaign.pk, self.today, get_transition_deltas(
+                status='PENDING', amount=Decimal('10.00')))
+            accumulator.add(self.campaign.pk, self.today, get_transition_deltas(
+                'PENDING', Decimal('10.00'), 'APPROVED', Decimal('10.00'), payment_method='PIX'))
+
+        self.assertFalse(accumulator.should_flush())
+        with self.assertNumQueries(3):
+            self.assertEqual(accumulator.flush(), 1)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(self.campaign.total_approved, 300)
+        finance_log = FinanceLogs.objects.get(campaign=self.campaign, date=self.today)
+        self.assertEqual(finance_log.pix_amount, Decimal('3000.00'))
+
+        metrics = accumulator.metrics.as_dict()
+        self.assertEqual(metrics['flushes'], 1)
+        self.assertEqual(metrics['last_size'], 600)
+        self.assertEqual(metrics['rows'], 1)
+        self.assertGreater(metrics['last_latency_ms'], 0)
+
+    def test_flush_routes_sharded_campaigns_to_shards(self):
+        """
+        Testa se o flush de uma campanha com shards grava em um shard, sem tocar na campanha.
+        """
+        accumulator = FinanceDeltaAccumulator(max_events=1000, max_delay_ms=float('inf'))
+        for _ in range(5):
+            accumulator.add(self.campaign.pk, self.today, get_transition_deltas(
+                status='APPROVED', amount=Decimal('10.00')), shards=4)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(accumulator.flush(), 1)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 0)
+        shard = FinanceLogShard.objects.get(campaign=self.campaign, date=self.today)
+        self.assertEqual(shard.total_approved, 5)
+
+    def test_flush_thresholds(self):
+        """
+        Testa se o flush é pedido ao atingir M eventos ou N milissegundos.
+        """
+        by_events = FinanceDeltaAccumulator(max_events=2, max_delay_ms=float('inf'))
+        by_events.add(self.campaign.pk, self.today, {'total_pending': 1})
+        self.assertFalse(by_events.should_flush())
+        by_events.add(self.campaign.pk, self.today, {'total_pending': 1})
+        self.assertTrue(by_events.should_flush())
+
+        by_time = FinanceDeltaAccumulator(max_events=1000, max_delay_ms=0)
+        self.assertFalse(by_time.should_flush())
+        by_time.add(self.campaign.pk, self.today, {'total_pending': 1})
+        self.assertTrue(by_time.should_flush())
+
+    def test_rows_per_campaign_and_day(self):
+        """
+        Testa se cada (campanha, dia) recebe sua própria linha e se deltas que se anulam não geram escrita.
+        """
+        yesterday = self.today - timezone.timedelta(days=1)
+        accumulator = FinanceDeltaAccumulator()
+        accumulator.add(self.campaign.pk, yesterday, {'total_refunded': 1, 'amount_refunded': Decimal('5.00')})
+        accumulator.add(self.campaign.pk, self.today, {'total_pending': 1})
+        accumulator.add(self.campaign.pk, self.today, {'total_pending': -1})
+
+        self.assertEqual(accumulator.flush(), 1)
+        self.assertEqual(FinanceLogs.objects.get(campaign=self.campaign).date, yesterday)
+        self.assertEqual(accumulator.flush(), 0)
+
+    def test_flush_applies_rows_in_key_order(self):
+        """
+        Testa se o flush aplica as linhas ordenadas por (campanha, dia), independente
+        da ordem de chegada, para que workers concorrentes travem na mesma ordem.
+        """
+        other = Campaign.objects.create(
+            user=self.user, title="Outra campanha", method="CPC", CPC=Decimal('1.00'))
+        yesterday = self.today - timezone.timedelta(days=1)
+        accumulator = FinanceDeltaAccumulator()
+        for campaign_id, date in [(other.pk, self.today), (self.campaign.pk, self.today),
+                                  (other.pk, yesterday), (self.campaign.pk, yesterday)]:
+            accumulator.add(campaign_id, date, {'total_pending': 1})
+
+        with mock.patch.object(finance_accumulator, 'apply_finance_deltas',
+                               wraps=finance_accumulator.apply_finance_deltas) as apply:
+            self.assertEqual(accumulator.flush(), 4)
+
+        self.assertEqual([call.args[:2] for call in apply.call_args_list], [
+            (self.campaign.pk, yesterday), (self.campaign.pk, self.today),
+            (other.pk, yesterday), (other.pk, self.today)])
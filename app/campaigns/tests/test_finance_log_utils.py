@@ -0,0 +1,154 @@
+import threading
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from campaigns.models import Campaign, CampaignCounters, FinanceLogs
+from campaigns.finance_log_utils import apply_status_transition, get_transition_deltas, update_finance_logs
+from integrations.campaign_operations import update_campaign_fields
+from integrations.models import Integration, IntegrationRequest
+
+User = get_user_model()
+
+
+class TestStatusTransition(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        CampaignCounters.objects.filter(campaign=self.campaign).update(total_ads=Decimal('10.00'))
+
+    def test_transition_deltas(self):
+        """
+        Testa os deltas de uma venda pendente que passa a ser aprovada via PIX.
+        """
+        deltas = get_transition_deltas(
+            'PENDING', Decimal('50.00'), 'APPROVED', Decimal('50.00'), payment_method='PIX')
+
+        self.assertEqual(deltas, {
+            'total_pending': -1,
+            'amount_pending': Decimal('-50.00'),
+            'total_approved': 1,
+            'amount_approved': Decimal('50.00'),
+            'pix_total': 1,
+            'pix_amount': Decimal('50.00'),
+        })
+
+    def test_same_status_without_changes(self):
+        """
+        Testa se uma transição sem alteração de status/valor não executa consultas.
+        """
+        with self.assertNumQueries(0):
+            deltas = apply_status_transition(
+                self.campaign.pk, 'APPROVED', Decimal('50.00'), 'APPROVED', Decimal('50.00'))
+        self.assertEqual(deltas, {})
+
+    def test_transition_statements(self):
+        """
+        Testa se a transição executa apenas um comando por tabela (contadores da
+        campanha, profit do usuário e FinanceLogs).
+        """
+        with self.assertNumQueries(3):
+            apply_status_transition(
+                self.campaign.pk, status='APPROVED', amount=Decimal('50.00'), payment_method='PIX')
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.amount_approved, Decimal('50.00'))
+        self.assertEqual(self.campaign.profit, Decimal('40.00'))
+        self.assertEqual(self.campaign.ROI, Decimal('400.00'))
+
+        finance_log = FinanceLogs.objects.get(campaign=self.campaign)
+        self.assertEqual(finance_log.date, timezone.localdate())
+        self.assertEqual(finance_log.total_approved, 1)
+        self.assertEqual(finance_log.pix_amount, Decimal('50.00'))
+        self.assertEqual(finance_log.profit, Decimal('50.00'))
+
+    def test_transition_accumulates_daily_log(self):
+        """
+        Testa se transições sucessivas somam no mesmo registro diário do FinanceLogs.
+        """
+        update_finance_logs(self.campaign, status='PENDING', amount=Decimal('30.00'))
+        update_finance_logs(self.campaign, 'PENDING', Decimal('30.00'), 'APPROVED', Decimal('30.00'))
+        update_finance_logs(self.campaign, 'APPROVED', Decimal('30.00'), 'REFUNDED', Decimal('30.00'))
+
+        finance_log = FinanceLogs.objects.get(campaign=self.campaign)
+        self.assertEqual(finance_log.total_pending, 0)
+        self.assertEqual(finance_log.total_approved, 0)
+        self.assertEqual(finance_log.total_refunded, 1)
+        self.assertEqual(finance_log.amount_refunded, Decimal('30.00'))
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.amount_approved, Decimal('0.00'))
+        self.assertEqual(self.campaign.amount_refunded, Decimal('30.00'))
+        self.assertEqual(self.campaign.profit, Decimal('-10.00'))
+
+    def test_update_campaign_fields_decrements_old_status(self):
+        """
+        Testa se o update_campaign_fields decrementa o status anterior apenas em atualizações.
+        """
+        integration = Integration.objects.create(
+            user=self.user, name="Integração", gateway="zeroone")
+        sale = IntegrationRequest(
+            integration=integration, status='PENDING', payment_id='abc', amount=Decimal('20.00'))
+
+        update_campaign_fields(sale, 'create', self.campaign, 'PENDING', Decimal('20.00'), 'ZeroOne')
+        update_campaign_fields(sale, 'update', self.campaign, 'APPROVED', Decimal('20.00'), 'ZeroOne')
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.amount_approved, Decimal('20.00'))
+
+
+class TestConcurrentStatusTransitions(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+
+    def test_parallel_transitions_do_not_lose_updates(self):
+        """
+        Testa se transições aplicadas em paralelo na mesma campanha não perdem atualizações.
+        """
+        threads_count = 8
+        events_per_thread = 10
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(events_per_thread):
+                    apply_status_transition(
+                        self.campaign.pk, status='PENDING', amount=Decimal('10.00'))
+                    apply_status_transition(
+                        self.campaign.pk, 'PENDING', Decimal('10.00'), 'APPROVED', Decimal('10.00'),
+                        payment_method='CREDIT_CARD')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        expected = threads_count * events_per_thread
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(self.campaign.total_approved, expected)
+        self.assertEqual(self.campaign.amount_approved, Decimal('10.00') * expected)
+
+        finance_log = FinanceLogs.objects.get(campaign=self.campaign)
+        self.assertEqual(finance_log.total_pending, 0)
+        self.assertEqual(finance_log.total_approved, expected)
+        self.assertEqual(finance_log.credit_card_total, expected)
+        self.assertEqual(finance_log.credit_card_amount, Decimal('10.00') * expected)
@@ -0,0 +1,292 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign, FinanceCompactedMonth, FinanceLogs, FinanceLogsMonthly, UserDailyFinance
+from campaigns.aggregations import FINANCE_SUM_FIELDS, aggregate_finance_logs, bucket_start
+from campaigns.finance_log_utils import apply_finance_deltas, apply_status_transition
+from campaigns.finance_months import (
+    aggregate_finance_tiers, compact_finance_month, get_compacted_months, invalidate_compacted_months,
+    month_start, next_month, overview_tiers, split_date_range,
+)
+from kwai.models import Kwai, KwaiDailyFinance
+from kwai.services import set_kwai_campaigns
+
+User = get_user_model()
+
+
+class TestSplitDateRange(TestCase):
+
+    def test_whole_compacted_months_and_edges(self):
+        """
+        Testa a divisão do intervalo entre meses inteiros compactados e os dias das bordas.
+        """
+        compacted = {date(2024, 2, 1), date(2024, 3, 1), date(2024, 5, 1)}
+
+        day_ranges, months = split_date_range(date(2024, 1, 15), date(2024, 6, 10), compacted)
+
+        self.assertEqual(months, [date(2024, 2, 1), date(2024, 3, 1), date(2024, 5, 1)])
+        self.assertEqual(day_ranges, [
+            (date(2024, 1, 15), date(2024, 1, 31)),
+            (date(2024, 4, 1), date(2024, 4, 30)),
+            (date(2024, 6, 1), date(2024, 6, 10)),
+        ])
+
+    def test_partial_months_are_read_by_day(self):
+        """
+        Testa se meses compactados que não estão inteiros no intervalo são lidos dia a dia.
+        """
+        compacted = {date(2024, 2, 1)}
+
+        self.assertEqual(split_date_range(date(2024, 2, 2), date(2024, 2, 29), compacted),
+                         ([(date(2024, 2, 2), date(2024, 2, 29))], []))
+        self.assertEqual(split_date_range(date(2024, 2, 1), date(2024, 2, 29), compacted),
+                         ([], [date(2024, 2, 1)]))
+
+
+class TestFinanceMonthTier(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaigns = [
+            Campaign.objects.create(
+                user=self.user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            for index in range(3)
+        ]
+        self.kwai = Kwai.objects.create(user=self.user, name="Conta da Sarah - Kwai")
+        set_kwai_campaigns(self.kwai, self.campaigns[1:])
+        self.today = timezone.localdate()
+        self.rng = random.Random(20240801)
+        invalidate_compacted_months()
+
+    def tearDown(self):
+        invalidate_compacted_months()
+
+    def random_writes(self, count, days_back):
+        statuses = ['APPROVED', 'PENDING', 'REFUNDED', 'CHARGEBACK']
+        for _ in range(count):
+            campaign = self.rng.choice(self.campaigns)
+            day = self.today - timedelta(days=self.rng.randint(0, days_back))
+            if self.rng.random() < 0.25:
+                apply_finance_deltas(campaign.pk, day, {
+                    'total_ads': Decimal(self.rng.randint(0, 900)) / 100,
+                    'total_views': self.rng.randint(0, 50)})
+            else:
+                apply_status_transition(
+                    campaign.pk, self.rng.choice(statuses + [None]), Decimal(self.rng.randint(100, 5000)) / 100,
+                    self.rng.choice(statuses), Decimal(self.rng.randint(100, 5000)) / 100,
+                    self.rng.choice(['PIX', 'CREDIT_CARD', 'BOLETO']), date=day)
+
+    def closed_months(self, days_back):
+        month = month_start(self.today - timedelta(days=days_back))
+        months = []
+        while month < month_start(self.today):
+            months.append(month)
+            month = next_month(month)
+        return months
+
+    def test_tiered_totals_match_daily_totals(self):
+        """
+        Testa se os totais pelos meses compactados mais as bordas são sempre
+        iguais aos totais somando apenas os dias, inclusive com escritas
+        atrasadas em meses já compactados.
+        """
+        self.random_writes(250, 200)
+        closed = self.closed_months(200)
+        # Parte dos meses fechados compactada: os demais continuam sendo lidos dia a dia
+        for month in closed[::2]:
+            compact_finance_month(month)
+        # Estornos, chargebacks e custos atrasados nos meses fechados, compactados ou não
+        self.random_writes(80, 200)
+        for month in closed[1::2][:1]:
+            compact_finance_month(month)
+
+        sources = [
+            (UserDailyFinance.objects.filter(user=self.user),
+             FinanceLogsMonthly.objects.filter(campaign__user=self.user)),
+            (KwaiDailyFinance.objects.filter(kwai=self.kwai),
+             FinanceLogsMonthly.objects.filter(campaign__in=self.campaigns[1:])),
+        ]
+        for _ in range(40):
+            start = self.today - timedelta(days=self.rng.randint(0, 230))
+            end = start + timedelta(days=self.rng.randint(0, 200))
+            for daily, monthly in sources:
+                expected = aggregate_finance_logs(daily.filter(date__gte=start, date__lte=end))
+                totals = aggregate_finance_tiers(daily, monthly, start, end)
+                for field in FINANCE_SUM_FIELDS + ['profit', 'first_date', 'last_date']:
+                    self.assertEqual(totals[field], expected[field], (start, end, field))
+
+        # Cada linha mensal é a soma dos dias do mês
+        for monthly in FinanceLogsMonthly.objects.all():
+            expected = FinanceLogs.objects.filter(
+                campaign_id=monthly.campaign_id, date__gte=monthly.month,
+                date__lt=next_month(monthly.month)).aggregate(total_approved=Sum('total_approved'))
+            self.assertEqual(monthly.total_approved, expected['total_approved'])
+
+    def test_long_range_reads_months(self):
+        """
+        Testa se um intervalo longo lê os meses compactados e apenas os dias das bordas.
+        """
+        first_month = month_start(self.today - timedelta(days=120))
+        for day in range(150):
+            apply_finance_deltas(self.campaigns[0].pk, self.today - timedelta(days=day), {
+                'total_approved': 1, 'amount_approved': Decimal('1.00')})
+        for month in self.closed_months(150):
+            compact_finance_month(month)
+
+        start = first_month + timedelta(days=10)
+        # A lista de meses compactados é reaproveitada pelo processo
+        get_compacted_months()
+        with CaptureQueriesContext(connection) as captured:
+            totals = aggregate_finance_tiers(
+                UserDailyFinance.objects.filter(user=self.user),
+                FinanceLogsMonthly.objects.filter(campaign__user=self.user), start, self.today)
+
+        self.assertEqual(len(captured.captured_queries), 1)
+        self.assertIn('"finance_logs_monthly"', captured.captured_queries[0]['sql'])
+        self.assertEqual(totals['total_approved'], (self.today - start).days + 1)
+        self.assertEqual(totals['first_date'], start)
+
+    def test_compaction_command(self):
+        """
+        Testa se o comando compacta apenas os meses fechados ainda não compactados.
+        """
+        apply_finance_deltas(self.campaigns[0].pk, self.today - timedelta(days=70), {'total_pending': 2})
+        apply_finance_deltas(self.campaigns[1].pk, self.today, {'total_pending': 1})
+
+        out = StringIO()
+        call_command('compact_finance_months', stdout=out)
+
+        closed = self.closed_months(70)
+        self.assertIn(f'{len(closed)} meses compactados', out.getvalue())
+        self.assertEqual(set(FinanceCompactedMonth.objects.values_list('month', flat=True)), set(closed))
+        self.assertFalse(FinanceLogsMonthly.objects.filter(month=month_start(self.today)).exists())
+
+        out = StringIO()
+        call_command('compact_finance_months', stdout=out)
+        self.assertIn('0 meses compactados', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('compact_finance_months', month=f"{self.today:%Y-%m}")
+
+
+class TestOverviewGranularity(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha", method="CPC", CPC=Decimal('1.00'))
+        self.today = timezone.localdate()
+        self.rng = random.Random(20240901)
+        invalidate_compacted_months()
+
+    def tearDown(self):
+        invalidate_compacted_months()
+
+    def expected_rows(self, start, end, granularity):
+        """Soma os FinanceLogs do intervalo por período, em Python."""
+        expected = {}
+        period = bucket_start(start, granularity)
+        while period <= end:
+            expected[period] = [0, 0]
+            period = (period + timedelta(days=1) if granularity == 'day'
+                      else period + timedelta(days=7) if granularity == 'week' else next_month(period))
+        for log in FinanceLogs.objects.filter(campaign=self.campaign, date__gte=start, date__lte=end):
+            totals = expected[bucket_start(log.date, granularity)]
+            totals[0] += log.total_ads
+            totals[1] += log.amount_approved
+        return [{'date': day, 'total_expense': expense, 'total_revenue': revenue}
+                for day, (expense, revenue) in expected.items()]
+
+    def test_buckets_match_daily_sums(self):
+        """
+        Testa se os overviews por dia, semana e mês (com meses compactados)
+        são iguais às somas dos dias, com 0 nos períodos sem registros.
+        """
+        for _ in range(120):
+            day = self.today - timedelta(days=self.rng.randint(0, 200))
+            apply_finance_deltas(self.campaign.pk, day, {
+                'total_ads': Decimal(self.rng.randint(0, 900)) / 100,
+                'amount_approved': Decimal(self.rng.randint(100, 5000)) / 100})
+        month = month_start(self.today - timedelta(days=200))
+        while month < month_start(self.today):
+            compact_finance_month(month)
+            month = next_month(month)
+
+        sources = [
+            (FinanceLogs.objects.filter(campaign=self.campaign), FinanceLogsMonthly.objects.filter(campaign=self.campaign)),
+            (UserDailyFinance.objects.filter(user=self.user), FinanceLogsMonthly.objects.filter(campaign__user=self.user)),
+        ]
+        for _ in range(15):
+            start = self.today - timedelta(days=self.rng.randint(0, 230))
+            end = start + timedelta(days=self.rng.randint(0, 200))
+            for granularity in ('day', 'week', 'month'):
+                expected = self.expected_rows(start, end, granularity)
+                for daily, monthly in sources:
+                    rows = overview_tiers(daily, monthly, start, end, granularity)
+                    self.assertEqual(rows, expected, (start, end, granularity))
+
+    def test_month_buckets_read_one_query(self):
+        """
+        Testa se o agrupamento mensal de um intervalo longo lê os meses
+        compactados e os dias das bordas em uma única consulta.
+        """
+        for day in range(150):
+            apply_finance_deltas(self.campaign.pk, self.today - timedelta(days=day), {
+                'total_ads': Decimal('1.00'), 'amount_approved': Decimal('2.00')})
+        for month in {month_start(self.today - timedelta(days=day)) for day in range(150)} - {month_start(self.today)}:
+            compact_finance_month(month)
+        start = self.today - timedelta(days=149)
+        get_compacted_months()
+
+        with CaptureQueriesContext(connection) as captured:
+            rows = overview_tiers(
+                UserDailyFinance.objects.filter(user=self.user),
+                FinanceLogsMonthly.objects.filter(campaign__user=self.user), start, self.today, 'month')
+
+        self.assertEqual(len(captured.captured_queries), 1)
+        self.assertIn('"finance_logs_monthly"', captured.captured_queries[0]['sql'])
+        self.assertEqual(rows, self.expected_rows(start, self.today, 'month'))
+        self.assertEqual(sum(row['total_expense'] for row in rows), 150)
+
+    def test_endpoints_accept_granularity(self):
+        """
+        Testa o parâmetro ?granularity= na listagem de campanhas e no
+        dashboard, inclusive com valor inválido.
+        """
+        apply_finance_deltas(self.campaign.pk, self.today, {'amount_approved': Decimal('10.00')})
+        start = self.today - timedelta(days=364)
+        params = {'start': str(start), 'end': str(self.today)}
+        months = len(self.expected_rows(start, self.today, 'month'))
+
+        response = self.client.get(reverse('dashboard-campaign-list'), params)
+        self.assertEqual(len(response.data['overviews']), 2 * 365)
+
+        endpoints = [
+            (reverse('dashboard-campaign-list'), lambda data: data['overviews']),
+            (reverse('campaign-list'), lambda data: data['results'][0]['overviews']),
+        ]
+        for url, get_overviews in endpoints:
+            response = self.client.get(url, dict(params, granularity='month'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            overviews = get_overviews(response.data)
+            self.assertEqual(len(overviews), 2 * months)
+            self.assertEqual(overviews[-1], {
+                'type': 'REVENUE', 'value': Decimal('10.00'), 'date': month_start(self.today)})
+
+            response = self.client.get(url, dict(params, granularity='year'))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,183 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from campaigns.models import Campaign, CampaignCounters, FinanceLogs
+from campaigns.finance_log_utils import apply_finance_deltas
+from campaigns.finance_rebuild import SALE_COUNTER_FIELDS
+from integrations.models import Integration, IntegrationRequest, SaleEventLedger, WebhookEvent
+from integrations.routing import router
+from integrations.webhook_queue import process_webhook_batch
+
+User = get_user_model()
+
+
+class RebuildTestMixin:
+
+    def create_campaign(self, title, gateway="zeroone"):
+        integration = Integration.objects.create(
+            user=self.user, name=f"Integração {title}", gateway=gateway)
+        campaign = Campaign.objects.create(
+            user=self.user, title=title, method="CPC", CPC=Decimal('1.00'))
+        campaign.integrations.set([integration])
+        return campaign, integration
+
+    def enqueue(self, integration, payment_id, payment_status, total_value=1000, payment_method="PIX"):
+        WebhookEvent.objects.create(
+            integration=integration, gateway=integration.gateway, payment_id=payment_id,
+            payload={"paymentId": payment_id, "status": payment_status,
+                     "totalValue": total_value, "paymentMethod": payment_method})
+
+    def snapshot(self, campaign):
+        counters = CampaignCounters.objects.values(*SALE_COUNTER_FIELDS, 'profit').get(campaign=campaign)
+        logs = list(FinanceLogs.objects.filter(campaign=campaign).order_by('date').values(
+            'date', 'total_approved', 'amount_approved', 'total_pending', 'total_refunded',
+            'pix_total', 'credit_card_amount', 'total_ads', 'profit'))
+        return counters, logs
+
+
+class TestRebuildCampaignFinance(RebuildTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaign, self.integration = self.create_campaign("Campanha APP da Sara")
+        router.load()
+
+    def test_rebuild_restores_drifted_counters(self):
+        """
+        Testa se a reconstrução devolve os contadores e o FinanceLogs aos valores
+        produzidos pelo processamento dos webhooks, inclusive os cancelados
+        (que não existem no FinanceLogs).
+        """
+        for payment_status, payment_id, method in [
+            ("PENDING", "pay-1", "PIX"), ("APPROVED", "pay-1", "PIX"), ("APPROVED", "pay-2", "CREDIT_CARD"),
+            ("REFUNDED", "pay-2", "CREDIT_CARD"), ("PENDING", "pay-3", "PIX"),
+        ]:
+            self.enqueue(self.integration, payment_id, payment_status, payment_method=method)
+            process_webhook_batch()
+        apply_finance_deltas(self.campaign.pk, timezone.localdate(), {'total_ads': Decimal('3.00')})
+        expected = self.snapshot(self.campaign)
+
+        # Contadores divergentes (e o profit do usuário acompanhando a divergência)
+        CampaignCounters.objects.filter(campaign=self.campaign).update(
+            total_approved=40, amount_approved=Decimal('999.00'), profit=Decimal('996.00'),
+            total_canceled=5, amount_canceled=Decimal('50.00'))
+        FinanceLogs.objects.filter(campaign=self.campaign).update(total_pending=7, pix_total=3)
+        User.objects.filter(pk=self.user.pk).update(profit=Decimal('996.00'))
+
+        out = StringIO()
+        call_command('rebuild_campaign_finance', campaign=str(self.campaign.uid), stdout=out)
+
+        self.assertIn('1 campanhas', out.getvalue())
+        self.assertEqual(self.snapshot(self.campaign), expected)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_canceled, 0)
+        self.assertEqual(self.campaign.amount_canceled, Decimal('0.00'))
+        self.assertEqual(self.campaign.total_ads, Decimal('3.00'))
+        self.assertEqual(self.campaign.profit, Decimal('7.00'))
+        # O profit do usuário recebe a diferença de lucro da campanha
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profit, Decimal('7.00'))
+
+    def test_history_is_split_by_day(self):
+        """
+        Testa se as transições registradas no ledger são atribuídas aos dias em que chegaram.
+        """
+        now = timezone.now()
+        first_day, second_day = now - timedelta(days=2), now - timedelta(days=1)
+        IntegrationRequest.objects.create(
+            integration=self.integration, status="APPROVED", payment_id="pay-1", payment_method="PIX",
+            amount=Decimal('25.00'), response={}, created_at=first_day, updated_at=second_day)
+        SaleEventLedger.objects.create(
+            integration=self.integration, payment_id="pay-1", status="PENDING", created_at=first_day)
+        SaleEventLedger.objects.create(
+            integration=self.integration, payment_id="pay-1", status="APPROVED", created_at=second_day)
+        # Venda anterior ao ledger: conta no dia da última alteração
+        IntegrationRequest.objects.create(
+            integration=self.integration, status="PENDING", payment_id="pay-2", payment_method="PIX",
+            amount=Decimal('10.00'), response={}, created_at=first_day, updated_at=first_day)
+
+        call_command('rebuild_campaign_finance', stdout=StringIO())
+
+        logs = {log.date: log for log in FinanceLogs.objects.filter(campaign=self.campaign)}
+        self.assertEqual(logs[first_day.date()].total_pending, 2)
+        self.assertEqual(logs[first_day.date()].amount_pending, Decimal('35.00'))
+        self.assertEqual(logs[first_day.date()].total_approved, 0)
+        self.assertEqual(logs[second_day.date()].total_pending, -1)
+        self.assertEqual(logs[second_day.date()].total_approved, 1)
+        self.assertEqual(logs[second_day.date()].pix_amount, Decimal('25.00'))
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 1)
+        self.assertEqual(self.campaign.total_approved, 1)
+
+    def test_since_keeps_older_days(self):
+        """
+        Testa se o --since reconstrói apenas os dias a partir da data informada,
+        mantendo os dias anteriores e os custos de anúncios.
+        """
+        today = timezone.localdate()
+        old_day = today - timedelta(days=10)
+        apply_finance_deltas(self.campaign.pk, old_day, {'total_pending': 5, 'total_ads': Decimal('2.00')})
+        apply_finance_deltas(self.campaign.pk, today, {'total_pending': 9, 'total_ads': Decimal('1.00')})
+        IntegrationRequest.objects.create(
+            integration=self.integration, status="APPROVED", payment_id="pay-1", payment_method="BOLETO",
+            amount=Decimal('40.00'), response={}, created_at=timezone.now(), updated_at=timezone.now())
+
+        call_command('rebuild_campaign_finance', since=str(today - timedelta(days=1)), stdout=StringIO())
+
+        old_log = FinanceLogs.objects.get(campaign=self.campaign, date=old_day)
+        self.assertEqual(old_log.total_pending, 5)
+        today_log = FinanceLogs.objects.get(campaign=self.campaign, date=today)
+        self.assertEqual(today_log.total_pending, 0)
+        self.assertEqual(today_log.total_approved, 1)
+        self.assertEqual(today_log.boleto_amount, Decimal('40.00'))
+        self.assertEqual(today_log.total_ads, Decimal('1.00'))
+        self.assertEqual(today_log.profit, Decimal('39.00'))
+
+        # Os totais da campanha são sempre recalculados por completo
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.total_ads, Decimal('3.00'))
+
+    def test_invalid_arguments(self):
+        """
+        Testa se uma campanha inexistente ou uma data inválida interrompem o comando.
+        """
+        with self.assertRaises(CommandError):
+            call_command('rebuild_campaign_finance', campaign="00000000-0000-0000-0000-000000000000")
+        with self.assertRaises(CommandError):
+            call_command('rebuild_campaign_finance', since="ontem")
+
+
+class TestRebuildWorkers(RebuildTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        router.load()
+
+    def test_campaigns_are_split_across_processes(self):
+        """
+        Testa se a reconstrução com vários processos produz o mesmo resultado por campanha.
+        """
+        campaigns = [self.create_campaign(f"Campanha {index}") for index in range(3)]
+        for index, (campaign, integration) in enumerate(campaigns):
+            for sale in range(index + 1):
+                self.enqueue(integration, f"pay-{index}-{sale}", "APPROVED", total_value=500)
+        process_webhook_batch()
+        expected = [self.snapshot(campaign) for campaign, _ in campaigns]
+        CampaignCounters.objects.update(total_approved=0, amount_approved=0)
+        FinanceLogs.objects.update(total_approved=0)
+
+        out = StringIO()
+        call_command('rebuild_campaign_finance', workers=2, stdout=out)
+
+        self.assertIn('3 campanhas', out.getvalue())
+        self.assertEqual([self.snapshot(campaign) for campaign, _ in campaigns], expected)
@@ -0,0 +1,188 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign, FinanceLogs, UserDailyFinance
+from campaigns.aggregations import FINANCE_SUM_FIELDS
+from campaigns.finance_log_utils import apply_finance_deltas, apply_status_transition
+from campaigns.finance_rebuild import rebuild_campaign_finance
+from integrations.models import Integration, IntegrationRequest
+from kwai.models import Kwai, KwaiDailyFinance
+from kwai.services import get_financial_data, set_kwai_campaigns
+from payments.models import UserSubscription
+from plans.models import Plan
+
+User = get_user_model()
+
+
+class TestFinanceRollups(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaigns = [
+            Campaign.objects.create(
+                user=self.user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            for index in range(3)
+        ]
+        self.kwai = Kwai.objects.create(user=self.user, name="Conta da Sarah - Kwai")
+        set_kwai_campaigns(self.kwai, self.campaigns[:2])
+        self.today = timezone.localdate()
+        self.client.force_authenticate(user=self.user)
+
+    def subscribe(self):
+        plan = Plan.objects.create(
+            name="Plano Teste", price=49.99, duration="month", duration_value=1, is_current=True,
+            campaign_limit=5, integration_limit=5, kwai_limit=5, description="Plano de teste")
+        UserSubscription.objects.create(
+            user=self.user, plan=plan, start_date=timezone.now(),
+            expiration=timezone.now() + timedelta(days=30), is_active=True, status="active")
+
+    def daily_sums(self, finance_logs):
+        rows = finance_logs.values('date').annotate(
+            **{field: Sum(field) for field in FINANCE_SUM_FIELDS}).order_by('date')
+        return {row.pop('date'): row for row in rows}
+
+    def rollup_days(self, rollups):
+        return {
+            row.pop('date'): row
+            for row in rollups.order_by('date').values('date', *FINANCE_SUM_FIELDS)
+        }
+
+    def assert_rollups_match_finance_logs(self):
+        self.assertEqual(
+            self.rollup_days(UserDailyFinance.objects.filter(user=self.user)),
+            self.daily_sums(FinanceLogs.objects.filter(campaign__user=self.user)))
+        self.assertEqual(
+            self.rollup_days(KwaiDailyFinance.objects.filter(kwai=self.kwai)),
+            self.daily_sums(FinanceLogs.objects.filter(campaign__kwai_campaigns__kwai=self.kwai)))
+
+    def test_writes_update_rollups_in_the_same_statement(self):
+        """
+        Testa se a escrita no FinanceLogs soma o delta nos rollups do usuário e
+        da conta Kwai no mesmo comando, sem consultas a mais.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('10.00'),
+                                    payment_method='PIX')
+
+        self.assertEqual(len(captured.captured_queries), 3)
+        upsert = [q['sql'] for q in captured.captured_queries if 'finances_logs' in q['sql']][0]
+        self.assertIn('"user_daily_finance"', upsert)
+        self.assertIn('"kwai_daily_finance"', upsert)
+        self.assertEqual(UserDailyFinance.objects.get(user=self.user, date=self.today).pix_amount,
+                         Decimal('10.00'))
+        self.assertEqual(KwaiDailyFinance.objects.get(kwai=self.kwai, date=self.today).total_approved, 1)
+
+    def test_random_writes_and_late_refunds(self):
+        """
+        Testa se os rollups acompanham escritas aleatórias, inclusive estornos
+        e chargebacks que chegam depois e são atribuídos a dias anteriores.
+        """
+        rng = random.Random(20240701)
+        sales = []
+        for _ in range(150):
+            campaign = rng.choice(self.campaigns)
+            date = self.today - timedelta(days=rng.randint(0, 45))
+            if sales and rng.random() < 0.3:
+                # Estorno/chargeback de uma venda aprovada, em um dia anterior ao atual
+                campaign, amount, method = sales.pop(rng.randrange(len(sales)))
+                apply_status_transition(campaign.pk, 'APPROVED', amount, rng.choice(['REFUNDED', 'CHARGEBACK']),
+                                        amount, method, date=date)
+            elif rng.random() < 0.2:
+                apply_finance_deltas(campaign.pk, date, {
+                    'total_ads': Decimal(rng.randint(0, 900)) / 100, 'total_clicks': rng.randint(0, 20)})
+            else:
+                amount = Decimal(rng.randint(100, 5000)) / 100
+                method = rng.choice(['PIX', 'CREDIT_CARD', 'BOLETO'])
+                apply_status_transition(campaign.pk, status='APPROVED', amount=amount,
+                                        payment_method=method, date=date)
+                sales.append((campaign, amount, method))
+
+        self.assert_rollups_match_finance_logs()
+
+        data = get_financial_data(user=self.user, start_date=self.today - timedelta(days=20), end_date=self.today)
+        expected = FinanceLogs.objects.filter(
+            campaign__user=self.user, date__gte=self.today - timedelta(days=20)).aggregate(
+            total_chargeback=Sum('total_chargeback'), amount_approved=Sum('amount_approved'))
+        self.assertEqual(data['total_chargeback'], expected['total_chargeback'])
+        self.assertEqual(data['amount_approved'], round(expected['amount_approved'], 2))
+
+    def test_kwai_update_attaches_and_detaches_campaigns(self):
+        """
+        Testa se alterar as campanhas da conta Kwai subtrai os dias das
+        campanhas removidas e soma os das campanhas adicionadas.
+        """
+        for index, campaign in enumerate(self.campaigns):
+            apply_finance_deltas(campaign.pk, self.today - timedelta(days=index), {
+                'total_approved': index + 1, 'amount_approved': Decimal('10.00') * (index + 1)})
+
+        self.subscribe()
+        url = reverse('kwai-detail', kwargs={'uid': str(self.kwai.uid)})
+        payload = {"name": "Conta da Sarah - Kwai", "campaigns": [
+            {"uid": str(self.campaigns[1].uid)}, {"uid": str(self.campaigns[2].uid)}]}
+        response = self.client.put(url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assert_rollups_match_finance_logs()
+        self.assertEqual(response.data['total_approved'], 5)
+        # O dia da campanha desvinculada deixa de existir no rollup da conta
+        self.assertFalse(KwaiDailyFinance.objects.filter(kwai=self.kwai, date=self.today).exists())
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(KwaiDailyFinance.objects.filter(kwai=self.kwai).exists())
+
+    def test_rebuild_and_deleted_campaigns(self):
+        """
+        Testa se a reconstrução do FinanceLogs e a exclusão de uma campanha
+        mantêm os rollups iguais à soma do FinanceLogs.
+        """
+        integration = Integration.objects.create(user=self.user, name="Integração", gateway="zeroone")
+        self.campaigns[0].integrations.set([integration])
+        apply_finance_deltas(self.campaigns[0].pk, self.today, {'total_pending': 4})
+        apply_finance_deltas(self.campaigns[1].pk, self.today, {'total_pending': 2})
+        IntegrationRequest.objects.create(
+            integration=integration, status="APPROVED", payment_id="pay-1", payment_method="PIX",
+            amount=Decimal('40.00'), response={}, created_at=timezone.now(), updated_at=timezone.now())
+
+        rebuild_campaign_finance(self.campaigns[0].pk, [integration.pk])
+        self.assert_rollups_match_finance_logs()
+        self.assertEqual(UserDailyFinance.objects.get(user=self.user, date=self.today).total_pending, 2)
+
+        self.campaigns[0].delete()
+        self.assert_rollups_match_finance_logs()
+        self.assertEqual(UserDailyFinance.objects.get(user=self.user, date=self.today).total_approved, 0)
+
+    def test_backfill_command(self):
+        """
+        Testa se o backfill recalcula os rollups divergentes e se o --since
+        mantém os dias anteriores.
+        """
+        old_day = self.today - timedelta(days=10)
+        apply_finance_deltas(self.campaigns[0].pk, old_day, {'total_refunded': 1, 'amount_refunded': Decimal('5.00')})
+        apply_finance_deltas(self.campaigns[1].pk, self.today, {'total_views': 30})
+        UserDailyFinance.objects.update(total_refunded=9, total_views=0)
+        KwaiDailyFinance.objects.all().delete()
+
+        call_command('backfill_finance_rollups', since=str(self.today), stdout=StringIO())
+        self.assertEqual(UserDailyFinance.objects.get(user=self.user, date=old_day).total_refunded, 9)
+        self.assertEqual(UserDailyFinance.objects.get(user=self.user, date=self.today).total_views, 30)
+
+        out = StringIO()
+        call_command('backfill_finance_rollups', stdout=out)
+        self.assertIn('1 contas Kwai', out.getvalue())
+        self.assert_rollups_match_finance_logs()
+
+        with self.assertRaises(CommandError):
+            call_command('backfill_finance_rollups', since="ontem")
@@ -0,0 +1,131 @@
+import multiprocessing
+import queue
+import uuid
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TransactionTestCase
+from campaigns.invalidation_bus import InvalidationBus, bus
+from custom_admin.reference_data import ReferenceData
+from integrations.models import Integration
+from integrations.routing import ROUTES_TAG
+
+User = get_user_model()
+
+
+def run_listener(mode, channel, tag, ready, stop, results):
+    """
+    Outro processo com um cache da tag: registra as chaves descartadas.
+    """
+    child_bus = InvalidationBus(mode=mode, channel=channel, poll_interval=0.05)
+    child_bus.subscribe(tag, results.put)
+    child_bus.enable()
+    child_bus.ensure_started()
+    if child_bus.listening.wait(10):
+        ready.set()
+    stop.wait(30)
+    child_bus.stop()
+
+
+class TestInvalidationBus(TransactionTestCase):
+
+    def setUp(self):
+        self.context = multiprocessing.get_context('fork')
+        self.ready = self.context.Event()
+        self.stop = self.context.Event()
+        self.results = self.context.Queue()
+        self.channel = f"test_{uuid.uuid4().hex}"
+        self.process = None
+
+    def tearDown(self):
+        self.stop.set()
+        if self.process is not None:
+            self.process.join(10)
+
+    def start_listener(self, mode, channel=None, tag='test_tag'):
+        self.process = self.context.Process(
+            target=run_listener,
+            args=(mode, channel or self.channel, tag, self.ready, self.stop, self.results))
+        self.process.start()
+        self.assertTrue(self.ready.wait(10))
+
+    def received(self):
+        return self.results.get(timeout=10)
+
+    def assertNothingReceived(self, timeout=0.3):
+        with self.assertRaises(queue.Empty):
+            self.results.get(timeout=timeout)
+
+    def test_notify_reaches_other_process_after_commit(self):
+        """
+        Testa se o outro processo descarta a chave publicada apenas após o
+        commit (o rollback descarta o aviso) e se tudo é descartado na conexão.
+        """
+        self.start_listener('notify')
+        # Avisos perdidos antes da conexão: tudo é descartado
+        self.assertIsNone(self.received())
+
+        publisher = InvalidationBus(mode='notify', channel=self.channel)
+        local = []
+        publisher.subscribe('test_tag', local.append)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                publisher.publish('test_tag', 'rolled-back')
+                raise RuntimeError
+        with transaction.atomic():
+            publisher.publish('test_tag', 'committed')
+            publisher.publish('other_tag', 'ignored')
+
+        self.assertEqual(self.received(), 'committed')
+        self.assertNothingReceived()
+        # O próprio processo descarta na hora (mesmo com rollback) e de novo após o commit
+        self.assertEqual(local, ['rolled-back', 'committed', 'committed'])
+
+    def test_tagged_model_changes_notify_other_process(self):
+        """
+        Testa se salvar um model marcado (integrações, nas rotas) avisa o outro processo.
+        """
+        self.start_listener('notify', channel=bus.channel, tag=ROUTES_TAG)
+        self.assertIsNone(self.received())
+
+        user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        Integration.objects.create(user=user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.assertIsNone(self.received())
+
+    def test_poll_mode_uses_version_stamps(self):
+        """
+        Testa se, no modo poll, o outro processo descarta a tag quando o
+        carimbo de versão muda após o commit.
+        """
+        self.start_listener('poll')
+        publisher = InvalidationBus(mode='poll', channel=self.channel)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                publisher.publish('test_tag', 'rolled-back')
+                raise RuntimeError
+        self.assertNothingReceived()
+
+        publisher.publish('test_tag', 'committed')
+        # O carimbo é da tag: todas as entradas são descartadas
+        self.assertIsNone(self.received())
+        self.assertNothingReceived()
+
+    def test_reload_before_commit_is_discarded(self):
+        """
+        Testa se uma recarga do cache entre o `publish` e o commit (outra
+        thread do processo lendo os dados anteriores ao commit) é descartada
+        após o commit, nos dois modos.
+        """
+        for mode in ('notify', 'poll'):
+            publisher = InvalidationBus(mode=mode, channel=self.channel)
+            data = ReferenceData('test', lambda: 'dados')
+            publisher.subscribe('test_tag', lambda key: data.invalidate())
+            data.get()
+
+            with transaction.atomic():
+                publisher.publish('test_tag')
+                self.assertFalse(data.loaded)
+                data.get()
+                self.assertTrue(data.loaded)
+            self.assertFalse(data.loaded, mode)
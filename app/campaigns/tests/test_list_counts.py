@@ -0,0 +1,125 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign
+from project.pagination import DefaultPagination
+
+User = get_user_model()
+
+
+class TestListCounts(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        for index in range(25):
+            Campaign.objects.create(
+                user=self.user, title=f"{'Promo' if index < 11 else 'Campanha'} {index}", method="CPC",
+                CPC=Decimal('1.00'))
+
+    def list_queries(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('campaign-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_single_page_counts_from_rows(self):
+        """
+        Testa se, na última página, o total sai das linhas da página (sem
+        COUNT nem EXISTS).
+        """
+        response, queries = self.list_queries({'page_size': 50})
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['count_approximate'])
+        self.assertFalse(any('COUNT(' in sql or sql.startswith('SELECT 1 AS') for sql in queries))
+
+        response, _ = self.list_queries({'page': 3})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIn('page=2', response.data['previous'])
+
+    def test_count_is_cached_per_user_and_filter(self):
+        """
+        Testa se o total exato fica no cache: a segunda request não faz COUNT
+        e o total é marcado como aproximado.
+        """
+        response, queries = self.list_queries({'page': 1})
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['count_approximate'])
+        self.assertEqual(sum('COUNT(' in sql for sql in queries), 1)
+        self.assertIn('page=2', response.data['next'])
+
+        response, queries = self.list_queries({'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertTrue(response.data['count_approximate'])
+        self.assertFalse(any('COUNT(' in sql for sql in queries))
+
+        # Outra busca é outro total
+        response, queries = self.list_queries({'search': 'Promo', 'page_size': 5})
+        self.assertEqual(response.data['count'], 11)
+        self.assertEqual(sum('COUNT(' in sql for sql in queries), 1)
+
+    @override_settings(LIST_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_planner_estimate_above_threshold(self):
+        """
+        Testa se, acima do limite, o total de uma listagem sem filtro vem da
+        estimativa do planner (sem COUNT).
+        """
+        paginator = DefaultPagination()
+        request = SimpleNamespace(user=self.user)
+        with CaptureQueriesContext(connection) as context:
+            count, approximate = paginator.count_rows(Campaign.objects.all(), request, None, 11)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertTrue(approximate)
+        self.assertGreaterEqual(count, 11)
+        self.assertTrue(any(sql.startswith('EXPLAIN') for sql in queries))
+        self.assertFalse(any('COUNT(' in sql for sql in queries))
+
+    @override_settings(LIST_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_filtered_list_counts_rows(self):
+        """
+        Testa se a listagem filtrada pelo usuário conta as linhas mesmo acima
+        do limite: a estimativa do planner não é usada com filtro.
+        """
+        other = User.objects.create_user(
+            cpf="52998224725", email="other@gmail.com", name="Outro Usuário", password="7lonAzJxss@")
+        for index in range(40):
+            Campaign.objects.create(user=other, title=f"Outra {index}", method="CPC", CPC=Decimal('1.00'))
+
+        response, queries = self.list_queries({'page': 1})
+        self.assertEqual(response.data['count'], 25)
+        self.assertFalse(response.data['count_approximate'])
+        self.assertFalse(any(sql.startswith('EXPLAIN') for sql in queries))
+        self.assertEqual(sum('COUNT(' in sql for sql in queries), 1)
+
+        response, _ = self.list_queries({'page': 'last'})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_empty_and_invalid_pages(self):
+        """
+        Testa a mensagem da busca sem resultados e o 404 das páginas inválidas.
+        """
+        response, _ = self.list_queries({'search': 'inexistente'})
+        self.assertEqual(response.data['count'], 0)
+        self.assertIn('detail', response.data)
+
+        response, _ = self.list_queries({'search': 'inexistente', 'page': 2})
+        self.assertEqual(response.data['count'], 0)
+
+        for page in (4, 0, 'abc'):
+            response = self.client.get(reverse('campaign-list'), {'page': page})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response, _ = self.list_queries({'page': 'last'})
+        self.assertEqual(len(response.data['results']), 5)
@@ -0,0 +1,165 @@
+import importlib
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from campaigns.models import Campaign, CampaignCounters, FinanceLogs
+from campaigns.aggregations import FINANCE_SUM_FIELDS, aggregate_finance_logs, aggregate_finance_range
+from campaigns.finance_log_utils import apply_finance_deltas, apply_status_transition
+
+User = get_user_model()
+
+running_totals_migration = importlib.import_module('campaigns.migrations.0034_financelogs_running_totals')
+
+
+class TestFinanceRunningTotals(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaigns = [
+            Campaign.objects.create(
+                user=self.user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            for index in range(2)
+        ]
+        self.today = timezone.localdate()
+
+    def assert_running_totals(self, campaign):
+        running = dict.fromkeys(FINANCE_SUM_FIELDS, 0)
+        for log in FinanceLogs.objects.filter(campaign=campaign).order_by('date'):
+            for field in FINANCE_SUM_FIELDS:
+                running[field] += getattr(log, field)
+                self.assertEqual(getattr(log, f'cum_{field}'), running[field], (log.date, field))
+
+    def test_backdated_writes_update_following_days(self):
+        """
+        Testa se uma escrita em um dia anterior soma o delta nos acumulados dos dias seguintes.
+        """
+        apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('10.00'),
+                                payment_method='PIX', date=self.today)
+        apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('5.00'),
+                                payment_method='PIX', date=self.today - timedelta(days=5))
+        apply_finance_deltas(self.campaigns[0].pk, self.today - timedelta(days=2), {'total_ads': Decimal('1.50')})
+
+        today_log = FinanceLogs.objects.get(campaign=self.campaigns[0], date=self.today)
+        self.assertEqual(today_log.total_approved, 1)
+        self.assertEqual(today_log.cum_total_approved, 2)
+        self.assertEqual(today_log.cum_amount_approved, Decimal('15.00'))
+        self.assertEqual(today_log.cum_total_ads, Decimal('1.50'))
+        self.assert_running_totals(self.campaigns[0])
+
+    def test_random_ranges_match_daily_sums(self):
+        """
+        Testa se os totais por acumulados são iguais à soma dos dias para
+        escritas aleatórias (fora de ordem) e intervalos aleatórios.
+        """
+        rng = random.Random(20240615)
+        statuses = ['APPROVED', 'PENDING', 'REFUNDED', 'CHARGEBACK']
+        for _ in range(200):
+            campaign = rng.choice(self.campaigns)
+            date = self.today - timedelta(days=rng.randint(0, 60))
+            if rng.random() < 0.2:
+                apply_finance_deltas(campaign.pk, date, {
+                    'total_ads': Decimal(rng.randint(0, 900)) / 100, 'total_views': rng.randint(0, 50)})
+            else:
+                apply_status_transition(
+                    campaign.pk, rng.choice(statuses + [None]), Decimal(rng.randint(100, 5000)) / 100,
+                    rng.choice(statuses), Decimal(rng.randint(100, 5000)) / 100,
+                    rng.choice(['PIX', 'CREDIT_CARD', 'BOLETO']), date=date)
+
+        for campaign in self.campaigns:
+            self.assert_running_totals(campaign)
+
+        campaigns = Campaign.objects.filter(user=self.user)
+        for _ in range(30):
+            start = self.today - timedelta(days=rng.randint(0, 70))
+            end = start + timedelta(days=rng.randint(0, 40))
+            expected = aggregate_finance_logs(FinanceLogs.objects.filter(
+                campaign__user=self.user, date__gte=start, date__lte=end))
+            totals = aggregate_finance_range(campaigns, start, end)
+            for field in FINANCE_SUM_FIELDS + ['profit', 'first_date', 'last_date']:
+                self.assertEqual(totals[field], expected[field], (start, end, field))
+
+    def test_range_is_a_single_query(self):
+        """
+        Testa se o total de um intervalo é uma única consulta sem somar as linhas diárias.
+        """
+        for days_ago in range(120):
+            apply_finance_deltas(self.campaigns[0].pk, self.today - timedelta(days=days_ago), {
+                'total_approved': 1, 'amount_approved': Decimal('2.00')})
+
+        with CaptureQueriesContext(connection) as captured:
+            totals = aggregate_finance_range(
+                Campaign.objects.filter(pk=self.campaigns[0].pk), self.today - timedelta(days=89), self.today)
+
+        self.assertEqual(len(captured.captured_queries), 1)
+        # Nenhuma soma das linhas diárias: apenas os acumulados do fim e da véspera do início
+        self.assertIn('"cum_total_approved"', captured.captured_queries[0]['sql'])
+        self.assertNotIn('SUM("finances_logs"', captured.captured_queries[0]['sql'])
+        self.assertEqual(totals['total_approved'], 90)
+        self.assertEqual(totals['amount_approved'], Decimal('180.00'))
+        self.assertEqual(totals['first_date'], self.today - timedelta(days=89))
+
+
+class TestSnapshotConversion(TestCase):
+
+    def row(self, approved, amount):
+        row = dict.fromkeys(running_totals_migration.SNAPSHOT_COLUMNS, 0)
+        row.update(total_approved=approved, amount_approved=Decimal(amount))
+        return row
+
+    def counters(self, approved, amount):
+        return self.row(approved, amount)
+
+    def test_finds_where_snapshots_end(self):
+        """
+        Testa a detecção das linhas antigas (retratos acumulados) seguidas de deltas.
+        """
+        find_snapshot_rows = running_totals_migration.find_snapshot_rows
+        snapshots = [self.row(1, '10'), self.row(3, '30'), self.row(4, '40')]
+        deltas = [self.row(1, '10'), self.row(2, '20')]
+
+        # Apenas deltas: nada a converter
+        self.assertEqual(find_snapshot_rows(deltas, self.counters(3, '30')), 0)
+        # Apenas retratos: o último retrato é igual aos contadores
+        self.assertEqual(find_snapshot_rows(snapshots, self.counters(4, '40')), 3)
+        # Retratos seguidos de deltas
+        self.assertEqual(find_snapshot_rows(snapshots + deltas, self.counters(7, '70')), 3)
+        # Sem correspondência: as linhas são mantidas e a campanha é reportada
+        self.assertIsNone(find_snapshot_rows(snapshots, self.counters(99, '1')))
+
+    def test_reports_unmatched_campaigns(self):
+        """
+        Testa se a migração mantém e lista as campanhas cujas linhas não batem
+        com os contadores, e converte as demais.
+        """
+        user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        matched, unmatched = [
+            Campaign.objects.create(user=user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            for index in range(2)
+        ]
+        today = timezone.localdate()
+        for campaign in (matched, unmatched):
+            for offset, (approved, amount) in enumerate([(1, '10'), (3, '30')]):
+                # `date` é auto_now_add: a data antiga é gravada depois
+                log = FinanceLogs.objects.create(
+                    campaign=campaign, total_approved=approved, amount_approved=Decimal(amount))
+                FinanceLogs.objects.filter(pk=log.pk).update(date=today - timedelta(days=3 - offset))
+        CampaignCounters.objects.filter(campaign=matched).update(total_approved=3, amount_approved=Decimal('30'))
+        CampaignCounters.objects.filter(campaign=unmatched).update(total_approved=9, amount_approved=Decimal('90'))
+
+        with self.assertLogs('django', level='WARNING') as logs:
+            running_totals_migration.convert_snapshots_to_deltas(apps, None)
+
+        self.assertIn(str(unmatched.uid), logs.output[0])
+        self.assertNotIn(str(matched.uid), logs.output[0])
+        approved = lambda campaign: list(FinanceLogs.objects.filter(campaign=campaign, date__lt=today).order_by(
+            'date').values_list('total_approved', flat=True))
+        self.assertEqual(approved(matched), [1, 2])
+        self.assertEqual(approved(unmatched), [1, 3])
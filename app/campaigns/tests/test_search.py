@@ -0,0 +1,103 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign
+from campaigns.search import unaccent
+
+User = get_user_model()
+
+
+class TestDocumentSearch(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        for title, description in [
+            ("Promoção de Verão", "Campanhas de inverno e verão"),
+            ("Black Friday", "Ofertas da semana"),
+            ("Lançamento", "Curso de programação"),
+        ]:
+            Campaign.objects.create(
+                user=self.user, title=title, description=description, method="CPC", CPC=Decimal('1.00'))
+
+    def search(self, term, url=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url or reverse('campaign-list'), {'search': term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def titles(self, term):
+        response, _ = self.search(term)
+        return sorted(item['title'] for item in response.data['results'])
+
+    def test_unaccent(self):
+        """
+        Testa a remoção dos acentos (igual no Python e no banco).
+        """
+        self.assertEqual(unaccent("Promoção de VERÃO"), "promocao de verao")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT search_unaccent(%s)", ["Promoção de VERÃO"])
+            self.assertEqual(cursor.fetchone()[0], "promocao de verao")
+
+    def test_accent_insensitive_prefix_search(self):
+        """
+        Testa se a busca ignora acentos e maiúsculas, casa prefixos e radicais
+        e exige todos os termos.
+        """
+        self.assertEqual(self.titles("promocao"), ["Promoção de Verão"])
+        self.assertEqual(self.titles("VERÃO"), ["Promoção de Verão"])
+        self.assertEqual(self.titles("lanç"), ["Lançamento"])
+        self.assertEqual(self.titles("programacao"), ["Lançamento"])
+        self.assertEqual(self.titles("campanha"), ["Promoção de Verão"])
+        self.assertEqual(self.titles("ofertas da"), ["Black Friday"])
+        self.assertEqual(self.titles("black verao"), [])
+        self.assertEqual(self.titles("cpc"), ["Black Friday", "Lançamento", "Promoção de Verão"])
+        self.assertEqual(self.titles(timezone.now().strftime("%Y-%m")),
+                         ["Black Friday", "Lançamento", "Promoção de Verão"])
+
+    def test_search_uses_document(self):
+        """
+        Testa se a busca filtra pelo documento indexado, sem ILIKE nos campos.
+        """
+        _, queries = self.search("verao")
+        listing = [sql for sql in queries if 'FROM "campaigns"' in sql and '@@' in sql]
+        self.assertTrue(listing)
+        self.assertFalse(any('ILIKE' in sql.upper() for sql in queries))
+
+        # Sem letras ou números: a busca padrão do SearchFilter
+        response, queries = self.search("--")
+        self.assertEqual(response.data['count'], 0)
+        self.assertTrue(any('LIKE' in sql.upper() for sql in queries))
+
+    def test_document_follows_changes(self):
+        """
+        Testa se o documento acompanha o save e o update em massa.
+        """
+        campaign = Campaign.objects.get(title="Black Friday")
+        campaign.title = "Cyber Monday"
+        campaign.save()
+        self.assertEqual(self.titles("cyber"), ["Cyber Monday"])
+        self.assertEqual(self.titles("black"), [])
+
+        Campaign.objects.filter(pk=campaign.pk).update(description="Descontos de Natal")
+        self.assertEqual(self.titles("natal"), ["Cyber Monday"])
+
+    def test_admin_user_search(self):
+        """
+        Testa a busca de usuários do admin pelo nome sem acentos e por partes do e-mail.
+        """
+        admin = User.objects.create_superuser(
+            cpf="52998224725", email="admin@gmail.com", name="Admin", password="7lonAzJxss@")
+        User.objects.create_user(
+            cpf="11144477735", email="joao.silva@empresa.com.br", name="João Silva", password="7lonAzJxss@")
+        self.client.force_authenticate(user=admin)
+
+        for term in ("joao", "joao.silva@empresa", "empresa"):
+            response, _ = self.search(term, reverse('user-list'))
+            self.assertEqual([item['name'] for item in response.data['results']], ["João Silva"], term)
@@ -0,0 +1,171 @@
+import random
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from accounts.leaderboard import leaderboard
+from campaigns.models import Campaign, CampaignCounters
+from campaigns.finance_accumulator import FinanceDeltaAccumulator
+from campaigns.finance_log_utils import apply_finance_deltas, apply_status_transition, get_transition_deltas
+from integrations.campaign_utils import recalculate_campaigns
+
+User = get_user_model()
+
+STATUSES = ['APPROVED', 'PENDING', 'REFUNDED', 'REJECTED', 'CHARGEBACK', 'ABANDONED', 'CANCELED']
+PAYMENT_METHODS = ['PIX', 'CREDIT_CARD', 'DEBIT_CARD', 'BOLETO']
+
+
+class TestIncrementalUserProfit(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.campaigns = [
+            Campaign.objects.create(
+                user=self.user, title=f"Campanha {index}", method="CPC", CPC=Decimal('1.00'))
+            for index in range(3)
+        ]
+
+    def full_profit(self):
+        """Profit recalculado do zero (SUM do profit das campanhas)."""
+        total = CampaignCounters.objects.filter(campaign__user=self.user).aggregate(
+            total=Sum('profit'))['total'] or 0
+        return Decimal(total).quantize(Decimal('0.01'))
+
+    def assert_profit_matches(self):
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profit, self.full_profit())
+
+    def test_approved_sale_updates_user_profit(self):
+        """
+        Testa se uma venda aprovada soma o lucro no usuário sem recalcular as campanhas.
+        """
+        apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('30.00'))
+        apply_status_transition(
+            self.campaigns[1].pk, status='APPROVED', amount=Decimal('12.50'), shards=0)
+        apply_status_transition(
+            self.campaigns[0].pk, 'APPROVED', Decimal('30.00'), 'REFUNDED', Decimal('30.00'))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profit, Decimal('12.50'))
+
+    def test_random_event_sequences_match_full_recalculation(self):
+        """
+        Testa se o profit incremental é igual ao recalculado do zero após
+        sequências aleatórias de transições, custos de anúncios e flushes do acumulador.
+        """
+        rng = random.Random(20240601)
+        today = timezone.localdate()
+        sales = {}
+        accumulator = FinanceDeltaAccumulator(max_events=7, max_delay_ms=float('inf'))
+
+        for step in range(300):
+            campaign = rng.choice(self.campaigns)
+            action = rng.random()
+
+            if action < 0.1:
+                # Custo de anúncios (pode ser corrigido para baixo)
+                apply_finance_deltas(campaign.pk, today, {
+                    'total_ads': Decimal(rng.randint(-500, 2000)) / 100})
+                continue
+
+            sale_key = (campaign.pk, rng.randint(0, 15))
+            old_status, old_amount, old_method = sales.get(sale_key, (None, None, None))
+            status = rng.choice(STATUSES)
+            amount = Decimal(rng.randint(100, 50000)) / 100
+            method = rng.choice(PAYMENT_METHODS)
+            sales[sale_key] = (status, amount, method)
+
+            if action < 0.5:
+                apply_status_transition(
+                    campaign.pk, old_status, old_amount, status, amount, method, old_method)
+            else:
+                accumulator.add(campaign.pk, today, get_transition_deltas(
+                    old_status, old_amount, status, amount, method, old_method))
+                if accumulator.should_flush():
+                    accumulator.flush()
+
+            if step % 25 == 0:
+                accumulator.flush()
+                self.assert_profit_matches()
+
+        accumulator.flush()
+        self.assert_profit_matches()
+
+    def test_campaign_delete_removes_profit(self):
+        """
+        Testa se excluir uma campanha remove o lucro dela do usuário.
+        """
+        apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('30.00'))
+        apply_status_transition(self.campaigns[1].pk, status='APPROVED', amount=Decimal('5.00'))
+
+        self.campaigns[0].delete()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profit, Decimal('5.00'))
+
+    def test_reconcile_command_fixes_drift(self):
+        """
+        Testa se o reconcile_user_profit corrige o profit divergente em lote.
+        """
+        apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('30.00'))
+        other = User.objects.create_user(
+            cpf="52998224725", email="other@gmail.com", name="Outro Usuário", password="7lonAzJxss@")
+        User.objects.filter(pk__in=[self.user.pk, other.pk]).update(profit=Decimal('999.00'))
+
+        out = StringIO()
+        call_command('reconcile_user_profit', dry_run=True, stdout=out)
+        self.assertIn('2 usuários', out.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profit, Decimal('999.00'))
+
+        call_command('reconcile_user_profit', stdout=StringIO())
+        self.assert_profit_matches()
+        self.assertEqual(self.user.profit, Decimal('30.00'))
+        other.refresh_from_db()
+        self.assertEqual(other.profit, Decimal('0.00'))
+
+    def test_recalculate_keeps_concurrent_increments(self):
+        """
+        Testa se recalcular o profit de uma campanha carregada antes de uma venda
+        mantém os contadores da venda e o profit do usuário.
+        """
+        campaign = Campaign.objects.select_related('counters').get(pk=self.campaigns[0].pk)
+        apply_status_transition(campaign.pk, status='APPROVED', amount=Decimal('30.00'))
+
+        recalculate_campaigns(campaign, Decimal('10.00'), Decimal('30.00'))
+
+        counters = CampaignCounters.objects.get(campaign=campaign)
+        self.assertEqual(counters.total_approved, 1)
+        self.assertEqual(counters.amount_approved, Decimal('30.00'))
+        self.assertEqual(counters.profit, Decimal('20.00'))
+        self.assertEqual(counters.ROI, Decimal('200.00'))
+        self.assert_profit_matches()
+
+    def test_account_saves_keep_concurrent_profit(self):
+        """
+        Testa se os saves de conta (login, perfil) de um usuário carregado antes de
+        uma venda não sobrescrevem o profit nem o enviam ao ranking, e se o
+        `recalculate_profit` grava e envia o profit.
+        """
+        stale = User.objects.get(pk=self.user.pk)
+        apply_status_transition(self.campaigns[0].pk, status='APPROVED', amount=Decimal('30.00'))
+
+        with mock.patch.object(leaderboard, 'record') as record, self.captureOnCommitCallbacks(execute=True):
+            stale.increment_login_attempts()
+            stale.reset_login_attempts()
+            stale.name = "Sarah Lima"
+            stale.save()
+        record.assert_not_called()
+        self.assert_profit_matches()
+        self.assertEqual(self.user.profit, Decimal('30.00'))
+        self.assertEqual(self.user.name, "Sarah Lima")
+
+        with mock.patch.object(leaderboard, 'record') as record, self.captureOnCommitCallbacks(execute=True):
+            stale.recalculate_profit()
+        self.assertEqual(stale.profit, Decimal('30.00'))
+        record.assert_called_once_with(self.user.pk, Decimal('30.00'))
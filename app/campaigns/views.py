@@ -2,6 +2,7 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework import serializers
 import re
+from django.utils import timezone
 from django.utils.html import strip_tags
 import html
 from datetime import datetime, timedelta
@@ -11,6 +12,10 @@ from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from .models import Campaign
 from .serializers import CampaignSerializer
+from .search import DocumentSearchFilter
+from .aggregations import get_date_range, get_campaigns_finance_context, get_granularity
+from .dashboard_cache import dashboard_cache
+from integrations.signals import invalidate_routes
 from django.conf import settings
 import logging
 from .schema import schemas
@@ -27,7 +32,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
     serializer_class = CampaignSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'uid'
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, DocumentSearchFilter]
     ordering_fields = ['title', 'created_at']
     search_fields = ['title', 'description', 'method', 'created_at']
 
@@ -57,7 +62,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
         try:
 
             if not start_date and not end_date:
-                end_date = datetime.now().date()
+                end_date = timezone.localdate()
                 start_date = end_date - timedelta(days=30)
 
             elif start_date and not end_date:
@@ -80,7 +85,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Retorna as campanhas do usuário autenticado"""
-        return self.queryset.filter(user=self.request.user).prefetch_related('integrations')
+        return self.queryset.filter(user=self.request.user).select_related('counters').prefetch_related('integrations')
 
     def list(self, request, *args, **kwargs):
         """
@@ -89,26 +94,56 @@ class CampaignViewSet(viewsets.ModelViewSet):
         """
         try:
             queryset = self.filter_queryset(self.get_queryset())
-            # Verifica se o queryset está vazio
-            if not queryset.exists():
-                return Response(
-                    {"count": 0, "detail": "Nenhuma campanha encontrada com os critérios de busca.", "results": []}
-                )
+            # A página é buscada primeiro: uma página vazia indica a busca sem resultados
+            page = self.paginate_queryset(queryset)
+        except NotFound:
+            raise
         except Exception as e:
             return Response(
                 {"count": 0, "results": [],
                     "detail": "O parâmetro de busca contém caracteres inválidos."},
             )
 
+        if page is not None and not page:
+            return Response(
+                {"count": 0, "detail": "Nenhuma campanha encontrada com os critérios de busca.", "results": []}
+            )
+
         # Caso contrário, retorna os resultados normalmente
-        page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = self.get_serializer(
+                page, many=True, context=self.get_page_serializer_context(page))
             return self.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(
+            queryset, many=True, context=self.get_page_serializer_context(queryset))
         return Response(serializer.data)
 
+    def get_page_serializer_context(self, campaigns):
+        """
+        Retorna o contexto do serializer com os totais e overviews de todas as
+        campanhas da página, calculados em consultas agrupadas por campanha.
+        """
+        context = self.get_serializer_context()
+        try:
+            start_date, end_date = get_date_range(
+                self.request.query_params.get('start', None),
+                self.request.query_params.get('end', None))
+        except ValueError:
+            raise ValidationError(
+                {"detail": "Os parâmetros de data devem estar no formato YYYY-MM-DD."})
+        try:
+            granularity = get_granularity(self.request.query_params.get('granularity'))
+        except ValueError:
+            raise ValidationError(
+                {"detail": "O parâmetro granularity deve ser day, week ou month."})
+
+        campaign_ids = [campaign.pk for campaign in campaigns]
+        sharded_ids = [campaign.pk for campaign in campaigns if campaign.counter_shards > 1]
+        context.update(get_campaigns_finance_context(
+            campaign_ids, start_date, end_date, sharded_ids, granularity))
+        return context
+
     def perform_create(self, serializer):
         """Vincula automaticamente o usuário logado à campanha"""
         serializer.save(user=self.request.user)
@@ -134,9 +169,16 @@ class CampaignViewSet(viewsets.ModelViewSet):
         return response
 
     def retrieve(self, request, *args, **kwargs):
-        """Adiciona os links do webhook na resposta do detalhe da campanha"""
-        response = super().retrieve(request, *args, **kwargs)
-        
+        """
+        Adiciona os links do webhook na resposta do detalhe da campanha.
+        Os totais e overviews vêm do cache dos dashboards (ver `campaigns.dashboard_cache`).
+        """
+        instance = self.get_object()
+        data = dashboard_cache.get_or_compute(
+            request.user.pk, f"campaign-detail:{instance.uid}", request.query_params,
+            lambda: self.get_serializer(instance).data)
+        response = Response(dict(data))
+
         # Usar o domínio configurado no .env
         base_webhook_url = settings.WEBHOOK_BASE_URL
 
@@ -230,6 +272,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
                     integration.save()
             deleted_count = instances.count()
             instances.update(deleted=True)
+            invalidate_routes()
 
         return Response(
             {
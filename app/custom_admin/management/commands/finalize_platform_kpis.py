@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
+from custom_admin.platform_kpis import finalize_platform_kpis, refresh_platform_kpis
+import logging
+logger = logging.getLogger('django')
+
+
+class Command(BaseCommand):
+    help = (
+        'Finaliza os indicadores diários da plataforma (platform_daily_kpis): recalcula os dias '
+        'fechados a partir dos cadastros, assinaturas, pagamentos e rollups financeiros. Com '
+        '--today, atualiza apenas a parte financeira do dia atual.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, default=None,
+                            help='Recalcula a partir deste dia (AAAA-MM-DD) até ontem, ex.: carga inicial. '
+                                 f'Padrão: os últimos {settings.PLATFORM_KPIS_LOOKBACK_DAYS} dias.')
+        parser.add_argument('--today', action='store_true',
+                            help='Atualiza a parte financeira do dia atual (executado a cada minuto).')
+
+    def handle(self, *args, **options):
+        today = localdate()
+        if options['today']:
+            refresh_platform_kpis(today, today, events=False)
+            self.stdout.write(self.style.SUCCESS(f"Indicadores financeiros de {today} atualizados."))
+            return
+
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Data inválida: {options['since']} (use AAAA-MM-DD).")
+            days = refresh_platform_kpis(since, today - timedelta(days=1))
+        else:
+            days = finalize_platform_kpis()
+
+        logger.info(f"Indicadores da plataforma finalizados: {days} dias.")
+        self.stdout.write(self.style.SUCCESS(f"{days} dias finalizados."))
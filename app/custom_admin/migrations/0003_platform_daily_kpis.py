@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_admin', '0002_alter_configuration_default_pix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformDailyKPIs',
+            fields=[
+                ('total_views', models.IntegerField(default=0)),
+                ('total_clicks', models.IntegerField(default=0)),
+                ('total_approved', models.IntegerField(default=0)),
+                ('total_pending', models.IntegerField(default=0)),
+                ('total_refunded', models.IntegerField(default=0)),
+                ('total_abandoned', models.IntegerField(default=0)),
+                ('total_chargeback', models.IntegerField(default=0)),
+                ('total_rejected', models.IntegerField(default=0)),
+                ('amount_approved', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_pending', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_refunded', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_rejected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_chargeback', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_abandoned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_total', models.IntegerField(default=0)),
+                ('pix_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('pix_total', models.IntegerField(default=0)),
+                ('debit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('debit_card_total', models.IntegerField(default=0)),
+                ('boleto_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('boleto_total', models.IntegerField(default=0)),
+                ('total_ads', models.DecimalField(decimal_places=8, default=0, max_digits=17)),
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('registrations', models.IntegerField(default=0)),
+                ('activations', models.IntegerField(default=0)),
+                ('subscription_payments', models.IntegerField(default=0)),
+                ('subscription_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('finalized_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'platform_daily_kpis',
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from campaigns.models import FinanceRollupCounters
 
 
 class Configuration(models.Model):
@@ -40,3 +41,29 @@ class Configuration(models.Model):
 
     class Meta:
         db_table = 'adm_configuration'
+
+
+class PlatformDailyKPIs(FinanceRollupCounters):
+    """
+    Indicadores diários da plataforma lidos pelos relatórios do admin:
+    cadastros, assinaturas ativadas, pagamentos de assinaturas e a soma
+    financeira de todos os usuários no dia.
+
+    Os eventos (cadastros, ativações e pagamentos) são somados na linha do
+    dia pelos signals (ver `custom_admin.platform_kpis`); a parte financeira
+    do dia atual é atualizada a cada minuto a partir dos rollups diários dos
+    usuários. Os dias fechados são recalculados das tabelas de origem pelo
+    `manage.py finalize_platform_kpis`.
+    """
+    date = models.DateField(primary_key=True)
+    registrations = models.IntegerField(default=0)
+    activations = models.IntegerField(default=0)
+    subscription_payments = models.IntegerField(default=0)
+    subscription_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'platform_daily_kpis'
+
+    def __str__(self):
+        return f"PlatformDailyKPIs on {self.date}"
@@ -0,0 +1,159 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from accounts.models import Usuario
+from campaigns.aggregations import FINANCE_SUM_FIELDS, build_finance_totals, finance_sum_annotations
+from campaigns.models import UserDailyFinance
+from payments.models import SubscriptionPayment, UserSubscription
+from .models import PlatformDailyKPIs
+
+# Indicadores somados pelos eventos (cadastros, ativações e pagamentos de assinaturas)
+KPI_EVENT_FIELDS = [
+    'registrations',
+    'activations',
+    'subscription_payments',
+    'subscription_revenue',
+]
+
+KPI_FIELDS = KPI_EVENT_FIELDS + FINANCE_SUM_FIELDS
+
+
+def local_date(value):
+    """
+    Retorna o dia (no fuso do projeto) de um datetime, como os filtros `__date`.
+    """
+    return timezone.localdate(value)
+
+
+def increment_platform_kpis(date, **deltas):
+    """
+    Soma os deltas na linha do dia, criando-a se necessário, em um único
+    `INSERT ... ON CONFLICT DO UPDATE`.
+
+    Ex.: `increment_platform_kpis(date, registrations=1)`.
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(KPI_EVENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Indicadores inválidos: {', '.join(sorted(unknown))}.")
+
+    qn = connection.ops.quote_name
+    table = qn(PlatformDailyKPIs._meta.db_table)
+    columns = ', '.join(qn(field) for field in KPI_FIELDS)
+    placeholders = ', '.join(['%s'] * len(KPI_FIELDS))
+    assignments = ', '.join(f"{qn(field)} = {table}.{qn(field)} + EXCLUDED.{qn(field)}" for field in deltas)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (date, {columns}) VALUES (%s, {placeholders}) "
+            f"ON CONFLICT (date) DO UPDATE SET {assignments}",
+            [date] + [deltas.get(field, 0) for field in KPI_FIELDS])
+
+
+def _daily_counts(queryset, date_field, **annotations):
+    rows = queryset.annotate(day=TruncDate(date_field)).values('day').annotate(**annotations)
+    return {row.pop('day'): row for row in rows}
+
+
+def refresh_platform_kpis(start_date, end_date, events=True):
+    """
+    Recalcula as linhas dos dias [start_date, end_date] a partir das tabelas
+    de origem: a parte financeira pelos rollups diários dos usuários e, com
+    `events`, os cadastros (Usuario), as ativações (UserSubscription ativas
+    pelo dia de início) e os pagamentos de assinaturas pagos.
+
+    Os dias anteriores a hoje são marcados como finalizados. A tabela fica
+    bloqueada para escrita durante o recálculo: os signals em andamento
+    aguardam e somam seus deltas depois, sem serem contados duas vezes.
+
+    Returns:
+        int: Quantidade de dias gravados.
+    """
+    today = timezone.localdate()
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    if not days:
+        return 0
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {connection.ops.quote_name(PlatformDailyKPIs._meta.db_table)} IN EXCLUSIVE MODE")
+
+        finance = UserDailyFinance.objects.filter(date__gte=start_date, date__lte=end_date).values(
+            'date').annotate(**finance_sum_annotations())
+        rows = {day: {} for day in days}
+        for row in finance:
+            rows[row.pop('date')].update(row)
+
+        if events:
+            registrations = _daily_counts(
+                Usuario.objects.filter(date_joined__date__gte=start_date, date_joined__date__lte=end_date),
+                'date_joined', registrations=Count('pk'))
+            activations = _daily_counts(
+                UserSubscription.objects.filter(
+                    start_date__date__gte=start_date, start_date__date__lte=end_date, is_active=True),
+                'start_date', activations=Count('pk'))
+            payments = _daily_counts(
+                SubscriptionPayment.objects.filter(
+                    created_at__date__gte=start_date, created_at__date__lte=end_date, status=True),
+                'created_at', subscription_payments=Count('pk'), subscription_revenue=Sum('price'))
+            for day, row in rows.items():
+                for counts in (registrations, activations, payments):
+                    row.update(counts.get(day, {}))
+
+        update_fields = (KPI_FIELDS if events else FINANCE_SUM_FIELDS) + ['finalized_at']
+        PlatformDailyKPIs.objects.bulk_create(
+            [
+                PlatformDailyKPIs(
+                    date=day, finalized_at=timezone.now() if day < today else None,
+                    **{field: row.get(field) or 0 for field in KPI_FIELDS})
+                for day, row in rows.items()
+            ],
+            update_conflicts=True, unique_fields=['date'], update_fields=update_fields,
+        )
+    return len(days)
+
+
+def finalize_platform_kpis(end_date=None, lookback_days=None):
+    """
+    Recalcula e finaliza os dias fechados dos últimos `lookback_days` dias
+    (padrão: PLATFORM_KPIS_LOOKBACK_DAYS) até `end_date` (padrão: ontem),
+    cobrindo estornos e chargebacks que chegam depois do dia da venda.
+
+    Returns:
+        int: Quantidade de dias gravados.
+    """
+    if end_date is None:
+        end_date = timezone.localdate() - timedelta(days=1)
+    if lookback_days is None:
+        lookback_days = settings.PLATFORM_KPIS_LOOKBACK_DAYS
+    start_date = end_date - timedelta(days=max(lookback_days, 1) - 1)
+    return refresh_platform_kpis(start_date, end_date)
+
+
+def get_platform_kpis(start_date, end_date):
+    """
+    Retorna as linhas do intervalo ({dia: {indicador: valor}}) em uma única
+    leitura pela chave primária (dia). Dias sem linha não têm eventos.
+    """
+    rows = PlatformDailyKPIs.objects.filter(date__gte=start_date, date__lte=end_date).values('date', *KPI_FIELDS)
+    return {row.pop('date'): row for row in rows}
+
+
+def sum_platform_kpis(kpis):
+    """
+    Soma as linhas de `get_platform_kpis`.
+
+    Returns:
+        tuple: ({indicador de evento: total}, totais financeiros — ver `build_finance_totals`).
+    """
+    events = {field: sum(row[field] for row in kpis.values()) for field in KPI_EVENT_FIELDS}
+    finance = {field: sum(row[field] for row in kpis.values()) for field in FINANCE_SUM_FIELDS}
+    days = sorted(kpis)
+    finance['first_date'] = days[0] if days else None
+    finance['last_date'] = days[-1] if days else None
+    return events, build_finance_totals(finance)
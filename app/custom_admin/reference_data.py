@@ -0,0 +1,149 @@
+import logging
+import threading
+import uuid
+from campaigns.invalidation_bus import bus
+from goals.models import Goal
+from plans.models import Plan
+from tutorials.models import Tutorial
+from .models import Configuration
+
+logger = logging.getLogger('django')
+
+# Tag dos dados de referência no barramento de invalidação; a chave é o nome do cache
+REFERENCE_DATA_TAG = 'reference_data'
+
+
+class ReferenceData:
+    """
+    Cache por processo de uma tabela de referência: lida em quase toda
+    request e alterada poucas vezes por mês pelo admin.
+
+    A tabela é carregada de uma vez na primeira leitura e as seguintes não
+    acessam o banco. Salvar ou excluir uma linha publica o nome do cache na
+    tag `REFERENCE_DATA_TAG` (ver `custom_admin.signals`), descartando a cópia
+    deste e dos demais processos; cada descarte avança a versão (`generation`).
+
+    Os objetos retornados são compartilhados entre as requests do processo e
+    não devem ser alterados: as telas de edição do admin leem do banco.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded = False
+        self.generation = 0
+
+    def load(self):
+        generation = self.generation
+        value = self.loader()
+        with self.lock:
+            self.value = value
+            # Uma alteração durante a carga mantém o cache sujo
+            self.loaded = generation == self.generation
+        logger.debug(f"Dados de referência carregados: {self.name} (versão {generation}).")
+        return value
+
+    def invalidate(self):
+        """
+        Descarta a cópia do processo; a próxima leitura recarrega do banco.
+        """
+        with self.lock:
+            self.generation += 1
+            self.loaded = False
+
+    def get(self):
+        bus.ensure_started()
+        if not self.loaded:
+            return self.load()
+        return self.value
+
+
+class PlanCatalog:
+    """
+    Planos (com as características já carregadas), em ordem de criação.
+    """
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.by_uid = {plan.uid: plan for plan in plans}
+        self.by_id = {plan.pk: plan for plan in plans}
+
+    def __iter__(self):
+        return iter(self.plans)
+
+    def __len__(self):
+        return len(self.plans)
+
+    def get(self, uid):
+        """
+        Retorna o plano pelo uid.
+
+        Raises:
+            Plan.DoesNotExist: Se o plano não existir (ou o uid for inválido).
+        """
+        try:
+            return self.by_uid[uid if isinstance(uid, uuid.UUID) else uuid.UUID(str(uid))]
+        except (KeyError, ValueError):
+            raise Plan.DoesNotExist(f"Plano {uid} não encontrado.")
+
+
+configuration = ReferenceData('configuration', lambda: Configuration.objects.first())
+plan_catalog = ReferenceData(
+    'plan_catalog', lambda: PlanCatalog(list(Plan.objects.prefetch_related('features').order_by('pk'))))
+goals = ReferenceData('goals', lambda: list(Goal.objects.order_by('min', 'pk')))
+tutorials = ReferenceData('tutorials', lambda: list(Tutorial.objects.order_by('pk')))
+
+REFERENCE_DATA = {data.name: data for data in (configuration, plan_catalog, goals, tutorials)}
+
+
+def invalidate_reference_data(name=None):
+    """
+    Descarta um cache de referência do processo (ou todos, sem `name`).
+    """
+    for data in ([REFERENCE_DATA[name]] if name in REFERENCE_DATA else REFERENCE_DATA.values()):
+        data.invalidate()
+
+
+bus.subscribe(REFERENCE_DATA_TAG, invalidate_reference_data)
+
+
+def get_configuration():
+    """
+    Retorna a configuração da plataforma (Configuration), ou None se não existir.
+    """
+    return configuration.get()
+
+
+def get_plan_catalog():
+    """
+    Retorna o catálogo de planos (PlanCatalog).
+    """
+    return plan_catalog.get()
+
+
+def get_goals():
+    """
+    Retorna as metas (Goal) em ordem de faturamento mínimo.
+    """
+    return goals.get()
+
+
+def get_goal_for_profit(profit):
+    """
+    Retorna a meta da faixa de faturamento do usuário: a primeira meta sem
+    faturamento, ou a primeira (por id) cuja faixa contém o profit.
+    """
+    goal_list = get_goals()
+    if profit <= 0:
+        return goal_list[0] if goal_list else None
+    matches = [goal for goal in goal_list if goal.min <= profit <= goal.max]
+    return min(matches, key=lambda goal: goal.pk) if matches else None
+
+
+def get_tutorials():
+    """
+    Retorna os tutoriais (Tutorial) em ordem de criação.
+    """
+    return tutorials.get()
@@ -177,6 +177,13 @@ admin_dashboard_schema = extend_schema(
             required=False,
             type=OpenApiTypes.STR
         ),
+        OpenApiParameter(
+            name="ranking",
+            description="Ranking dos top_users: 'all' (profit de todo o período, padrão) ou 'period' (lucro no intervalo).",
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=['all', 'period']
+        ),
     ],
     responses={
         200: DashboardSerializer,
@@ -0,0 +1,99 @@
+from decimal import Decimal
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from accounts.models import Usuario
+from campaigns.invalidation_bus import bus
+from goals.models import Goal
+from payments.models import SubscriptionPayment, UserSubscription
+from plans.models import Plan, PlanFeature
+from tutorials.models import Tutorial
+from .models import Configuration
+from .platform_kpis import increment_platform_kpis, local_date
+from .reference_data import REFERENCE_DATA_TAG
+
+# Tabelas de referência alteradas descartam os caches por processo (ver `custom_admin.reference_data`)
+bus.tag_models(REFERENCE_DATA_TAG, Configuration, key=lambda instance: 'configuration')
+bus.tag_models(REFERENCE_DATA_TAG, Plan, PlanFeature, key=lambda instance: 'plan_catalog')
+bus.tag_models(REFERENCE_DATA_TAG, Goal, key=lambda instance: 'goals')
+bus.tag_models(REFERENCE_DATA_TAG, Tutorial, key=lambda instance: 'tutorials')
+
+
+@receiver(post_save, sender=Usuario)
+def platform_registration(sender, instance, created, **kwargs):
+    """
+    Soma o cadastro na linha do dia do cadastro.
+    """
+    if created:
+        increment_platform_kpis(local_date(instance.date_joined), registrations=1)
+
+
+@receiver(post_delete, sender=Usuario)
+def platform_registration_removed(sender, instance, **kwargs):
+    """
+    Usuários excluídos deixam de contar como cadastros do dia.
+    """
+    increment_platform_kpis(local_date(instance.date_joined), registrations=-1)
+
+
+@receiver(pre_save, sender=UserSubscription)
+@receiver(pre_save, sender=SubscriptionPayment)
+def platform_previous_state(sender, instance, **kwargs):
+    """
+    Guarda o estado gravado no banco (ativa/paga e valor) para que o
+    post_save some apenas as transições.
+    """
+    previous = None
+    if instance.pk:
+        fields = ('is_active',) if sender is UserSubscription else ('status', 'price')
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._platform_kpis_previous = previous
+
+
+@receiver(post_save, sender=UserSubscription)
+def platform_activation(sender, instance, **kwargs):
+    """
+    Assinaturas ativadas (ou desativadas) somam (ou subtraem) uma ativação
+    no dia de início da assinatura.
+    """
+    previous = getattr(instance, '_platform_kpis_previous', None) or {}
+    was_active = bool(previous.get('is_active'))
+    if instance.is_active != was_active:
+        increment_platform_kpis(local_date(instance.start_date), activations=1 if instance.is_active else -1)
+
+
+@receiver(post_delete, sender=UserSubscription)
+def platform_activation_removed(sender, instance, **kwargs):
+    """
+    Assinaturas ativas excluídas deixam de contar como ativação.
+    """
+    if instance.is_active:
+        increment_platform_kpis(local_date(instance.start_date), activations=-1)
+
+
+@receiver(post_save, sender=SubscriptionPayment)
+def platform_subscription_payment(sender, instance, **kwargs):
+    """
+    Pagamentos de assinaturas confirmados somam o pagamento e o valor no dia
+    do pagamento; estornos da confirmação e ajustes de valor de pagamentos
+    pagos somam a diferença.
+    """
+    previous = getattr(instance, '_platform_kpis_previous', None) or {}
+    was_paid = bool(previous.get('status'))
+    old_revenue = (previous.get('price') or 0) if was_paid else 0
+    # O valor pode vir como float do plano (ex.: gateway Firebanking)
+    new_revenue = Decimal(str(instance.price)) if instance.status else 0
+    increment_platform_kpis(
+        local_date(instance.created_at),
+        subscription_payments=int(bool(instance.status)) - int(was_paid),
+        subscription_revenue=new_revenue - old_revenue,
+    )
+
+
+@receiver(post_delete, sender=SubscriptionPayment)
+def platform_subscription_payment_removed(sender, instance, **kwargs):
+    """
+    Pagamentos pagos excluídos deixam de contar no dia do pagamento.
+    """
+    if instance.status:
+        increment_platform_kpis(local_date(instance.created_at), subscription_payments=-1,
+                                subscription_revenue=-Decimal(str(instance.price)))
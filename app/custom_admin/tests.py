@@ -1,3 +1,303 @@
-from django.test import TestCase
+import json
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from campaigns.invalidation_bus import bus
+from campaigns.models import Campaign
+from campaigns.finance_log_utils import apply_finance_deltas, apply_status_transition
+from goals.models import Goal
+from payments.models import SubscriptionPayment, UserSubscription
+from plans.models import Plan, PlanFeature
+from tutorials.models import Tutorial
+from .models import Configuration, PlatformDailyKPIs
+from .platform_kpis import KPI_FIELDS, get_platform_kpis, refresh_platform_kpis
+from .reference_data import (
+    REFERENCE_DATA, REFERENCE_DATA_TAG, get_configuration, get_goal_for_profit, get_plan_catalog,
+    invalidate_reference_data,
+)
 
-# Create your tests here.
+User = get_user_model()
+
+
+class TestPlatformDailyKPIs(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            cpf="63861694921", email="admin@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.admin)
+        self.plan = Plan.objects.create(
+            name="Plano Teste", price=49.99, duration="month", duration_value=1, is_current=True,
+            campaign_limit=5, integration_limit=5, kwai_limit=5, description="Plano de teste")
+        self.today = timezone.localdate()
+        self.rng = random.Random(20240901)
+
+    def create_user(self, index):
+        return User.objects.create_user(
+            cpf=f"{index:011d}", email=f"user{index}@gmail.com", name=f"Usuário {index}", password="7lonAzJxss@")
+
+    def subscribe(self, user, paid=True, price=Decimal('49.99')):
+        subscription = UserSubscription.objects.create(
+            user=user, plan=self.plan, expiration=timezone.now() + timedelta(days=30))
+        payment = SubscriptionPayment.objects.create(
+            user=user, subscription=subscription, idempotency=f"pay-{user.pk}-{subscription.pk}",
+            payment_method="PIX", price=price)
+        if paid:
+            payment.status = True
+            payment.save()
+            subscription.save()
+        return subscription, payment
+
+    def move_to(self, instance, field, day):
+        """Move o registro para outro dia direto no banco, como dados antigos."""
+        type(instance).objects.filter(pk=instance.pk).update(
+            **{field: timezone.now() - timedelta(days=(self.today - day).days)})
+
+    def kpi_rows(self):
+        return {
+            row.pop('date'): row
+            for row in PlatformDailyKPIs.objects.order_by('date').values('date', *KPI_FIELDS)
+            if any(row[field] for field in KPI_FIELDS)
+        }
+
+    def test_signals_match_recount(self):
+        """
+        Testa se os indicadores somados pelos signals (cadastros, ativações,
+        pagamentos, desativações e exclusões) são iguais ao recálculo das
+        tabelas de origem.
+        """
+        users = [self.create_user(index) for index in range(1, 13)]
+        subscriptions = []
+        for user in users:
+            if self.rng.random() < 0.7:
+                subscriptions.append(self.subscribe(user, paid=self.rng.random() < 0.8))
+
+        # Estorno da confirmação (desativa a assinatura) e exclusões
+        subscription, payment = next(item for item in subscriptions if item[1].status)
+        payment.status = False
+        payment.save()
+        subscription.save()
+        self.assertFalse(subscription.is_active)
+        SubscriptionPayment.objects.filter(status=True).first().delete()
+        users[-1].delete()
+
+        live = self.kpi_rows()
+        PlatformDailyKPIs.objects.all().delete()
+        refresh_platform_kpis(self.today, self.today)
+
+        self.assertEqual(self.kpi_rows(), live)
+        row = live[self.today]
+        self.assertEqual(row['registrations'], User.objects.count())
+        self.assertEqual(row['subscription_payments'], SubscriptionPayment.objects.filter(status=True).count())
+
+    def test_finalize_recomputes_closed_days(self):
+        """
+        Testa se a finalização recalcula os dias fechados (inclusive dias
+        alterados direto no banco e estornos atrasados) e se o --today
+        atualiza apenas a parte financeira do dia atual.
+        """
+        user = self.create_user(1)
+        subscription, payment = self.subscribe(user, price=Decimal('30.00'))
+        self.move_to(user, 'date_joined', self.today - timedelta(days=3))
+        self.move_to(payment, 'created_at', self.today - timedelta(days=2))
+        campaign = Campaign.objects.create(user=user, title="Campanha", method="CPC", CPC=Decimal('1.00'))
+        apply_status_transition(campaign.pk, status='APPROVED', amount=Decimal('20.00'), payment_method='PIX',
+                                date=self.today - timedelta(days=1))
+        apply_finance_deltas(campaign.pk, self.today, {'total_ads': Decimal('5.00'), 'total_views': 7})
+
+        call_command('finalize_platform_kpis', stdout=StringIO())
+        kpis = get_platform_kpis(self.today - timedelta(days=3), self.today)
+        self.assertEqual(kpis[self.today - timedelta(days=3)]['registrations'], 1)
+        self.assertEqual(kpis[self.today - timedelta(days=2)]['subscription_revenue'], Decimal('30.00'))
+        self.assertEqual(kpis[self.today - timedelta(days=1)]['amount_approved'], Decimal('20.00'))
+        self.assertTrue(PlatformDailyKPIs.objects.get(date=self.today - timedelta(days=1)).finalized_at)
+
+        # A parte financeira do dia atual vem do --today, sem alterar os eventos do dia
+        self.assertEqual(kpis[self.today]['total_views'], 0)
+        call_command('finalize_platform_kpis', today=True, stdout=StringIO())
+        row = PlatformDailyKPIs.objects.get(date=self.today)
+        self.assertEqual(row.total_views, 7)
+        self.assertEqual(row.registrations, 2)
+        self.assertIsNone(row.finalized_at)
+
+        with self.assertRaises(CommandError):
+            call_command('finalize_platform_kpis', since="ontem")
+
+    def test_local_day_late_evening(self):
+        """
+        Testa se às 22h (horário local, já o dia seguinte em UTC) os eventos
+        e a parte financeira caem na mesma linha do dia local e se o --today
+        atualiza esse dia.
+        """
+        evening = timezone.make_aware(datetime(2024, 9, 10, 22, 0))
+        local_day = evening.date()
+        with mock.patch('django.utils.timezone.now', return_value=evening):
+            self.assertEqual(evening.astimezone(timezone.utc).date(), local_day + timedelta(days=1))
+            user = self.create_user(1)
+            self.subscribe(user, price=Decimal('30.00'))
+            campaign = Campaign.objects.create(user=user, title="Campanha", method="CPC", CPC=Decimal('1.00'))
+            apply_status_transition(campaign.pk, status='APPROVED', amount=Decimal('20.00'), payment_method='PIX')
+
+            PlatformDailyKPIs.objects.all().delete()
+            call_command('finalize_platform_kpis', today=True, stdout=StringIO())
+            self.assertEqual(list(PlatformDailyKPIs.objects.values_list('date', flat=True)), [local_day])
+
+            refresh_platform_kpis(local_day, local_day)
+            row = PlatformDailyKPIs.objects.get(date=local_day)
+            self.assertEqual(row.amount_approved, Decimal('20.00'))
+            self.assertEqual(row.registrations, 1)
+            self.assertEqual(row.subscription_revenue, Decimal('30.00'))
+            self.assertIsNone(row.finalized_at)
+
+            call_command('finalize_platform_kpis', stdout=StringIO())
+            self.assertIsNone(PlatformDailyKPIs.objects.get(date=local_day).finalized_at)
+            self.assertFalse(PlatformDailyKPIs.objects.filter(date=local_day + timedelta(days=1)).exists())
+
+    def test_admin_endpoints_read_one_range(self):
+        """
+        Testa se o dashboard admin e o relatório de assinaturas respondem um
+        intervalo longo com uma leitura dos indicadores diários.
+        """
+        for index in range(1, 4):
+            self.subscribe(self.create_user(index))
+        refresh_platform_kpis(self.today - timedelta(days=365), self.today)
+
+        url = '/subscription-report/'
+        params = {'start': str(self.today - timedelta(days=364)), 'end': str(self.today)}
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        kpi_queries = [q['sql'] for q in captured.captured_queries if 'platform_daily_kpis' in q['sql']]
+        self.assertEqual(len(kpi_queries), 1)
+        self.assertFalse([q for q in captured.captured_queries if '"subscription_payment"' in q['sql']])
+        self.assertEqual(response.data['total_users'], 4)
+        self.assertEqual(response.data['total_subscriptions'], 3)
+        self.assertEqual(response.data['amount_subscriptions'], 149.97)
+        self.assertEqual(len(response.data['overviews']), 365)
+        self.assertEqual(response.data['overviews'][-1]['value'], 149.97)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('admin-dashboard-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        kpi_queries = [q['sql'] for q in captured.captured_queries if 'platform_daily_kpis' in q['sql']]
+        self.assertEqual(len(kpi_queries), 1)
+        self.assertEqual(response.data['total_users'], 4)
+        self.assertEqual(len(response.data['users']), 365 * 2)
+        self.assertEqual(response.data['users'][-1], {'type': 'SUBSCRIPTION', 'value': 3, 'date': self.today})
+
+
+class TestReferenceData(APITestCase):
+
+    # Tabelas de referência que não devem ser consultadas com o cache carregado
+    REFERENCE_TABLES = ['adm_configuration', '"Plan"', 'plan_feature', '"goals"', '"tutorials"']
+
+    def setUp(self):
+        invalidate_reference_data()
+        self.config = Configuration.objects.create(
+            email_register_subject="Cadastro", email_recovery_subject="Recuperação",
+            email_reminder_subject="Lembrete", email_expired_subject="Expirado",
+            email_subscription_paid_subject="Pago", email_register="", email_recovery="",
+            email_reminder="", email_expired="", email_subscription_paid="",
+            recaptchar_site_key="site-key", recaptchar_secret_key="secret-key",
+            days_to_reminder=3, days_to_expire=5, late_payment_interest=2.0)
+        self.plan = Plan.objects.create(
+            name="Plano Teste", price=49.99, duration="month", duration_value=1,
+            campaign_limit=5, integration_limit=5, kwai_limit=5)
+        PlanFeature.objects.create(plan=self.plan, text="5 campanhas")
+        other = Plan.objects.create(name="Plano Anual", price=499.99, duration="year", duration_value=1)
+        PlanFeature.objects.create(plan=other, text="Campanhas ilimitadas")
+        Goal.objects.create(prize="Placa 10K", min=0, max=10000)
+        Goal.objects.create(prize="Placa 100K", min=10000, max=100000)
+        Tutorial.objects.create(
+            title="Primeiros passos", youtube_url="https://www.youtube.com/watch?v=abc",
+            thumbnail_url="https://img.youtube.com/vi/abc/0.jpg")
+
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.client.force_authenticate(user=self.user)
+        subscription = UserSubscription.objects.create(
+            user=self.user, plan=self.plan, expiration=timezone.now() - timedelta(days=2))
+        for index in range(3):
+            SubscriptionPayment.objects.create(
+                user=self.user, subscription=subscription, idempotency=f"pay-{index}",
+                payment_method="PIX", price=Decimal('49.99'))
+
+    def reference_queries(self, captured):
+        return [
+            query['sql'] for query in captured.captured_queries
+            if any(table in query['sql'] for table in self.REFERENCE_TABLES)
+        ]
+
+    def test_hot_endpoints_skip_reference_tables_once_warm(self):
+        """
+        Testa se, com o cache carregado, a assinatura (planos e juros de cada
+        pagamento em aberto), a verificação do token (metas), os tutoriais e
+        o captcha não consultam as tabelas de referência.
+        """
+        token = str(AccessToken.for_user(self.user))
+        requests = [
+            lambda: self.client.get(reverse('subscription-info')),
+            lambda: self.client.post(reverse('token_verify'), {'token': token}, format='json'),
+            lambda: self.client.get(reverse('tutorial-list')),
+            lambda: self.client.get(reverse('captcha')),
+        ]
+        first = [request() for request in requests]
+
+        with CaptureQueriesContext(connection) as captured:
+            second = [request() for request in requests]
+
+        self.assertEqual(self.reference_queries(captured), [])
+        for before, after in zip(first, second):
+            self.assertEqual(after.status_code, status.HTTP_200_OK)
+            self.assertEqual(after.data, before.data)
+        self.assertEqual(len(second[0].data['plans']), 2)
+        self.assertEqual(second[0].data['plans'][0]['features'], [{'text': '5 campanhas', 'active': True}])
+        self.assertNotEqual(second[0].data['payments_opened'][0]['tax'], "0.00")
+        self.assertEqual(second[1].data['user']['goals'], {'min': 0, 'max': 10000})
+        self.assertEqual(len(second[2].data['results']), 1)
+
+    def test_changes_invalidate(self):
+        """
+        Testa se salvar ou excluir linhas das tabelas de referência descarta
+        apenas o cache correspondente.
+        """
+        get_configuration()
+        catalog = get_plan_catalog()
+        self.assertEqual(catalog.get(str(self.plan.uid)), self.plan)
+        with self.assertRaises(Plan.DoesNotExist):
+            catalog.get('invalid')
+
+        PlanFeature.objects.create(plan=self.plan, text="Suporte")
+        self.assertTrue(REFERENCE_DATA['configuration'].loaded)
+        with self.assertNumQueries(2):
+            features = [feature.text for feature in get_plan_catalog().get(self.plan.uid).features.all()]
+        self.assertEqual(features, ["5 campanhas", "Suporte"])
+
+        self.config.days_to_reminder = 7
+        self.config.save()
+        self.assertEqual(get_configuration().days_to_reminder, 7)
+
+        Goal.objects.filter(prize="Placa 10K").delete()
+        self.assertEqual(get_goal_for_profit(0).prize, "Placa 100K")
+        self.assertIsNone(get_goal_for_profit(200000))
+
+    def test_notification_from_other_process_invalidates(self):
+        """
+        Testa se um aviso de outro processo descarta apenas o cache avisado.
+        """
+        get_configuration()
+        get_plan_catalog()
+        bus.receive(json.dumps({'origin': 'other-process', 'tag': REFERENCE_DATA_TAG, 'key': 'plan_catalog'}))
+        self.assertTrue(REFERENCE_DATA['configuration'].loaded)
+        self.assertFalse(REFERENCE_DATA['plan_catalog'].loaded)
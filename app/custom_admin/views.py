@@ -1,20 +1,19 @@
 from datetime import timedelta, datetime
-from collections import defaultdict
 from rest_framework.viewsets import ViewSet
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.utils.timezone import now
-from django.db.models import Sum, Count, Q, Value
-from django.db.models.functions import TruncDate
+from django.utils.timezone import localdate
 from .permissions import IsSuperUser
 from accounts.models import Usuario
-from payments.models import UserSubscription, SubscriptionPayment
-from campaigns.models import FinanceLogs
+from accounts.leaderboard import get_top_users, get_top_users_by_period
+from campaigns.models import UserDailyFinance
+from campaigns.aggregations import aggregate_finance_logs
 from .serializers import DashboardSerializer, UsuarioSerializer, ConfigurationSerializer, CaptchaSerializer
 from .models import Configuration
+from .reference_data import get_configuration
+from .platform_kpis import get_platform_kpis, sum_platform_kpis
 from rest_framework.views import APIView
 from .schemas import admin_dashboard_schema, configuration_view_get_schema, configuration_view_post_schema, captcha_view_get_schema, captcha_view_post_schema, admin_subscription_report_schema
-from django.db import models
 import requests
 from django.urls import reverse
 import logging
@@ -137,7 +136,7 @@ class CaptchaView(APIView):
 
     @captcha_view_get_schema
     def get(self, request):
-        config = Configuration.objects.first()
+        config = get_configuration()
         if not config:
             return Response({"detail": "Not found."}, status=404)
         serializer = CaptchaSerializer(config)
@@ -186,7 +185,7 @@ class AdminDashboardViewSet(ViewSet):
     def get_date_range(self, start, end):
         """Calcula o intervalo de datas com base nos parâmetros fornecidos."""
         if not start and not end:
-            end_date = now().date()
+            end_date = localdate()
             start_date = end_date - timedelta(days=30)
         elif start and not end:
             start_date = end_date = datetime.strptime(start, '%Y-%m-%d').date()
@@ -195,78 +194,56 @@ class AdminDashboardViewSet(ViewSet):
             end_date = datetime.strptime(end, '%Y-%m-%d').date()
         return start_date, end_date
 
-    def get_register_stats(self, start_date, end_date):
-        """Obtém estatísticas de registros de usuários (REGISTER)."""
-        stats = Usuario.objects.filter(
-            date_joined__range=[start_date, end_date]
-        ).annotate(
-            type=Value("REGISTER", output_field=models.CharField()),
-            date=TruncDate('date_joined')
-        ).values(
-            'type', 'date'
-        ).annotate(
-            value=Count('uid')
-        ).order_by('date')
-        return stats
-
-    def get_subscription_stats(self, start_date, end_date):
-        """Obtém estatísticas de assinaturas ativas (SUBSCRIPTION)."""
-        stats = UserSubscription.objects.filter(
-            start_date__range=[start_date, end_date],
-            is_active=True
-        ).annotate(
-
-            type=Value("SUBSCRIPTION", output_field=models.CharField()),
-
-            date=TruncDate('start_date')
-        ).values(
-            'type', 'date'
-        ).annotate(
-            value=Count('uid')  # Conta as assinaturas por data
-        ).order_by('date')
-
-        return stats
-
-    def fill_missing_days(self, users, start_date, end_date):
-        """Preenche os dias ausentes no intervalo de datas com valores 0."""
-        user_data = defaultdict(lambda: defaultdict(int))
-        for user in users:
-            user_data[user['type']][user['date']] = user['value']
-
+    def get_user_stats(self, kpis, start_date, end_date):
+        """
+        Monta os cadastros (REGISTER) e as assinaturas ativadas (SUBSCRIPTION)
+        de cada dia do intervalo, com 0 nos dias sem linha.
+        """
         return [
             {
                 "type": user_type,
-                "value": user_data[user_type].get(date, 0),
+                "value": kpis.get(date, {}).get(field, 0),
                 "date": date
             }
             for date in (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
-            for user_type in ['REGISTER', 'SUBSCRIPTION']
+            for user_type, field in (('REGISTER', 'registrations'), ('SUBSCRIPTION', 'activations'))
         ]
 
-    def get_finance_stats(self, finance_logs):
-        """Calcula estatísticas financeiras agregadas."""
+    def get_finance_stats(self, start_date, end_date, user=None, kpis=None):
+        """
+        Calcula as estatísticas financeiras do intervalo pelos indicadores
+        diários da plataforma ou, com `user` (uid), pelos rollups diários do
+        usuário, em uma única consulta.
+        """
+        if user:
+            totals = aggregate_finance_logs(UserDailyFinance.objects.filter(
+                user__uid=user, date__gte=start_date, date__lte=end_date))
+        else:
+            if kpis is None:
+                kpis = get_platform_kpis(start_date, end_date)
+            totals = sum_platform_kpis(kpis)[1]
         return {
-            "total_approved": finance_logs.aggregate(total=Sum('total_approved'))['total'] or 0,
-            "total_pending": finance_logs.aggregate(total=Sum('total_pending'))['total'] or 0,
-            "total_refunded": finance_logs.aggregate(total=Sum('total_refunded'))['total'] or 0,
-            "total_abandoned": finance_logs.aggregate(total=Sum('total_abandoned'))['total'] or 0,
-            "total_chargeback": finance_logs.aggregate(total=Sum('total_chargeback'))['total'] or 0,
-            "total_rejected": finance_logs.aggregate(total=Sum('total_rejected'))['total'] or 0,
-            "amount_approved": finance_logs.aggregate(total=Sum('amount_approved'))['total'] or 0,
-            "amount_pending": finance_logs.aggregate(total=Sum('amount_pending'))['total'] or 0,
-            "amount_refunded": finance_logs.aggregate(total=Sum('amount_refunded'))['total'] or 0,
-            "amount_rejected": finance_logs.aggregate(total=Sum('amount_rejected'))['total'] or 0,
-            "amount_chargeback": finance_logs.aggregate(total=Sum('amount_chargeback'))['total'] or 0,
-            "amount_abandoned": finance_logs.aggregate(total=Sum('amount_abandoned'))['total'] or 0,
-            "total_ads": finance_logs.aggregate(total=Sum('total_ads'))['total'] or 0,
-            "profit": finance_logs.aggregate(total=Sum('profit'))['total'] or 0,
-            "total_views": finance_logs.aggregate(total=Sum('total_views'))['total'] or 0,
-            "total_clicks": finance_logs.aggregate(total=Sum('total_clicks'))['total'] or 0,
+            "total_approved": totals['total_approved'],
+            "total_pending": totals['total_pending'],
+            "total_refunded": totals['total_refunded'],
+            "total_abandoned": totals['total_abandoned'],
+            "total_chargeback": totals['total_chargeback'],
+            "total_rejected": totals['total_rejected'],
+            "amount_approved": totals['amount_approved'],
+            "amount_pending": totals['amount_pending'],
+            "amount_refunded": totals['amount_refunded'],
+            "amount_rejected": totals['amount_rejected'],
+            "amount_chargeback": totals['amount_chargeback'],
+            "amount_abandoned": totals['amount_abandoned'],
+            "total_ads": totals['total_ads'],
+            "profit": totals['profit'],
+            "total_views": totals['total_views'],
+            "total_clicks": totals['total_clicks'],
             "stats": {
-                "PIX": finance_logs.aggregate(pix_amount=Sum('pix_amount')).get('pix_amount', 0) or 0,
-                "CARD_CREDIT": finance_logs.aggregate(credit_card_amount=Sum('credit_card_amount')).get('credit_card_amount', 0) or 0,
-                "DEBIT_CARD": finance_logs.aggregate(debit_card_amount=Sum('debit_card_amount')).get('debit_card_amount', 0) or 0,
-                "BOLETO": finance_logs.aggregate(boleto_amount=Sum('boleto_amount')).get('boleto_amount', 0) or 0,
+                "PIX": totals['pix_amount'],
+                "CARD_CREDIT": totals['credit_card_amount'],
+                "DEBIT_CARD": totals['debit_card_amount'],
+                "BOLETO": totals['boleto_amount'],
             },
         }
 
@@ -279,33 +256,26 @@ class AdminDashboardViewSet(ViewSet):
         # Obter intervalo de datas
         start_date, end_date = self.get_date_range(start, end)
 
-        finance_logs = FinanceLogs.objects.filter(
-            campaign__created_at__range=[start_date, end_date]
-        )
-        if user:
-            finance_logs = finance_logs.filter(campaign__user__uid=user)
+        # Indicadores diários do intervalo (cadastros, ativações e financeiro) em uma leitura
+        kpis = get_platform_kpis(start_date, end_date)
+        events = sum_platform_kpis(kpis)[0]
 
-        # Obter estatísticas de usuários
-        total_users = Usuario.objects.filter(
-            date_joined__range=[start_date, end_date]).count()
         total_users_subscription = Usuario.objects.filter(
             subscription_active=True).count()
 
-        # Obter estatísticas de REGISTER e SUBSCRIPTION
-        register_stats = self.get_register_stats(start_date, end_date)
-        subscription_stats = self.get_subscription_stats(start_date, end_date)
-        users = list(register_stats) + list(subscription_stats)
-        filled_users = self.fill_missing_days(users, start_date, end_date)
-
-        finance_stats = self.get_finance_stats(finance_logs)
+        finance_stats = self.get_finance_stats(start_date, end_date, user=user, kpis=kpis)
 
-        top_users = Usuario.objects.order_by('-profit')[:10]
+        # Ranking de todo o período (padrão) ou do lucro no intervalo (?ranking=period)
+        if request.query_params.get('ranking') == 'period':
+            top_users = get_top_users_by_period(start_date, end_date)
+        else:
+            top_users = get_top_users()
 
         response_data = {
-            "total_users": total_users,
+            "total_users": events['registrations'],
             "total_users_subscription": total_users_subscription,
             **finance_stats,
-            "users": filled_users,
+            "users": self.get_user_stats(kpis, start_date, end_date),
             "top_users": UsuarioSerializer(top_users, many=True).data,
         }
 
@@ -321,7 +291,7 @@ class AdminSubscriptionReportView(APIView):
         start = request.query_params.get('start')
         end = request.query_params.get('end')
 
-        today = now().date()
+        today = localdate()
         if not start and not end:
             end_date = today
             start_date = end_date - timedelta(days=30)
@@ -335,30 +305,22 @@ class AdminSubscriptionReportView(APIView):
             end_date = datetime.strptime(end, '%Y-%m-%d').date()
             start_date = end_date
 
-        payments = SubscriptionPayment.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
-            status=True
-        )
-
-        total_users = Usuario.objects.filter(
-            date_joined__date__gte=start_date,
-            date_joined__date__lte=end_date
-        ).count()
+        # Cadastros e pagamentos de assinaturas do intervalo em uma leitura dos indicadores diários
+        kpis = get_platform_kpis(start_date, end_date)
+        events = sum_platform_kpis(kpis)[0]
 
-        total_subscriptions = payments.count()
-        amount_subscriptions = float(payments.aggregate(
-            total=models.Sum('price'))['total'] or 0)
+        total_users = events['registrations']
+        total_subscriptions = events['subscription_payments']
+        amount_subscriptions = float(events['subscription_revenue'])
 
         # Overview diário
-        overviews = []
-        for single_date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1)):
-            daily_value = payments.filter(created_at__date=single_date).aggregate(
-                total=models.Sum('price'))['total'] or 0
-            overviews.append({
+        overviews = [
+            {
                 "date": single_date.strftime('%Y-%m-%d'),
-                "value": float(daily_value)
-            })
+                "value": float(kpis.get(single_date, {}).get('subscription_revenue', 0))
+            }
+            for single_date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1))
+        ]
 
         response = {
             "total_users": total_users,
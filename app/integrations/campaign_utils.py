@@ -1,4 +1,6 @@
-from campaigns.models import Campaign
+from campaigns.models import Campaign, CampaignCounters
+from campaigns.finance_log_utils import apply_user_profit_delta
+from django.db import transaction
 from django.db.models import Sum
 from integrations.models import IntegrationRequest
 from decimal import Decimal
@@ -23,11 +25,13 @@ def recalculate_campaigns(campaign, total_ads, amount_approved):
     # Calcula o ROI (taxa de retorno sobre investimento)
     roi = ((Decimal(amount_approved) - Decimal(total_ads)) / Decimal(total_ads)) * 100 if total_ads > 0 else 0
 
-    # Atualiza os campos da campanha
-    campaign.profit = profit
-    campaign.ROI = roi
-
     # Opcional: Atualizar outros campos usando update_campaign_fields
     # update_campaign_fields(campaign, status, amount)  # Exemplo de uso, se necessário
 
-    campaign.save()
\ No newline at end of file
+    # Atualiza apenas profit e ROI dos contadores: um save completo sobrescreveria
+    # os incrementos (F()) das vendas gravados depois da leitura
+    with transaction.atomic():
+        counters = CampaignCounters.objects.select_for_update().filter(campaign=campaign)
+        current_profit = counters.values_list('profit', flat=True).get()
+        counters.update(profit=profit, ROI=roi)
+        apply_user_profit_delta(campaign.pk, profit - current_profit)
\ No newline at end of file
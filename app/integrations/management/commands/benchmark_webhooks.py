@@ -0,0 +1,103 @@
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+from campaigns.models import Campaign, FinanceLogs
+from integrations.models import Integration
+from integrations.views import ZeroOneWebhookView
+from integrations.webhook_queue import process_webhook_batch
+from campaigns.finance_accumulator import FinanceDeltaAccumulator
+import logging
+logger = logging.getLogger('django')
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Mede a vazão (eventos/s) e a latência do webhook dos gateways e do worker da fila'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=2000,
+                            help='Quantidade de vendas (cada venda gera PENDING e APPROVED).')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Quantidade de threads enviando notificações em paralelo.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Tamanho do lote usado para esvaziar a fila.')
+        parser.add_argument('--flush-events', type=int, default=1000,
+                            help='Eventos acumulados por flush dos contadores.')
+
+    def handle(self, *args, **options):
+        sales = options['sales']
+        workers = options['workers']
+        run_id = uuid.uuid4().hex[:10]
+
+        # Dados temporários, removidos ao final (cascata a partir do usuário)
+        user = User.objects.create_user(
+            cpf=str(uuid.uuid4().int)[:11], email=f"benchmark-{run_id}@example.com", name="Benchmark")
+        integration = Integration.objects.create(
+            user=user, name=f"Benchmark {run_id}", gateway='zeroone')
+        campaign = Campaign.objects.create(
+            user=user, title=f"Benchmark {run_id}", method='CPC', CPC=Decimal('1.00'))
+        campaign.integrations.set([integration])
+
+        factory = APIRequestFactory()
+        view = ZeroOneWebhookView.as_view()
+        latencies = []
+        errors = []
+
+        def worker(worker_no):
+            try:
+                for sale_no in range(worker_no, sales, workers):
+                    for payment_status in ('PENDING', 'APPROVED'):
+                        request = factory.post('/', {
+                            'paymentId': f"{run_id}-{sale_no}",
+                            'status': payment_status,
+                            'totalValue': 1000,
+                            'paymentMethod': 'PIX',
+                        }, format='json')
+                        started = time.perf_counter()
+                        response = view(request, uid=integration.uid)
+                        latencies.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        try:
+            threads = [threading.Thread(target=worker, args=(worker_no,)) for worker_no in range(workers)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            # Esvazia a fila com o mesmo processamento do `manage.py process_webhooks`
+            drain_started = time.perf_counter()
+            accumulator = FinanceDeltaAccumulator(
+                max_events=options['flush_events'], max_delay_ms=float('inf'))
+            while process_webhook_batch(options['batch_size'], accumulator):
+                pass
+            drain_elapsed = time.perf_counter() - drain_started
+
+            campaign.refresh_from_db()
+            finance_log = FinanceLogs.objects.get(campaign=campaign)
+            latencies.sort()
+            self.stdout.write(
+                f"webhook: {len(latencies)} eventos em {elapsed:.2f}s ({len(latencies) / elapsed:.0f} eventos/s), "
+                f"{workers} threads, {len(errors)} erros\n"
+                f"latência p50={statistics.median(latencies) * 1000:.2f}ms "
+                f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms\n"
+                f"worker: {len(latencies)} eventos em {drain_elapsed:.2f}s "
+                f"({len(latencies) / drain_elapsed:.0f} eventos/s, lotes de {options['batch_size']})\n"
+                f"flush: {accumulator.metrics.as_dict()}\n"
+                f"campanha: total_approved={campaign.total_approved} total_pending={campaign.total_pending} | "
+                f"FinanceLogs: total_approved={finance_log.total_approved} pix_total={finance_log.pix_total}"
+            )
+        finally:
+            user.delete()
@@ -0,0 +1,63 @@
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from campaigns.finance_accumulator import FinanceDeltaAccumulator
+from campaigns.invalidation_bus import bus
+from integrations.routing import router
+from integrations.webhook_queue import process_webhook_batch
+import logging
+logger = logging.getLogger('django')
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de notificações dos gateways (webhook_events)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Quantidade máxima de eventos por lote.')
+        parser.add_argument('--flush-events', type=int, default=1000,
+                            help='Aplica os contadores acumulados a cada M eventos.')
+        parser.add_argument('--flush-interval-ms', type=int, default=200,
+                            help='Aplica os contadores acumulados a cada N milissegundos.')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Intervalo (s) entre consultas quando a fila está vazia.')
+        parser.add_argument('--stats-interval', type=float, default=60.0,
+                            help='Intervalo (s) entre os registros das métricas de flush no log.')
+        parser.add_argument('--once', action='store_true',
+                            help='Processa os eventos disponíveis e encerra.')
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        accumulator = FinanceDeltaAccumulator(
+            max_events=options['flush_events'], max_delay_ms=options['flush_interval_ms'])
+        last_stats = time.monotonic()
+
+        bus.enable()
+        routes = router.load()
+        logger.info(f"Worker de webhooks iniciado ({routes} rotas de integrações carregadas).")
+        while self.running:
+            close_old_connections()
+            try:
+                processed = process_webhook_batch(options['batch_size'], accumulator)
+            except Exception:
+                # Os eventos já foram reagendados em process_webhook_batch
+                processed = 0
+
+            if time.monotonic() - last_stats >= options['stats_interval']:
+                logger.info(f"Métricas de flush dos webhooks: {accumulator.metrics.as_dict()}")
+                last_stats = time.monotonic()
+
+            if options['once'] and not processed:
+                break
+            if not processed:
+                time.sleep(options['sleep'])
+
+        logger.info(f"Worker de webhooks finalizado. Métricas de flush: {accumulator.metrics.as_dict()}")
+
+    def stop(self, signum, frame):
+        """Finaliza o worker após o flush do lote atual."""
+        self.running = False
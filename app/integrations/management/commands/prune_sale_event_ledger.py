@@ -0,0 +1,32 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from integrations.models import SaleEventLedger
+import logging
+logger = logging.getLogger('django')
+
+
+class Command(BaseCommand):
+    help = 'Remove do ledger de deduplicação as transições de vendas mais antigas que o período de retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SALE_EVENT_LEDGER_RETENTION_DAYS,
+                            help='Mantém apenas as transições dos últimos N dias.')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Quantidade de linhas removidas por DELETE.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        removed = 0
+
+        # Remove em lotes para não manter bloqueios longos na tabela
+        while True:
+            batch = list(SaleEventLedger.objects.filter(created_at__lt=cutoff).values_list(
+                'pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            removed += SaleEventLedger.objects.filter(pk__in=batch).delete()[0]
+
+        logger.info(f"Ledger de vendas: {removed} transições anteriores a {cutoff:%Y-%m-%d} removidas.")
+        self.stdout.write(self.style.SUCCESS(f"{removed} transições removidas do ledger."))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0018_alter_integration_name'),
+    ]
+
+    operations = [
+        # Mantém apenas o registro mais recente de cada (integração, payment_id)
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM integrations_requests AS duplicated
+                USING integrations_requests AS latest
+                WHERE duplicated.integration_id = latest.integration_id
+                  AND duplicated.payment_id = latest.payment_id
+                  AND duplicated.id < latest.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='integrationrequest',
+            constraint=models.UniqueConstraint(fields=('integration', 'payment_id'), name='unique_integration_payment_id'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0019_integrationrequest_unique_payment_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('gateway', models.CharField(max_length=255)),
+                ('payment_id', models.CharField(max_length=255)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('dead', 'Dead')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('integration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_events', to='integrations.integration')),
+            ],
+            options={
+                'db_table': 'webhook_events',
+                'indexes': [models.Index(fields=['status', 'available_at'], name='webhook_event_status_idx'), models.Index(fields=['integration', 'payment_id'], name='webhook_event_payment_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0020_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleEventLedger',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('payment_id', models.CharField(max_length=255)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('integration', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sale_events', to='integrations.integration')),
+            ],
+            options={
+                'db_table': 'sale_event_ledger',
+                'indexes': [models.Index(fields=['created_at'], name='sale_event_created_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='saleeventledger',
+            constraint=models.UniqueConstraint(fields=('integration', 'payment_id', 'status'), name='unique_sale_event'),
+        ),
+        # Registra o status atual das vendas existentes, para que reenvios
+        # dessas notificações também sejam reconhecidos como repetidos
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO sale_event_ledger (integration_id, payment_id, status, created_at)
+                SELECT integration_id, payment_id, status, COALESCE(updated_at, created_at)
+                FROM integrations_requests
+                ON CONFLICT (integration_id, payment_id, status) DO NOTHING
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0021_saleeventledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='integration',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='integrations_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='integrationrequest',
+            index=models.Index(fields=['integration', 'created_at', 'id'], name='int_requests_created_idx'),
+        ),
+    ]
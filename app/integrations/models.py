@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth import get_user_model
 import uuid
@@ -35,6 +37,11 @@ class Integration(models.Model):
         'active', 'Active'), ('inactive', 'Inactive')], default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(null=True, blank=True)
+    # Documento da busca das listagens, mantido por trigger (ver `campaigns.search`)
+    search_document = models.TextField(null=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    SEARCH_DOCUMENT_FIELDS = ('name', 'gateway')
 
     def delete(self, *args, **kwargs):
         """Sobrescreve o método delete para realizar soft delete."""
@@ -57,6 +64,11 @@ class Integration(models.Model):
 
     class Meta:
         db_table = 'integrations'
+        indexes = [
+            # Listagem por cursor (created_at, id) das integrações do usuário
+            models.Index(fields=['user', 'created_at', 'id'], name='integrations_user_created_idx'),
+            GinIndex(fields=['search_vector'], name='integrations_search_idx'),
+        ]
 
 
 class IntegrationRequest(models.Model):
@@ -77,6 +89,77 @@ class IntegrationRequest(models.Model):
 
     class Meta:
         db_table = 'integrations_requests'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['integration', 'payment_id'], name='unique_integration_payment_id'),
+        ]
+        indexes = [
+            # Listagem por cursor (created_at, id) das vendas das integrações do usuário
+            models.Index(fields=['integration', 'created_at', 'id'], name='int_requests_created_idx'),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """
+    Notificação recebida de um gateway, aguardando processamento pelo
+    `manage.py process_webhooks`.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    integration = models.ForeignKey(
+        Integration, on_delete=models.CASCADE, related_name='webhook_events')
+    gateway = models.CharField(max_length=255)
+    payment_id = models.CharField(max_length=255)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'webhook_events'
+        indexes = [
+            models.Index(fields=['status', 'available_at'],
+                         name='webhook_event_status_idx'),
+            models.Index(fields=['integration', 'payment_id'],
+                         name='webhook_event_payment_idx'),
+        ]
+
+
+class SaleEventLedger(models.Model):
+    """
+    Registro das transições de venda já aplicadas, usado para descartar as
+    notificações repetidas dos gateways (um registro por pagamento e status).
+
+    A inserção é feita com `INSERT ... ON CONFLICT DO NOTHING` (ver
+    `integrations.webhooks.register_sale_event`); registros antigos são
+    removidos pelo `manage.py prune_sale_event_ledger`.
+    """
+    id = models.BigAutoField(primary_key=True)
+    # Indexado pela restrição única (integration, payment_id, status)
+    integration = models.ForeignKey(
+        Integration, on_delete=models.CASCADE, related_name='sale_events', db_index=False)
+    payment_id = models.CharField(max_length=255)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'sale_event_ledger'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['integration', 'payment_id', 'status'], name='unique_sale_event'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='sale_event_created_idx'),
+        ]
 
 
 class IntegrationSample(models.Model):
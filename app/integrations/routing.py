@@ -0,0 +1,119 @@
+import logging
+import threading
+import uuid
+from collections import namedtuple
+from campaigns.invalidation_bus import bus
+from campaigns.models import Campaign
+from .models import Integration
+
+logger = logging.getLogger('django')
+
+# Tag das rotas no barramento de invalidação dos caches
+ROUTES_TAG = 'integration_routes'
+
+# Rota de uma integração ativa: para onde vão as vendas recebidas por ela
+IntegrationRoute = namedtuple('IntegrationRoute', [
+    'integration_id', 'uid', 'campaign_id', 'user_id', 'gateway', 'status', 'counter_shards',
+])
+
+
+def get_integration_campaigns(integration_ids=None):
+    """
+    Retorna a campanha de cada integração: a mais recente não excluída entre
+    as campanhas vinculadas (uma consulta).
+
+    Args:
+        integration_ids (list): Opcional; apenas estas integrações.
+
+    Returns:
+        dict: {integration_id: (campaign_id, counter_shards)}
+    """
+    campaigns = {}
+    links = Campaign.integrations.through.objects.filter(campaign__deleted=False)
+    if integration_ids is not None:
+        links = links.filter(integration_id__in=integration_ids)
+    links = links.order_by(
+        '-campaign__created_at').values_list('integration_id', 'campaign_id', 'campaign__counter_shards')
+    for integration_id, campaign_id, counter_shards in links:
+        campaigns.setdefault(integration_id, (campaign_id, counter_shards))
+    return campaigns
+
+
+class IntegrationRouter:
+    """
+    Cache por processo das rotas integração -> campanha usadas no recebimento
+    e no processamento das vendas dos gateways.
+
+    Todas as integrações ativas são carregadas de uma vez (duas consultas) e
+    as buscas seguintes não acessam o banco. Alterações em integrações e
+    campanhas publicam a tag `ROUTES_TAG` no barramento de invalidação (ver
+    `integrations.signals`), que descarta as rotas deste e dos demais processos.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_uid = {}
+        self.by_id = {}
+        self.loaded = False
+        self.generation = 0
+
+    def load(self):
+        """
+        Carrega todas as rotas (integrações não excluídas e a campanha mais
+        recente não excluída de cada uma).
+        """
+        generation = self.generation
+        campaigns = get_integration_campaigns()
+        by_uid = {}
+        by_id = {}
+        integrations = Integration.objects.filter(deleted=False).values_list(
+            'id', 'uid', 'user_id', 'gateway', 'status')
+        for integration_id, uid, user_id, gateway, status in integrations:
+            campaign_id, counter_shards = campaigns.get(integration_id, (None, 0))
+            route = IntegrationRoute(
+                integration_id, uid, campaign_id, user_id, gateway, status, counter_shards)
+            by_uid[uid] = route
+            by_id[integration_id] = route
+
+        with self.lock:
+            self.by_uid = by_uid
+            self.by_id = by_id
+            # Uma invalidação durante a carga mantém o cache sujo
+            self.loaded = generation == self.generation
+        logger.debug(f"Rotas de integrações carregadas: {len(by_id)}.")
+        return len(by_id)
+
+    def invalidate(self):
+        """
+        Descarta as rotas do processo; a próxima busca recarrega do banco.
+        """
+        with self.lock:
+            self.generation += 1
+            self.loaded = False
+
+    def ensure_fresh(self):
+        """
+        Recarrega as rotas se foram invalidadas.
+        """
+        bus.ensure_started()
+        if not self.loaded:
+            self.load()
+
+    def get(self, integration_id):
+        """
+        Retorna a rota da integração pelo id, ou None se não existir (ou estiver excluída).
+        """
+        self.ensure_fresh()
+        return self.by_id.get(integration_id)
+
+    def get_by_uid(self, uid):
+        """
+        Retorna a rota da integração pelo uid, ou None se não existir (ou estiver excluída).
+        """
+        self.ensure_fresh()
+        return self.by_uid.get(uid if isinstance(uid, uuid.UUID) else uuid.UUID(str(uid)))
+
+
+# Instância usada pelas views de webhook e pelo worker da fila
+router = IntegrationRouter()
+bus.subscribe(ROUTES_TAG, lambda key: router.invalidate())
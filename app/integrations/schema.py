@@ -24,6 +24,16 @@ schemas = {
                     type=OpenApiTypes.INT,
                     location=OpenApiParameter.QUERY,
                 ),
+                OpenApiParameter(
+                    name="cursor",
+                    description=(
+                        "Paginação por cursor (created_at, id), sem `count`: envie `?cursor=` na primeira "
+                        "página e siga os links `next`/`previous`."
+                    ),
+                    required=False,
+                    type=OpenApiTypes.STR,
+                    location=OpenApiParameter.QUERY,
+                ),
 
                 OpenApiParameter(
                     name="search",
@@ -0,0 +1,27 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from campaigns.invalidation_bus import bus
+from campaigns.models import Campaign
+from .models import Integration
+from .routing import ROUTES_TAG
+
+# Integrações (gateway, status, exclusão) e campanhas (exclusão, shards)
+# alteradas mudam as rotas das vendas
+bus.tag_models(ROUTES_TAG, Integration, Campaign)
+
+
+def invalidate_routes(using=None):
+    """
+    Invalida as rotas do processo na hora e, após o commit, as dos demais
+    processos (alterações em lote, sem signals).
+    """
+    bus.publish(ROUTES_TAG, using=using)
+
+
+@receiver(m2m_changed, sender=Campaign.integrations.through)
+def campaign_integrations_changed(sender, instance, action, using, **kwargs):
+    """
+    Vínculos entre campanhas e integrações alterados mudam as rotas das vendas.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_routes(using)
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from campaigns.models import Campaign
+from integrations.models import Integration, IntegrationRequest, SaleEventLedger, WebhookEvent
+from integrations.webhook_queue import process_webhook_batch
+
+User = get_user_model()
+
+
+class TestSaleEventLedger(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.integration = Integration.objects.create(
+            user=self.user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.campaign.integrations.set([self.integration])
+
+    def enqueue(self, payment_id, payment_status, total_value=1000):
+        return WebhookEvent.objects.create(
+            integration=self.integration, gateway="zeroone", payment_id=payment_id,
+            payload={"paymentId": payment_id, "status": payment_status,
+                     "totalValue": total_value, "paymentMethod": "PIX"})
+
+    def test_retry_of_same_status_is_ignored(self):
+        """
+        Testa se o reenvio do mesmo status é descartado pelo ledger, sem atualizar a venda.
+        """
+        self.enqueue("pay-1", "APPROVED")
+        process_webhook_batch()
+        self.enqueue("pay-1", "APPROVED", total_value=9900)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(process_webhook_batch(), 1)
+
+        statements = [q['sql'] for q in captured.captured_queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('INSERT INTO sale_event_ledger')]), 1)
+        self.assertFalse([sql for sql in statements if 'integrations_requests' in sql])
+        self.assertFalse([sql for sql in statements if sql.startswith('UPDATE "campaign_counters"')])
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.amount_approved, Decimal('10.00'))
+        self.assertEqual(SaleEventLedger.objects.count(), 1)
+
+    def test_out_of_order_replay_does_not_recount(self):
+        """
+        Testa se um APPROVED reenviado após o REFUNDED não aprova a venda de novo.
+        """
+        for payment_status in ("PENDING", "APPROVED", "REFUNDED", "APPROVED", "PENDING"):
+            self.enqueue("pay-1", payment_status)
+            process_webhook_batch()
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 0)
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(self.campaign.total_refunded, 1)
+        self.assertEqual(IntegrationRequest.objects.get(payment_id="pay-1").status, "REFUNDED")
+        self.assertEqual(
+            sorted(SaleEventLedger.objects.values_list('status', flat=True)),
+            ["APPROVED", "PENDING", "REFUNDED"])
+
+    def test_older_status_after_newer_is_ignored(self):
+        """
+        Testa se um PENDING entregue pela primeira vez depois do APPROVED não
+        volta a venda para pendente nem fica no ledger.
+        """
+        for payment_status in ("APPROVED", "PENDING"):
+            self.enqueue("pay-1", payment_status)
+            process_webhook_batch()
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(IntegrationRequest.objects.get(payment_id="pay-1").status, "APPROVED")
+        self.assertEqual(list(SaleEventLedger.objects.values_list('status', flat=True)), ["APPROVED"])
+        self.assertEqual(WebhookEvent.objects.filter(status="done").count(), 2)
+
+        # Um status posterior continua sendo aplicado
+        self.enqueue("pay-1", "REFUNDED")
+        process_webhook_batch()
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 0)
+        self.assertEqual(self.campaign.total_refunded, 1)
+
+    def test_failed_event_does_not_keep_ledger_row(self):
+        """
+        Testa se o registro no ledger é desfeito junto com o processamento que falhou,
+        para que o retry da fila ainda aplique a venda.
+        """
+        event = self.enqueue("pay-1", "APPROVED")
+        with mock.patch("integrations.webhooks.upsert_integration_request",
+                        side_effect=RuntimeError("falha temporária")):
+            process_webhook_batch()
+        self.assertFalse(SaleEventLedger.objects.exists())
+
+        WebhookEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        process_webhook_batch()
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(SaleEventLedger.objects.count(), 1)
+
+    def test_prune_removes_old_entries(self):
+        """
+        Testa se o prune_sale_event_ledger remove apenas as transições antigas.
+        """
+        self.enqueue("pay-old", "APPROVED")
+        self.enqueue("pay-new", "APPROVED")
+        process_webhook_batch()
+        SaleEventLedger.objects.filter(payment_id="pay-old").update(
+            created_at=timezone.now() - timedelta(days=120))
+
+        out = StringIO()
+        call_command('prune_sale_event_ledger', days=90, batch_size=1, stdout=out)
+
+        self.assertIn('1 transições', out.getvalue())
+        self.assertEqual(list(SaleEventLedger.objects.values_list('payment_id', flat=True)), ["pay-new"])
@@ -0,0 +1,139 @@
+import json
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.invalidation_bus import bus
+from campaigns.models import Campaign
+from integrations.models import Integration
+from integrations.routing import ROUTES_TAG, router
+from integrations.webhook_queue import process_webhook_batch
+
+User = get_user_model()
+
+
+class TestIntegrationRouter(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.integration = Integration.objects.create(
+            user=self.user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.campaign.integrations.set([self.integration])
+
+    def test_bulk_load_and_lookup_without_queries(self):
+        """
+        Testa se as rotas são carregadas em lote e as buscas seguintes não acessam o banco.
+        """
+        with self.assertNumQueries(2):
+            router.load()
+
+        with self.assertNumQueries(0):
+            route = router.get_by_uid(self.integration.uid)
+            self.assertEqual(router.get(self.integration.pk), route)
+
+        self.assertEqual(route.integration_id, self.integration.pk)
+        self.assertEqual(route.campaign_id, self.campaign.pk)
+        self.assertEqual(route.user_id, self.user.pk)
+        self.assertEqual(route.gateway, 'zeroone')
+        self.assertEqual(route.status, 'active')
+
+    def test_m2m_change_invalidates_routes(self):
+        """
+        Testa se alterar as integrações de uma campanha atualiza a rota.
+        """
+        router.load()
+        other = Campaign.objects.create(
+            user=self.user, title="Outra campanha", method="CPC", CPC=Decimal('1.00'))
+        self.campaign.integrations.clear()
+        self.assertIsNone(router.get(self.integration.pk).campaign_id)
+
+        other.integrations.add(self.integration)
+        self.assertEqual(router.get(self.integration.pk).campaign_id, other.pk)
+
+    def test_deleted_integration_and_campaign(self):
+        """
+        Testa se integrações e campanhas excluídas deixam de ser roteadas.
+        """
+        router.load()
+        self.campaign.deleted = True
+        self.campaign.save()
+        self.assertIsNone(router.get(self.integration.pk).campaign_id)
+
+        self.integration.delete()
+        self.assertIsNone(router.get_by_uid(self.integration.uid))
+
+    def test_notification_from_other_process_invalidates(self):
+        """
+        Testa se um aviso de outro processo no barramento de invalidação
+        descarta as rotas e os avisos do próprio processo são ignorados.
+        """
+        router.load()
+        bus.receive(json.dumps({'origin': bus.get_origin(), 'tag': ROUTES_TAG, 'key': None}))
+        self.assertTrue(router.loaded)
+
+        bus.receive(json.dumps({'origin': 'other-process', 'tag': ROUTES_TAG, 'key': None}))
+        self.assertFalse(router.loaded)
+        with self.assertNumQueries(2):
+            self.assertEqual(router.get(self.integration.pk).campaign_id, self.campaign.pk)
+
+
+class TestWebhookRoutingQueries(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.integration = Integration.objects.create(
+            user=self.user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.campaign.integrations.set([self.integration])
+        self.url = reverse("zeroone-webhook", kwargs={"uid": self.integration.uid})
+        router.load()
+
+    def post_sale(self, payment_id):
+        return self.client.post(self.url, {
+            "paymentId": payment_id, "status": "APPROVED", "totalValue": 1000, "paymentMethod": "PIX",
+        }, format="json")
+
+    def test_webhook_view_only_inserts_event(self):
+        """
+        Testa se o webhook não faz consultas de busca: apenas o INSERT na fila.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            response = self.post_sale("pay-1")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [q['sql'] for q in captured.captured_queries]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT INTO "webhook_events"'))
+
+    def test_webhook_view_rejects_other_gateway(self):
+        """
+        Testa se o uid de uma integração de outro gateway retorna 404.
+        """
+        url = reverse("sunize-webhook", kwargs={"uid": self.integration.uid})
+        response = self.client.post(url, {"sale": {"id": "1"}, "event": "SALE_APPROVED"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_worker_does_not_look_up_campaigns(self):
+        """
+        Testa se o worker resolve a campanha pelo cache de rotas, sem consultar campanhas.
+        """
+        for index in range(3):
+            self.post_sale(f"pay-{index}")
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(process_webhook_batch(), 3)
+
+        lookups = [q['sql'] for q in captured.captured_queries
+                   if q['sql'].startswith('SELECT') and '"campaigns"' in q['sql']]
+        self.assertEqual(lookups, [])
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 3)
@@ -0,0 +1,392 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from campaigns.finance_accumulator import FinanceDeltaAccumulator
+from campaigns.models import Campaign, FinanceLogs
+from integrations.models import Integration, IntegrationRequest, SaleEventLedger, WebhookEvent
+from integrations.routing import router
+from integrations.campaign_operations import PAYMENT_STATUS_MAPPING
+from integrations.webhooks import GATEWAY_PAYLOADS, get_gateway_display_name, parse_webhook_payload
+from integrations.webhook_queue import process_webhook_batch
+import threading
+import uuid
+
+User = get_user_model()
+
+
+class TestGatewayWebhook(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.integration = Integration.objects.create(
+            user=self.user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.campaign.integrations.set([self.integration])
+        self.url = reverse("zeroone-webhook", kwargs={"uid": self.integration.uid})
+
+    def notify(self, payment_status, total_value=5000, payment_method="PIX", payment_id="pay-1", process=True):
+        response = self.client.post(self.url, {
+            "paymentId": payment_id,
+            "status": payment_status,
+            "totalValue": total_value,
+            "paymentMethod": payment_method,
+            "customer": {"name": "Cliente", "email": "cliente@gmail.com", "phone": "11999999999"},
+        }, format="json")
+        if process:
+            process_webhook_batch()
+        return response
+
+    def test_notification_is_queued(self):
+        """
+        Testa se o webhook apenas grava a notificação na fila, sem alterar os contadores.
+        """
+        response = self.notify("APPROVED", process=False)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.payment_id, "pay-1")
+        self.assertFalse(IntegrationRequest.objects.exists())
+
+        self.assertEqual(process_webhook_batch(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.status, "done")
+        self.assertTrue(IntegrationRequest.objects.exists())
+
+    def test_new_sale_updates_counters(self):
+        """
+        Testa se uma venda nova registra o IntegrationRequest e incrementa os contadores.
+        """
+        response = self.notify("PENDING")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        sale = IntegrationRequest.objects.get(integration=self.integration, payment_id="pay-1")
+        self.assertEqual(sale.status, "PENDING")
+        self.assertEqual(sale.amount, Decimal('50.00'))
+        self.assertEqual(sale.payment_method, "PIX")
+        self.assertEqual(sale.email, "cliente@gmail.com")
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 1)
+        self.assertEqual(self.campaign.amount_pending, Decimal('50.00'))
+
+    def test_status_transition_with_payment_method_split(self):
+        """
+        Testa a transição PENDING -> APPROVED -> REFUNDED, incluindo a divisão por forma de pagamento.
+        """
+        self.notify("PENDING", payment_method="CREDIT_CARD")
+        self.notify("APPROVED", payment_method="CREDIT_CARD")
+
+        finance_log = FinanceLogs.objects.get(campaign=self.campaign)
+        self.assertEqual(finance_log.total_pending, 0)
+        self.assertEqual(finance_log.total_approved, 1)
+        self.assertEqual(finance_log.credit_card_total, 1)
+        self.assertEqual(finance_log.credit_card_amount, Decimal('50.00'))
+
+        self.notify("REFUNDED", payment_method="CREDIT_CARD")
+
+        finance_log.refresh_from_db()
+        self.assertEqual(finance_log.total_approved, 0)
+        self.assertEqual(finance_log.credit_card_total, 0)
+        self.assertEqual(finance_log.total_refunded, 1)
+        self.assertEqual(IntegrationRequest.objects.filter(payment_id="pay-1").count(), 1)
+
+    def test_duplicate_notification_is_idempotent(self):
+        """
+        Testa se notificações repetidas do mesmo status não duplicam os contadores.
+        """
+        self.notify("APPROVED")
+        self.notify("APPROVED")
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.amount_approved, Decimal('50.00'))
+
+    def test_unknown_status_is_ignored(self):
+        """
+        Testa se um status desconhecido é confirmado sem alterar vendas ou contadores.
+        """
+        response = self.notify("SOMETHING_ELSE")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(IntegrationRequest.objects.exists())
+        self.assertEqual(WebhookEvent.objects.get().status, "done")
+
+    def test_invalid_payload(self):
+        """
+        Testa se um payload sem identificador do pagamento retorna 400.
+        """
+        response = self.client.post(self.url, {"status": "APPROVED"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_unknown_integration(self):
+        """
+        Testa se uma integração inexistente (ou de outro gateway) retorna 404.
+        """
+        url = reverse("zeroone-webhook", kwargs={"uid": uuid.uuid4()})
+        self.assertEqual(self.client.post(url, {}, format="json").status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        url = reverse("vegacheckout-webhook", kwargs={"uid": self.integration.uid})
+        self.assertEqual(self.client.post(url, {}, format="json").status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_routed_gateways_have_status_mapping(self):
+        """
+        Testa se todo gateway com endpoint de webhook tem o mapeamento de status
+        (sem ele as vendas seriam confirmadas e nunca contadas).
+        """
+        for gateway in GATEWAY_PAYLOADS:
+            self.assertIn(get_gateway_display_name(gateway), PAYMENT_STATUS_MAPPING, gateway)
+            reverse(f"{gateway}-webhook", kwargs={"uid": self.integration.uid})
+
+    def test_parse_vegacheckout_payload(self):
+        """
+        Testa a leitura de um payload da VegaCheckout (valor em reais e boleto).
+        """
+        event = parse_webhook_payload("vegacheckout", {
+            "transaction_token": "abc", "status": "approved", "total_price": "19.90", "method": "billet",
+        })
+        self.assertEqual(event.payment_id, "abc")
+        self.assertEqual(event.amount, Decimal('19.90'))
+        self.assertEqual(event.payment_method, "BOLETO")
+
+
+class TestWebhookQueue(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.integration = Integration.objects.create(
+            user=self.user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.campaign.integrations.set([self.integration])
+
+    def enqueue(self, payment_id, payment_status, total_value=1000):
+        return WebhookEvent.objects.create(
+            integration=self.integration, gateway="zeroone", payment_id=payment_id,
+            payload={"paymentId": payment_id, "status": payment_status,
+                     "totalValue": total_value, "paymentMethod": "PIX"})
+
+    def test_batch_applies_net_deltas_per_campaign(self):
+        """
+        Testa se um lote aplica as transições somadas com um único UPDATE/upsert por campanha.
+        """
+        for index in range(10):
+            self.enqueue(f"pay-{index}", "PENDING")
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(process_webhook_batch(), 10)
+
+        campaign_updates = [q for q in captured.captured_queries
+                            if q['sql'].startswith('UPDATE "campaign_counters"')]
+        finance_upserts = [q for q in captured.captured_queries
+                           if 'INSERT INTO "finances_logs"' in q['sql']]
+        self.assertEqual(len(campaign_updates), 1)
+        self.assertEqual(len(finance_upserts), 1)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 10)
+        self.assertEqual(self.campaign.amount_pending, Decimal('100.00'))
+
+    def test_same_payment_is_processed_in_order(self):
+        """
+        Testa se notificações do mesmo pagamento são retiradas da fila uma de cada vez, na ordem.
+        """
+        self.enqueue("pay-1", "PENDING")
+        self.enqueue("pay-1", "APPROVED")
+
+        self.assertEqual(process_webhook_batch(batch_size=1, accumulator=FinanceDeltaAccumulator(
+            max_events=1, max_delay_ms=float('inf'))), 1)
+        self.assertEqual(IntegrationRequest.objects.get(payment_id="pay-1").status, "PENDING")
+        self.assertEqual(process_webhook_batch(), 1)
+
+        sale = IntegrationRequest.objects.get(payment_id="pay-1")
+        self.assertEqual(sale.status, "APPROVED")
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_pending, 0)
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(self.campaign.pix_total, 1)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_RETRY_DELAY_SECONDS=30)
+    def test_retry_with_backoff_and_dead_letter(self):
+        """
+        Testa se uma falha agenda nova tentativa com backoff e, ao atingir o limite, o dead-letter.
+        """
+        event = self.enqueue("pay-1", "APPROVED")
+
+        with mock.patch("integrations.webhook_queue.record_sale_notification",
+                        side_effect=RuntimeError("falha temporária")):
+            process_webhook_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.available_at, timezone.now() + timezone.timedelta(seconds=20))
+
+        # Não é processado antes do backoff
+        self.assertEqual(process_webhook_batch(), 0)
+
+        WebhookEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        with mock.patch("integrations.webhook_queue.record_sale_notification",
+                        side_effect=RuntimeError("falha temporária")):
+            process_webhook_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "dead")
+        self.assertEqual(event.attempts, 2)
+        self.assertIn("falha temporária", event.last_error)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 0)
+
+    def test_invalid_payload_goes_to_dead_letter(self):
+        """
+        Testa se um payload inválido vai direto para o dead-letter sem afetar o restante do lote.
+        """
+        invalid = WebhookEvent.objects.create(
+            integration=self.integration, gateway="zeroone", payment_id="x", payload={"foo": "bar"})
+        self.enqueue("pay-1", "APPROVED")
+
+        self.assertEqual(process_webhook_batch(), 2)
+
+        invalid.refresh_from_db()
+        self.assertEqual(invalid.status, "dead")
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+
+    def test_accumulator_spans_several_batches(self):
+        """
+        Testa se vários lotes são confirmados juntos com um único flush dos contadores.
+        """
+        for index in range(50):
+            self.enqueue(f"pay-{index}", "APPROVED")
+        accumulator = FinanceDeltaAccumulator(max_events=50, max_delay_ms=float('inf'))
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(process_webhook_batch(batch_size=10, accumulator=accumulator), 50)
+
+        campaign_updates = [q for q in captured.captured_queries
+                            if q['sql'].startswith('UPDATE "campaign_counters"')]
+        self.assertEqual(len(campaign_updates), 1)
+        self.assertEqual(accumulator.metrics.as_dict()['last_size'], 50)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 50)
+
+    def test_failed_flush_keeps_events_queued(self):
+        """
+        Testa se uma falha no flush desfaz vendas e contadores e devolve os eventos à fila.
+        """
+        event = self.enqueue("pay-1", "APPROVED")
+
+        with mock.patch("campaigns.finance_accumulator.apply_finance_deltas",
+                        side_effect=RuntimeError("banco indisponível")):
+            with self.assertRaises(RuntimeError):
+                process_webhook_batch()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+        self.assertFalse(IntegrationRequest.objects.exists())
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 0)
+
+    def test_stale_route_reads_campaign_from_database(self):
+        """
+        Testa se uma rota sem campanha no cache do processo (desatualizado) é
+        conferida no banco e a venda vai para a campanha vinculada.
+        """
+        router.load()
+        # Cache do processo de antes do vínculo com a campanha
+        route = router.get(self.integration.pk)
+        router.by_id[self.integration.pk] = route._replace(campaign_id=None)
+        event = self.enqueue("pay-1", "APPROVED")
+
+        self.assertEqual(process_webhook_batch(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "done")
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+        self.assertEqual(router.get(self.integration.pk).campaign_id, self.campaign.pk)
+
+    def test_integration_without_campaign_keeps_event_queued(self):
+        """
+        Testa se a venda de uma integração sem campanha não é registrada nem
+        confirmada, e é contada depois que a campanha é vinculada.
+        """
+        self.campaign.integrations.clear()
+        event = self.enqueue("pay-1", "APPROVED")
+
+        self.assertEqual(process_webhook_batch(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("sem campanha", event.last_error)
+        self.assertFalse(IntegrationRequest.objects.exists())
+        self.assertFalse(SaleEventLedger.objects.exists())
+
+        self.campaign.integrations.set([self.integration])
+        WebhookEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        self.assertEqual(process_webhook_batch(), 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, "done")
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 1)
+
+
+class TestConcurrentWebhookWorkers(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cpf="63861694921", email="tester@gmail.com", name="Sarah Isabela Lima", password="7lonAzJxss@")
+        self.integration = Integration.objects.create(
+            user=self.user, name="Conta da Sarah - ZeroOne", gateway="zeroone")
+        self.campaign = Campaign.objects.create(
+            user=self.user, title="Campanha APP da Sara", method="CPC", CPC=Decimal('4.25'))
+        self.campaign.integrations.set([self.integration])
+
+    def test_workers_do_not_double_process(self):
+        """
+        Testa se vários workers em paralelo processam cada evento uma única vez.
+        """
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(integration=self.integration, gateway="zeroone", payment_id=f"pay-{index}",
+                         payload={"paymentId": f"pay-{index}", "status": "APPROVED",
+                                  "totalValue": 1000, "paymentMethod": "PIX"})
+            for index in range(200)
+        ])
+        errors = []
+
+        def worker():
+            try:
+                while process_webhook_batch(batch_size=10):
+                    pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertFalse(WebhookEvent.objects.exclude(status="done").exists())
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.total_approved, 200)
+        self.assertEqual(self.campaign.amount_approved, Decimal('2000.00'))
+        self.assertEqual(FinanceLogs.objects.get(campaign=self.campaign).pix_total, 200)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import IntegrationViewSet, IntegrationDetailView, AvailableGatewaysView
+from . import views
 
 router = DefaultRouter()
 router.register(r'integrations-user', IntegrationViewSet,
@@ -13,4 +14,25 @@ urlpatterns = [
     path('integrations/gateways/', AvailableGatewaysView.as_view(),
          name='available-gateways'),
 
+    # Notificações de vendas dos gateways (ver IntegrationViewSet.build_webhook_url)
+    path('webhook/zeroone/<uuid:uid>/', views.ZeroOneWebhookView.as_view(),
+         name='zeroone-webhook'),
+    path('webhook/ghostspay/<uuid:uid>/', views.GhostsPayWebhookView.as_view(),
+         name='ghostspay-webhook'),
+    path('webhook/paradisepag/<uuid:uid>/', views.ParadisePagWebhookView.as_view(),
+         name='paradisepag-webhook'),
+    path('webhook/disrupty/<uuid:uid>/', views.DisruptyWebhookView.as_view(),
+         name='disrupty-webhook'),
+    path('webhook/wolfpay/<uuid:uid>/', views.WolfPayWebhookView.as_view(),
+         name='wolfpay-webhook'),
+    path('webhook/vegacheckout/<uuid:uid>/', views.VegaCheckoutWebhookView.as_view(),
+         name='vegacheckout-webhook'),
+    path('webhook/cloudfy/<uuid:uid>/', views.CloudFyWebhookView.as_view(),
+         name='cloudfy-webhook'),
+    path('webhook/tribopay/<uuid:uid>/', views.TriboPayWebhookView.as_view(),
+         name='tribopay-webhook'),
+    path('webhook/westpay/<uuid:uid>/', views.WestPayWebhookView.as_view(),
+         name='westpay-webhook'),
+    path('webhook/sunize/<uuid:uid>/', views.SunizeWebhookView.as_view(),
+         name='sunize-webhook'),
 ]
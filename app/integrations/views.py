@@ -9,11 +9,17 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
 from .models import Integration, IntegrationRequest
 from campaigns.models import Campaign
+from campaigns.search import DocumentSearchFilter
+from project.pagination import DefaultPagination
 from .serializers import IntegrationSerializer, IntegrationRequestSerializer
 from django.conf import settings
 import logging
 import re
 from .schema import schemas
+from .webhooks import parse_webhook_payload
+from .webhook_queue import enqueue_webhook_event
+from .routing import router
+from .signals import invalidate_routes
 
 logger = logging.getLogger('django')
 
@@ -27,7 +33,7 @@ class IntegrationViewSet(viewsets.ModelViewSet):
     serializer_class = IntegrationSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'uid'
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, DocumentSearchFilter]
     ordering_fields = ['created_at']
     search_fields = ['name', 'gateway']
 
@@ -61,14 +67,14 @@ class IntegrationViewSet(viewsets.ModelViewSet):
         """
         queryset = self.filter_queryset(self.get_queryset())
 
-        # Verifica se o queryset está vazio
-        if not queryset.exists():
+        # A página é buscada primeiro: uma página vazia indica a busca sem resultados
+        page = self.paginate_queryset(queryset)
+        if page is not None and not page:
             return Response(
                 {"count": 0, "detail": "Nenhuma campanha encontrada com os critérios de busca.", "results": []}
             )
 
         # Caso contrário, retorna os resultados normalmente
-        page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
@@ -176,6 +182,7 @@ class IntegrationViewSet(viewsets.ModelViewSet):
 
         with transaction.atomic():
             updated_count = instances.update(deleted=True)
+            invalidate_routes()
 
         return Response(
             {
@@ -229,10 +236,17 @@ class IntegrationRequestListView(APIView):
 
     def get(self, request):
         """
-        Retorna uma lista de todas as requisições de integração do usuário autenticado.
+        Retorna uma lista de todas as requisições de integração do usuário
+        autenticado, ou uma página com `?cursor=` (paginação por cursor).
         """
         integration_requests = IntegrationRequest.objects.filter(
             integration__user=request.user)
+        paginator = DefaultPagination()
+        if paginator.cursor_query_param in request.query_params:
+            page = paginator.paginate_queryset(integration_requests, request, self)
+            serializer = IntegrationRequestSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
         serializer = IntegrationRequestSerializer(
             integration_requests, many=True)
         return Response(serializer.data)
@@ -259,3 +273,87 @@ class AvailableGatewaysView(APIView):
                         for key, value in Integration._meta.get_field('gateway').choices]
 
         return Response(response)
+
+
+class GatewayWebhookView(APIView):
+    """
+    Base dos endpoints que recebem as notificações de vendas dos gateways
+    (`/webhook/<gateway>/<uid da integração>/`).
+
+    A notificação é validada e gravada na fila `webhook_events`; a venda e os
+    contadores da campanha são atualizados pelo `manage.py process_webhooks`.
+    A integração é resolvida pelo cache de rotas (`integrations.routing`), sem
+    consultas ao banco além do INSERT na fila.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    gateway = None
+
+    def post(self, request, uid):
+        route = router.get_by_uid(uid)
+        if not route or route.gateway != self.gateway:
+            return Response({"error": "Integração não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            notification = parse_webhook_payload(self.gateway, request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            enqueue_webhook_event(route, notification)
+        except Exception as e:
+            logger.error(
+                f"Erro ao registrar webhook {self.gateway} da integração {uid}: {e}", exc_info=True)
+            return Response({"error": "Erro ao registrar a notificação."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({"message": "Notificação recebida com sucesso."}, status=status.HTTP_200_OK)
+
+
+@schemas['zeroone_webhook_view']
+class ZeroOneWebhookView(GatewayWebhookView):
+    gateway = 'zeroone'
+
+
+@schemas['ghostspay_webhook_view']
+class GhostsPayWebhookView(GatewayWebhookView):
+    gateway = 'ghostspay'
+
+
+@schemas['paradisepag_webhook_view']
+class ParadisePagWebhookView(GatewayWebhookView):
+    gateway = 'paradisepag'
+
+
+@schemas['disrupty_webhook_view']
+class DisruptyWebhookView(GatewayWebhookView):
+    gateway = 'disrupty'
+
+
+@schemas['wolfpay_webhook_view']
+class WolfPayWebhookView(GatewayWebhookView):
+    gateway = 'wolfpay'
+
+
+@schemas['vegacheckout_webhook_view']
+class VegaCheckoutWebhookView(GatewayWebhookView):
+    gateway = 'vegacheckout'
+
+
+@schemas['cloudfy_webhook_view']
+class CloudFyWebhookView(GatewayWebhookView):
+    gateway = 'cloudfy'
+
+
+@schemas['tribopay_webhook_view']
+class TriboPayWebhookView(GatewayWebhookView):
+    gateway = 'tribopay'
+
+
+@schemas['westpay_webhook_view']
+class WestPayWebhookView(GatewayWebhookView):
+    gateway = 'westpay'
+
+
+@schemas['sunize_webhook_view']
+class SunizeWebhookView(GatewayWebhookView):
+    gateway = 'sunize'
@@ -0,0 +1,209 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from campaigns.finance_accumulator import FinanceDeltaAccumulator
+from .models import WebhookEvent
+from .routing import get_integration_campaigns, router
+from .webhooks import parse_webhook_payload, record_sale_notification
+
+logger = logging.getLogger('django')
+
+# Atraso máximo entre tentativas (backoff exponencial)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def enqueue_webhook_event(route, notification):
+    """
+    Grava a notificação na fila (`webhook_events`) para ser processada pelo worker.
+
+    Args:
+        route (IntegrationRoute): Rota da integração que recebeu a notificação.
+        notification (SaleNotification): Venda normalizada.
+    """
+    return WebhookEvent.objects.create(
+        integration_id=route.integration_id,
+        gateway=route.gateway,
+        payment_id=notification.payment_id,
+        payload=notification.payload,
+    )
+
+
+def get_retry_delay(attempts):
+    """
+    Retorna o atraso até a próxima tentativa: WEBHOOK_RETRY_DELAY_SECONDS * 2^(tentativas - 1),
+    limitado a MAX_RETRY_DELAY.
+    """
+    delay = timedelta(seconds=settings.WEBHOOK_RETRY_DELAY_SECONDS * 2 ** max(attempts - 1, 0))
+    return min(delay, MAX_RETRY_DELAY)
+
+
+def claim_webhook_events(batch_size):
+    """
+    Bloqueia um lote de eventos pendentes com `SELECT ... FOR UPDATE SKIP LOCKED`,
+    permitindo vários workers em paralelo sem processamento duplicado.
+
+    Eventos com uma notificação anterior ainda pendente do mesmo pagamento são
+    deixados para lotes seguintes, preservando a ordem das transições.
+    Deve ser chamada dentro de uma transação.
+    """
+    earlier_pending = WebhookEvent.objects.filter(
+        integration_id=OuterRef('integration_id'),
+        payment_id=OuterRef('payment_id'),
+        status='pending',
+        id__lt=OuterRef('id'),
+    )
+    return list(
+        WebhookEvent.objects.select_related('integration')
+        .select_for_update(skip_locked=True, of=('self',))
+        .filter(status='pending', available_at__lte=timezone.now())
+        .exclude(Exists(earlier_pending))
+        .order_by('id')[:batch_size]
+    )
+
+
+def mark_failed(event, error, now, permanent=False):
+    """
+    Registra a falha do evento: agenda uma nova tentativa com backoff ou o move
+    para o dead-letter (`dead`) ao atingir WEBHOOK_MAX_ATTEMPTS.
+    """
+    event.attempts += 1
+    event.last_error = str(error)[:2000]
+    if permanent or event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        event.status = 'dead'
+        event.processed_at = now
+        logger.error(f"Webhook {event.pk} ({event.gateway}) movido para o dead-letter: {error}")
+    else:
+        event.available_at = now + get_retry_delay(event.attempts)
+        logger.warning(
+            f"Webhook {event.pk} ({event.gateway}) falhou (tentativa {event.attempts}): {error}")
+
+
+def process_webhook_batch(batch_size=100, accumulator=None):
+    """
+    Processa a fila de webhooks em uma única transação.
+
+    Cada evento registra a venda no IntegrationRequest (em um savepoint próprio)
+    e sua transição é somada no acumulador por (campanha, dia do recebimento).
+    Novos lotes são retirados da fila até o acumulador pedir o flush (ou a fila
+    esvaziar); então cada (campanha, dia) é aplicado com um único UPDATE na
+    campanha e um upsert no FinanceLogs, e a transação confirma os eventos e os
+    contadores juntos. Se o processo cair antes do commit, os eventos voltam
+    para a fila.
+
+    Args:
+        batch_size (int): Quantidade máxima de eventos por lote.
+        accumulator (FinanceDeltaAccumulator): Acumulador reaproveitado entre chamadas
+            (mantém as métricas de flush). Padrão: flush a cada lote.
+
+    Returns:
+        int: Quantidade de eventos retirados da fila (0 se não havia eventos disponíveis).
+    """
+    if accumulator is None:
+        accumulator = FinanceDeltaAccumulator(max_events=batch_size, max_delay_ms=float('inf'))
+
+    claimed_ids = []
+    try:
+        with transaction.atomic():
+            while True:
+                events = claim_webhook_events(batch_size)
+                if not events:
+                    break
+                claimed_ids.extend(event.pk for event in events)
+                process_events(events, accumulator)
+                if accumulator.should_flush():
+                    break
+
+            accumulator.flush()
+            return len(claimed_ids)
+    except Exception as e:
+        # Falha ao aplicar os lotes: a transação foi desfeita e os eventos voltam
+        # para a fila com uma nova tentativa agendada.
+        accumulator.reset()
+        logger.error(f"Erro ao processar lote de webhooks: {e}", exc_info=True)
+        if claimed_ids:
+            retry_batch(claimed_ids, e)
+        raise
+
+
+def get_event_campaign(event):
+    """
+    Retorna a campanha (campaign_id, counter_shards) que recebe as vendas do
+    evento, ou (None, 0) se a integração não tiver campanha vinculada (ou
+    tiver sido excluída).
+
+    Uma rota ausente (ou sem campanha) no cache do processo é conferida no
+    banco: se o banco tiver a campanha, o cache estava desatualizado e é descartado.
+    """
+    route = router.get(event.integration_id)
+    if route and route.campaign_id:
+        return route.campaign_id, route.counter_shards
+    if event.integration.deleted:
+        return None, 0
+
+    campaign = get_integration_campaigns([event.integration_id]).get(event.integration_id)
+    if campaign is None:
+        return None, 0
+    logger.warning(f"Rota da integração {event.integration_id} desatualizada no cache; recarregando.")
+    router.invalidate()
+    return campaign
+
+
+def process_events(events, accumulator):
+    """
+    Registra as vendas de um lote de eventos bloqueados, soma as transições no
+    acumulador e grava o novo estado dos eventos (ainda dentro da transação).
+
+    Os eventos processados são confirmados com um único UPDATE; apenas os que
+    falharam (tentativas, erro e próxima tentativa próprios) usam o bulk_update.
+    """
+    now = timezone.now()
+    done_ids = []
+    for event in events:
+        try:
+            notification = parse_webhook_payload(event.gateway, event.payload)
+        except ValueError as e:
+            mark_failed(event, e, now, permanent=True)
+            continue
+
+        # A campanha é resolvida antes de registrar a venda: uma venda registrada
+        # no ledger sem ir para os contadores não seria somada de novo
+        campaign_id, counter_shards = get_event_campaign(event)
+        if campaign_id is None:
+            mark_failed(event, f"Integração {event.integration_id} sem campanha vinculada", now,
+                        permanent=event.integration.deleted)
+            continue
+
+        try:
+            with transaction.atomic():
+                deltas = record_sale_notification(event.integration, notification)
+        except Exception as e:
+            mark_failed(event, e, now)
+            continue
+
+        done_ids.append(event.pk)
+        accumulator.add(campaign_id, timezone.localdate(event.created_at), deltas, counter_shards)
+
+    if done_ids:
+        WebhookEvent.objects.filter(pk__in=done_ids).update(status='done', processed_at=now)
+    done_ids = set(done_ids)
+    failed = [event for event in events if event.pk not in done_ids]
+    if failed:
+        WebhookEvent.objects.bulk_update(
+            failed, ['status', 'attempts', 'last_error', 'available_at', 'processed_at'])
+
+
+def retry_batch(event_ids, error):
+    """
+    Agenda uma nova tentativa (ou o dead-letter) para todos os eventos de um lote que falhou.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(WebhookEvent.objects.select_for_update().filter(
+            pk__in=event_ids, status='pending'))
+        for event in events:
+            mark_failed(event, error, now)
+        WebhookEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'last_error', 'available_at', 'processed_at'])
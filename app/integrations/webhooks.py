@@ -0,0 +1,341 @@
+import logging
+import uuid
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from django.db import connection
+from django.utils import timezone
+from campaigns.finance_log_utils import get_transition_deltas
+from .campaign_operations import map_payment_status
+from .models import Integration, IntegrationRequest, SaleEventLedger
+
+logger = logging.getLogger('django')
+
+# Venda normalizada extraída do payload de um gateway
+SaleNotification = namedtuple('SaleNotification', [
+    'payment_id', 'status', 'amount', 'payment_method', 'name', 'email', 'phone', 'payload',
+])
+
+# Ordem dos status de uma venda: um status anterior ao atual (ex.: PENDING
+# depois de APPROVED) é uma notificação fora de ordem e não altera a venda.
+# Status de mesma ordem podem se substituir (ex.: REJECTED -> APPROVED).
+STATUS_PRECEDENCE = {
+    'PENDING': 0,
+    'APPROVED': 1,
+    'REJECTED': 1,
+    'ABANDONED': 1,
+    'CANCELED': 1,
+    'REFUNDED': 2,
+    'CHARGEBACK': 2,
+}
+
+# Onde cada gateway envia os dados da venda. Cada campo lista caminhos
+# (separados por ponto) tentados em ordem; `amount_in_cents` indica se o
+# valor chega em centavos.
+GATEWAY_PAYLOADS = {
+    'zeroone': {
+        'payment_id': ('paymentId', 'id'),
+        'status': ('status',),
+        'amount': ('totalValue', 'amount'),
+        'amount_in_cents': True,
+        'payment_method': ('paymentMethod', 'method'),
+        'customer': ('customer',),
+    },
+    'ghostspay': {
+        'payment_id': ('paymentId', 'id'),
+        'status': ('status',),
+        'amount': ('totalValue', 'amount'),
+        'amount_in_cents': True,
+        'payment_method': ('paymentMethod', 'method'),
+        'customer': ('customer',),
+    },
+    'paradisepag': {
+        'payment_id': ('transaction_id', 'id'),
+        'status': ('status',),
+        'amount': ('amount',),
+        'amount_in_cents': True,
+        'payment_method': ('payment_method', 'paymentMethod'),
+        'customer': ('customer',),
+    },
+    'disrupty': {
+        'payment_id': ('data.id', 'id'),
+        'status': ('data.status', 'status'),
+        'amount': ('data.amount', 'amount'),
+        'amount_in_cents': True,
+        'payment_method': ('data.paymentMethod', 'paymentMethod'),
+        'customer': ('data.customer', 'customer'),
+    },
+    'wolfpay': {
+        'payment_id': ('data.id', 'id'),
+        'status': ('data.status', 'status'),
+        'amount': ('data.amount', 'amount'),
+        'amount_in_cents': True,
+        'payment_method': ('data.paymentMethod', 'paymentMethod'),
+        'customer': ('data.customer', 'customer'),
+    },
+    'vegacheckout': {
+        'payment_id': ('transaction_token', 'code', 'id'),
+        'status': ('status',),
+        'amount': ('total_price', 'amount'),
+        'amount_in_cents': False,
+        'payment_method': ('method', 'payment_method'),
+        'customer': ('customer',),
+    },
+    'cloudfy': {
+        'payment_id': ('id', 'transactionId'),
+        'status': ('status',),
+        'amount': ('amount',),
+        'amount_in_cents': True,
+        'payment_method': ('paymentMethod', 'payment_method'),
+        'customer': ('customer',),
+    },
+    'tribopay': {
+        'payment_id': ('transaction_hash', 'hash', 'id'),
+        'status': ('status',),
+        'amount': ('amount',),
+        'amount_in_cents': True,
+        'payment_method': ('payment_method', 'method'),
+        'customer': ('customer',),
+    },
+    'westpay': {
+        'payment_id': ('data.id', 'id'),
+        'status': ('data.status', 'status'),
+        'amount': ('data.amount', 'amount'),
+        'amount_in_cents': True,
+        'payment_method': ('data.paymentMethod', 'paymentMethod'),
+        'customer': ('data.customer', 'customer'),
+    },
+    'sunize': {
+        'payment_id': ('sale.id', 'id'),
+        'status': ('event', 'status'),
+        'amount': ('sale.amount', 'amount'),
+        'amount_in_cents': False,
+        'payment_method': ('sale.payment_method', 'payment_method'),
+        'customer': ('customer', 'sale.customer'),
+    },
+}
+
+# Nomes das formas de pagamento enviados pelos gateways -> forma de pagamento interna
+PAYMENT_METHOD_ALIASES = {
+    'pix': 'PIX',
+    'credit_card': 'CREDIT_CARD',
+    'creditcard': 'CREDIT_CARD',
+    'credit card': 'CREDIT_CARD',
+    'card': 'CREDIT_CARD',
+    'cartao': 'CREDIT_CARD',
+    'debit_card': 'DEBIT_CARD',
+    'debitcard': 'DEBIT_CARD',
+    'debit card': 'DEBIT_CARD',
+    'boleto': 'BOLETO',
+    'billet': 'BOLETO',
+    'bank_slip': 'BOLETO',
+    'bankslip': 'BOLETO',
+}
+
+
+def _get_value(payload, paths):
+    """
+    Retorna o primeiro valor encontrado no payload entre os caminhos informados.
+    """
+    for path in paths:
+        value = payload
+        for key in path.split('.'):
+            if not isinstance(value, dict) or key not in value:
+                value = None
+                break
+            value = value[key]
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def normalize_payment_method(payment_method):
+    """
+    Converte a forma de pagamento do gateway para PIX, CREDIT_CARD, DEBIT_CARD ou BOLETO.
+    Formas desconhecidas são retornadas em maiúsculas.
+    """
+    if not payment_method:
+        return ''
+    payment_method = str(payment_method).strip()
+    return PAYMENT_METHOD_ALIASES.get(payment_method.lower(), payment_method.upper())
+
+
+def parse_webhook_payload(gateway, payload):
+    """
+    Extrai os dados da venda do payload de um gateway.
+
+    Args:
+        gateway (str): Chave do gateway (ex.: 'zeroone').
+        payload (dict): Corpo da notificação recebida.
+
+    Returns:
+        SaleNotification: Venda normalizada.
+
+    Raises:
+        ValueError: Se o payload não tiver os dados mínimos da venda.
+    """
+    spec = GATEWAY_PAYLOADS.get(gateway)
+    if spec is None:
+        raise ValueError(f"Gateway '{gateway}' não suportado.")
+    if not isinstance(payload, dict):
+        raise ValueError("Payload inválido.")
+
+    payment_id = _get_value(payload, spec['payment_id'])
+    status = _get_value(payload, spec['status'])
+    if payment_id is None or status is None:
+        raise ValueError("Payload sem identificador ou status do pagamento.")
+
+    try:
+        amount = Decimal(str(_get_value(payload, spec['amount']) or 0))
+    except InvalidOperation:
+        raise ValueError("Valor do pagamento inválido.")
+    if spec['amount_in_cents']:
+        amount = amount / 100
+    amount = amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    customer = _get_value(payload, spec['customer'])
+    customer = customer if isinstance(customer, dict) else {}
+
+    return SaleNotification(
+        payment_id=str(payment_id)[:255],
+        status=str(status),
+        amount=amount,
+        payment_method=normalize_payment_method(
+            _get_value(payload, spec['payment_method'])),
+        name=str(customer['name'])[:255] if customer.get('name') else None,
+        email=str(customer['email'])[:254] if customer.get('email') else None,
+        phone=str(customer['phone'])[:20] if customer.get('phone') else None,
+        payload=payload,
+    )
+
+
+def get_gateway_display_name(gateway):
+    """
+    Retorna o nome de exibição do gateway (ex.: 'zeroone' -> 'ZeroOne'),
+    usado pelo `map_payment_status`.
+    """
+    return dict(Integration._meta.get_field('gateway').choices).get(gateway, gateway)
+
+
+def register_sale_event(integration_id, payment_id, status):
+    """
+    Registra no ledger a transição (integração, pagamento, status mapeado).
+
+    Um único `INSERT ... ON CONFLICT DO NOTHING`: se a linha já existia, a
+    notificação é uma repetição (reenvio do gateway ou retry da fila) e não
+    deve alterar os contadores. Status anteriores que chegam pela primeira vez
+    depois do atual são barrados pelo `upsert_integration_request`.
+
+    Returns:
+        bool: True se a transição é nova.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SaleEventLedger._meta.db_table} (integration_id, payment_id, status, created_at) "
+            f"VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT (integration_id, payment_id, status) DO NOTHING",
+            [integration_id, payment_id, status, timezone.now()],
+        )
+        return cursor.rowcount == 1
+
+
+def discard_sale_event(integration_id, payment_id, status):
+    """
+    Remove do ledger a transição registrada para uma notificação que não foi aplicada.
+    """
+    SaleEventLedger.objects.filter(
+        integration_id=integration_id, payment_id=payment_id, status=status).delete()
+
+
+def upsert_integration_request(integration_id, notification, status):
+    """
+    Cria ou atualiza o IntegrationRequest da venda pelo payment_id.
+
+    A venda nova é inserida com `INSERT ... ON CONFLICT DO NOTHING`; se já existir,
+    é atualizada com um UPDATE que bloqueia a linha e retorna o estado anterior,
+    garantindo que notificações concorrentes do mesmo pagamento vejam transições
+    consecutivas. O UPDATE não é feito se o status atual da venda vem depois do
+    novo em `STATUS_PRECEDENCE` (notificação fora de ordem).
+
+    Returns:
+        tuple: (aplicada, anteriores): aplicada é False para uma notificação fora
+        de ordem; anteriores é (status, amount, payment_method), ou None se a
+        venda é nova.
+    """
+    table = IntegrationRequest._meta.db_table
+    precedence = ' '.join(f"WHEN '{name}' THEN {rank}" for name, rank in STATUS_PRECEDENCE.items())
+    now = timezone.now()
+    payload = IntegrationRequest._meta.get_field('response').get_db_prep_value(notification.payload, connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (uid, integration_id, status, payment_id, payment_method, amount, "
+            f"phone, name, email, response, created_at, updated_at) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+            f"ON CONFLICT (integration_id, payment_id) DO NOTHING RETURNING id",
+            [uuid.uuid4(), integration_id, status, notification.payment_id, notification.payment_method, notification.amount,
+             notification.phone, notification.name, notification.email, payload, now, now],
+        )
+        if cursor.fetchone():
+            return True, None
+
+        cursor.execute(
+            f"UPDATE {table} AS request SET status = %s, amount = %s, "
+            f"payment_method = COALESCE(NULLIF(%s, ''), old.payment_method), "
+            f"response = %s, updated_at = %s "
+            f"FROM (SELECT id, status, amount, payment_method FROM {table} "
+            f"WHERE integration_id = %s AND payment_id = %s FOR UPDATE) AS old "
+            f"WHERE request.id = old.id AND %s >= CASE old.status {precedence} ELSE 0 END "
+            f"RETURNING old.status, old.amount, old.payment_method",
+            [status, notification.amount, notification.payment_method, payload, now,
+             integration_id, notification.payment_id, STATUS_PRECEDENCE.get(status, 0)],
+        )
+        previous = cursor.fetchone()
+        return previous is not None, previous
+
+
+def record_sale_notification(integration, notification):
+    """
+    Registra a venda no IntegrationRequest e calcula a transição de status
+    (status anterior -> novo status), incluindo a divisão por forma de pagamento.
+
+    Deve ser chamada dentro de uma transação; os contadores não são alterados aqui.
+    Transições já registradas no ledger (ver `register_sale_event`) e status
+    anteriores ao atual da venda (ver `STATUS_PRECEDENCE`) são ignorados.
+
+    Args:
+        integration (Integration): Integração que recebeu a notificação.
+        notification (SaleNotification): Venda normalizada (ver `parse_webhook_payload`).
+
+    Returns:
+        dict: Deltas da transição (vazio se nada mudou ou o status é desconhecido).
+    """
+    status = map_payment_status(notification.status, get_gateway_display_name(integration.gateway))
+    if status == 'UNKNOWN':
+        logger.warning(
+            f"Status '{notification.status}' desconhecido para o gateway {integration.gateway}; "
+            f"pagamento {notification.payment_id} ignorado.")
+        return {}
+
+    if not register_sale_event(integration.pk, notification.payment_id, status):
+        logger.info(
+            f"Notificação repetida do pagamento {notification.payment_id} ({status}) "
+            f"na integração {integration.pk} ignorada.")
+        return {}
+
+    applied, previous = upsert_integration_request(integration.pk, notification, status)
+    if not applied:
+        # Status anterior ao atual da venda: fora do ledger, como se não tivesse chegado
+        discard_sale_event(integration.pk, notification.payment_id, status)
+        logger.info(
+            f"Notificação fora de ordem do pagamento {notification.payment_id} ({status}) "
+            f"na integração {integration.pk} ignorada.")
+        return {}
+    old_status, old_amount, old_payment_method = previous or (None, None, None)
+    return get_transition_deltas(
+        old_status=old_status,
+        old_amount=old_amount,
+        status=status,
+        amount=notification.amount,
+        payment_method=notification.payment_method,
+        old_payment_method=old_payment_method,
+    )
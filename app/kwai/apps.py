@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class KwaiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kwai'
+
+    def ready(self):
+        import kwai.signals
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0035_userdailyfinance'),
+        ('kwai', '0005_kwai_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KwaiDailyFinance',
+            fields=[
+                ('total_views', models.IntegerField(default=0)),
+                ('total_clicks', models.IntegerField(default=0)),
+                ('total_approved', models.IntegerField(default=0)),
+                ('total_pending', models.IntegerField(default=0)),
+                ('total_refunded', models.IntegerField(default=0)),
+                ('total_abandoned', models.IntegerField(default=0)),
+                ('total_chargeback', models.IntegerField(default=0)),
+                ('total_rejected', models.IntegerField(default=0)),
+                ('amount_approved', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_pending', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_refunded', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_rejected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_chargeback', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_abandoned', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit_card_total', models.IntegerField(default=0)),
+                ('pix_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('pix_total', models.IntegerField(default=0)),
+                ('debit_card_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('debit_card_total', models.IntegerField(default=0)),
+                ('boleto_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('boleto_total', models.IntegerField(default=0)),
+                ('total_ads', models.DecimalField(decimal_places=8, default=0, max_digits=17)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('kwai', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_finance', to='kwai.kwai')),
+            ],
+            options={
+                'db_table': 'kwai_daily_finance',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='kwaidailyfinance',
+            constraint=models.UniqueConstraint(fields=('kwai', 'date'), name='unique_kwai_daily_finance'),
+        ),
+        # Preenche os rollups com a soma diária do FinanceLogs das campanhas vinculadas
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO kwai_daily_finance
+                (kwai_id, date, total_views, total_clicks, total_approved, total_pending,
+                 total_refunded, total_abandoned, total_chargeback, total_rejected,
+                 credit_card_total, pix_total, debit_card_total, boleto_total,
+                 total_ads, amount_approved, amount_pending, amount_refunded,
+                 amount_rejected, amount_chargeback, amount_abandoned,
+                 credit_card_amount, pix_amount, debit_card_amount, boleto_amount)
+                SELECT linked.kwai_id, finances_logs.date,
+                       SUM(finances_logs.total_views),
+                       SUM(finances_logs.total_clicks),
+                       SUM(finances_logs.total_approved),
+                       SUM(finances_logs.total_pending),
+                       SUM(finances_logs.total_refunded),
+                       SUM(finances_logs.total_abandoned),
+                       SUM(finances_logs.total_chargeback),
+                       SUM(finances_logs.total_rejected),
+                       SUM(finances_logs.credit_card_total),
+                       SUM(finances_logs.pix_total),
+                       SUM(finances_logs.debit_card_total),
+                       SUM(finances_logs.boleto_total),
+                       SUM(finances_logs.total_ads),
+                       SUM(finances_logs.amount_approved),
+                       SUM(finances_logs.amount_pending),
+                       SUM(finances_logs.amount_refunded),
+                       SUM(finances_logs.amount_rejected),
+                       SUM(finances_logs.amount_chargeback),
+                       SUM(finances_logs.amount_abandoned),
+                       SUM(finances_logs.credit_card_amount),
+                       SUM(finances_logs.pix_amount),
+                       SUM(finances_logs.debit_card_amount),
+                       SUM(finances_logs.boleto_amount)
+                FROM finances_logs
+                JOIN (SELECT DISTINCT kwai_id, campaign_id FROM kwai_campaigns) AS linked
+                  ON linked.campaign_id = finances_logs.campaign_id
+                GROUP BY linked.kwai_id, finances_logs.date
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kwai', '0006_kwaidailyfinance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='kwai',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='kwai_user_created_idx'),
+        ),
+    ]
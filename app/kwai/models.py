@@ -1,7 +1,7 @@
 import uuid
 from django.db import models
 from django.conf import settings
-from campaigns.models import Campaign
+from campaigns.models import Campaign, FinanceRollupCounters
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -25,6 +25,10 @@ class Kwai(models.Model):
 
     class Meta:
         db_table = 'kwai'
+        indexes = [
+            # Listagem por cursor (created_at, id) das contas do usuário
+            models.Index(fields=['user', 'created_at', 'id'], name='kwai_user_created_idx'),
+        ]
 
 
 class KwaiCampaign(models.Model):
@@ -40,3 +44,24 @@ class KwaiCampaign(models.Model):
 
     class Meta:
         db_table = 'kwai_campaigns'
+
+
+class KwaiDailyFinance(FinanceRollupCounters):
+    """
+    Soma diária do FinanceLogs das campanhas vinculadas à conta Kwai, mantida
+    nas escritas do FinanceLogs e ajustada quando campanhas são vinculadas ou
+    desvinculadas (ver `campaigns.finance_rollups`).
+    """
+    id = models.BigAutoField(primary_key=True)
+    kwai = models.ForeignKey(
+        Kwai, on_delete=models.CASCADE, related_name="daily_finance", db_index=False)
+    date = models.DateField()
+
+    def __str__(self):
+        return f"KwaiDailyFinance for Kwai {self.kwai_id} on {self.date}"
+
+    class Meta:
+        db_table = 'kwai_daily_finance'
+        constraints = [
+            models.UniqueConstraint(fields=['kwai', 'date'], name='unique_kwai_daily_finance'),
+        ]
@@ -360,6 +360,13 @@ dashboard_campaigns_get_schema = extend_schema(
             required=False,
             type=OpenApiTypes.DATE,
         ),
+        OpenApiParameter(
+            name="granularity",
+            description="Agrupamento dos overviews: `day` (padrão), `week` ou `month`. Períodos sem registros vêm com 0.",
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=["day", "week", "month"],
+        ),
     ],
     responses={
         200: OpenApiTypes.OBJECT,
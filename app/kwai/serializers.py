@@ -1,9 +1,10 @@
 from rest_framework import serializers
-from .models import Kwai, KwaiCampaign
-from campaigns.models import FinanceLogs, Campaign
+from .models import Kwai
+from campaigns.models import FinanceLogs, FinanceRunningTotals, Campaign
 from payments.models import UserSubscription
 import uuid
-from .services import get_financial_data
+from .services import get_financial_data, set_kwai_campaigns
+from campaigns.aggregations import get_date_range, get_granularity
 from django.utils.html import strip_tags
 import html
 
@@ -11,7 +12,8 @@ import html
 class FinanceLogsSerializer(serializers.ModelSerializer):
     class Meta:
         model = FinanceLogs
-        exclude = ['id']
+        # Os totais acumulados são internos (usados nas consultas por intervalo)
+        exclude = ['id'] + [field.name for field in FinanceRunningTotals._meta.fields]
 
 
 class CampaignSerializer(serializers.ModelSerializer):
@@ -115,9 +117,20 @@ class KwaiSerializer(serializers.ModelSerializer):
                 {"start": "A data de início não pode ser maior que a data de fim."}
             )
 
+        try:
+            start_date, end_date = get_date_range(start_date, end_date)
+        except ValueError:
+            raise serializers.ValidationError(
+                {"detail": "Os parâmetros de data devem estar no formato YYYY-MM-DD."})
+        try:
+            granularity = get_granularity(request.query_params.get('granularity') if request else None)
+        except ValueError:
+            raise serializers.ValidationError(
+                {"detail": "O parâmetro granularity deve ser day, week ou month."})
+
         # Obtém os dados financeiros agregados filtrados por data
         financial_data = get_financial_data(
-            kwai=instance, start_date=start_date, end_date=end_date)
+            kwai=instance, start_date=start_date, end_date=end_date, granularity=granularity)
 
         fields_to_remove = ['source', 'CPM', 'CPC',
                             'CPV', 'method', 'created_at', 'updated_at']
@@ -158,7 +171,7 @@ class KwaiSerializer(serializers.ModelSerializer):
         for campaign in campaigns:
             campaign.in_use = True
             campaign.save()
-            KwaiCampaign.objects.create(kwai=kwai, campaign=campaign)
+        set_kwai_campaigns(kwai, campaigns)
 
         return kwai
 
@@ -201,12 +214,10 @@ class KwaiSerializer(serializers.ModelSerializer):
                 campaign.in_use = False
                 campaign.save()
 
-            KwaiCampaign.objects.filter(kwai=instance).delete()
-
             for campaign in campaigns:
                 campaign.in_use = True
                 campaign.save()
-                KwaiCampaign.objects.create(kwai=instance, campaign=campaign)
+            set_kwai_campaigns(instance, campaigns)
 
         instance.name = validated_data.get('name', instance.name)
         instance.save()
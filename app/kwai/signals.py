@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from campaigns.dashboard_cache import invalidate_dashboards
+from .models import Kwai, KwaiCampaign
+
+
+@receiver(post_save, sender=Kwai)
+@receiver(post_delete, sender=Kwai)
+def kwai_dashboards_changed(sender, instance, **kwargs):
+    """
+    Contas Kwai alteradas mudam os dashboards em cache do dono.
+    """
+    invalidate_dashboards(instance.user_id)
+
+
+@receiver(post_save, sender=KwaiCampaign)
+@receiver(post_delete, sender=KwaiCampaign)
+def kwai_campaigns_dashboards_changed(sender, instance, **kwargs):
+    """
+    Vínculos entre contas Kwai e campanhas alterados mudam os totais da conta em cache.
+    """
+    invalidate_dashboards(instance.kwai.user_id)
@@ -6,13 +6,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.decorators import action
 from campaigns.models import Campaign
+from campaigns.aggregations import get_granularity
+from campaigns.dashboard_cache import dashboard_cache
 from datetime import datetime, timedelta
-from .services import get_financial_data
+from .services import get_financial_data, set_kwai_campaigns
 from .models import KwaiCampaign
 from .serializers import KwaiSerializer, CampaignSerializer
 from .models import Kwai, KwaiCampaign
 from django.db import transaction
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from django.utils import timezone
 from django.utils.html import strip_tags
 import html
 import re
@@ -67,19 +70,28 @@ class KwaiViewSet(ModelViewSet):
 
     @kwai_list_view_get_schema
     def list(self, request, *args, **kwargs):
+        # A página inteira (com os totais de cada conta) vem do cache dos dashboards
+        data = dashboard_cache.get_or_compute(
+            request.user.pk, "kwai-list", request.query_params,
+            lambda: self.list_data(request, *args, **kwargs))
+        return Response(data)
+
+    def list_data(self, request, *args, **kwargs):
         try:
             queryset = self.filter_queryset(self.get_queryset())
-            if not queryset.exists():
-                return Response(
-                    {"count": 0, "detail": "Nenhuma campanha encontrada com os critérios de busca.", "results": []}
-                )
+            # A página é buscada primeiro: uma página vazia indica a busca sem resultados
+            page = self.paginate_queryset(queryset)
+        except NotFound:
+            raise
         except Exception as e:
-            return Response(
-                {"count": 0, "results": [],
-                    "detail": "O parâmetro de busca contém caracteres inválidos."},
-            )
+            return {"count": 0, "results": [],
+                    "detail": "O parâmetro de busca contém caracteres inválidos."}
 
-        return super().list(request, *args, **kwargs)
+        if page is not None and not page:
+            return {"count": 0, "detail": "Nenhuma campanha encontrada com os critérios de busca.", "results": []}
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data).data
+        return self.get_serializer(queryset, many=True).data
 
     @kwai_create_view_post_schema
     def create(self, request, *args, **kwargs):
@@ -100,8 +112,10 @@ class KwaiViewSet(ModelViewSet):
         if not kwai:
             return Response({"error": "Conta Kwai não encontrada."}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = self.get_serializer(kwai)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = dashboard_cache.get_or_compute(
+            request.user.pk, f"kwai-detail:{kwai.uid}", request.query_params,
+            lambda: self.get_serializer(kwai).data)
+        return Response(data, status=status.HTTP_200_OK)
 
     @kwai_put_view_schema
     def update(self, request, uid=None, *args, **kwargs):
@@ -163,12 +177,12 @@ class KwaiViewSet(ModelViewSet):
                 campaign.in_use = False
                 campaign.save()
 
-            KwaiCampaign.objects.filter(kwai=kwai).delete()
-
             for campaign in campaigns:
                 campaign.in_use = True
                 campaign.save()
-                KwaiCampaign.objects.create(kwai=kwai, campaign=campaign)
+
+            # Substitui os vínculos ajustando o rollup diário da conta
+            set_kwai_campaigns(kwai, campaigns)
 
         kwai.save()
 
@@ -200,7 +214,7 @@ class KwaiViewSet(ModelViewSet):
                 campaign.in_use = False
                 campaign.save()
 
-            kwai_campaigns.delete()
+            set_kwai_campaigns(kwai, [])
             kwai.deleted = True
             kwai.save()
 
@@ -296,7 +310,7 @@ class Dashboard_campaigns(APIView):
         try:
 
             if not start_date and not end_date:
-                end_date = datetime.now().date()
+                end_date = timezone.localdate()
                 start_date = end_date - timedelta(days=30)
 
             elif start_date and not end_date:
@@ -312,8 +326,15 @@ class Dashboard_campaigns(APIView):
 
             raise ValidationError(
                 {"detail": "Os parâmetros de data devem estar no formato YYYY-MM-DD."})
+        try:
+            granularity = get_granularity(request.query_params.get('granularity'))
+        except ValueError:
+            raise ValidationError(
+                {"detail": "O parâmetro granularity deve ser day, week ou month."})
 
-        # Obtém os dados financeiros filtrados pelo intervalo de datas
-        data = get_financial_data(
-            user=request.user, start_date=start_date, end_date=end_date)
+        # Obtém os dados financeiros filtrados pelo intervalo de datas (via cache dos dashboards)
+        data = dashboard_cache.get_or_compute(
+            request.user.pk, "dashboard-campaigns", request.query_params,
+            lambda: get_financial_data(
+                user=request.user, start_date=start_date, end_date=end_date, granularity=granularity))
         return Response(data, status=status.HTTP_200_OK)
@@ -1,6 +1,6 @@
 import boto3
 from django.conf import settings
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 from datetime import datetime
 import os
 import logging
@@ -16,7 +16,7 @@ def get_ses_client():
 
 
 def send_subscription_paid_email(to_email, total_paid=None, user_name=None):
-    config = Configuration.objects.first()
+    config = get_configuration()
     email_subject = config.email_subscription_paid_subject if config else None
     email_body = config.email_subscription_paid if config else None
      
@@ -64,7 +64,7 @@ def send_subscription_paid_email(to_email, total_paid=None, user_name=None):
 
 
 def send_subscription_expired_email(to_email, expiration=None, user_name=None):
-    config = Configuration.objects.first()
+    config = get_configuration()
     email_subject = config.email_expired_subject if config else None
     email_body = config.email_expired if config else None
      
@@ -116,7 +116,7 @@ def send_subscription_expired_email(to_email, expiration=None, user_name=None):
         return None
     
 def send_subscription_reminder_email(to_email, expiration=None, user_name=None):
-    config = Configuration.objects.first()
+    config = get_configuration()
     email_subject = config.email_reminder_subject if config else None
     email_body = config.email_reminder if config else None
      
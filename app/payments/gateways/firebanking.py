@@ -1,5 +1,5 @@
 from .base import PaymentGatewayBase
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 from payments.models import UserSubscription, SubscriptionPayment
 from accounts.models import User
 from django.conf import settings
@@ -27,7 +27,7 @@ class FirebankingGateway(PaymentGatewayBase):
         except User.DoesNotExist:
             raise Exception(f"Usuário não encontrado: {user}")
 
-        config = Configuration.objects.first()
+        config = get_configuration()
         firebanking_api_key = config.firebanking_api_key
 
         url = f"{settings.FIRE_BANKING_API_URL}/payment"
@@ -1,5 +1,5 @@
 from .base import PaymentGatewayBase
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 from payments.models import UserSubscription, SubscriptionPayment
 from django.utils.timezone import now, timedelta
 from decimal import Decimal, ROUND_HALF_UP
@@ -20,7 +20,7 @@ class ZeroOneGateway(PaymentGatewayBase):
         return self.create_subscription_and_payment(user, plan, payment_method, idempotency_key)
 
     def generate_pix_payment(self, payload):
-        config = Configuration.objects.first()
+        config = get_configuration()
         if not config or not config.zeroone_secret_key:
             raise Exception("Chave ZeroOne não encontrada.")
         zeroone_secret_key = config.zeroone_secret_key
@@ -41,7 +41,7 @@ class ZeroOneGateway(PaymentGatewayBase):
                 f"Erro ao comunicar com o gateway ZeroOne: {str(e)}")
 
     def create_subscription_and_payment(self, user, plan, payment_method, idempotency_key=None):
-        config = Configuration.objects.first()
+        config = get_configuration()
         late_interest = config.late_payment_interest or 0
         daily_late_interest = config.daily_late_payment_interest or 0
 
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils.timezone import now, timedelta
 from payments.models import UserSubscription, NotificationSend, SubscriptionPayment, PaymentReminderLock
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration
 from payments.utils import create_subscription_payment
 from payments.email_utils import send_subscription_reminder_email
 from django.utils import timezone
@@ -24,7 +24,7 @@ class Command(BaseCommand):
 
         try:
             with transaction.atomic():
-                config = Configuration.objects.first()
+                config = get_configuration()
                 if not config or not config.days_to_reminder:
                     logger.error('Configuração days_to_reminder não encontrada.')
                     return
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.utils.timezone import now
 from plans.models import Plan, PlanFeature
 from .models import SubscriptionPayment, UserSubscription
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration, get_plan_catalog
 from decimal import Decimal
 
 
@@ -31,7 +31,7 @@ class PaymentSerializer(serializers.Serializer):
         """
 
         try:
-            plan = Plan.objects.get(uid=data['plan_uid'])
+            plan = get_plan_catalog().get(data['plan_uid'])
             data['plan'] = plan
         except Plan.DoesNotExist:
             raise serializers.ValidationError(
@@ -104,7 +104,7 @@ class PaymentOpenedSerializer(serializers.ModelSerializer):
         fields = ["uid", "amount", "date", "tax", "total"]
 
     def get_tax(self, obj):
-        config = Configuration.objects.first()
+        config = get_configuration()
         late_interest = config.late_payment_interest or 0
         daily_late_interest = config.daily_late_payment_interest or 0
 
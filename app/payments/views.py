@@ -6,7 +6,7 @@ from django.shortcuts import get_object_or_404
 from plans.models import Plan
 from accounts.models import Usuario
 from .models import SubscriptionPayment, UserSubscription
-from custom_admin.models import Configuration
+from custom_admin.reference_data import get_configuration, get_plan_catalog
 from .serializers import PaymentSerializer, SubscriptionPlanSerializer, PlanInfoSerializer, PaymentOpenedSerializer, PaymentHistoricSerializer
 from django.utils.timezone import now, timedelta
 from .utils import get_idempotent_payment
@@ -154,7 +154,7 @@ class PaymentChangePlanView(APIView):
         user = request.user
 
         try:
-            plan = Plan.objects.get(uid=data['plan_uid'])
+            plan = get_plan_catalog().get(data['plan_uid'])
         except Plan.DoesNotExist:
             return Response({"error": "Plano não encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -220,10 +220,13 @@ class SubscriptionInfoView(APIView):
     def get(self, request):
         user = request.user
 
-        # Assinatura do usuário
+        # Assinatura do usuário (o plano vem do catálogo em cache)
+        catalog = get_plan_catalog()
         subscription = UserSubscription.objects.filter(
             user=user
-        ).select_related('plan').order_by('-expiration').first()
+        ).order_by('-expiration').first()
+        if subscription and subscription.plan_id in catalog.by_id:
+            subscription.plan = catalog.by_id[subscription.plan_id]
         plan_data = SubscriptionPlanSerializer(
             subscription).data if subscription else {}
 
@@ -242,8 +245,7 @@ class SubscriptionInfoView(APIView):
             payments_historic, many=True).data
 
         # Planos disponíveis
-        plans = Plan.objects.all()
-        plans_list = PlanInfoSerializer(plans, many=True).data
+        plans_list = PlanInfoSerializer(catalog.plans, many=True).data
 
         return Response({
             "plan": plan_data,
@@ -282,7 +284,7 @@ class PaymentWebhookView(APIView):
             }
 
         else:
-            zeroone_config = Configuration.objects.first()
+            zeroone_config = get_configuration()
             if not zeroone_config or not zeroone_config.zeroone_secret_key:
                 return Response({"error": "Chave de autorização ZeroOne não configurada."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             zeroone_secret_key = zeroone_config.zeroone_secret_key
@@ -1,7 +1,234 @@
+import base64
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10  # Número padrão de itens por página
     page_size_query_param = 'page_size'  # Permite alterar o tamanho da página via parâmetro
     max_page_size = 100  # Limite máximo de itens por página
-    page_query_param = 'page'  # Nome do parâmetro para a página
\ No newline at end of file
+    page_query_param = 'page'  # Nome do parâmetro para a página
+    # Paginação por cursor (keyset), opcional: `?cursor=` na primeira página e os links
+    # `next`/`previous` nas seguintes, sem COUNT nem OFFSET
+    cursor_query_param = 'cursor'
+    cursor_field = 'created_at'  # Campo padrão do cursor (a view pode definir `cursor_field`)
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return self.paginate_page_number(queryset, request, view)
+        return self.paginate_keyset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'cursor_mode', False):
+            return Response({
+                'count': self.count,
+                # O total não foi contado nesta request (cache ou estimativa do planner)
+                'count_approximate': self.count_approximate,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            })
+        return Response({
+            'next': self.next_cursor_link,
+            'previous': self.previous_cursor_link,
+            'results': data,
+        })
+
+    def paginate_page_number(self, queryset, request, view=None):
+        """
+        Pagina por número de página buscando primeiro as linhas da página
+        (`page_size + 1`, para saber se há próxima página).
+
+        Na última página o total sai das próprias linhas; nas demais vem de
+        `count_rows`. Uma página vazia além da primeira só é inválida (404)
+        se a listagem tiver linhas.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            count, _ = self.count_rows(queryset, request, view, 1)
+            page_number = max((count + page_size - 1) // page_size, 1)
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        page = rows[:page_size]
+        self.page_number = page_number
+        self.has_next_page = len(rows) > page_size
+
+        if not page and page_number > 1:
+            if (queryset.exists() if isinstance(queryset, QuerySet) else len(queryset)):
+                raise NotFound(self.invalid_page_message)
+            self.count, self.count_approximate = 0, False
+        elif not self.has_next_page:
+            self.count, self.count_approximate = offset + len(page), False
+        else:
+            self.count, self.count_approximate = self.count_rows(
+                queryset, request, view, offset + len(rows))
+        return page
+
+    def count_rows(self, queryset, request, view, minimum):
+        """
+        Retorna (total, aproximado) de uma listagem com mais de uma página.
+
+        O total exato fica no cache compartilhado por `LIST_COUNT_CACHE_SECONDS`
+        para o usuário e os filtros da listagem (a consulta SQL); sem ele, a
+        estimativa do planner do Postgres é usada nas listagens sem filtro
+        quando passa de `LIST_COUNT_ESTIMATE_THRESHOLD` linhas, evitando o
+        COUNT(*) das tabelas grandes. Com filtro (por usuário, busca etc.) a
+        estimativa pode errar por ordens de grandeza, então o total é contado.
+        `minimum` é a quantidade de linhas já vistas.
+        """
+        if not isinstance(queryset, QuerySet):
+            return len(queryset), False
+
+        queryset = queryset.order_by()
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f"{sql}:{params!r}".encode()).hexdigest()
+        user_id = getattr(getattr(request, 'user', None), 'pk', None)
+        key = f"list_count:{type(view).__name__}:{user_id}:{digest}"
+
+        count = cache.get(key)
+        if count is not None and count >= minimum:
+            return count, True
+
+        if not queryset.query.where:
+            estimate = self.planner_estimate(queryset)
+            if estimate is not None and estimate >= settings.LIST_COUNT_ESTIMATE_THRESHOLD:
+                return max(estimate, minimum), True
+
+        count = queryset.count()
+        cache.set(key, count, settings.LIST_COUNT_CACHE_SECONDS)
+        return count, False
+
+    def planner_estimate(self, queryset):
+        """
+        Retorna a quantidade de linhas estimada pelo planner (EXPLAIN, sem
+        executar a consulta), ou None fora do Postgres.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_next_link(self):
+        if not self.has_next_page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def paginate_keyset(self, queryset, request, view=None):
+        """
+        Pagina por (campo do cursor, id), na direção da ordenação pedida
+        (`?ordering=<campo>` ascendente; decrescente nos demais casos).
+
+        Cada página busca `page_size + 1` linhas a partir da última posição
+        (`WHERE (campo, id) < (valor, id)`), usando os índices compostos
+        (usuário, campo, id) das listagens. Valores nulos no campo ficam no fim.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        model = queryset.model
+        field = model._meta.get_field(getattr(view, 'cursor_field', self.cursor_field))
+        pk = model._meta.pk
+        ordering = queryset.query.order_by
+        descending = not ordering or ordering[0] != field.name
+
+        position = self.decode_cursor(request.query_params[self.cursor_query_param], field, pk)
+        reverse = position is not None and position[2]
+        # A página anterior é buscada na ordem inversa (nulos no início) e invertida
+        scan_descending = descending != reverse
+        nulls_last = not reverse
+
+        if position is not None:
+            queryset = queryset.filter(self.rows_after(field, pk, position[0], position[1], scan_descending, nulls_last))
+        rows = list(queryset.order_by(*self.keyset_ordering(field, pk, scan_descending, nulls_last))[:page_size + 1])
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+        if reverse:
+            page.reverse()
+
+        self.next_cursor_link = self.previous_cursor_link = None
+        if page:
+            if has_more or reverse:
+                self.next_cursor_link = self.cursor_link(page[-1], field, reverse=False)
+            if (has_more and reverse) or (position is not None and not reverse):
+                self.previous_cursor_link = self.cursor_link(page[0], field, reverse=True)
+        return page
+
+    def keyset_ordering(self, field, pk, descending, nulls_last):
+        if not field.null:
+            return [f"-{field.name}", f"-{pk.name}"] if descending else [field.name, pk.name]
+        nulls = {'nulls_last': True} if nulls_last else {'nulls_first': True}
+        value = F(field.name).desc(**nulls) if descending else F(field.name).asc(**nulls)
+        return [value, F(pk.name).desc() if descending else F(pk.name).asc()]
+
+    def rows_after(self, field, pk, value, key, descending, nulls_last):
+        """
+        Filtro das linhas depois de (value, key) na ordenação do cursor.
+        """
+        lookup = 'lt' if descending else 'gt'
+        if value is None:
+            after_nulls = Q(**{f"{field.name}__isnull": True, f"{pk.name}__{lookup}": key})
+            return after_nulls if nulls_last else Q(**{f"{field.name}__isnull": False}) | after_nulls
+
+        # O `<=` (ou `>=`) redundante limita a varredura do índice pelo primeiro campo
+        after = Q(**{f"{field.name}__{lookup}e": value}) & (
+            Q(**{f"{field.name}__{lookup}": value}) | Q(**{field.name: value, f"{pk.name}__{lookup}": key}))
+        if field.null and nulls_last:
+            after |= Q(**{f"{field.name}__isnull": True})
+        return after
+
+    def cursor_link(self, obj, field, reverse):
+        value = getattr(obj, field.attname)
+        payload = {'v': value.isoformat() if value is not None else None, 'k': str(obj.pk), 'r': reverse}
+        cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, cursor, field, pk):
+        """
+        Retorna (valor, id, anterior) da posição do cursor, ou None na primeira página.
+        """
+        if not cursor:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            value = field.to_python(payload['v']) if payload['v'] is not None else None
+            return value, pk.to_python(payload['k']), bool(payload['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
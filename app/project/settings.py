@@ -253,7 +253,7 @@ REST_FRAMEWORK = {
     # Backends de filtro (para filtragem, busca e ordenação)
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        'campaigns.search.DocumentSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
 
@@ -335,14 +335,45 @@ DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
 # Carregar o domínio do webhook
 WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL', 'http://localhost')
 
+# Fila de notificações dos gateways (manage.py process_webhooks)
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', 5))
+WEBHOOK_RETRY_DELAY_SECONDS = int(os.getenv('WEBHOOK_RETRY_DELAY_SECONDS', 5))
+# Dias mantidos no ledger de deduplicação das vendas (manage.py prune_sale_event_ledger)
+SALE_EVENT_LEDGER_RETENTION_DAYS = int(os.getenv('SALE_EVENT_LEDGER_RETENTION_DAYS', 90))
+# Dias fechados recalculados a cada noite nos indicadores da plataforma (manage.py finalize_platform_kpis)
+PLATFORM_KPIS_LOOKBACK_DAYS = int(os.getenv('PLATFORM_KPIS_LOOKBACK_DAYS', 35))
+# Ranking de usuários por profit: recarga do ranking de cada processo e cache dos rankings por período (s)
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', 30))
+LEADERBOARD_CACHE_SECONDS = int(os.getenv('LEADERBOARD_CACHE_SECONDS', 60))
+# Cache das respostas dos dashboards: validade, tempo extra servindo a resposta vencida (sem alterações
+# nos dados) durante o recálculo e espera máxima por um recálculo de outra request (s); 0 desativa
+DASHBOARD_CACHE_SECONDS = int(os.getenv('DASHBOARD_CACHE_SECONDS', 300))
+DASHBOARD_CACHE_STALE_SECONDS = int(os.getenv('DASHBOARD_CACHE_STALE_SECONDS', 60))
+DASHBOARD_CACHE_LOCK_SECONDS = int(os.getenv('DASHBOARD_CACHE_LOCK_SECONDS', 10))
+# Invalidação dos caches por processo entre os processos e containers: notify (LISTEN/NOTIFY
+# do Postgres) ou poll (carimbos no cache compartilhado), canal do NOTIFY e intervalo (s) das
+# verificações do modo poll e das reconexões
+CACHE_INVALIDATION_MODE = os.getenv('CACHE_INVALIDATION_MODE', 'notify')
+CACHE_INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache_invalidation')
+CACHE_INVALIDATION_POLL_SECONDS = float(os.getenv('CACHE_INVALIDATION_POLL_SECONDS', 1))
+# Totais das listagens paginadas: cache do total exato por usuário e filtros (s) e
+# quantidade de linhas estimadas pelo planner a partir da qual o COUNT(*) não é feito
+LIST_COUNT_CACHE_SECONDS = int(os.getenv('LIST_COUNT_CACHE_SECONDS', 60))
+LIST_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('LIST_COUNT_ESTIMATE_THRESHOLD', 10000))
+
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:80")
 # Configuração do gateway de pagamento ZeroOne
 ZEROONE_SECRET_KEY = os.getenv('ZEROONE_SECRET_KEY', 'default-secret-key')
 ZEROONE_API_URL = os.getenv('ZEROONE_API_URL', 'https://default-url.com')
 
+# Cache em memória compartilhada por todos os processos que mapeiam o mesmo arquivo
+# (workers do uwsgi e worker da fila, pelo volume tmpfs /tmp/django_cache); tamanho em MB
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': '/tmp/django_cache',
+        'BACKEND': 'campaigns.cache_backend.SharedMemoryCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/django_cache/shared_memory.cache'),
+        'OPTIONS': {
+            'SIZE_MB': int(os.getenv('CACHE_SIZE_MB', 128)),
+        },
     }
 }
\ No newline at end of file
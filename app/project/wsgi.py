@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
 application = get_wsgi_application()
+
+# Escuta as invalidações dos caches por processo (a thread é criada em cada worker do uwsgi)
+from campaigns.invalidation_bus import bus  # noqa: E402
+bus.enable()
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('support', '0006_alter_support_title'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='support',
+            index=models.Index(fields=['created_at', 'id'], name='support_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='support',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='support_user_created_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -21,12 +23,23 @@ class Support(models.Model):
     closed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Documento da busca das listagens, mantido por trigger (ver `campaigns.search`)
+    search_document = models.TextField(null=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    SEARCH_DOCUMENT_FIELDS = ('title', 'description')
 
     def __str__(self):
         return self.title
 
     class Meta:
         db_table = 'support'
+        indexes = [
+            # Listagem por cursor (created_at, id): todos os tickets (admin) e os do usuário
+            models.Index(fields=['created_at', 'id'], name='support_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='support_user_created_idx'),
+            GinIndex(fields=['search_vector'], name='support_search_idx'),
+        ]
 
 
 class SupportReply(models.Model):
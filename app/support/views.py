@@ -13,6 +13,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from .models import Support, SupportReply
 from .serializers import SupportSerializer, SupportReplySerializer, SupportReplyAttachment
+from campaigns.search import DocumentSearchFilter
 from .schema import (
     support_list_view_schema,
     support_detail_view_schema,
@@ -31,7 +32,7 @@ class SupportListView(generics.ListAPIView):
     queryset = Support.objects.all()
     serializer_class = SupportSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, DocumentSearchFilter]
     ordering_fields = ['created_at']
     ordering = ['-created_at']
     search_fields = ['title', 'description']
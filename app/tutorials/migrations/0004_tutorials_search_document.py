@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+from campaigns.search import search_document_operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tutorials', '0003_tutorial_created_at_tutorial_uid_tutorial_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutorial',
+            name='search_document',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutorial',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tutorials_search_idx'),
+        ),
+        *search_document_operations(
+            'tutorials', ['title', 'description', 'youtube_url']),
+    ]
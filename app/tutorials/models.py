@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 import requests
 import uuid
@@ -11,9 +13,17 @@ class Tutorial(models.Model):
     thumbnail_url = models.URLField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Documento da busca das listagens, mantido por trigger (ver `campaigns.search`)
+    search_document = models.TextField(null=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    SEARCH_DOCUMENT_FIELDS = ('title', 'description', 'youtube_url')
 
     class Meta:
         db_table = 'tutorials'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='tutorials_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -4,8 +4,10 @@ from .permissions import IsAdminUserOrReadOnly
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 import re
+from custom_admin.reference_data import get_tutorials
 from .models import Tutorial
 from .serializers import TutorialSerializer
+from campaigns.search import DocumentSearchFilter
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
 
@@ -17,7 +19,7 @@ class TutorialViewSet(viewsets.ModelViewSet):
     queryset = Tutorial.objects.all()
     serializer_class = TutorialSerializer
     permission_classes = [IsAdminUserOrReadOnly]
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, DocumentSearchFilter]
     ordering_fields = ['title', 'description']
     ordering = ['created_at']
     search_fields = ['title', 'description', 'youtube_url']
@@ -63,15 +65,23 @@ class TutorialViewSet(viewsets.ModelViewSet):
         Sobrescreve o método list para adicionar uma mensagem de erro
         caso nenhum dado seja encontrado na busca.
         """
-        queryset = self.filter_queryset(self.get_queryset())
-
-        if not queryset.exists():
+        params = self.request.query_params
+        if params.get('search') or params.get('ordering') in self.ordering_fields:
+            queryset = self.filter_queryset(self.get_queryset())
+        else:
+            # Listagem padrão (por id, sem busca): lida do cache de referência do processo
+            queryset = get_tutorials()
+            if params.get('order') == 'desc':
+                queryset = queryset[::-1]
+
+        # A página é buscada primeiro: uma página vazia indica a busca sem resultados
+        page = self.paginate_queryset(queryset)
+        if page is not None and not page:
             return Response(
                 {"count": 0, "detail": "Nenhum tutorial encontrado com os critérios de busca.", "results": []},
                 status=status.HTTP_200_OK
             )
 
-        page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)